@@ -0,0 +1,72 @@
+"""
+Exercise Catalog
+Exercises parsed once per file and kept in memory.
+
+Each lookup only stats the JSON file, so edits to exercises/*.json are still
+picked up without a restart. In the preforking server (serve.py) the master
+loads the catalog before forking and the workers share it.
+"""
+
+import os
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+EXERCISES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "exercises")
+
+_lock = threading.Lock()
+# language -> (mtime_ns, exercises, {id: exercise})
+_catalog: Dict[str, tuple] = {}
+
+
+def _entry(language: str) -> Optional[tuple]:
+    path = os.path.join(EXERCISES_DIR, f"{language}.json")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    entry = _catalog.get(language)
+    if entry is not None and entry[0] == mtime:
+        return entry
+    with _lock:
+        entry = _catalog.get(language)
+        if entry is not None and entry[0] == mtime:
+            return entry
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                exercises = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(exercises, list):
+            return None
+        entry = (mtime, exercises, {ex.get("id"): ex for ex in exercises if isinstance(ex, dict)})
+        _catalog[language] = entry
+        return entry
+
+
+def list_exercises(language: str) -> Optional[List[Dict[str, Any]]]:
+    """All exercises of a language, or None if its file is missing or invalid."""
+    entry = _entry(language)
+    return entry[1] if entry else None
+
+
+def get_exercise(language: str, exercise_id: str) -> Optional[Dict[str, Any]]:
+    """One exercise by id, or None."""
+    entry = _entry(language)
+    return entry[2].get(exercise_id) if entry else None
+
+
+def metric_labels(language: str, exercise_id: str) -> Dict[str, str]:
+    """Label values for metrics; unknown languages and exercises collapse to 'other'."""
+    if list_exercises(language) is None:
+        return {"language": "other", "exercise": "other"}
+    return {"language": language, "exercise": exercise_id if get_exercise(language, exercise_id) else "other"}
+
+
+def preload() -> int:
+    """Parse every exercise file now. Returns the number of exercises loaded."""
+    total = 0
+    for name in sorted(os.listdir(EXERCISES_DIR)):
+        if name.endswith(".json"):
+            total += len(list_exercises(name[:-5]) or [])
+    return total
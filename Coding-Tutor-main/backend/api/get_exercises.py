@@ -5,7 +5,8 @@ Returns list of exercises for a given language.
 
 from fastapi import APIRouter, HTTPException
 from typing import List, Dict, Any
-import json
+from stats import tracing
+from . import catalog
 import os
 
 router = APIRouter()
@@ -29,6 +30,7 @@ async def get_exercises(language: str) -> List[Dict[str, Any]]:
     """
     # Normalize language to lowercase
     language = language.lower().strip()
+    tracing.annotate(language=catalog.metric_labels(language, "")["language"])
     
     exercises_file = os.path.join(
         os.path.dirname(os.path.dirname(__file__)),
@@ -46,11 +48,10 @@ async def get_exercises(language: str) -> List[Dict[str, Any]]:
         return []
     
     try:
-        with open(exercises_file, 'r', encoding='utf-8') as f:
-            exercises = json.load(f)
+        exercises = catalog.list_exercises(language)
         
-        if not isinstance(exercises, list):
-            logger.error(f"Exercises file does not contain a list: {type(exercises)}")
+        if exercises is None:
+            logger.error(f"Exercises file is not valid JSON or does not contain a list: {exercises_file}")
             return []
         
         logger.info(f"Loaded {len(exercises)} exercises from {exercises_file}")
@@ -67,9 +68,6 @@ async def get_exercises(language: str) -> List[Dict[str, Any]]:
         
         logger.info(f"Returning {len(result)} exercises")
         return result
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {e}")
-        return []
     except Exception as e:
         logger.error(f"Error loading exercises: {e}")
         import traceback
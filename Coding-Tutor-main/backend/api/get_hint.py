@@ -4,16 +4,106 @@ Generates hints using RAG-first, LLM-fallback strategy.
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-from rag import get_hint
-from stats import StatsManager
-import os
+from rag import get_hint, stream_hint, rag_llm_chat
+from stats import StatsManager, metrics, tracing
+from . import catalog
 import json
+import time
 
 router = APIRouter()
 stats_manager = StatsManager()
 
+# Time from request to the first hint text the student sees
+hint_ttft = metrics.histogram(
+    "hint_time_to_first_token_seconds",
+    "Seconds from a streamed hint request to its first hint text",
+    ["path"],
+)
+hint_stream_duration = metrics.histogram(
+    "hint_stream_duration_seconds",
+    "Seconds from a streamed hint request to its final event",
+    ["source"],
+)
+
+hint_latency = metrics.histogram(
+    "hint_latency_seconds",
+    "Seconds to answer /api/hint",
+    ["source"],
+)
+hint_stage = metrics.histogram(
+    "hint_stage_seconds",
+    "Seconds spent in each hint pipeline stage (parallel pipeline)",
+    ["stage"],
+)
+
+# Requests answered by a generation another identical request had started
+metrics.counter(
+    "hint_requests_coalesced_total",
+    "Hint requests that joined an identical request already in flight",
+).set_function(lambda: rag_llm_chat.hint_flights.coalesced)
+metrics.counter(
+    "hint_generations_total",
+    "Hint retrieval + generation runs started (one per distinct in-flight error)",
+).set_function(lambda: rag_llm_chat.hint_flights.leaders)
+metrics.gauge(
+    "hint_generations_in_flight",
+    "Distinct hint generations currently running",
+).set_function(lambda: rag_llm_chat.hint_flights.in_flight())
+
+# Lookups answered from the precomputed hint packs
+metrics.counter(
+    "hint_pack_hits_total",
+    "Hint requests answered from a precomputed hint pack",
+).set_function(lambda: rag_llm_chat.hint_packs.hits)
+metrics.counter(
+    "hint_pack_misses_total",
+    "Hint pack lookups with no precomputed hint for the exercise and error class",
+).set_function(lambda: rag_llm_chat.hint_packs.misses)
+
+# LLM scheduler: queue, running generations and requests shed to faster tiers
+metrics.gauge(
+    "llm_queue_depth",
+    "Hint generations waiting for an LLM slot",
+).set_function(lambda: rag_llm_chat.llm_scheduler.queue_depth)
+metrics.gauge(
+    "llm_running",
+    "Hint generations holding an LLM slot",
+).set_function(lambda: rag_llm_chat.llm_scheduler.running)
+metrics.gauge(
+    "llm_estimated_wait_seconds",
+    "Estimated wait for an LLM slot",
+).set_function(lambda: rag_llm_chat.llm_scheduler.estimate_wait())
+_llm_shed = metrics.counter(
+    "llm_shed_total",
+    "Hint requests answered from a faster tier instead of the LLM",
+    ["reason"],
+)
+for _reason in ("queue_full", "deadline", "timeout"):
+    _llm_shed.set_function(lambda r=_reason: rag_llm_chat.llm_scheduler.shed[r], reason=_reason)
+
+# Caches, embedding queue and loaded indexes
+_cache_entries = metrics.gauge("cache_entries", "Entries held by a cache", ["cache"])
+_cache_hits = metrics.counter("cache_hits_total", "Cache lookups answered from the cache", ["cache"])
+_cache_misses = metrics.counter("cache_misses_total", "Cache lookups that missed", ["cache"])
+_caches = {"retrieval": lambda: rag_llm_chat._rag_cache.get_stats()}
+if rag_llm_chat._hint_cache:
+    _caches["hint"] = lambda: rag_llm_chat._hint_cache.get_stats()
+for _name, _stats in _caches.items():
+    _cache_entries.set_function(lambda s=_stats: s()["size"], cache=_name)
+    _cache_hits.set_function(lambda s=_stats: s()["hits"], cache=_name)
+    _cache_misses.set_function(lambda s=_stats: s()["misses"], cache=_name)
+metrics.gauge(
+    "embedding_queue_depth",
+    "Queries waiting for the embedding batcher",
+).set_function(lambda: rag_llm_chat.batcher.get_stats()["queued"] if rag_llm_chat.batcher else 0)
+metrics.gauge(
+    "rag_indexes_loaded",
+    "Lab-manual indexes loaded in this process",
+).set_function(lambda: len(rag_llm_chat.metadata))
+
 
 class GetHintRequest(BaseModel):
     """Request model for hint generation."""
@@ -29,6 +119,9 @@ async def get_hint_api(request: GetHintRequest):
     Generate hint using RAG (lab manual) first, then LLM fallback.
     Returns conceptual hint only (no code, no solution).
     """
+    started = time.perf_counter()
+    tracing.mark("request_parse")
+    tracing.annotate(**catalog.metric_labels(request.language, request.exercise_id))
     try:
         # Load exercise to get subject
         exercise = _load_exercise(request.language, request.exercise_id)
@@ -37,12 +130,13 @@ async def get_hint_api(request: GetHintRequest):
         if exercise:
             subject = exercise.get("subject", subject)
         
-        # Generate hint
+        # Generate hint (embedding and LLM calls are awaited, never blocking the loop)
         try:
-            hint_data = get_hint(
+            hint_data = await get_hint(
                 subject=subject,
                 error_message=request.error_message,
-                failed_tests=request.failed_tests
+                failed_tests=request.failed_tests,
+                exercise_id=request.exercise_id
             )
         except Exception as hint_error:
             # Fallback if hint generation fails
@@ -59,6 +153,10 @@ async def get_hint_api(request: GetHintRequest):
             error=True,
             hint_used=True
         )
+        hint_latency.observe(time.perf_counter() - started, source=hint_data.get("source", "Basic"))
+        for stage, ms in hint_data.get("timings", {}).items():
+            if stage != "total":
+                hint_stage.observe(ms / 1000, stage=stage)
         
         return {
             "hint": hint_data.get("hint", "Review your code and check for errors."),
@@ -75,25 +173,74 @@ async def get_hint_api(request: GetHintRequest):
         }
 
 
-def _load_exercise(language: str, exercise_id: str) -> Optional[dict]:
-    """Load exercise from JSON file."""
-    exercises_file = os.path.join(
-        os.path.dirname(os.path.dirname(__file__)),
-        "exercises",
-        f"{language}.json"
+@router.post("/hint/stream")
+async def stream_hint_api(request: GetHintRequest):
+    """
+    Stream a hint as Server-Sent Events.
+
+    A rule-based or cached hint arrives at once as a `hint` event; otherwise
+    LLM text arrives as `token` events. The last event is always `done` with
+    the final hint, source and rag_used.
+    """
+    started = time.perf_counter()
+    tracing.mark("request_parse")
+    tracing.annotate(**catalog.metric_labels(request.language, request.exercise_id))
+    exercise = _load_exercise(request.language, request.exercise_id)
+    subject = request.language + "_lab_manual"
+    if exercise:
+        subject = exercise.get("subject", subject)
+
+    stats_manager.record_attempt(
+        language=request.language,
+        success=False,
+        error=True,
+        hint_used=True
     )
-    
-    if not os.path.exists(exercises_file):
-        return None
-    
+
+    return StreamingResponse(
+        _hint_events(request, subject, started),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _hint_events(request: GetHintRequest, subject: str, started: float):
+    """Encode stream_hint events as SSE, timing the first hint text."""
+    first_token_at = None
     try:
-        with open(exercises_file, 'r', encoding='utf-8') as f:
-            exercises = json.load(f)
-            for ex in exercises:
-                if ex.get("id") == exercise_id:
-                    return ex
+        async for event in stream_hint(
+            subject=subject,
+            error_message=request.error_message,
+            failed_tests=request.failed_tests,
+            exercise_id=request.exercise_id
+        ):
+            name = event.pop("event")
+            if first_token_at is None and name in ("hint", "token"):
+                first_token_at = time.perf_counter()
+                hint_ttft.observe(first_token_at - started,
+                                  path="immediate" if name == "hint" else "llm")
+            if name == "done":
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    hint_ttft.observe(first_token_at - started, path="llm")
+                event["ttft_ms"] = round((first_token_at - started) * 1000, 1)
+                hint_stream_duration.observe(time.perf_counter() - started,
+                                             source=event.get("source", "Basic"))
+            yield _sse(name, event)
     except Exception:
-        pass
-    
-    return None
+        # Same fallback text as /hint
+        yield _sse("done", {
+            "hint": f"Error: {request.error_message}. Review your code syntax and logic.",
+            "source": "Basic",
+            "rag_used": False
+        })
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _load_exercise(language: str, exercise_id: str) -> Optional[dict]:
+    """Look up an exercise in the in-memory catalog."""
+    return catalog.get_exercise(language, exercise_id)
 
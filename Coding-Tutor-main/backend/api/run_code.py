@@ -3,17 +3,70 @@ Sandboxed Practice API
 Executes code in non-interactive sandbox.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from services.sandbox_runner import DockerSandboxRunner
-from stats import StatsManager
-import json
-import os
+from services.sandbox_scheduler import SandboxScheduler, SandboxRejected, SandboxCancelled
+from services.remote_executor import RemoteSandboxRunner, SANDBOX_WORKERS
+from services.output_checker import describe
+from services import complexity_profiler
+from stats import StatsManager, metrics, tracing
+from . import catalog
+import math
 
 router = APIRouter()
 stats_manager = StatsManager()
 
+# Fair share of sandbox slots between students
+sandbox_scheduler = SandboxScheduler()
+
+# Sandbox agents on other hosts (SANDBOX_WORKERS); local Docker otherwise
+remote_runner = RemoteSandboxRunner(SANDBOX_WORKERS) if SANDBOX_WORKERS else None
+if remote_runner is not None:
+    sandbox_scheduler.capacity_fn = remote_runner.capacity
+    metrics.gauge(
+        "sandbox_workers_healthy",
+        "Remote sandbox workers accepting jobs",
+    ).set_function(remote_runner.healthy_workers)
+    metrics.counter(
+        "sandbox_remote_retries_total",
+        "Runs retried on another sandbox worker after a worker was lost",
+    ).set_function(lambda: remote_runner.retries)
+
+sandbox_queue_wait = metrics.histogram(
+    "sandbox_queue_wait_seconds",
+    "Seconds a run waited for a sandbox slot",
+)
+sandbox_scheduler.wait_observer = sandbox_queue_wait.observe
+metrics.gauge(
+    "sandbox_queue_depth",
+    "Runs waiting for a sandbox slot",
+).set_function(lambda: sandbox_scheduler.queue_depth)
+metrics.gauge(
+    "sandbox_running",
+    "Runs executing in the sandbox",
+).set_function(lambda: sandbox_scheduler.running)
+metrics.counter(
+    "sandbox_cancelled_total",
+    "Runs superseded by a newer run from the same client",
+).set_function(lambda: sandbox_scheduler.cancelled)
+_sandbox_rejected = metrics.counter(
+    "sandbox_rejected_total",
+    "Runs not admitted to the sandbox",
+    ["reason"],
+)
+for _reason in ("rate_limited", "queue_timeout"):
+    _sandbox_rejected.set_function(lambda r=_reason: sandbox_scheduler.rejected[r], reason=_reason)
+sandbox_early_stops = metrics.counter(
+    "sandbox_early_stops_total",
+    "Testcase runs stopped at the first difference from the expected output",
+)
+sandbox_profiles_over_budget = metrics.counter(
+    "sandbox_profiles_over_budget_total",
+    "Performance profiles stopped at a size over its time budget",
+)
+
 
 class RunCodeRequest(BaseModel):
     """Request model for code execution."""
@@ -21,16 +74,38 @@ class RunCodeRequest(BaseModel):
     language: str
     exercise_id: str
     user_input: str = ""
+    # Grade against the exercise's testcases instead of running with user_input
+    run_tests: bool = False
+    # Time the submission on growing inputs and estimate its complexity
+    profile: bool = False
+
+
+def _client_id(http_request: Request) -> str:
+    """
+    Identify the submitting client for rate limits and fair sharing: the peer
+    IP. Headers (X-Client-Id, Authorization) are not verified by this app, so
+    a script could rotate them to get a fresh allowance on every call.
+    """
+    return "ip:" + (http_request.client.host if http_request.client else "unknown")
+
+
+def _session_id(http_request: Request) -> Optional[str]:
+    """The app window's X-Client-Id: only decides which earlier runs a new one supersedes."""
+    session = http_request.headers.get("x-client-id", "").strip()
+    return session[:128] or None
 
 
 @router.post("/run")
-async def run_code(request: RunCodeRequest):
+async def run_code(request: RunCodeRequest, http_request: Request):
     """
     Execute code in sandbox (non-interactive).
     Returns execution results.
     """
+    tracing.mark("request_parse")
+    tracing.annotate(**catalog.metric_labels(request.language, request.exercise_id))
     try:
-        runner = DockerSandboxRunner()
+        with tracing.span("docker_check"):
+            runner = remote_runner or DockerSandboxRunner()
         
         # Input injection strategy for non-interactive sandbox execution:
         # 1. User-provided input (from InputArea component) takes priority
@@ -58,15 +133,59 @@ async def run_code(request: RunCodeRequest):
             #         stdin_data += '\n'
             # If no input available, stdin_data remains empty (programs get EOF)
             stdin_data = ""
-        result = runner.run_code(
-            request.language,
-            request.code,
-            stdin_data
-        )
+        tests = None
+        if request.run_tests and request.profile:
+            raise HTTPException(status_code=400, detail="Choose either run_tests or profile")
+        if request.profile:
+            exercise = _load_exercise(request.language, request.exercise_id)
+            if not (exercise or {}).get("profile"):
+                raise HTTPException(status_code=404, detail="Exercise has no performance profile")
+            run, kill = _profile_runner(runner, request, exercise)
+        elif request.run_tests:
+            exercise = _load_exercise(request.language, request.exercise_id)
+            testcases = (exercise or {}).get("testcases")
+            if not testcases:
+                raise HTTPException(status_code=404, detail="Exercise has no testcases")
+            run, kill = _testcase_runner(runner, request, testcases, exercise.get("compare"))
+        else:
+            run = lambda name: runner.run_code(request.language, request.code, stdin_data, container_name=name)
+            kill = runner.kill
+        
+        # Runs in a worker thread once this client's turn comes up; a newer
+        # run from the same client cancels this one
+        try:
+            result = await sandbox_scheduler.submit(_client_id(http_request), run, kill=kill,
+                                                    session=_session_id(http_request))
+        except SandboxCancelled:
+            return {
+                "success": False,
+                "output": "",
+                "error": "Run cancelled: a newer run was submitted.",
+                "hint_available": False,
+                "error_type": None,
+                "cancelled": True
+            }
+        except SandboxRejected as e:
+            retry_after = e.retry_after if math.isfinite(e.retry_after) else 60
+            raise HTTPException(
+                status_code=429,
+                detail="Too many runs. Please wait a moment before running again.",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+        
+        profile = None
+        if request.run_tests:
+            result, tests = _grade(result, testcases)
+        elif request.profile:
+            result, profile = _profile_report(result, exercise)
         
         has_error = not result["success"] or bool(result.get("error", ""))
         error_type = None
-        if has_error:
+        if result.get("wrong_answer"):
+            error_type = "WRONG_ANSWER"
+        elif result.get("stopped") == "over_budget":
+            error_type = "TIME_LIMIT_EXCEEDED"
+        elif has_error:
             error_msg = result.get("error", "")
             if "compile" in error_msg.lower() or "syntax" in error_msg.lower() or "error:" in error_msg.lower():
                 error_type = "COMPILE_ERROR"
@@ -89,9 +208,17 @@ async def run_code(request: RunCodeRequest):
             "hint_available": has_error,
             "error_type": error_type
         }
+        if tests is not None:
+            response["tests"] = tests
+            response["tests_passed"] = sum(1 for t in tests if t["passed"])
+            response["tests_total"] = len(testcases)
+        if profile is not None:
+            response["profile"] = profile
         
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         stats_manager.record_attempt(
             language=request.language,
@@ -102,24 +229,101 @@ async def run_code(request: RunCodeRequest):
 
 
 def _load_exercise(language: str, exercise_id: str) -> Optional[Dict[str, Any]]:
-    """Load exercise from JSON file."""
-    exercises_file = os.path.join(
-        os.path.dirname(os.path.dirname(__file__)),
-        "exercises",
-        f"{language}.json"
-    )
-    
-    if not os.path.exists(exercises_file):
-        return None
-    
-    try:
-        with open(exercises_file, 'r', encoding='utf-8') as f:
-            exercises = json.load(f)
-            for ex in exercises:
-                if ex.get("id") == exercise_id:
-                    return ex
-    except Exception:
-        pass
-    
-    return None
+    """Look up an exercise in the in-memory catalog."""
+    return catalog.get_exercise(language, exercise_id)
+
+
+def _testcase_runner(runner, request: RunCodeRequest, testcases, compare):
+    """
+    Blocking run of the submission against each testcase, and its kill function.
+
+    Every testcase runs in its own sandbox with the output checked as it is
+    produced; grading stops at the first failing testcase.
+    """
+    current = {"name": None}
+
+    def run(name):
+        results = []
+        for i, case in enumerate(testcases, 1):
+            current["name"] = f"{name}-t{i}"
+            stdin_data = case.get("input", "").strip()
+            if stdin_data:
+                stdin_data += '\n'
+            result = runner.run_code(request.language, request.code, stdin_data, container_name=current["name"],
+                                     expected_output=case.get("expected_output", ""), compare=compare)
+            results.append(result)
+            if not (result["success"] and result.get("check", {}).get("passed")):
+                break
+        return results
+
+    def kill(name):
+        # The scheduler knows the job name; stop the testcase running now
+        if current["name"]:
+            runner.kill(current["name"])
+
+    return run, kill
+
+
+def _grade(results, testcases):
+    """
+    Per-testcase report, and the run result to show: the first failing
+    testcase's (with a wrong answer explained), else the last one's.
+    """
+    tests = []
+    for i, result in enumerate(results, 1):
+        check = result.get("check") or {}
+        if check.get("stopped_early"):
+            sandbox_early_stops.inc()
+        tests.append({
+            "testcase": i,
+            "input": testcases[i - 1].get("input", ""),
+            "passed": bool(result["success"] and check.get("passed")),
+            "stopped_early": bool(check.get("stopped_early")),
+            "first_difference": check.get("first_difference")
+        })
+    shown = dict(results[-1])
+    last = tests[-1]
+    if not last["passed"] and last["first_difference"] and (shown["success"] or last["stopped_early"]):
+        # The program ran but printed the wrong thing
+        shown.update(
+            success=False,
+            wrong_answer=True,
+            error=f"Wrong answer on testcase {last['testcase']}: {describe(last['first_difference'])}"
+        )
+    return shown, tests
+
+
+def _profile_runner(runner, request: RunCodeRequest, exercise):
+    """
+    Blocking profile of the submission and of the reference solution, and its kill function.
+
+    The reference is profiled on the same inputs (once per process) unless
+    the submission did not compile.
+    """
+    current = {"name": None}
+
+    def run(name):
+        inputs, budget = complexity_profiler.plan(request.language, exercise)
+        current["name"] = name
+        result = runner.profile_code(request.language, request.code, inputs, budget, container_name=name)
+        reference = None
+        if result["sizes"]:
+            current["name"] = f"{name}-ref"
+            reference = complexity_profiler.reference_profile(runner, request.language, exercise, current["name"])
+        return result, reference
+
+    def kill(name):
+        if current["name"]:
+            runner.kill(current["name"])
+
+    return run, kill
+
 
+def _profile_report(results, exercise):
+    """The run result to show (the profile summary as output), and the profile report."""
+    result, reference = results
+    profile = complexity_profiler.report(result, reference, exercise)
+    if result.get("stopped") == "over_budget":
+        sandbox_profiles_over_budget.inc()
+    shown = dict(result, output=complexity_profiler.summary(profile) if result["sizes"] else "")
+    return shown, profile
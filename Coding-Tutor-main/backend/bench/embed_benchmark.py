@@ -0,0 +1,166 @@
+"""
+Embedding Benchmark
+Compares embedding backends (rag/embedders.py) on the real lab-manual chunks.
+
+Each backend runs in a fresh child process so import + model load time and
+resident memory are measured from a clean interpreter. Reported per backend:
+
+- load_s:        import + model load time
+- rss_mb:        resident memory after loading (and after encoding)
+- chunks_per_s:  batch encoding throughput over the stored chunks
+- query_p50_ms:  single-query latency (what retrieve_notes pays per request)
+- index_cosine:  mean cosine similarity between the chunk vectors and the
+                 vectors stored in the existing FAISS index (1.0 = identical)
+- top5_overlap:  share of top-5 neighbours, searched with the backend's own
+                 query vectors against the existing index, that match the
+                 neighbours found with the stored vectors
+
+Usage (from backend/):
+    python -m bench.embed_benchmark
+    python -m bench.embed_benchmark --backends onnx --subject c_lab_manual --json
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import subprocess
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.embedders import BACKENDS, backend_available
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INDEX_DIR = os.path.join(BASE_DIR, "indexes")
+META_DIR = os.path.join(BASE_DIR, "metadata")
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MiB (Linux), or peak RSS elsewhere."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def worker(backend: str, subject: str, n_queries: int, threads: int):
+    """Measure one backend in this (fresh) process; prints one JSON line."""
+    from rag import chunk_store
+
+    store = chunk_store.ChunkStore(META_DIR, subject)
+    texts = [store[i] for i in range(len(store))]
+    base_rss = rss_mb()
+
+    start = time.perf_counter()
+    from rag.embedders import load_embedder
+    embedder = load_embedder(backend, threads)
+    embedder.encode(["warm up"])
+    load_s = time.perf_counter() - start
+    loaded_rss = rss_mb()
+
+    start = time.perf_counter()
+    vectors = embedder.encode(texts)
+    encode_s = time.perf_counter() - start
+
+    queries = texts[:n_queries]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        embedder.encode([query[:200]])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    out_path = os.path.join(os.environ.get("TMPDIR", "/tmp"), f"embed_bench_{backend}_{os.getpid()}.npy")
+    np.save(out_path, vectors)
+    print(json.dumps({
+        "backend": backend,
+        "subject": subject,
+        "chunks": len(texts),
+        "load_s": round(load_s, 3),
+        "rss_mb": round(loaded_rss - base_rss, 1),
+        "rss_after_encode_mb": round(rss_mb() - base_rss, 1),
+        "chunks_per_s": round(len(texts) / encode_s, 1) if encode_s else 0.0,
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 2) if latencies else 0.0,
+        "vectors": out_path,
+    }))
+
+
+def agreement(vectors: np.ndarray, subject: str, k: int = 5):
+    """(mean cosine to the stored vectors, top-k overlap against the stored index)."""
+    import faiss
+
+    index = faiss.read_index(os.path.join(INDEX_DIR, f"{subject}.index"))
+    stored = index.reconstruct_n(0, index.ntotal)
+    if stored.shape != vectors.shape:
+        return None, None
+    cosine = float(np.mean(np.sum(stored * vectors, axis=1) /
+                           (np.linalg.norm(stored, axis=1) * np.linalg.norm(vectors, axis=1))))
+    _, truth = index.search(stored, k)
+    _, found = index.search(vectors, k)
+    overlap = sum(len(set(t) & set(f)) for t, f in zip(truth, found)) / truth.size
+    return round(cosine, 4), round(overlap, 4)
+
+
+def run(backend: str, subject: str, n_queries: int, threads: int):
+    """Benchmark one backend in a child process. Returns a result row."""
+    cmd = [sys.executable, "-m", "bench.embed_benchmark", "--worker", backend,
+           "--subject", subject, "--queries", str(n_queries), "--threads", str(threads)]
+    proc = subprocess.run(cmd, capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        return {"backend": backend, "subject": subject, "error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+
+    row = json.loads(lines[-1])
+    vectors_path = row.pop("vectors")
+    vectors = np.load(vectors_path)
+    os.remove(vectors_path)
+    row["index_cosine"], row["top5_overlap"] = agreement(vectors, subject)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load time / memory / throughput of embedding backends")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--subject", default="c_lab_manual")
+    parser.add_argument("--queries", type=int, default=50, help="Single-query encodes to time")
+    parser.add_argument("--threads", type=int, default=0, help="Encoding threads (0 = backend default)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.subject, args.queries, args.threads)
+        return
+
+    rows = []
+    for backend in args.backends:
+        if not backend_available(backend):
+            rows.append({"backend": backend, "subject": args.subject, "error": "not installed"})
+            continue
+        rows.append(run(backend, args.subject, args.queries, args.threads))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'backend':<22} {'load s':>7} {'RSS MiB':>8} {'chunks/s':>9} {'query ms':>9} "
+          f"{'cosine':>7} {'top5':>6}")
+    for r in rows:
+        if "error" in r:
+            print(f"{r['backend']:<22} {r['error']}")
+            continue
+        print(f"{r['backend']:<22} {r['load_s']:>7.2f} {r['rss_mb']:>8.1f} {r['chunks_per_s']:>9.1f} "
+              f"{r['query_p50_ms']:>9.2f} {r['index_cosine'] or 0:>7.4f} {r['top5_overlap'] or 0:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
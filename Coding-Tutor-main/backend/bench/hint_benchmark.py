@@ -0,0 +1,390 @@
+"""
+Hint Benchmark
+Measures the tiers of get_hint on real compiler/runtime errors.
+
+Every case in bench/error_corpus.json (per language) is sent through:
+
+- tiers:    each tier on its own. Rule-based hints (hit rate, and accuracy
+            against the corpus' expected rule), retrieve_notes (cold and
+            warm latency, share of queries with any notes and with notes on
+            the case's expected topics), format_hint_from_notes and
+            llm_hint_fallback (generation latency).
+
+The rules were written against this corpus, so their hit rate and accuracy
+are in-sample: they show that rules still match what they were written for,
+not how often they match errors never seen before. Retrieval relevance is
+scored per case: the top 3 notes (what a prompt uses) must mention one of the
+case's "topics" keywords.
+- pipeline: get_hint end to end, once with empty caches (cold) and once
+            more over the same corpus (warm). Reported per pass: share of
+            hints answered by each tier, latency distribution, per-phase
+            latency (from the request tracing spans) and retrieval / hint
+            cache / hint pack hit rates. The "no_instant" scenario turns the
+            rule and hint pack tier off, so the retrieval, cache and LLM
+            tiers see the whole corpus instead of the few cases the rules
+            miss.
+
+The LLM is an in-process stub (rag/ollama_stub.py) with deterministic
+replies and configurable latency. The embedder and indexes are the real
+ones; without them retrieval reports as unavailable and every generation
+takes the LLM fallback path.
+
+Results can be saved with the commit they were measured on and compared
+with a later run:
+
+    python -m bench.hint_benchmark --save before.json
+    git checkout my-branch
+    python -m bench.hint_benchmark --compare before.json
+
+Usage (from backend/):
+    python -m bench.hint_benchmark
+    python -m bench.hint_benchmark --language c --limit 10 --token-delay 0.02 --json
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import results as saved
+from rag import rag_llm_chat as chat
+from rag.hint_packs import PACK_TAG
+from rag.hint_cache import CACHED_TAG
+from rag.ollama_client import OllamaClient
+from rag.ollama_stub import OllamaStub
+from rag.retrieval_cache import RetrievalCache
+from stats import tracing
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXERCISES_DIR = os.path.join(BACKEND_DIR, "exercises")
+ERROR_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "error_corpus.json")
+
+TIERS = ("rule", "pack", "cache", "rag", "rag_summary", "llm", "basic")
+SCENARIOS = ("full", "no_instant")
+
+
+def load_cases(languages: Optional[List[str]] = None, limit: int = 0) -> List[dict]:
+    """
+    Corpus cases with the subject and exercise a hint request would carry.
+
+    Each case is assigned one of its language's exercises in turn, so
+    precomputed hint packs and per-exercise caches are exercised too.
+    """
+    with open(ERROR_CORPUS, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    exercises = {}
+    for name in sorted(os.listdir(EXERCISES_DIR)):
+        if name.endswith(".json"):
+            with open(os.path.join(EXERCISES_DIR, name), "r", encoding="utf-8") as f:
+                exercises[name[:-5]] = json.load(f)
+
+    cases = []
+    per_language = Counter()
+    for case in corpus:
+        language = case["language"]
+        if languages and language not in languages:
+            continue
+        if limit and per_language[language] >= limit:
+            continue
+        pool = exercises.get(language) or [{}]
+        exercise = pool[per_language[language] % len(pool)]
+        per_language[language] += 1
+        cases.append({
+            "language": language,
+            "subject": exercise.get("subject", f"{language}_lab_manual"),
+            "exercise_id": exercise.get("id", ""),
+            "error_message": case["error_message"],
+            "failed_tests": case.get("failed_tests", ""),
+            "expect": case.get("expect"),
+            "topics": case.get("topics", []),
+        })
+    return cases
+
+
+def tier_of(source: str) -> str:
+    """Tier that answered a hint, from its source label."""
+    if source.endswith(CACHED_TAG):
+        return "cache"
+    if source.endswith(PACK_TAG):
+        return "pack"
+    if source.startswith("Rule-based"):
+        return "rule"
+    if source.startswith("RAG"):
+        return "rag_summary" if "Summary" in source else "rag"
+    if source.startswith("LLM"):
+        return "llm"
+    return "basic"
+
+
+def on_topic(notes: List[str], topics: List[str]) -> bool:
+    """Whether the top 3 notes (what a prompt uses) mention one of the expected topics."""
+    text = "\n".join(str(note) for note in notes[:3]).lower()
+    return any(topic.lower() in text for topic in topics)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def distribution(seconds: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    values = sorted(seconds)
+    return {
+        "n": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def rate(part: int, whole: int) -> float:
+    return round(part / whole, 4) if whole else 0.0
+
+
+def reset_caches():
+    """Empty retrieval and hint caches (in memory, so nothing on disk is touched)."""
+    chat._rag_cache = RetrievalCache(path=None)
+    chat._hint_cache = chat.make_hint_cache()
+
+
+def cache_counters() -> Dict[str, int]:
+    counters = {
+        "retrieval_hits": chat._rag_cache.hits,
+        "retrieval_misses": chat._rag_cache.misses,
+        "pack_hits": chat.hint_packs.hits,
+        "pack_misses": chat.hint_packs.misses,
+    }
+    if chat._hint_cache:
+        stats = chat._hint_cache.get_stats()
+        counters.update(hint_hits=stats["hits"], hint_misses=stats["misses"],
+                        hint_semantic_hits=stats["semantic_hits"])
+    return counters
+
+
+async def timed(coro):
+    started = time.perf_counter()
+    result = await coro
+    return result, time.perf_counter() - started
+
+
+async def bench_tiers(cases: List[dict]) -> dict:
+    """Each tier of get_hint on its own."""
+    results = {}
+
+    # Rule-based hints
+    hits = correct = labelled = 0
+    latencies = []
+    for case in cases:
+        started = time.perf_counter()
+        match = chat.rule_engine.match(case["error_message"], case["failed_tests"], case["language"]) \
+            if chat.rule_engine else None
+        latencies.append(time.perf_counter() - started)
+        hits += match is not None
+        if case["expect"]:
+            labelled += 1
+            correct += bool(match) and match["id"] == case["expect"]
+    # In-sample: the rules were written against this corpus
+    results["rules"] = {"hit_rate": rate(hits, len(cases)), "accuracy": rate(correct, labelled),
+                        "in_sample": True, "latency": distribution(latencies)}
+
+    # Retrieval, cold then warm
+    queries = [(c["subject"], chat.build_query(c["error_message"], c["failed_tests"])) for c in cases]
+    if chat.HAS_LEXICAL or chat.retrieval_client is not None:
+        reset_caches()
+        notes = []
+        cold = []
+        for subject, query in queries:
+            chunks, seconds = await timed(chat.retrieve_notes_async(subject, query, k=5))
+            notes.append(chunks)
+            cold.append(seconds)
+        warm = [(await timed(chat.retrieve_notes_async(s, q, k=5)))[1] for s, q in queries]
+        with_notes = [n for n in notes if chat.has_relevant_notes(n)]
+        scored = [(n, c["topics"]) for n, c in zip(notes, cases) if c["topics"]]
+        results["retrieval"] = {
+            "available": True,
+            "notes_rate": rate(len(with_notes), len(cases)),
+            "relevant_rate": rate(sum(on_topic(n, topics) for n, topics in scored), len(scored)),
+            "scored_cases": len(scored),
+            "cold": distribution(cold),
+            "warm": distribution(warm),
+            "lexical_fast_path": chat.retrieval_stats["lexical_fast_path"],
+            "lexical_only": chat.retrieval_stats["lexical_only"],
+            "hybrid": chat.retrieval_stats["hybrid"],
+        }
+    else:
+        notes = [[] for _ in cases]
+        results["retrieval"] = {"available": False}
+
+    # Generation from notes (only where retrieval found some) and plain LLM fallback
+    from_notes = [(await timed(chat.format_hint_from_notes(n, c["error_message"], c["failed_tests"])))[1]
+                  for c, n in zip(cases, notes) if chat.has_relevant_notes(n)]
+    results["format_hint_from_notes"] = {"latency": distribution(from_notes)}
+    fallback = [(await timed(chat.llm_hint_fallback(c["subject"], c["error_message"], c["failed_tests"])))[1]
+                for c in cases]
+    results["llm_hint_fallback"] = {"latency": distribution(fallback)}
+    return results
+
+
+async def bench_pass(cases: List[dict], concurrency: int) -> dict:
+    """One get_hint per case; tier shares, latency and cache activity."""
+    before = cache_counters()
+    tiers = Counter()
+    latencies = []
+    phases = defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(case):
+        async with semaphore:
+            trace, token = tracing.start()
+            hint = await chat.get_hint(case["subject"], case["error_message"], case["failed_tests"],
+                                       case["exercise_id"])
+            latencies.append(time.perf_counter() - trace.started)
+            tracing.finish(trace, token, "bench", 200)
+            tiers[tier_of(hint.get("source", ""))] += 1
+            for phase, seconds in trace.breakdown().items():
+                phases[phase].append(seconds)
+
+    await asyncio.gather(*(one(case) for case in cases))
+
+    after = cache_counters()
+    delta = {k: after[k] - before.get(k, 0) for k in after}
+    caches = {
+        "retrieval_hit_rate": rate(delta["retrieval_hits"], delta["retrieval_hits"] + delta["retrieval_misses"]),
+        "pack_hit_rate": rate(delta["pack_hits"], delta["pack_hits"] + delta["pack_misses"]),
+    }
+    if "hint_hits" in delta:
+        caches["hint_hit_rate"] = rate(delta["hint_hits"], delta["hint_hits"] + delta["hint_misses"])
+        caches["hint_semantic_hits"] = delta["hint_semantic_hits"]
+    return {
+        "tiers": {tier: rate(tiers[tier], len(cases)) for tier in TIERS},
+        "latency": distribution(latencies),
+        "phases": {phase: distribution(values) for phase, values in sorted(phases.items())},
+        "caches": caches,
+    }
+
+
+async def bench_pipeline(cases: List[dict], scenario: str, concurrency: int) -> dict:
+    """Cold and warm passes of get_hint under one scenario."""
+    original_instant = chat.instant_hint
+    if scenario == "no_instant":
+        chat.instant_hint = lambda *args, **kwargs: None
+    try:
+        reset_caches()
+        return {
+            "cold": await bench_pass(cases, concurrency),
+            "warm": await bench_pass(cases, concurrency),
+        }
+    finally:
+        chat.instant_hint = original_instant
+
+
+async def run(cases: List[dict], args) -> dict:
+    """Start the stub LLM, point the hint pipeline at it and run every benchmark."""
+    stub = await OllamaStub(token_delay=args.token_delay, first_token_delay=args.first_token_delay).start()
+    original_client = chat.llm_client
+    chat.llm_client = OllamaClient("stub", base_url=stub.url)
+    try:
+        for subject in sorted({c["subject"] for c in cases}):
+            chat.load_subject(subject)
+        results = {"tiers": await bench_tiers(cases), "pipeline": {}}
+        for scenario in args.scenarios:
+            results["pipeline"][scenario] = await bench_pipeline(cases, scenario, args.concurrency)
+        results["llm_generations"] = stub.generations
+        return results
+    finally:
+        await chat.llm_client.aclose()
+        chat.llm_client = original_client
+        await stub.stop()
+
+
+def print_report(report: dict):
+    meta = report["meta"]
+    results = report["results"]
+    print(f"commit {meta['commit']}  cases {meta['cases']}  embedder "
+          f"{'yes' if meta['embedder'] else 'unavailable'}  LLM stub "
+          f"{meta['first_token_delay'] * 1000:.0f}ms + {meta['token_delay'] * 1000:.0f}ms/token")
+
+    tiers = results["tiers"]
+    rules = tiers["rules"]
+    print(f"\nrules (in-sample):       hit rate {rules['hit_rate']:.1%}  accuracy {rules['accuracy']:.1%}  "
+          f"p50 {rules['latency']['p50_ms']:.3f}ms  p95 {rules['latency']['p95_ms']:.3f}ms")
+    retrieval = tiers["retrieval"]
+    if retrieval["available"]:
+        print(f"retrieve_notes:          notes {retrieval['notes_rate']:.1%}  on topic "
+              f"{retrieval['relevant_rate']:.1%} of {retrieval['scored_cases']}  "
+              f"cold p50 {retrieval['cold']['p50_ms']:.2f}ms p95 {retrieval['cold']['p95_ms']:.2f}ms  "
+              f"warm p50 {retrieval['warm']['p50_ms']:.3f}ms")
+    else:
+        print("retrieve_notes:          unavailable (no embedder / indexes)")
+    for name in ("format_hint_from_notes", "llm_hint_fallback"):
+        latency = tiers[name]["latency"]
+        print(f"{name + ':':<24} n {latency['n']:>4}  p50 {latency['p50_ms']:.1f}ms  p95 {latency['p95_ms']:.1f}ms")
+
+    for scenario, passes in results["pipeline"].items():
+        print(f"\nget_hint ({scenario})")
+        print(f"{'pass':<6} " + " ".join(f"{t:>7}" for t in TIERS) +
+              f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ret hit':>8} {'hint hit':>8}")
+        for name, result in passes.items():
+            caches = result["caches"]
+            latency = result["latency"]
+            print(f"{name:<6} " + " ".join(f"{result['tiers'][t]:>7.1%}" for t in TIERS) +
+                  f" {latency['p50_ms']:>8.2f} {latency['p95_ms']:>8.2f} {latency['p99_ms']:>8.2f}"
+                  f" {caches['retrieval_hit_rate']:>8.1%} {caches.get('hint_hit_rate', 0.0):>8.1%}")
+        phases = passes["cold"]["phases"]
+        if phases:
+            print("  cold phases: " + ", ".join(f"{p} p50 {d['p50_ms']:.2f}ms" for p, d in phases.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tiers of get_hint on the error corpus")
+    parser.add_argument("--language", action="append", help="Language(s) to benchmark (default: all)")
+    parser.add_argument("--limit", type=int, default=0, help="At most this many cases per language")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Stub LLM seconds per token")
+    parser.add_argument("--first-token-delay", type=float, default=0.02, help="Stub LLM seconds before the first token")
+    parser.add_argument("--concurrency", type=int, default=1, help="Hint requests in flight in the pipeline passes")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, dest="scenarios",
+                        help="Pipeline scenario(s) to run (default: all)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--save", help="Write results (with the commit measured) to this file")
+    parser.add_argument("--compare", help="Compare with results saved earlier by --save")
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+
+    cases = load_cases(args.language, args.limit)
+    if not cases:
+        parser.error("no corpus cases for the selected languages")
+
+    results = asyncio.run(run(cases, args))
+    report = saved.make_report(
+        results,
+        cases=len(cases),
+        languages=dict(Counter(c["language"] for c in cases)),
+        embedder=bool(chat.batcher is not None or chat.retrieval_client is not None),
+        pipeline=chat.HINT_PIPELINE,
+        token_delay=args.token_delay,
+        first_token_delay=args.first_token_delay,
+        concurrency=args.concurrency,
+    )
+
+    if args.save:
+        saved.save(report, args.save)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.compare:
+        print()
+        saved.print_comparison(saved.load(args.compare), report)
+
+if __name__ == "__main__":
+    main()
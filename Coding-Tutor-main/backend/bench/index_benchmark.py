@@ -0,0 +1,134 @@
+"""
+Index Benchmark
+Compares approximate/compressed FAISS index types against the flat baseline.
+
+Vectors are reconstructed from the existing flat indexes, so no embedding
+model is needed. Use --scale to tile the corpus (with small noise) up to a
+larger size and see how each index type behaves as the manuals grow.
+
+Usage (from backend/):
+    python -m bench.index_benchmark
+    python -m bench.index_benchmark --subject c_lab_manual --scale 50000 --json
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.index_factory import make_index, index_nbytes
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INDEX_DIR = os.path.join(BASE_DIR, "indexes")
+
+
+def load_vectors(subject: str) -> np.ndarray:
+    """Reconstruct the stored vectors of a subject's index."""
+    index = faiss.read_index(os.path.join(INDEX_DIR, f"{subject}.index"))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def scale_corpus(vectors: np.ndarray, size: int, seed: int = 0) -> np.ndarray:
+    """Tile vectors up to `size` rows, jittering copies so they stay distinct."""
+    if size <= len(vectors):
+        return vectors
+    rng = np.random.default_rng(seed)
+    reps = int(np.ceil(size / len(vectors)))
+    tiled = np.tile(vectors, (reps, 1))[:size]
+    noise = rng.normal(0, 0.02, tiled.shape).astype("float32")
+    noise[:len(vectors)] = 0
+    return tiled + noise
+
+
+def make_queries(vectors: np.ndarray, n: int, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of corpus vectors, standing in for real queries."""
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), n)]
+    return (picks + rng.normal(0, 0.05, picks.shape)).astype("float32")
+
+
+def bench_index(index, queries: np.ndarray, k: int):
+    """Search one query at a time (like retrieve_notes) and time each call."""
+    latencies = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        _, I = index.search(q.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(I[0])
+    return np.array(results), np.array(latencies)
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    """Fraction of true top-k neighbours present in the approximate top-k."""
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def run(subject: str, scale: int, n_queries: int, k: int, types):
+    """Benchmark every index type on one subject. Returns a list of result rows."""
+    corpus = scale_corpus(load_vectors(subject), scale)
+    queries = make_queries(corpus, n_queries)
+    rows = []
+    truth = None
+
+    for index_type in types:
+        start = time.perf_counter()
+        index = make_index(corpus, index_type)
+        build_s = time.perf_counter() - start
+
+        found, lat = bench_index(index, queries, k)
+        if truth is None:
+            truth = found  # first type is always the flat baseline
+        rows.append({
+            "subject": subject,
+            "index_type": index_type,
+            "index_class": type(index).__name__,
+            "vectors": int(index.ntotal),
+            "bytes": index_nbytes(index),
+            "build_s": round(build_s, 3),
+            "recall_at_k": round(recall_at_k(truth, found), 4),
+            "p50_ms": round(float(np.percentile(lat, 50)), 4),
+            "p95_ms": round(float(np.percentile(lat, 95)), 4),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latency benchmark of FAISS index types")
+    parser.add_argument("--subject", action="append", help="Subject(s) to benchmark (default: all)")
+    parser.add_argument("--scale", type=int, default=0, help="Tile corpus up to this many vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--types", default="flat,fp16,sq8,hnsw,ivfpq")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    subjects = args.subject or sorted(
+        f[:-len(".index")] for f in os.listdir(INDEX_DIR) if f.endswith(".index")
+    )
+    types = ["flat"] + [t for t in args.types.split(",") if t and t != "flat"]
+
+    rows = []
+    for subject in subjects:
+        rows.extend(run(subject, args.scale, args.queries, args.k, types))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'subject':<20} {'type':<6} {'vectors':>8} {'KiB':>9} {'build s':>8} "
+          f"{'recall':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in rows:
+        print(f"{r['subject']:<20} {r['index_type']:<6} {r['vectors']:>8} {r['bytes'] / 1024:>9.1f} "
+              f"{r['build_s']:>8.3f} {r['recall_at_k']:>7.3f} {r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""
+Load Harness
+Drives /api/run, /api/hint and /api/exercises/{language} with classroom traffic.
+
+Traffic is open-loop (requests arrive on schedule whether or not earlier
+ones have finished, like students do), from one of two sources:
+
+- mix:    Poisson arrivals at --rate requests/s for --duration seconds.
+          Endpoints are picked by --mix weights. Runs and hints are for
+          random exercises from exercises/*.json, and hint errors come from
+          bench/error_corpus.json. Requests are spread over --clients
+          simulated students, each with its own X-Client-Id and, against a
+          loopback URL, its own 127.x source address, so per-client (per-IP)
+          limits apply as they would in a lab.
+- replay: a request log recorded by the backend with REQUEST_LOG=path
+          (anonymized: route, language, exercise and timing only). Requests
+          are re-issued at their recorded offsets, sped up by --speed, with
+          synthesized bodies.
+
+Reported per endpoint: requests, status counts, throughput and
+p50/p95/p99/max latency.
+
+Against a running backend:
+    python -m bench.load_harness --url http://127.0.0.1:8000 --rate 20 --duration 60
+API-layer overhead only (fake sandbox + stub LLM, any Linux box):
+    python -m bench.load_harness --fake --rate 50 --duration 30
+Replay a recorded lab session at 4x:
+    python -m bench.load_harness --fake --replay requests.jsonl --speed 4 --json
+"""
+
+import os
+import sys
+import time
+import json
+import random
+import socket
+import asyncio
+import tempfile
+import argparse
+import subprocess
+from collections import defaultdict
+from urllib.parse import urlsplit
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXERCISES_DIR = os.path.join(BACKEND_DIR, "exercises")
+ERROR_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "error_corpus.json")
+
+ENDPOINTS = ("run", "hint", "exercises")
+DEFAULT_MIX = "run=0.6,hint=0.25,exercises=0.15"
+
+# Smallest valid program per language, sent as the code of mix /api/run requests
+PROGRAMS = {
+    "c": '#include <stdio.h>\nint main() {\n    int a, b;\n    scanf("%d %d", &a, &b);\n    printf("%d\\n", a + b);\n    return 0;\n}\n',
+    "cpp": '#include <iostream>\nint main() {\n    int a, b;\n    std::cin >> a >> b;\n    std::cout << a + b << std::endl;\n    return 0;\n}\n',
+    "java": 'import java.util.Scanner;\npublic class Main {\n    public static void main(String[] args) {\n        Scanner s = new Scanner(System.in);\n        System.out.println(s.nextInt() + s.nextInt());\n    }\n}\n',
+    "python": 'a = int(input())\nb = int(input())\nprint(a + b)\n',
+}
+
+
+class Workload:
+    """Exercises and real error messages to build requests from."""
+
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.exercises: Dict[str, List[dict]] = {}
+        for name in sorted(os.listdir(EXERCISES_DIR)):
+            if name.endswith(".json"):
+                with open(os.path.join(EXERCISES_DIR, name), "r", encoding="utf-8") as f:
+                    self.exercises[name[:-5]] = json.load(f)
+        with open(ERROR_CORPUS, "r", encoding="utf-8") as f:
+            corpus = json.load(f)
+        self.errors: Dict[str, List[dict]] = defaultdict(list)
+        for case in corpus:
+            self.errors[case["language"]].append(case)
+
+    def exercise(self, language: Optional[str] = None, exercise_id: Optional[str] = None):
+        if language not in self.exercises:
+            language = self.rng.choice(sorted(self.exercises))
+        exercises = self.exercises[language]
+        match = [ex for ex in exercises if ex.get("id") == exercise_id]
+        return language, (match[0] if match else self.rng.choice(exercises))
+
+    def request(self, endpoint: str, client: str, language: Optional[str] = None,
+                exercise_id: Optional[str] = None) -> dict:
+        """Method, path, headers and body of one request."""
+        language, exercise = self.exercise(language, exercise_id)
+        # Limits are keyed on the IP (see drive), supersede on the session
+        headers = {"X-Client-Id": client}
+        if endpoint == "exercises":
+            return {"method": "GET", "path": f"/api/exercises/{language}", "headers": headers}
+        if endpoint == "run":
+            tests = exercise.get("testcases") or [{}]
+            body = {
+                "code": PROGRAMS.get(language, ""),
+                "language": language,
+                "exercise_id": exercise["id"],
+                "user_input": self.rng.choice(tests).get("input", ""),
+            }
+            return {"method": "POST", "path": "/api/run", "headers": headers, "json": body}
+        case = self.rng.choice(self.errors.get(language) or self.errors["c"])
+        body = {
+            "language": language,
+            "exercise_id": exercise["id"],
+            "error_message": case["error_message"],
+            "failed_tests": case.get("failed_tests", ""),
+        }
+        return {"method": "POST", "path": "/api/hint", "headers": headers, "json": body}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def mix_schedule(workload: Workload, rate: float, duration: float, mix: Dict[str, float],
+                 clients: int) -> List[tuple]:
+    """Poisson arrivals: [(offset seconds, endpoint, request)]."""
+    rng = workload.rng
+    names, weights = zip(*mix.items())
+    schedule = []
+    t = rng.expovariate(rate)
+    while t < duration:
+        endpoint = rng.choices(names, weights)[0]
+        client = f"student-{rng.randrange(clients)}"
+        schedule.append((t, endpoint, workload.request(endpoint, client)))
+        t += rng.expovariate(rate)
+    return schedule
+
+
+ROUTES = {"/api/run": "run", "/api/hint": "hint", "/api/hint/stream": "hint", "/api/exercises/{language}": "exercises"}
+
+
+def replay_schedule(workload: Workload, path: str, speed: float, clients: int) -> List[tuple]:
+    """Requests from a REQUEST_LOG file at their recorded offsets / speed."""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("route") in ROUTES:
+                entries.append(entry)
+    if not entries:
+        return []
+    entries.sort(key=lambda e: e["ts"])
+    start = entries[0]["ts"]
+    schedule = []
+    for entry in entries:
+        endpoint = ROUTES[entry["route"]]
+        client = f"student-{workload.rng.randrange(clients)}"
+        request = workload.request(endpoint, client, entry.get("language"), entry.get("exercise"))
+        schedule.append(((entry["ts"] - start) / speed, endpoint, request))
+    return schedule
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def source_address(client: str) -> str:
+    """Loopback source address of a simulated student ("student-7" -> 127.1.0.8)."""
+    n = int(client.rsplit("-", 1)[1])
+    return f"127.1.{n // 250}.{n % 250 + 1}"
+
+
+async def drive(url: str, schedule: List[tuple], max_in_flight: int, timeout: float) -> dict:
+    """Issue the schedule against url; returns per-endpoint results."""
+    import httpx
+
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    in_flight = 0
+    not_sent = defaultdict(int)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    # The backend keys sandbox limits on the peer IP. On loopback every
+    # student gets its own 127.x address (all of 127/8 is local on Linux).
+    loopback = urlsplit(url).hostname in ("127.0.0.1", "localhost")
+    clients = {}
+
+    def client_for(request):
+        source = source_address(request["headers"]["X-Client-Id"]) if loopback else None
+        if source not in clients:
+            transport = httpx.AsyncHTTPTransport(local_address=source, limits=limits)
+            clients[source] = httpx.AsyncClient(base_url=url, timeout=timeout, transport=transport)
+        return clients[source]
+
+    try:
+        async def one(endpoint, request):
+            nonlocal in_flight
+            in_flight += 1
+            started = time.perf_counter()
+            try:
+                response = await client_for(request).request(
+                    request["method"], request["path"], headers=request["headers"], json=request.get("json"))
+                status = str(response.status_code)
+            except httpx.TimeoutException:
+                status = "timeout"
+            except httpx.HTTPError:
+                status = "connection_error"
+            finally:
+                in_flight -= 1
+            latencies[endpoint].append(time.perf_counter() - started)
+            statuses[endpoint][status] += 1
+
+        tasks = []
+        began = time.perf_counter()
+        for offset, endpoint, request in schedule:
+            delay = began + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if in_flight >= max_in_flight:
+                # The harness itself is saturated; count instead of queueing
+                # (queueing here would hide the server's latency)
+                not_sent[endpoint] += 1
+                continue
+            tasks.append(asyncio.ensure_future(one(endpoint, request)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - began
+    finally:
+        for client in clients.values():
+            await client.aclose()
+
+    report = {"elapsed_s": round(elapsed, 3), "endpoints": {}}
+    for endpoint in ENDPOINTS:
+        values = sorted(latencies.get(endpoint, []))
+        if not values and not not_sent.get(endpoint):
+            continue
+        ok = sum(n for s, n in statuses[endpoint].items() if s.startswith("2"))
+        report["endpoints"][endpoint] = {
+            "requests": len(values),
+            "ok": ok,
+            "status": dict(statuses[endpoint]),
+            "not_sent": not_sent.get(endpoint, 0),
+            "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+            "max_ms": round(values[-1] * 1000, 1) if values else 0.0,
+        }
+    total_ok = sum(e["ok"] for e in report["endpoints"].values())
+    report["throughput_rps"] = round(total_ok / elapsed, 2) if elapsed else 0.0
+    return report
+
+
+# Fake backend: the real app with the sandbox and LLM replaced
+
+class FakeSandboxRunner:
+    """Stands in for DockerSandboxRunner: sleeps, then answers like a run."""
+
+    latency = 0.2
+    error_rate = 0.3
+    errors: Dict[str, List[str]] = {}
+
+    def __init__(self):
+        pass
+
+    def run_code(self, language, code, stdin_data="", container_name=None):
+        time.sleep(random.expovariate(1 / self.latency) if self.latency else 0)
+        if random.random() < self.error_rate and self.errors.get(language):
+            return {"success": False, "output": "", "error": random.choice(self.errors[language])}
+        return {"success": True, "output": "11", "error": ""}
+
+    def kill(self, container_name):
+        pass
+
+
+def serve_fake(port: int, sandbox_latency: float, error_rate: float):
+    """Run the real app with FakeSandboxRunner (call in a child process)."""
+    import uvicorn
+    import main
+    from api import run_code, get_hint
+
+    FakeSandboxRunner.latency = sandbox_latency
+    FakeSandboxRunner.error_rate = error_rate
+    for language, cases in Workload().errors.items():
+        FakeSandboxRunner.errors[language] = [c["error_message"] for c in cases]
+    run_code.DockerSandboxRunner = FakeSandboxRunner
+    # Keep load-test attempts out of the real stats.json
+    stats_file = os.path.join(tempfile.gettempdir(), f"load_harness_stats_{os.getpid()}.json")
+    run_code.stats_manager.stats_file = get_hint.stats_manager.stats_file = stats_file
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Backend on port {port} did not start")
+
+
+def start_fake_backend(args) -> tuple:
+    """Start the Ollama stub and the fake backend; returns (url, processes)."""
+    procs = []
+    llm_port = free_port()
+    procs.append(subprocess.Popen(
+        [sys.executable, "-m", "rag.ollama_stub", "--port", str(llm_port),
+         "--token-delay", str(args.llm_token_delay), "--first-token-delay", str(args.llm_first_token_delay)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    port = free_port()
+    env = dict(os.environ, OLLAMA_HOST=f"http://127.0.0.1:{llm_port}")
+    procs.append(subprocess.Popen(
+        [sys.executable, "-m", "bench.load_harness", "serve-fake", "--port", str(port),
+         "--sandbox-latency", str(args.sandbox_latency), "--error-rate", str(args.error_rate)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    wait_for_port(llm_port)
+    wait_for_port(port)
+    return f"http://127.0.0.1:{port}", procs
+
+
+def print_report(report: dict, label: str):
+    print(f"\n{label}: {report['elapsed_s']}s, {report['throughput_rps']} ok req/s")
+    print(f"{'endpoint':<10} {'sent':>6} {'ok':>6} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  status")
+    for endpoint, r in report["endpoints"].items():
+        status = ", ".join(f"{k}:{v}" for k, v in sorted(r["status"].items()))
+        if r["not_sent"]:
+            status += f", not sent:{r['not_sent']}"
+        print(f"{endpoint:<10} {r['requests']:>6} {r['ok']:>6} {r['throughput_rps']:>7} "
+              f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}  {status}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "serve-fake":
+        parser = argparse.ArgumentParser(description="Fake backend (internal)")
+        parser.add_argument("serve")
+        parser.add_argument("--port", type=int, required=True)
+        parser.add_argument("--sandbox-latency", type=float, default=0.2)
+        parser.add_argument("--error-rate", type=float, default=0.3)
+        args = parser.parse_args()
+        serve_fake(args.port, args.sandbox_latency, args.error_rate)
+        return
+
+    parser = argparse.ArgumentParser(description="Load test the HTTP API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Backend to load")
+    parser.add_argument("--fake", action="store_true",
+                        help="Start the app locally with a fake sandbox and stub LLM")
+    parser.add_argument("--rate", type=float, default=10.0, help="Requests per second (mix)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of traffic (mix)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Endpoint weights")
+    parser.add_argument("--clients", type=int, default=40, help="Simulated students")
+    parser.add_argument("--replay", default=None, help="REQUEST_LOG file to replay instead of the mix")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed-up")
+    parser.add_argument("--max-in-flight", type=int, default=512)
+    parser.add_argument("--timeout", type=float, default=180.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sandbox-latency", type=float, default=0.2, help="Fake run seconds (mean)")
+    parser.add_argument("--error-rate", type=float, default=0.3, help="Share of fake runs that fail")
+    parser.add_argument("--llm-token-delay", type=float, default=0.02)
+    parser.add_argument("--llm-first-token-delay", type=float, default=0.5)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    workload = Workload(args.seed)
+    if args.replay:
+        schedule = replay_schedule(workload, args.replay, args.speed, args.clients)
+        label = f"replay {os.path.basename(args.replay)} x{args.speed:g}"
+    else:
+        schedule = mix_schedule(workload, args.rate, args.duration, parse_mix(args.mix), args.clients)
+        label = f"mix {args.rate:g} req/s for {args.duration:g}s"
+    if not schedule:
+        print("No requests to send")
+        return
+
+    procs = []
+    url = args.url
+    if args.fake:
+        url, procs = start_fake_backend(args)
+        label += " (fake sandbox + stub LLM)"
+    try:
+        report = asyncio.run(drive(url, schedule, args.max_in_flight, args.timeout))
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+    report["source"] = label
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, label)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark Results
+Saving benchmark results with the commit they were measured on, and
+comparing two runs.
+
+A saved report is {"meta": {"commit", "date", ...}, "results": {...}};
+results may nest freely. Metrics are compared by their dotted path, so
+the same benchmark on two commits lines up metric by metric.
+"""
+
+import os
+import json
+import datetime
+import subprocess
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Sample counts and extremes are too noisy to compare
+SKIPPED_SUFFIXES = (".n", ".mean_ms", ".max_ms")
+
+
+def git_commit() -> str:
+    """Short commit hash of the tree being measured ("+dirty" with local changes)."""
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return sha + ("+dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def make_report(results: dict, **meta) -> dict:
+    """Wrap results with the commit and time they were measured at."""
+    return {
+        "meta": dict(commit=git_commit(), date=datetime.datetime.now().isoformat(timespec="seconds"), **meta),
+        "results": results,
+    }
+
+
+def save(report: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def flatten(data, prefix: str = "") -> Dict[str, float]:
+    """Nested results -> {"a.b.c": number} for comparison."""
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def print_comparison(baseline: dict, current: dict):
+    """Metrics measured in both runs, side by side."""
+    old = flatten(baseline["results"])
+    new = flatten(current["results"])
+    print(f"{'metric':<58} {baseline['meta']['commit']:>12} {current['meta']['commit']:>12} {'change':>8}")
+    for name in sorted(set(old) & set(new)):
+        if name.endswith(SKIPPED_SUFFIXES) or old[name] == new[name] == 0:
+            continue
+        change = f"{(new[name] - old[name]) / old[name] * 100:+.1f}%" if old[name] else "new"
+        print(f"{name:<58} {old[name]:>12g} {new[name]:>12g} {change:>8}")
+    unmatched = len(set(old) ^ set(new))
+    if unmatched:
+        print(f"({unmatched} metrics measured in only one of the runs)")
+
+
+def regressions(baseline: dict, current: dict, percent: float) -> List[str]:
+    """
+    Metrics that got worse by more than `percent`.
+
+    Latencies (*_ms) are worse when higher, throughputs (*_per_s,
+    *_per_core) when lower; other metrics are not checked.
+    """
+    old = flatten(baseline["results"])
+    new = flatten(current["results"])
+    worse = []
+    for name in sorted(set(old) & set(new)):
+        if name.endswith(SKIPPED_SUFFIXES) or not old[name]:
+            continue
+        change = (new[name] - old[name]) / old[name] * 100
+        if name.endswith("_ms") and change > percent:
+            worse.append(f"{name}: {old[name]:g} -> {new[name]:g} ({change:+.1f}%)")
+        elif name.endswith(("_per_s", "_per_core")) and change < -percent:
+            worse.append(f"{name}: {old[name]:g} -> {new[name]:g} ({change:+.1f}%)")
+    return worse
@@ -0,0 +1,313 @@
+"""
+Sandbox Benchmark
+Per-language timings of the sandbox execution backends.
+
+For every backend that is available (local Docker, the remote agents in
+--workers / SANDBOX_WORKERS, or a --runner class) and every language, runs:
+
+- programs:   hello world, and the reference_solution of every exercise in
+              exercises/*.json with its first testcase as input. Each
+              program's first run is reported as cold (hello world runs
+              first, so it pays for a cold language), the next --repeat
+              runs as warm (p50). Each run is split into container start, compile
+              and execute with the sandbox's phase timestamps (the same
+              phases request tracing records), and checked against the
+              expected output.
+- throughput: --runs hello-world runs one after another (sequential) and
+              --parallel at a time (parallel): runs per second, runs per
+              second per core of the backend, and the parallel speedup.
+
+"Cold" is the first run in this process: for a truly cold host (image
+layers and compilers not in the page cache), run right after restarting
+Docker.
+
+Results are JSON with --json; --save / --compare keep them between commits,
+and --fail-over makes the command exit non-zero when a latency or
+throughput regressed by more than the given percentage, for deployment
+checks:
+
+    python -m bench.sandbox_benchmark --save baseline.json
+    python -m bench.sandbox_benchmark --compare baseline.json --fail-over 25
+
+Usage (from backend/):
+    python -m bench.sandbox_benchmark --language python --repeat 5
+    python -m bench.sandbox_benchmark --workers http://sandbox-1:9100 --backend remote --json
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import results as saved
+from services.sandbox_runner import DockerSandboxRunner
+from services.remote_executor import RemoteSandboxRunner, SANDBOX_WORKERS
+from services.sandbox_agent import load_runner
+from stats import tracing
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXERCISES_DIR = os.path.join(BACKEND_DIR, "exercises")
+
+LANGUAGES = ("c", "cpp", "java", "python")
+BACKENDS = ("docker", "remote", "custom")
+# Phases reported per run; "docker_run" is recorded instead of the first
+# three when the sandbox clock cannot be used (see sandbox_runner._record_phases)
+PHASES = ("container_start", "compile", "execute", "docker_run", "sandbox_prepare", "sandbox_cleanup", "remote_run")
+
+HELLO = {
+    "c": '#include <stdio.h>\nint main() {\n    printf("Hello, World!\\n");\n    return 0;\n}\n',
+    "cpp": '#include <iostream>\nint main() {\n    std::cout << "Hello, World!" << std::endl;\n    return 0;\n}\n',
+    "java": 'public class Main {\n    public static void main(String[] args) {\n        System.out.println("Hello, World!");\n    }\n}\n',
+    "python": 'print("Hello, World!")\n',
+}
+HELLO_OUTPUT = "Hello, World!"
+
+
+def load_programs(languages: List[str], hello_only: bool = False) -> Dict[str, List[dict]]:
+    """language -> [{name, code, stdin, expected}], hello world first."""
+    programs = {}
+    for language in languages:
+        programs[language] = [{"name": "hello", "code": HELLO[language], "stdin": "", "expected": HELLO_OUTPUT}]
+        if hello_only:
+            continue
+        path = os.path.join(EXERCISES_DIR, f"{language}.json")
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            exercises = json.load(f)
+        for exercise in exercises:
+            code = exercise.get("reference_solution")
+            if not code:
+                continue
+            case = (exercise.get("testcases") or [{}])[0]
+            stdin = case.get("input", "").strip()
+            programs[language].append({
+                "name": exercise["id"],
+                "code": code,
+                # As /api/run passes user input
+                "stdin": stdin + "\n" if stdin else "",
+                "expected": case.get("expected_output"),
+            })
+    return programs
+
+
+def docker_backend():
+    """(runner, cores) for local Docker, or raises RuntimeError with the reason."""
+    runner = DockerSandboxRunner()
+    image = subprocess.run(["docker", "image", "inspect", runner.SANDBOX_IMAGE], capture_output=True)
+    if image.returncode != 0:
+        raise RuntimeError(f"image {runner.SANDBOX_IMAGE} not built (see Dockerfile.sandbox)")
+    return runner, os.cpu_count() or 1
+
+
+def remote_backend(urls: List[str]):
+    """(runner, cores) for the remote agents, or raises RuntimeError with the reason."""
+    if not urls:
+        raise RuntimeError("no agents configured (--workers or SANDBOX_WORKERS)")
+    runner = RemoteSandboxRunner(urls)
+    runner.check_workers()
+    if not runner.healthy_workers():
+        runner.close()
+        raise RuntimeError("no agent is reachable")
+    cores = sum(w["cpus"] for w in runner.get_stats()["workers"] if w["healthy"] and not w["draining"])
+    return runner, cores
+
+
+def timed_run(runner, language: str, program: dict) -> dict:
+    """One run: total seconds, phase seconds and whether the output was right."""
+    started = time.perf_counter()
+    with tracing.collect() as trace:
+        result = runner.run_code(language, program["code"], program["stdin"])
+    total = time.perf_counter() - started
+    correct = None
+    if program["expected"] is not None:
+        correct = bool(result.get("success")) and result.get("output", "").strip() == program["expected"].strip()
+    return {"total": total, "phases": trace.breakdown(), "correct": correct,
+            "error": "" if result.get("success") else result.get("error", "")}
+
+
+def ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def median(values: List[float]) -> float:
+    values = sorted(values)
+    return values[len(values) // 2] if values else 0.0
+
+
+def run_summary(run: dict) -> dict:
+    summary = {"total_ms": ms(run["total"])}
+    summary.update({f"{p}_ms": ms(run["phases"][p]) for p in PHASES if p in run["phases"]})
+    return summary
+
+
+def warm_summary(runs: List[dict]) -> dict:
+    """p50 of total and of every phase over the warm runs."""
+    summary = {"n": len(runs), "total_ms": ms(median([r["total"] for r in runs]))}
+    for phase in PHASES:
+        values = [r["phases"][phase] for r in runs if phase in r["phases"]]
+        if values:
+            summary[f"{phase}_ms"] = ms(median(values))
+    return summary
+
+
+def bench_programs(runner, programs: Dict[str, List[dict]], repeat: int) -> dict:
+    """Cold and warm timings of every program."""
+    results = {}
+    for language, items in programs.items():
+        for program in items:
+            cold = timed_run(runner, language, program)
+            warm = [timed_run(runner, language, program) for _ in range(repeat)]
+            entry = {"cold": run_summary(cold), "warm": warm_summary(warm) if warm else {}}
+            checks = [r["correct"] for r in [cold] + warm if r["correct"] is not None]
+            if checks:
+                entry["correct"] = all(checks)
+            if cold["error"]:
+                entry["error"] = cold["error"][:200]
+            results[f"{language}/{program['name']}"] = entry
+    return results
+
+
+def bench_throughput(runner, languages: List[str], runs: int, parallel: int, cores: int) -> dict:
+    """Hello-world runs per second, sequential and `parallel` at a time."""
+    results = {}
+    for language in languages:
+        program = {"code": HELLO[language], "stdin": "", "expected": HELLO_OUTPUT}
+        started = time.perf_counter()
+        sequential = [timed_run(runner, language, program) for _ in range(runs)]
+        sequential_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(parallel) as pool:
+            concurrent = list(pool.map(lambda _: timed_run(runner, language, program), range(runs)))
+        parallel_s = time.perf_counter() - started
+
+        seq_rate = runs / sequential_s
+        par_rate = runs / parallel_s
+        results[language] = {
+            "runs": runs,
+            "parallel": parallel,
+            "failed": sum(1 for r in sequential + concurrent if not r["correct"]),
+            "sequential_runs_per_s": round(seq_rate, 3),
+            "parallel_runs_per_s": round(par_rate, 3),
+            "parallel_runs_per_s_per_core": round(par_rate / max(1, cores), 4),
+            "speedup": round(par_rate / seq_rate, 2),
+            "parallel_p50_ms": ms(median([r["total"] for r in concurrent])),
+        }
+    return results
+
+
+def bench_backend(name: str, args, programs: Dict[str, List[dict]]) -> dict:
+    try:
+        if name == "docker":
+            runner, cores = docker_backend()
+        elif name == "remote":
+            runner, cores = remote_backend(args.workers)
+        else:
+            if not args.runner:
+                raise RuntimeError("no --runner given")
+            runner, cores = load_runner(args.runner), os.cpu_count() or 1
+    except RuntimeError as e:
+        return {"available": False, "reason": str(e)}
+
+    try:
+        languages = list(programs)
+        return {
+            "available": True,
+            "cores": cores,
+            "programs": bench_programs(runner, programs, args.repeat),
+            "throughput": bench_throughput(runner, languages, args.runs, args.parallel, cores)
+            if args.runs else {},
+        }
+    finally:
+        if hasattr(runner, "close"):
+            runner.close()
+
+
+def print_report(report: dict):
+    meta = report["meta"]
+    print(f"commit {meta['commit']}  repeat {meta['repeat']}  runs {meta['runs']}  parallel {meta['parallel']}")
+    for backend, result in report["results"].items():
+        if not result["available"]:
+            print(f"\n{backend}: unavailable ({result['reason']})")
+            continue
+        print(f"\n{backend} ({result['cores']} cores)")
+        print(f"{'program':<14} {'cold ms':>9} {'start':>8} {'compile':>8} {'execute':>8} "
+              f"{'warm ms':>9} {'start':>8} {'compile':>8} {'execute':>8}  ok")
+        for program, entry in result["programs"].items():
+            cold, warm = entry["cold"], entry["warm"]
+            cells = []
+            for summary in (cold, warm):
+                cells.append(f"{summary.get('total_ms', 0):>9.1f}")
+                cells.extend(f"{summary[p + '_ms']:>8.1f}" if p + "_ms" in summary else f"{'-':>8}"
+                             for p in ("container_start", "compile", "execute"))
+            ok = {True: "yes", False: "NO", None: "-"}[entry.get("correct")]
+            print(f"{program:<14} " + " ".join(cells) + f"  {ok}")
+        if result["throughput"]:
+            print(f"{'language':<14} {'seq/s':>9} {'par/s':>8} {'per core':>8} {'speedup':>8} {'failed':>8}")
+            for language, t in result["throughput"].items():
+                print(f"{language:<14} {t['sequential_runs_per_s']:>9.2f} {t['parallel_runs_per_s']:>8.2f} "
+                      f"{t['parallel_runs_per_s_per_core']:>8.3f} {t['speedup']:>8.2f} {t['failed']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-language benchmark of the sandbox backends")
+    parser.add_argument("--backend", action="append", choices=BACKENDS,
+                        help="Backend(s) to benchmark (default: docker and remote)")
+    parser.add_argument("--workers", default=",".join(SANDBOX_WORKERS),
+                        help="Comma-separated sandbox agent URLs for the remote backend")
+    parser.add_argument("--runner", help="Runner class (module:Class) for the custom backend")
+    parser.add_argument("--language", action="append", choices=LANGUAGES, help="Language(s) (default: all)")
+    parser.add_argument("--hello-only", action="store_true", help="Skip the exercise reference programs")
+    parser.add_argument("--repeat", type=int, default=3, help="Warm runs per program")
+    parser.add_argument("--runs", type=int, default=8, help="Runs per language in the throughput test (0 = skip)")
+    parser.add_argument("--parallel", type=int, default=os.cpu_count() or 2, help="Runs at once in the throughput test")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--save", help="Write results (with the commit measured) to this file")
+    parser.add_argument("--compare", help="Compare with results saved earlier by --save")
+    parser.add_argument("--fail-over", type=float, default=0.0,
+                        help="With --compare: exit 1 if a latency or throughput regressed by more than this percent")
+    args = parser.parse_args()
+    args.workers = [u.strip().rstrip("/") for u in args.workers.split(",") if u.strip()]
+    backends = args.backend or (["docker", "remote"] + (["custom"] if args.runner else []))
+
+    programs = load_programs(args.language or list(LANGUAGES), args.hello_only)
+    results = {backend: bench_backend(backend, args, programs) for backend in backends}
+    report = saved.make_report(
+        results,
+        languages=list(programs),
+        programs=sum(len(p) for p in programs.values()),
+        repeat=args.repeat,
+        runs=args.runs,
+        parallel=args.parallel,
+        host_cpus=os.cpu_count() or 1,
+    )
+
+    if args.save:
+        saved.save(report, args.save)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.compare:
+        baseline = saved.load(args.compare)
+        if not args.json:
+            print()
+            saved.print_comparison(baseline, report)
+        if args.fail_over:
+            worse = saved.regressions(baseline, report, args.fail_over)
+            if worse:
+                print(f"\nRegressed by more than {args.fail_over:g}%:", file=sys.stderr)
+                for line in worse:
+                    print(f"  {line}", file=sys.stderr)
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
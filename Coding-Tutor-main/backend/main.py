@@ -3,9 +3,11 @@ Sandboxed Practice System - Main Backend
 Non-interactive Docker sandbox execution.
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from api import run_code, get_exercises, get_hint
+from stats import metrics, tracing
 
 app = FastAPI(title="Lab Practice System API")
 
@@ -18,6 +20,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    Time every request and the phases recorded below it (see stats/tracing.py).
+
+    The trace ends when the response body is complete, so streamed responses
+    (/api/hint/stream) include the work done while streaming.
+    """
+    trace, token = tracing.start()
+    try:
+        response = await call_next(request)
+    except BaseException:
+        route = request.scope.get("route")
+        tracing.finish(trace, token, getattr(route, "path", "unmatched"), 500)
+        raise
+    # The handler runs in its own task with a copy of the context, so the
+    # trace can leave this context now and still collect the body's spans
+    tracing.detach(token)
+    body = response.body_iterator
+
+    async def traced_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            route = request.scope.get("route")
+            tracing.finish(trace, None, getattr(route, "path", "unmatched"), response.status_code)
+
+    response.body_iterator = traced_body()
+    return response
+
+
 # Include API routers
 app.include_router(run_code.router, prefix="/api", tags=["execution"])
 app.include_router(get_exercises.router, prefix="/api", tags=["exercises"])
@@ -41,6 +75,12 @@ async def api_health_check():
     return {"status": "ok", "message": "API is running", "ready": True}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics (aggregate counters and latency histograms only)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/favicon.ico")
 async def favicon():
     from fastapi.responses import Response
@@ -1,5 +1,5 @@
 """RAG and LLM module."""
-from .rag_llm_chat import get_hint, retrieve_notes, call_llm
+from .rag_llm_chat import get_hint, stream_hint, retrieve_notes, retrieve_notes_async, call_llm, stream_llm
 
-__all__ = ['get_hint', 'retrieve_notes', 'call_llm']
+__all__ = ['get_hint', 'stream_hint', 'retrieve_notes', 'retrieve_notes_async', 'call_llm', 'stream_llm']
 
@@ -0,0 +1,142 @@
+"""
+Build Hint Packs
+Offline job that precomputes a hint for every exercise and error class.
+
+For each exercise in exercises/{language}.json and each class in
+hint_packs.ERROR_CLASSES, the lab-manual notes are retrieved from the
+subject's index and the LLM writes the hint once. Run it after adding
+exercises or rebuilding an index (stale hints are ignored until then):
+
+    python -m rag.build_hint_packs                    # all languages
+    python -m rag.build_hint_packs --languages c java
+    python -m rag.build_hint_packs --no-llm           # lab-manual summaries only
+"""
+
+import os
+import json
+import asyncio
+import argparse
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from . import rag_llm_chat as chat
+from .hint_packs import (
+    PACK_FORMAT, HINT_PACK_DIR, EXERCISES_DIR, ERROR_CLASSES,
+    corpus_version, exercise_hash, pack_path,
+)
+
+
+def scenario(exercise: Dict[str, Any], error_class: str):
+    """(error_message, failed_tests) describing a typical failure of this class."""
+    error_message = (f"{ERROR_CLASSES[error_class]}\n"
+                     f"Exercise: {exercise.get('title', '')}\n{exercise.get('description', '')}")
+    testcases = exercise.get("testcases") or []
+    failed_tests = ""
+    if testcases:
+        case = testcases[0]
+        failed_tests = f"Input: {case.get('input', '')!r}, expected output: {case.get('expected_output', '')!r}"
+    return error_message, failed_tests
+
+
+async def build_hint(subject: str, exercise: Dict[str, Any], error_class: str, use_llm: bool = True,
+                     llm: Optional[Callable[[str], Awaitable[str]]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Hint for one (exercise, error class) pair.
+
+    Args:
+        subject: Subject whose index grounds the hint
+        exercise: Exercise definition
+        error_class: Key of ERROR_CLASSES
+        use_llm: False to store lab-manual summaries instead of LLM hints
+        llm: Prompt -> text coroutine (default rag_llm_chat.call_llm)
+
+    Returns:
+        Hint dict, or None when nothing worth storing was produced
+    """
+    error_message, failed_tests = scenario(exercise, error_class)
+    query = f"{exercise.get('title', '')}\n{ERROR_CLASSES[error_class]}"
+    chunks = await chat.retrieve_notes_async(subject, query, k=5)
+    relevant = chat.has_relevant_notes(chunks)
+
+    if not use_llm:
+        if not relevant:
+            return None
+        return {"hint": f"From your lab manual: {chat.summarize_notes(chunks)}",
+                "source": "RAG (Lab Manual, Summary)", "rag_used": True}
+
+    llm = llm or chat.call_llm
+    if relevant:
+        prompt = chat.notes_prompt(chunks, error_message, failed_tests)
+        hint_data = {"source": "RAG (Lab Manual)", "rag_used": True}
+    else:
+        prompt = chat.fallback_prompt(subject, error_message, failed_tests)
+        hint_data = {"source": "LLM (Ollama)", "rag_used": False}
+    hint_data["hint"] = (await llm(prompt)).strip()
+    if not hint_data["hint"] or not chat._cacheable(hint_data):
+        return None
+    return hint_data
+
+
+async def build_pack(language: str, exercises_dir: str = EXERCISES_DIR, use_llm: bool = True,
+                     llm: Optional[Callable[[str], Awaitable[str]]] = None,
+                     classes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Hint pack for every exercise of one language."""
+    with open(os.path.join(exercises_dir, f"{language}.json"), "r", encoding="utf-8") as f:
+        exercises = json.load(f)
+    subject = exercises[0].get("subject", f"{language}_lab_manual") if exercises else f"{language}_lab_manual"
+    classes = classes or list(ERROR_CLASSES)
+
+    hints = {}
+    for exercise in exercises:
+        entry = {"exercise_hash": exercise_hash(exercise)}
+        for error_class in classes:
+            hint_data = await build_hint(subject, exercise, error_class, use_llm, llm)
+            if hint_data:
+                entry[error_class] = hint_data
+        hints[exercise["id"]] = entry
+        print(f"  {language}/{exercise['id']}: {len(entry) - 1}/{len(classes)} hints")
+
+    return {
+        "format": PACK_FORMAT,
+        "language": language,
+        "subject": subject,
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "model": chat.OLLAMA_MODEL if use_llm else None,
+        "index_version": corpus_version(subject),
+        "classes": classes,
+        "hints": hints,
+    }
+
+
+def write_pack(pack: Dict[str, Any], pack_dir: str = HINT_PACK_DIR) -> str:
+    """Write a pack atomically (a running server may be reading the old one)."""
+    os.makedirs(pack_dir, exist_ok=True)
+    path = pack_path(pack_dir, pack["language"])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pack, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+async def build_all(languages: List[str], pack_dir: str, use_llm: bool):
+    for language in languages:
+        print(f"Building hint pack for {language}...")
+        pack = await build_pack(language, use_llm=use_llm)
+        count = sum(len(entry) - 1 for entry in pack["hints"].values())
+        print(f"Saved {count} hints to {write_pack(pack, pack_dir)}")
+    await chat.llm_client.aclose()
+
+
+def main():
+    available = sorted(f[:-5] for f in os.listdir(EXERCISES_DIR) if f.endswith(".json"))
+    parser = argparse.ArgumentParser(description="Precompute hints for every exercise and error class")
+    parser.add_argument("--languages", nargs="+", default=available, choices=available)
+    parser.add_argument("--out", default=HINT_PACK_DIR, help="Hint pack directory")
+    parser.add_argument("--no-llm", action="store_true", help="Store lab-manual summaries instead of LLM hints")
+    args = parser.parse_args()
+    asyncio.run(build_all(args.languages, args.out, not args.no_llm))
+
+
+if __name__ == "__main__":
+    main()
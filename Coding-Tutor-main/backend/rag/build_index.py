@@ -4,18 +4,33 @@ Extracts text and images from PDFs, creates FAISS indexes.
 """
 
 import os
+import argparse
 import faiss
 import numpy as np
 import fitz  # PyMuPDF
 from PIL import Image
 import pytesseract
-from sentence_transformers import SentenceTransformer
+
+try:
+    from .index_factory import make_index, write_index, INDEX_TYPE, INDEX_TYPES
+    from . import chunk_store
+    from .lexical_index import BM25Index, index_path as bm25_path
+    from .embedders import load_embedder, EMBED_BACKEND
+    from .dedup import strip_boilerplate, dedup_chunks, print_report, DEDUP_THRESHOLD
+except ImportError:  # run as a script: python build_index.py
+    from index_factory import make_index, write_index, INDEX_TYPE, INDEX_TYPES
+    import chunk_store
+    from lexical_index import BM25Index, index_path as bm25_path
+    from embedders import load_embedder, EMBED_BACKEND
+    from dedup import strip_boilerplate, dedup_chunks, print_report, DEDUP_THRESHOLD
 
 # Configuration
-PDF_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "Lab")
-IMG_DIR = os.path.join(os.path.dirname(__file__), "images")
-INDEX_DIR = os.path.join(os.path.dirname(__file__), "indexes")
-META_DIR = os.path.join(os.path.dirname(__file__), "metadata")
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PDF_DIR = os.path.join(BASE_DIR, "Lab")
+IMG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+# Same locations rag_llm_chat.load_subject reads from
+INDEX_DIR = os.path.join(BASE_DIR, "indexes")
+META_DIR = os.path.join(BASE_DIR, "metadata")
 
 # Create directories
 os.makedirs(IMG_DIR, exist_ok=True)
@@ -28,8 +43,8 @@ if os.name == 'nt':
         r"C:\Program Files\Tesseract-OCR\tesseract.exe"
     )
 
-# Embedding model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Embedding model (EMBED_BACKEND; queries must be encoded by a compatible backend)
+model = load_embedder(EMBED_BACKEND)
 
 
 def chunk(text, size=180, overlap=40):
@@ -43,8 +58,8 @@ def chunk(text, size=180, overlap=40):
     return chunks
 
 
-def build_index(pdf_file: str):
-    """Build FAISS index for a single PDF."""
+def build_index(pdf_file: str, index_type: str = INDEX_TYPE, dedup_threshold: float = DEDUP_THRESHOLD):
+    """Build FAISS index for a single PDF (dedup_threshold 0 keeps near-duplicate chunks)."""
     if not pdf_file.endswith(".pdf"):
         return
     
@@ -59,15 +74,20 @@ def build_index(pdf_file: str):
     
     doc = fitz.open(pdf_path)
     all_chunks = []
+    chunk_pages = []
+    chunk_sources = []
     
     img_subdir = os.path.join(IMG_DIR, subject)
     os.makedirs(img_subdir, exist_ok=True)
     
-    # Extract text
-    for page in doc:
-        text = page.get_text()
+    # Extract text, without the header/footer lines repeated on every page
+    page_texts = strip_boilerplate([page.get_text() for page in doc])
+    for page, text in zip(doc, page_texts):
         if text.strip():
-            all_chunks.extend(chunk(text))
+            page_chunks = chunk(text)
+            all_chunks.extend(page_chunks)
+            chunk_pages.extend([page.number + 1] * len(page_chunks))
+            chunk_sources.extend(["text"] * len(page_chunks))
     
     # Extract images and OCR
     img_id = 0
@@ -83,7 +103,10 @@ def build_index(pdf_file: str):
             try:
                 ocr_text = pytesseract.image_to_string(Image.open(img_path))
                 if ocr_text.strip():
-                    all_chunks.extend(chunk(ocr_text))
+                    ocr_chunks = chunk(ocr_text)
+                    all_chunks.extend(ocr_chunks)
+                    chunk_pages.extend([page.number + 1] * len(ocr_chunks))
+                    chunk_sources.extend(["ocr"] * len(ocr_chunks))
             except Exception as e:
                 print(f"Warning: OCR failed for image {img_id}: {e}")
             
@@ -93,20 +116,37 @@ def build_index(pdf_file: str):
         print(f"Warning: No content extracted from {subject}")
         return
     
+    # Collapse near-duplicate chunks (OCR repeating page text, repeated pages)
+    if dedup_threshold:
+        kept, report = dedup_chunks(all_chunks, dedup_threshold, chunk_sources)
+        all_chunks = [all_chunks[i] for i in kept]
+        chunk_pages = [chunk_pages[i] for i in kept]
+        chunk_sources = [chunk_sources[i] for i in kept]
+        print_report(report)
+    
     # Create FAISS index
     embeddings = model.encode(all_chunks)
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(np.array(embeddings))
+    index = make_index(np.array(embeddings, dtype="float32"), index_type)
     
     # Save index and metadata
-    faiss.write_index(index, os.path.join(INDEX_DIR, f"{subject}.index"))
-    np.save(os.path.join(META_DIR, f"{subject}.npy"), np.array(all_chunks, dtype=object))
+    # Keyword index for the lexical fast path, then the vectors; the chunk
+    # store's header goes last, so readers see a complete rebuild
+    BM25Index.build(all_chunks).save(bm25_path(META_DIR, subject))
+    write_index(index, os.path.join(INDEX_DIR, f"{subject}.index"))
+    chunk_store.write(META_DIR, subject, all_chunks, pages=chunk_pages, sources=chunk_sources)
     
-    print(f"✅ Indexed {subject} | Chunks: {len(all_chunks)}")
+    print(f"✅ Indexed {subject} | Chunks: {len(all_chunks)} | Index: {type(index).__name__}")
 
 
 def main():
     """Build indexes for all PDFs in Lab directory."""
+    parser = argparse.ArgumentParser(description="Build RAG indexes from lab manuals")
+    parser.add_argument("--index-type", default=INDEX_TYPE, choices=INDEX_TYPES,
+                        help="FAISS index type (default: RAG_INDEX_TYPE or 'flat')")
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD,
+                        help="Similarity at which chunks count as near-duplicates (0 disables dedup)")
+    args = parser.parse_args()
+
     if not os.path.exists(PDF_DIR):
         print(f"Error: Lab directory not found: {PDF_DIR}")
         return
@@ -120,7 +160,7 @@ def main():
     print(f"Found {len(pdf_files)} PDF file(s)")
     
     for pdf_file in pdf_files:
-        build_index(pdf_file)
+        build_index(pdf_file, args.index_type, args.dedup_threshold)
     
     print("\n✅ Index building complete!")
 
@@ -0,0 +1,173 @@
+"""
+Chunk Store
+Compact, memory-mapped storage for RAG chunk text.
+
+Layout for a subject in the metadata directory:
+- {subject}.chunks       one contiguous UTF-8 blob with every chunk's text
+- {subject}.offsets.npy  int64 byte offsets, length n+1 (chunk i = blob[o[i]:o[i+1]])
+- {subject}.pages.npy    optional int32 page number per chunk (0 = unknown)
+- {subject}.sources.npy  optional uint8 index into the header's source names
+- {subject}.chunks.json  small header: format version, count, source names
+
+Nothing is unpickled and nothing is decoded until a chunk is accessed, so
+load time and resident memory are proportional to what retrieval reads.
+"""
+
+import os
+import json
+import mmap
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def _paths(meta_dir: str, subject: str) -> Dict[str, str]:
+    base = os.path.join(meta_dir, subject)
+    return {
+        "blob": f"{base}.chunks",
+        "offsets": f"{base}.offsets.npy",
+        "pages": f"{base}.pages.npy",
+        "sources": f"{base}.sources.npy",
+        "header": f"{base}.chunks.json",
+    }
+
+
+def exists(meta_dir: str, subject: str) -> bool:
+    """Whether a chunk store has been written for a subject."""
+    paths = _paths(meta_dir, subject)
+    return all(os.path.exists(paths[p]) for p in ("blob", "offsets", "header"))
+
+
+def write(meta_dir: str, subject: str, chunks: Sequence[str],
+          pages: Optional[Sequence[int]] = None, sources: Optional[Sequence[str]] = None):
+    """
+    Write chunks for a subject.
+
+    Args:
+        meta_dir: Metadata directory
+        subject: Subject name
+        chunks: Chunk texts, in index order
+        pages: Optional page number per chunk
+        sources: Optional source label per chunk (e.g. 'text', 'ocr')
+    """
+    paths = _paths(meta_dir, subject)
+    encoded = [str(c).encode("utf-8") for c in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    # Every file is written next to its target and renamed over it: running
+    # servers mmap the old files, which must not be truncated under them
+    with open(paths["blob"] + ".tmp", "wb") as f:
+        for b in encoded:
+            f.write(b)
+    _save_npy(paths["offsets"], offsets)
+
+    header = {"version": FORMAT_VERSION, "count": len(encoded), "sources": []}
+
+    if pages is not None:
+        _save_npy(paths["pages"], np.asarray(pages, dtype=np.int32))
+    elif os.path.exists(paths["pages"]):
+        os.remove(paths["pages"])
+
+    if sources is not None:
+        names = sorted(set(sources))
+        lookup = {name: i for i, name in enumerate(names)}
+        _save_npy(paths["sources"], np.array([lookup[s] for s in sources], dtype=np.uint8))
+        header["sources"] = names
+    elif os.path.exists(paths["sources"]):
+        os.remove(paths["sources"])
+    os.replace(paths["blob"] + ".tmp", paths["blob"])
+
+    # Header last: a store only counts as present (and changes version) once it is complete
+    with open(paths["header"] + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    os.replace(paths["header"] + ".tmp", paths["header"])
+
+
+def _save_npy(path: str, array: np.ndarray):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+class ChunkStore:
+    """Read-only, memory-mapped view of a subject's chunks."""
+
+    def __init__(self, meta_dir: str, subject: str):
+        """Open the chunk store for a subject (raises FileNotFoundError if missing)."""
+        paths = _paths(meta_dir, subject)
+        with open(paths["header"], "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported chunk store version: {header.get('version')}")
+
+        self.subject = subject
+        self.source_names: List[str] = header.get("sources", [])
+        self.offsets = np.load(paths["offsets"], mmap_mode="r")
+        self.pages = np.load(paths["pages"], mmap_mode="r") if os.path.exists(paths["pages"]) else None
+        self.sources = np.load(paths["sources"], mmap_mode="r") if os.path.exists(paths["sources"]) else None
+
+        self._file = open(paths["blob"], "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        """Text of chunk i (decoded on access)."""
+        i = int(i)
+        if i < 0 or i >= len(self):
+            raise IndexError(f"chunk index out of range: {i}")
+        return self._blob[int(self.offsets[i]):int(self.offsets[i + 1])].decode("utf-8")
+
+    def get(self, i: int) -> Dict[str, Any]:
+        """Chunk i with its optional page/source fields."""
+        item = {"text": self[i]}
+        if self.pages is not None:
+            item["page"] = int(self.pages[i])
+        if self.sources is not None:
+            item["source"] = self.source_names[int(self.sources[i])]
+        return item
+
+    def close(self):
+        """Release the mapping."""
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
+
+
+def migrate_legacy(meta_dir: str, subject: str) -> int:
+    """
+    Convert a legacy pickled {subject}.npy object array into a chunk store.
+
+    This is the only place the old format is unpickled; run it once, offline,
+    on files you built yourself. Returns the number of chunks converted.
+    """
+    legacy_path = os.path.join(meta_dir, f"{subject}.npy")
+    chunks = np.load(legacy_path, allow_pickle=True)
+    write(meta_dir, subject, [str(c) for c in chunks])
+    return len(chunks)
+
+
+def main():
+    """Migrate every legacy metadata file: python -m rag.chunk_store [meta_dir]"""
+    import sys
+    meta_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "metadata"
+    )
+    for name in sorted(os.listdir(meta_dir)):
+        if not name.endswith(".npy") or name.count(".") > 1:
+            continue
+        subject = name[:-len(".npy")]
+        count = migrate_legacy(meta_dir, subject)
+        print(f"✅ Migrated {subject} | Chunks: {count}")
+
+
+if __name__ == "__main__":
+    main()
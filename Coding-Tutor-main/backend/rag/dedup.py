@@ -0,0 +1,250 @@
+"""
+Near-Duplicate Chunk Elimination
+Collapses near-identical chunks before they are embedded and indexed.
+
+OCR of page images often repeats the page text, and every page carries the
+same header and footer, so the flat index stores many near-identical
+vectors and the top-5 notes for a query are often the same passage twice.
+
+- strip_boilerplate() removes lines that repeat on most pages (headers,
+  footers, page numbers) before chunking.
+- dedup_chunks() estimates the Jaccard similarity of every chunk pair's
+  word 3-shingles with MinHash, finds candidate pairs with LSH banding
+  (no all-pairs comparison) and keeps the first chunk of each cluster of
+  near-duplicates. Page text comes before OCR text in the build order, so
+  the cleaner copy is the one kept.
+
+Existing indexes can be deduplicated in place, without the PDFs or an
+embedding model (vectors are reconstructed from the index):
+    python -m rag.dedup                 # report only
+    python -m rag.dedup --apply         # rewrite index, chunks and BM25
+"""
+
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configuration
+DEDUP_THRESHOLD = float(os.environ.get("RAG_DEDUP_THRESHOLD", "0.8"))
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+BANDS = 32
+
+# Universal hashing (a * x + b) mod P, with a, b, x < P so a * x + b fits in uint64
+_PRIME = (1 << 31) - 1
+_DIGITS_RE = re.compile(r"\d+")
+_WORD_RE = re.compile(r"[\w#]+")
+
+
+def strip_boilerplate(pages: Sequence[str], min_pages: int = 3, share: float = 0.5) -> List[str]:
+    """
+    Remove lines that repeat across pages (headers, footers, page numbers).
+
+    A line counts as boilerplate when, with digits ignored, it appears on at
+    least max(min_pages, share * len(pages)) pages.
+    """
+    def key(line: str) -> str:
+        return _DIGITS_RE.sub("#", " ".join(line.split()).lower())
+
+    counts = Counter()
+    for text in pages:
+        counts.update({key(line) for line in text.splitlines() if line.strip()})
+    limit = max(min_pages, share * len(pages))
+    repeated = {line for line, n in counts.items() if n >= limit}
+    if not repeated:
+        return list(pages)
+    return ["\n".join(line for line in text.splitlines() if key(line) not in repeated) for text in pages]
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Hashes of the text's word n-grams (uint64, deduplicated); numbers all count as equal."""
+    words = _DIGITS_RE.sub("#", text.lower())
+    words = _WORD_RE.findall(words)
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64))
+
+
+def minhash_signatures(texts: Sequence[str], num_perm: int = NUM_PERM, seed: int = 1) -> np.ndarray:
+    """(len(texts), num_perm) MinHash signatures."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+    signatures = np.full((len(texts), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for row, text in enumerate(texts):
+        x = shingles(text) % _PRIME
+        if len(x):
+            signatures[row] = ((a[:, None] * x[None, :] + b[:, None]) % _PRIME).min(axis=1)
+    return signatures
+
+
+def candidate_pairs(signatures: np.ndarray, bands: int = BANDS) -> set:
+    """Pairs sharing at least one identical signature band."""
+    rows = signatures.shape[1] // bands
+    pairs = set()
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        for i, sig in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+            buckets.setdefault(sig.tobytes(), []).append(i)
+        for members in buckets.values():
+            for j in range(1, len(members)):
+                for i in members[:j]:
+                    pairs.add((i, members[j]))
+    return pairs
+
+
+def dedup_chunks(chunks: Sequence[str], threshold: float = DEDUP_THRESHOLD,
+                 sources: Optional[Sequence[str]] = None) -> Tuple[List[int], Dict[str, Any]]:
+    """
+    Indices of the chunks to keep, first of each near-duplicate cluster.
+
+    Args:
+        chunks: Chunk texts, in index order
+        threshold: Estimated Jaccard similarity at which two chunks are duplicates
+        sources: Optional source label per chunk ('text', 'ocr'), for the report
+
+    Returns:
+        (kept indices in order, report dict)
+    """
+    n = len(chunks)
+    if n == 0:
+        return [], {"chunks": 0, "kept": 0, "removed": 0, "clusters": 0, "removed_by_source": {}}
+    signatures = minhash_signatures(chunks)
+
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in candidate_pairs(signatures):
+        if np.mean(signatures[i] == signatures[j]) >= threshold:
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                # The earlier chunk represents the cluster
+                parent[max(ri, rj)] = min(ri, rj)
+
+    roots = [find(i) for i in range(n)]
+    kept = [i for i in range(n) if roots[i] == i]
+    removed = [i for i in range(n) if roots[i] != i]
+    report = {
+        "chunks": n,
+        "kept": len(kept),
+        "removed": len(removed),
+        "clusters": len({roots[i] for i in removed}),
+        "removed_by_source": dict(Counter(sources[i] for i in removed)) if sources is not None else {},
+    }
+    return kept, report
+
+
+def duplicate_share_in_top_k(index, vectors: np.ndarray, chunks: Sequence[str], k: int = 5,
+                             threshold: float = DEDUP_THRESHOLD) -> float:
+    """Share of top-k results that near-duplicate a better-ranked result (vectors as queries)."""
+    if index.ntotal == 0:
+        return 0.0
+    signatures = minhash_signatures(chunks)
+    _, found = index.search(vectors, min(k, index.ntotal))
+    dupes = total = 0
+    for row in found:
+        ids = [int(i) for i in row if i >= 0]
+        for pos, i in enumerate(ids[1:], start=1):
+            total += 1
+            if any(np.mean(signatures[i] == signatures[j]) >= threshold for j in ids[:pos]):
+                dupes += 1
+    return dupes / total if total else 0.0
+
+
+def _search_ms(index, vectors: np.ndarray, k: int = 5) -> float:
+    import time
+    start = time.perf_counter()
+    for q in vectors:
+        index.search(q.reshape(1, -1), k)
+    return (time.perf_counter() - start) / max(1, len(vectors)) * 1000
+
+
+def dedup_subject(meta_dir: str, index_dir: str, subject: str, threshold: float = DEDUP_THRESHOLD,
+                  apply: bool = False) -> Dict[str, Any]:
+    """Deduplicate an already-built subject; rewrites it when apply is True."""
+    import faiss
+    from . import chunk_store
+    from .chunk_store import ChunkStore
+    from .index_factory import make_index, write_index, index_type_of, index_nbytes
+    from .lexical_index import BM25Index, index_path as bm25_path
+
+    store = ChunkStore(meta_dir, subject)
+    items = [store.get(i) for i in range(len(store))]
+    store.close()
+    chunks = [item["text"] for item in items]
+    sources = [item["source"] for item in items] if items and "source" in items[0] else None
+    pages = [item["page"] for item in items] if items and "page" in items[0] else None
+
+    kept, report = dedup_chunks(chunks, threshold, sources)
+    index_path = os.path.join(index_dir, f"{subject}.index")
+    index = faiss.read_index(index_path)
+    ivf = faiss.try_extract_index_ivf(index) if hasattr(faiss, "try_extract_index_ivf") else None
+    if ivf is not None:
+        ivf.make_direct_map()  # IVF indexes reconstruct by id only with a direct map
+    vectors = index.reconstruct_n(0, index.ntotal)
+    # Rebuild as the same type, not whatever RAG_INDEX_TYPE says now
+    new_index = make_index(vectors[kept], index_type_of(index))
+    kept_chunks = [chunks[i] for i in kept]
+
+    report.update({
+        "subject": subject,
+        "index_bytes": [index_nbytes(index), index_nbytes(new_index)],
+        "search_ms": [round(_search_ms(index, vectors), 4), round(_search_ms(new_index, vectors), 4)],
+        "top5_duplicate_share": [round(duplicate_share_in_top_k(index, vectors, chunks), 4),
+                                 round(duplicate_share_in_top_k(new_index, vectors, kept_chunks), 4)],
+    })
+
+    if apply and report["removed"]:
+        # Same order as build_index: the chunk store's header is replaced last
+        BM25Index.build(kept_chunks).save(bm25_path(meta_dir, subject))
+        write_index(new_index, index_path)
+        chunk_store.write(meta_dir, subject, kept_chunks,
+                          pages=[pages[i] for i in kept] if pages is not None else None,
+                          sources=[sources[i] for i in kept] if sources is not None else None)
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    line = f"🧹 Dedup {report.get('subject', '')}: removed {report['removed']} of {report['chunks']} chunks"
+    if report["removed_by_source"]:
+        line += " (" + ", ".join(f"{n} {source}" for source, n in sorted(report["removed_by_source"].items())) + ")"
+    print(line)
+
+
+def main():
+    import argparse
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser = argparse.ArgumentParser(description="Remove near-duplicate chunks from built indexes")
+    parser.add_argument("--subject", action="append", help="Subject(s) (default: all)")
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    parser.add_argument("--apply", action="store_true", help="Rewrite index, chunk store and BM25 index")
+    args = parser.parse_args()
+
+    meta_dir = os.path.join(base_dir, "metadata")
+    index_dir = os.path.join(base_dir, "indexes")
+    subjects = args.subject or sorted(f[:-len(".index")] for f in os.listdir(index_dir) if f.endswith(".index"))
+    for subject in subjects:
+        report = dedup_subject(meta_dir, index_dir, subject, args.threshold, args.apply)
+        print_report(report)
+        print(f"   index {report['index_bytes'][0] / 1024:.1f} -> {report['index_bytes'][1] / 1024:.1f} KiB, "
+              f"search {report['search_ms'][0]:.4f} -> {report['search_ms'][1]:.4f} ms, "
+              f"duplicate top-5 results {report['top5_duplicate_share'][0]:.1%} -> "
+              f"{report['top5_duplicate_share'][1]:.1%}")
+    if not args.apply:
+        print("Report only; run with --apply to rewrite the indexes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Embedding Backends
+Interchangeable sentence embedders for indexing and retrieval.
+
+Every backend runs the same all-MiniLM-L6-v2 weights with mean pooling and
+L2 normalisation, so vectors from either one can be searched against indexes
+built by the other:
+
+- "sentence-transformers": the reference PyTorch model in fp32
+- "onnx": the model exported to ONNX with int8 dynamically-quantized
+  weights, run by ONNX Runtime. Needs only onnxruntime + tokenizers at
+  serving time (no PyTorch import), loads faster, uses less memory and
+  encodes faster on CPU. Quantization moves vectors slightly (cosine
+  similarity to the fp32 vectors stays around 0.99); bench/embed_benchmark.py
+  measures the agreement on the real indexes. For exact agreement, rebuild
+  the indexes with the same backend (EMBED_BACKEND=onnx python -m rag.build_index).
+
+The ONNX model is exported once, on any machine with PyTorch and transformers:
+    python -m rag.embedders export
+"""
+
+import os
+import json
+import importlib.util
+from typing import List, Sequence
+
+import numpy as np
+
+# Configuration
+EMBED_MODEL = "all-MiniLM-L6-v2"
+EMBED_BACKEND = os.environ.get("EMBED_BACKEND", "sentence-transformers")
+# Intra-op threads for encoding (0 = one per physical core, at most 4)
+EMBED_THREADS = int(os.environ.get("EMBED_THREADS", "0"))
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+ONNX_DIR = os.environ.get("EMBED_ONNX_DIR", os.path.join(BASE_DIR, "models", f"{EMBED_MODEL}-onnx"))
+ONNX_MODEL_FILE = "model_int8.onnx"
+# Truncation length of the sentence-transformers model (word pieces)
+MAX_SEQ_LENGTH = 256
+
+BACKENDS = ("sentence-transformers", "onnx")
+_REQUIREMENTS = {
+    "sentence-transformers": ("sentence_transformers",),
+    "onnx": ("onnxruntime", "tokenizers"),
+}
+
+
+def backend_available(backend: str) -> bool:
+    """Whether a backend's packages are installed (without importing them)."""
+    return backend in _REQUIREMENTS and all(
+        importlib.util.find_spec(module) is not None for module in _REQUIREMENTS[backend])
+
+
+def default_threads() -> int:
+    """Physical cores (logical / 2), capped at 4: a small model gains little beyond that."""
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+class SentenceTransformerEmbedder:
+    """Reference fp32 PyTorch embedder."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = EMBED_MODEL, threads: int = EMBED_THREADS):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        torch.set_num_threads(threads or default_threads())
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        """(len(texts), dim) float32 unit vectors."""
+        vectors = self.model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True,
+                                    normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype="float32")
+
+
+class OnnxEmbedder:
+    """Int8-quantized ONNX Runtime embedder."""
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str = ONNX_DIR, threads: int = EMBED_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found; run: python -m rag.embedders export")
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or default_threads()
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dim = self.session.get_outputs()[0].shape[-1]
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalisation (as sentence-transformers)
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+        """(len(texts), dim) float32 unit vectors."""
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        # Batch texts of similar length together so little compute goes to padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            picked = order[start:start + batch_size]
+            out[picked] = self._encode_batch([texts[i] for i in picked])
+        return out
+
+
+def load_embedder(backend: str = EMBED_BACKEND, threads: int = EMBED_THREADS):
+    """
+    Create the configured embedder.
+
+    Args:
+        backend: One of BACKENDS
+        threads: Encoding threads (0 = default_threads())
+
+    Returns:
+        Embedder with encode(texts) -> (n, dim) float32 unit vectors
+
+    Raises:
+        ValueError: Unknown backend
+        ImportError / FileNotFoundError: Backend not installed or model not exported
+    """
+    if backend == "onnx":
+        return OnnxEmbedder(threads=threads)
+    if backend == "sentence-transformers":
+        return SentenceTransformerEmbedder(threads=threads)
+    raise ValueError(f"Unknown EMBED_BACKEND '{backend}' (expected one of {', '.join(BACKENDS)})")
+
+
+def export_onnx(out_dir: str = ONNX_DIR, model_name: str = EMBED_MODEL, quantize: bool = True) -> str:
+    """
+    Export the model to ONNX and quantize its weights to int8.
+
+    Needs torch, transformers and onnxruntime; only the export machine does.
+
+    Returns:
+        Path of the model file OnnxEmbedder loads
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(out_dir, exist_ok=True)
+    hub_name = f"sentence-transformers/{model_name}"
+    AutoTokenizer.from_pretrained(hub_name).save_pretrained(out_dir)
+    model = AutoModel.from_pretrained(hub_name).eval()
+
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    dummy = {name: torch.ones(1, 8, dtype=torch.long) for name in ("input_ids", "attention_mask", "token_type_ids")}
+    axes = {0: "batch", 1: "sequence"}
+    torch.onnx.export(
+        model, (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]), fp32_path,
+        input_names=list(dummy), output_names=["last_hidden_state"],
+        dynamic_axes={**{name: axes for name in dummy}, "last_hidden_state": axes},
+        opset_version=14,
+    )
+
+    model_path = os.path.join(out_dir, ONNX_MODEL_FILE)
+    if quantize:
+        quantize_dynamic(fp32_path, model_path, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+    else:
+        os.replace(fp32_path, model_path)
+    with open(os.path.join(out_dir, "embedder.json"), "w", encoding="utf-8") as f:
+        json.dump({"model": model_name, "quantized": quantize, "max_seq_length": MAX_SEQ_LENGTH}, f)
+    return model_path
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Embedding backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Export the ONNX int8 model")
+    export.add_argument("--out", default=ONNX_DIR)
+    export.add_argument("--no-quantize", action="store_true", help="Keep fp32 weights")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(f"Exported {export_onnx(args.out, quantize=not args.no_quantize)}")
+
+
+if __name__ == "__main__":
+    main()
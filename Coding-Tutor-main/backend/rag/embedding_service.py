@@ -0,0 +1,128 @@
+"""
+Micro-batched Embedding Service
+Collects concurrent query embeddings and encodes them in one batched call.
+
+Hint requests from a whole lab tend to arrive together. Instead of one
+single-item forward pass per request, queries are queued and a dedicated
+worker thread encodes everything that arrived within a short window (or up
+to a maximum batch size) in a single call. Each caller gets its vector back
+through a future, so the event loop is never blocked by encoding.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+# Configuration
+BATCH_WINDOW_MS = float(os.environ.get("EMBED_BATCH_WINDOW_MS", "5"))
+MAX_BATCH_SIZE = int(os.environ.get("EMBED_MAX_BATCH_SIZE", "64"))
+
+
+class EmbeddingBatcher:
+    """Batch concurrent encode requests onto a dedicated worker thread."""
+
+    def __init__(self, embedder, window_ms: float = BATCH_WINDOW_MS, max_batch_size: int = MAX_BATCH_SIZE):
+        """
+        Initialize EmbeddingBatcher.
+
+        Args:
+            embedder: Object with an ``encode(list_of_texts)`` method
+            window_ms: How long to wait for more queries after the first one arrives
+            max_batch_size: Encode immediately once this many queries are queued
+        """
+        self.embedder = embedder
+        self.window = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+
+        # Counters (read by stats/metrics consumers)
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_worker(self):
+        """Start the worker thread lazily (and again in a forked child)."""
+        pid = os.getpid()
+        if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+                return
+            if self._pid != pid:
+                # Threads do not survive fork; drop anything queued by the parent
+                self._queue = queue.Queue()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for encoding. Returns a future resolving to its vector."""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str, timeout: Optional[float] = None):
+        """Encode one text, blocking the calling thread until its batch is done."""
+        return self.submit(text).result(timeout=timeout)
+
+    async def encode_async(self, text: str):
+        """Encode one text without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect_batch(self) -> List[Tuple[str, Future]]:
+        """Block for the first item, then gather more until the window closes."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Window closed - still take whatever is already waiting
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Worker loop: encode queued texts in batches."""
+        while True:
+            batch = self._collect_batch()
+            # Skip callers that gave up while waiting
+            batch = [(text, fut) for text, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.embedder.encode(texts)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            for i, (_, fut) in enumerate(batch):
+                # Keep the (1, dim) shape callers used to get from encode([query])
+                fut.set_result(vectors[i:i + 1])
+
+    def get_stats(self) -> dict:
+        """Get batching statistics."""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": (self.items / self.batches) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
@@ -0,0 +1,94 @@
+"""
+Error Signatures
+Normalizes compiler/runtime error text so equivalent errors share a key.
+
+Two students hitting the same mistake get different raw messages: line and
+column numbers, variable names, temp directory paths and literal values all
+change. Caches and request coalescing key on the normalized form instead.
+Undeclared-name and missing-member errors keep their name: the hint for an
+undeclared 'cout' (missing include) is not the hint for an undeclared 'vector'.
+"""
+
+import re
+import hashlib
+
+# gcc/clang source excerpts ("    5 |   printf(...)") and caret lines ("  |   ^~~")
+_EXCERPT_RE = re.compile(r"^\s*\d*\s*\|.*$", re.MULTILINE)
+# javac / Python source line followed by a caret marker line
+_CARET_RE = re.compile(r"^.*\n[ \t]*[\^~]+[ \t]*$", re.MULTILINE)
+# Python traceback frames (File "...", line N, in f) and the echoed source line
+_PY_FRAME_RE = re.compile(r"^[ \t]*File \"[^\"]*\", line \d+.*(?:\n[ \t]{4,}\S.*)?$", re.MULTILINE)
+# Java stack frames: "at Main.main(Main.java:7)"
+_JAVA_FRAME_RE = re.compile(r"^[ \t]*at [\w$.<>]+\(.*\)[ \t]*$", re.MULTILINE)
+# Unix/Windows paths with at least one separator (/tmp/coding_tutor_x/main.c, C:\...\Main.java)
+_PATH_RE = re.compile(r"(?:[A-Za-z]:)?(?:[\\/][\w.+-]+)+|[\w.+-]+(?:[\\/][\w.+-]+)+")
+# file:line:col prefixes and "line 12" / "line 12, column 3"
+_LOCATION_RE = re.compile(r":\d+(?::\d+)?:")
+_LINE_RE = re.compile(r"\b(line|column|col)\s+\d+", re.IGNORECASE)
+# Quoted fragments: 'x', "x", ‘x’ (gcc), `x`
+_QUOTED_RE = re.compile(r"'([^'\n]*)'|\"([^\"\n]*)\"|‘([^’\n]*)’|`([^`\n]*)`")
+_IDENT_RE = re.compile(r"^[A-Za-z_$][\w$.]*$")
+# Java "symbol: variable total" / "location: class Main"
+_SYMBOL_RE = re.compile(r"\b(variable|method|class|symbol|function|field)[ \t]+[A-Za-z_$][\w$]*(\([^)]*\))?")
+# Errors about an unknown name or member, where the name is the diagnosis
+_NAME_ERROR_RE = re.compile(
+    r"not declared|undeclared|is not defined|cannot find symbol|^\s*symbol\s*:"
+    r"|has no member|no member named|has no attribute|no attribute",
+    re.IGNORECASE,
+)
+_HEX_RE = re.compile(r"\b0x[0-9a-fA-F]+\b")
+_NUMBER_RE = re.compile(r"(?<![\w<])[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_SPACE_RE = re.compile(r"[ \t]+")
+
+
+def _replace_quoted(match: re.Match, keep_names: bool = False) -> str:
+    content = next(g for g in match.groups() if g is not None)
+    if not re.search(r"\w", content):
+        # Quoted punctuation is the error itself: expected ';'
+        return f"'{content}'"
+    if _IDENT_RE.match(content):
+        return f"'{content}'" if keep_names else "'<id>'"
+    return "'<str>'"
+
+
+def _strip_names(line: str) -> str:
+    """Replace quoted fragments and Java symbol names, unless the name is the error."""
+    if _NAME_ERROR_RE.search(line):
+        return _QUOTED_RE.sub(lambda m: _replace_quoted(m, keep_names=True), line)
+    line = _QUOTED_RE.sub(_replace_quoted, line)
+    return _SYMBOL_RE.sub(lambda m: f"{m.group(1)} <id>", line)
+
+
+def normalize_error(text: str) -> str:
+    """
+    Reduce an error message to a stable signature text.
+
+    Strips source excerpts, stack frames, paths, line/column numbers,
+    quoted identifiers (except in undeclared-name and missing-member
+    errors) and literal values, then lowercases and collapses whitespace.
+    """
+    if not text:
+        return ""
+    text = _EXCERPT_RE.sub("", text)
+    text = _CARET_RE.sub("", text)
+    text = _PY_FRAME_RE.sub("", text)
+    text = _JAVA_FRAME_RE.sub("", text)
+    text = "\n".join(_strip_names(line) for line in text.split("\n"))
+    text = _PATH_RE.sub("<path>", text)
+    text = _LOCATION_RE.sub(":<n>:", text)
+    text = _LINE_RE.sub(lambda m: f"{m.group(1).lower()} <n>", text)
+    text = _HEX_RE.sub("<n>", text)
+    text = _NUMBER_RE.sub("<n>", text)
+
+    lines = []
+    for line in text.lower().splitlines():
+        line = _SPACE_RE.sub(" ", line).strip()
+        # Drop blank lines and exact repeats (same error reported per call site)
+        if line and (not lines or lines[-1] != line):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def error_signature(text: str) -> str:
+    """Short stable hash of the normalized error text."""
+    return hashlib.sha1(normalize_error(text).encode("utf-8")).hexdigest()[:16]
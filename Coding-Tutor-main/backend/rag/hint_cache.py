@@ -0,0 +1,217 @@
+"""
+Semantic Hint Cache
+Reuses LLM-generated hints across students who hit the same mistake.
+
+Lookup order for (subject, exercise, error):
+1. Exact: the normalized error signature was answered before.
+2. Semantic: nearest neighbour over embeddings of previously answered
+   (normalized) errors for the same subject and exercise, accepted above a
+   cosine-similarity threshold.
+
+Entries are tagged with the subject's index version; when the index is
+rebuilt, that subject's hints are dropped on the next lookup.
+"""
+
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .error_signature import normalize_error, error_signature
+from .retrieval_cache import RetrievalCache
+
+# Configuration
+HINT_CACHE_SIZE = int(os.environ.get("HINT_CACHE_SIZE", "2048"))
+HINT_CACHE_TTL = float(os.environ.get("HINT_CACHE_TTL", str(7 * 24 * 3600)))
+HINT_CACHE_SIMILARITY = float(os.environ.get("HINT_CACHE_SIMILARITY", "0.92"))
+# Neighbour candidates kept per (subject, exercise)
+HINT_CACHE_BUCKET_SIZE = 256
+
+CACHED_TAG = " (Cached)"
+
+
+class HintCache:
+    """Exact + nearest-neighbour cache of generated hints."""
+
+    def __init__(self, encode: Optional[Callable[[str], Any]] = None,
+                 version_fn: Optional[Callable[[str], str]] = None,
+                 similarity: float = HINT_CACHE_SIMILARITY,
+                 max_entries: int = HINT_CACHE_SIZE, ttl: float = HINT_CACHE_TTL,
+                 encode_async: Optional[Callable[[str], Awaitable[Any]]] = None):
+        """
+        Initialize HintCache.
+
+        Args:
+            encode: Text -> (1, dim) embedding; None disables the semantic layer
+            version_fn: Subject -> index version string, for invalidation on rebuild
+            similarity: Minimum cosine similarity for a semantic hit
+            max_entries: Maximum exact entries (LRU)
+            ttl: Seconds a cached hint stays valid
+            encode_async: Awaitable variant of encode, used by lookup_async/store_async
+        """
+        self.encode = encode
+        self.encode_async = encode_async
+        self.version_fn = version_fn
+        self.similarity = similarity
+        self._exact = RetrievalCache(max_entries=max_entries, ttl=ttl)
+        # (subject, exercise) -> (keys, unit vectors matrix)
+        self._buckets: Dict[Tuple[str, str], Tuple[list, Optional[np.ndarray]]] = {}
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        self.semantic_hits = 0
+
+    def _check_version(self, subject: str):
+        """Drop a subject's hints if its index was rebuilt since they were cached."""
+        if not self.version_fn:
+            return
+        version = self.version_fn(subject)
+        with self._lock:
+            previous = self._versions.get(subject)
+            self._versions[subject] = version
+        if previous is not None and previous != version:
+            self.invalidate(subject)
+
+    def _prepare(self, subject: str, exercise_id: str, error_message: str, failed_tests: str):
+        """Normalized error text and exact-cache key for a request."""
+        self._check_version(subject)
+        normalized = normalize_error(f"{error_message}\n{failed_tests}")
+        return normalized, f"{subject}:{exercise_id}:{error_signature(normalized)}"
+
+    @staticmethod
+    def _unit(vec) -> Optional[np.ndarray]:
+        vec = np.asarray(vec, dtype="float32").reshape(-1)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else None
+
+    def _embed(self, normalized: str) -> Optional[np.ndarray]:
+        if not self.encode or not normalized:
+            return None
+        try:
+            return self._unit(self.encode(normalized))
+        except Exception as e:
+            print(f"Warning: hint cache embedding failed: {e}")
+            return None
+
+    async def _embed_async(self, normalized: str) -> Optional[np.ndarray]:
+        if not self.encode_async or not normalized:
+            return None
+        try:
+            return self._unit(await self.encode_async(normalized))
+        except Exception as e:
+            print(f"Warning: hint cache embedding failed: {e}")
+            return None
+
+    def _has_neighbours(self, subject: str, exercise_id: str) -> bool:
+        return (subject, exercise_id) in self._buckets
+
+    def _nearest(self, subject: str, exercise_id: str, vec: Optional[np.ndarray]) -> Optional[Dict[str, Any]]:
+        if vec is None:
+            return None
+        with self._lock:
+            keys, matrix = self._buckets.get((subject, exercise_id), ([], None))
+        if matrix is None:
+            return None
+        sims = matrix @ vec
+        hit = None
+        dead = []
+        # Closest live neighbour above the threshold; rows whose hint was
+        # evicted or expired are skipped and dropped from the bucket
+        for i in np.argsort(-sims):
+            if sims[i] < self.similarity:
+                break
+            if keys[i] in self._exact:
+                hit = self._exact.get(keys[i])
+                if hit is not None:
+                    self.semantic_hits += 1
+                    break
+            dead.append(keys[i])
+        if dead:
+            self._drop_neighbours(subject, exercise_id, dead)
+        return hit
+
+    def _drop_neighbours(self, subject: str, exercise_id: str, dead):
+        with self._lock:
+            keys, matrix = self._buckets.get((subject, exercise_id), ([], None))
+            keep = [i for i, key in enumerate(keys) if key not in dead]
+            if len(keep) == len(keys):
+                return
+            if keep:
+                self._buckets[(subject, exercise_id)] = ([keys[i] for i in keep], matrix[keep])
+            else:
+                del self._buckets[(subject, exercise_id)]
+
+    @staticmethod
+    def _tag(hit: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if hit is None:
+            return None
+        result = dict(hit)
+        if not result.get("source", "").endswith(CACHED_TAG):
+            result["source"] = result.get("source", "LLM") + CACHED_TAG
+        return result
+
+    def lookup(self, subject: str, exercise_id: str, error_message: str,
+               failed_tests: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Find a cached hint for this error.
+
+        Returns:
+            Hint dict with its source tagged as cached, or None on a miss
+        """
+        normalized, key = self._prepare(subject, exercise_id, error_message, failed_tests)
+        hit = self._exact.get(key)
+        if hit is None and self._has_neighbours(subject, exercise_id):
+            hit = self._nearest(subject, exercise_id, self._embed(normalized))
+        return self._tag(hit)
+
+    async def lookup_async(self, subject: str, exercise_id: str, error_message: str,
+                           failed_tests: str = "") -> Optional[Dict[str, Any]]:
+        """lookup() that awaits the embedding instead of blocking on it."""
+        normalized, key = self._prepare(subject, exercise_id, error_message, failed_tests)
+        hit = self._exact.get(key)
+        if hit is None and self._has_neighbours(subject, exercise_id):
+            hit = self._nearest(subject, exercise_id, await self._embed_async(normalized))
+        return self._tag(hit)
+
+    def _add_neighbour(self, subject: str, exercise_id: str, key: str, vec: Optional[np.ndarray]):
+        if vec is None:
+            return
+        with self._lock:
+            keys, matrix = self._buckets.get((subject, exercise_id), ([], None))
+            if key in keys:
+                return
+            # Reclaim rows whose hint is gone before the bucket drops live ones
+            if len(keys) >= HINT_CACHE_BUCKET_SIZE:
+                keep = [i for i, k in enumerate(keys) if k in self._exact]
+                keys, matrix = [keys[i] for i in keep], (matrix[keep] if keep else None)
+            keys = (keys + [key])[-HINT_CACHE_BUCKET_SIZE:]
+            rows = vec[None, :] if matrix is None else np.vstack([matrix, vec[None, :]])
+            self._buckets[(subject, exercise_id)] = (keys, rows[-HINT_CACHE_BUCKET_SIZE:])
+
+    def store(self, subject: str, exercise_id: str, error_message: str, failed_tests: str,
+              hint_data: Dict[str, Any]):
+        """Cache a freshly generated hint."""
+        normalized, key = self._prepare(subject, exercise_id, error_message, failed_tests)
+        self._exact.put(key, dict(hint_data))
+        self._add_neighbour(subject, exercise_id, key, self._embed(normalized))
+
+    async def store_async(self, subject: str, exercise_id: str, error_message: str, failed_tests: str,
+                          hint_data: Dict[str, Any]):
+        """store() that awaits the embedding instead of blocking on it."""
+        normalized, key = self._prepare(subject, exercise_id, error_message, failed_tests)
+        self._exact.put(key, dict(hint_data))
+        self._add_neighbour(subject, exercise_id, key, await self._embed_async(normalized))
+
+    def invalidate(self, subject: str = ""):
+        """Drop cached hints for one subject (or all subjects)."""
+        self._exact.clear(f"{subject}:" if subject else "")
+        with self._lock:
+            for bucket in [b for b in self._buckets if not subject or b[0] == subject]:
+                del self._buckets[bucket]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        stats = self._exact.get_stats()
+        stats["semantic_hits"] = self.semantic_hits
+        return stats
@@ -0,0 +1,217 @@
+"""
+Hint Packs
+Hints precomputed offline for every (exercise, error class) pair.
+
+Exercises and the common ways students fail them are known in advance, so
+rag/build_hint_packs.py runs retrieval and LLM generation for each pair once
+and writes one pack per exercise file to hint_packs/{language}.json. At
+serving time get_hint classifies the error and answers from the pack with a
+dictionary lookup.
+
+Pack layout (compact JSON):
+    {
+      "format": 1,
+      "language": "c", "subject": "c_lab_manual",
+      "built_at": "...", "model": "llama3.1",
+      "index_version": "...",            # corpus_version of the notes the hints were grounded in
+      "classes": [...],
+      "hints": {"ex1": {"exercise_hash": "...", "off_by_one": {"hint", "source", "rag_used"}, ...}}
+    }
+
+Hints for an exercise whose definition changed since the build, or for a
+subject whose index was rebuilt, are ignored.
+"""
+
+import os
+import re
+import json
+import hashlib
+from typing import Any, Callable, Dict, Optional
+
+PACK_FORMAT = 1
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+HINT_PACK_DIR = os.environ.get("HINT_PACK_DIR", os.path.join(BASE_DIR, "hint_packs"))
+META_DIR = os.path.join(BASE_DIR, "metadata")
+EXERCISES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "exercises")
+
+PACK_TAG = " (Precomputed)"
+
+# Error classes, with the problem description used when building the pack
+ERROR_CLASSES = {
+    "compile_error": "The program does not compile.",
+    "output_format": "The program prints input prompts or extra text around the answer.",
+    "off_by_one": "The output is off by one (a loop runs one time too many or too few, or a boundary is wrong).",
+    "wrong_output": "The program runs but prints the wrong result for the test input.",
+    "eof_input": "The program tries to read more input than is provided, or reads it in the wrong order.",
+    "runtime_error": "The program crashes while running.",
+    "timeout": "The program never finishes (infinite loop or waiting for input).",
+}
+
+_EXPECTED_GOT_RE = re.compile(
+    r"expected[:\s]+'?(-?\d+(?:\.\d+)?)'?[,;\s]+(?:but\s+)?(?:got|actual|output)[:\s]+'?(-?\d+(?:\.\d+)?)",
+    re.IGNORECASE,
+)
+# Whole words only: "sizeof" is not EOF and "prompt_len" is not a prompt
+_EOF_RE = re.compile(r"\beof\b|eoferror|nosuchelementexception|expects input|no input available")
+_PROMPT_RE = re.compile(r"\bprompts?\b")
+_RUNTIME_RE = re.compile(r"runtime|traceback|exception|segmentation")
+
+
+def corpus_version(subject: str, meta_dir: str = META_DIR) -> str:
+    """
+    Content hash of a subject's lab-manual chunks.
+
+    Unlike index_version (file mtimes) this survives a fresh checkout, so a
+    pack built on one machine stays valid on another with the same notes.
+    """
+    digest = hashlib.sha1()
+    for suffix in (".chunks", ".chunks.json"):
+        try:
+            with open(os.path.join(meta_dir, subject + suffix), "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b"-")
+    return digest.hexdigest()[:12]
+
+
+# Exercise fields a hint can depend on (not e.g. the reference solution or profile spec)
+HASHED_FIELDS = ("title", "description", "testcases")
+
+
+def exercise_hash(exercise: Dict[str, Any]) -> str:
+    """Changes when an exercise's statement or testcases change."""
+    fields = {name: exercise.get(name) for name in HASHED_FIELDS}
+    text = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def classify_error(error_message: str, failed_tests: str = "") -> Optional[str]:
+    """
+    Map an error to one of ERROR_CLASSES.
+
+    Specific classes are matched against the error and the failed tests
+    together; wrong_output is the catch-all for failed tests nothing else
+    explains.
+
+    Returns:
+        Error class name, or None when the error fits no class
+    """
+    error = (error_message or "").lower()
+    tests = (failed_tests or "").lower()
+    text = f"{error}\n{tests}"
+
+    if "timed out" in text:
+        return "timeout"
+    if "syntaxerror" in text or "indentationerror" in text or "compile" in text:
+        if "traceback" not in text or "syntaxerror" in text or "indentationerror" in text:
+            return "compile_error"
+    if _EOF_RE.search(text):
+        return "eof_input"
+    # A crash that mentions a prompt (NameError: name 'prompt' ...) is still a crash
+    if "output_format_error" in text or (_PROMPT_RE.search(text) and not _RUNTIME_RE.search(text)):
+        return "output_format"
+    if _RUNTIME_RE.search(text):
+        return "runtime_error"
+
+    pairs = _EXPECTED_GOT_RE.findall(tests) or _EXPECTED_GOT_RE.findall(error)
+    if pairs and all(abs(float(expected) - float(got)) == 1 for expected, got in pairs):
+        return "off_by_one"
+    if pairs or "mismatch" in error or "wrong" in error or "expected" in error or tests.strip():
+        return "wrong_output"
+    return None
+
+
+def pack_path(pack_dir: str, language: str) -> str:
+    return os.path.join(pack_dir, f"{language}.json")
+
+
+class HintPacks:
+    """Precomputed hints indexed by (subject, exercise, error class)."""
+
+    def __init__(self, pack_dir: str = HINT_PACK_DIR, exercises_dir: str = EXERCISES_DIR,
+                 version_fn: Optional[Callable[[str], str]] = corpus_version):
+        """
+        Initialize HintPacks.
+
+        Args:
+            pack_dir: Directory of {language}.json packs
+            exercises_dir: Directory of exercise definitions (to detect stale hints)
+            version_fn: Subject -> current index version; hints built on an older index are skipped
+        """
+        self.pack_dir = pack_dir
+        self.exercises_dir = exercises_dir
+        self.version_fn = version_fn
+        self._hints: Dict[tuple, Dict[str, Any]] = {}
+        self.packs: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def _current_hashes(self, language: str) -> Dict[str, str]:
+        path = os.path.join(self.exercises_dir, f"{language}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return {ex["id"]: exercise_hash(ex) for ex in json.load(f)}
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def load(self):
+        """(Re)load every pack, keeping only hints that are still valid."""
+        hints, packs = {}, {}
+        if os.path.isdir(self.pack_dir):
+            for filename in sorted(os.listdir(self.pack_dir)):
+                if not filename.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(self.pack_dir, filename), "r", encoding="utf-8") as f:
+                        pack = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Warning: could not read hint pack {filename}: {e}")
+                    continue
+                if pack.get("format") != PACK_FORMAT:
+                    print(f"Warning: skipping hint pack {filename} (format {pack.get('format')})")
+                    continue
+
+                subject = pack["subject"]
+                if self.version_fn and pack.get("index_version") != self.version_fn(subject):
+                    print(f"Warning: hint pack {filename} was built on an older {subject} index; rebuild it")
+                    continue
+
+                current = self._current_hashes(pack["language"])
+                loaded = 0
+                for exercise_id, entry in pack.get("hints", {}).items():
+                    if current.get(exercise_id) != entry.get("exercise_hash"):
+                        continue
+                    for error_class, hint_data in entry.items():
+                        if error_class != "exercise_hash":
+                            hints[(subject, exercise_id, error_class)] = hint_data
+                            loaded += 1
+                packs[pack["language"]] = {"subject": subject, "built_at": pack.get("built_at"), "hints": loaded}
+        self._hints, self.packs = hints, packs
+
+    def __len__(self) -> int:
+        return len(self._hints)
+
+    def lookup(self, subject: str, exercise_id: str, error_message: str,
+               failed_tests: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Precomputed hint for this exercise and error, if any.
+
+        Returns:
+            Hint dict with its source tagged as precomputed, or None
+        """
+        if not self._hints or not exercise_id:
+            return None
+        error_class = classify_error(error_message, failed_tests)
+        hit = self._hints.get((subject, exercise_id, error_class)) if error_class else None
+        if hit is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        result = dict(hit)
+        result["source"] = result.get("source", "LLM") + PACK_TAG
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hint pack statistics."""
+        return {"hints": len(self._hints), "packs": dict(self.packs), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,126 @@
+"""
+Parallel Hint Pipeline
+Runs the hint tiers concurrently under one latency budget.
+
+The sequential get_hint waits for each stage in turn, so its worst case is
+the sum of every stage's worst case. Here:
+- rules and precomputed hint packs answer immediately when they match
+- the hint cache lookup and lab-manual retrieval start together
+- LLM generation starts as soon as retrieval has produced its context
+- at the deadline the best answer available is returned: the LLM hint, or
+  else a lab-manual summary, or else a basic hint
+
+Enabled with HINT_PIPELINE=parallel. Every hint carries per-stage timings
+(milliseconds) under "timings".
+"""
+
+import os
+import time
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from . import rag_llm_chat as chat
+from .llm_scheduler import LLMShed
+
+# Configuration
+HINT_LATENCY_BUDGET = float(os.environ.get("HINT_LATENCY_BUDGET", "10"))
+
+
+class StageTimer:
+    """Wall-clock duration of each pipeline stage, in milliseconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    async def timed(self, name: str, awaitable):
+        with self.stage(name):
+            return await awaitable
+
+    def result(self, hint_data: Dict[str, Any]) -> Dict[str, Any]:
+        """hint_data with the timings (and total) attached."""
+        timings = dict(self.timings)
+        timings["total"] = round((time.perf_counter() - self.started) * 1000, 2)
+        return {**hint_data, "timings": timings}
+
+
+async def parallel_hint(subject: str, error_message: str, failed_tests: str, exercise_id: str = "",
+                        budget: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Generate a hint with concurrent tiers, returning by the budget.
+
+    Args:
+        subject: Subject name (e.g., 'c_lab_manual')
+        error_message: Error description
+        failed_tests: Description of failed test cases
+        exercise_id: Exercise the error came from (scopes the hint cache)
+        budget: Seconds until the best available answer is returned (default HINT_LATENCY_BUDGET)
+
+    Returns:
+        dict with hint, source, rag_used and timings
+    """
+    timer = StageTimer()
+    deadline = time.monotonic() + (budget or HINT_LATENCY_BUDGET)
+
+    with timer.stage("rules"):
+        instant = chat.instant_hint(subject, error_message, failed_tests, exercise_id)
+    if instant:
+        return timer.result(instant)
+
+    query = chat.build_query(error_message, failed_tests)
+    retrieval = asyncio.ensure_future(timer.timed("retrieval", chat.retrieve_notes_async(subject, query, k=5)))
+
+    cached = None
+    if chat._hint_cache:
+        try:
+            cached = await asyncio.wait_for(
+                timer.timed("cache", chat._hint_cache.lookup_async(subject, exercise_id, error_message, failed_tests)),
+                max(0.0, deadline - time.monotonic()),
+            )
+        except asyncio.TimeoutError:
+            cached = None
+    if cached:
+        retrieval.cancel()
+        return timer.result(cached)
+
+    try:
+        chunks = await asyncio.wait_for(asyncio.shield(retrieval), max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        retrieval.cancel()
+        return timer.result(chat.degraded_hint([], error_message, failed_tests))
+
+    relevant = chat.has_relevant_notes(chunks)
+    with timer.stage("llm"):
+        hint_data, _ = await chat.hint_flights.do(
+            ("parallel",) + chat.flight_key(subject, error_message, failed_tests),
+            lambda: _generate(subject, error_message, failed_tests, chunks if relevant else [], deadline),
+        )
+
+    hint_data = dict(hint_data)
+    if chat._hint_cache and chat._cacheable(hint_data):
+        await chat._hint_cache.store_async(subject, exercise_id, error_message, failed_tests, hint_data)
+    return timer.result(hint_data)
+
+
+async def _generate(subject: str, error_message: str, failed_tests: str, chunks, deadline: float) -> Dict[str, Any]:
+    """LLM hint grounded in chunks (or plain), degraded if it misses the deadline."""
+    if chunks:
+        fn = lambda: chat.format_hint_from_notes(chunks, error_message, failed_tests)
+        hint_data = {"source": "RAG (Lab Manual)", "rag_used": True}
+    else:
+        fn = lambda: chat.llm_hint_fallback(subject, error_message, failed_tests)
+        hint_data = {"source": "LLM (Ollama)", "rag_used": False}
+    try:
+        hint_data["hint"] = await chat.llm_scheduler.run(fn, deadline)
+    except LLMShed:
+        return chat.degraded_hint(chunks, error_message, failed_tests)
+    return hint_data
@@ -0,0 +1,147 @@
+"""
+FAISS Index Factory
+Builds and loads the per-subject vector indexes.
+
+Supported index types:
+- flat:   exact IndexFlatL2 (the original baseline)
+- sq8 / fp16: scalar-quantized flat index (4x / 2x smaller, still exhaustive)
+- hnsw:   graph index, sub-linear search with near-exact recall
+- ivfpq:  inverted lists + product quantization, for very large corpora
+- auto:   pick one of the above from the corpus size
+"""
+
+import os
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+# Configuration
+INDEX_TYPE = os.environ.get("RAG_INDEX_TYPE", "flat")
+HNSW_M = int(os.environ.get("RAG_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("RAG_HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.environ.get("RAG_HNSW_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.environ.get("RAG_IVF_NPROBE", "16"))
+USE_MMAP = os.environ.get("RAG_INDEX_MMAP", "1") != "0"
+
+# Corpus-size thresholds for INDEX_TYPE=auto
+AUTO_HNSW_MIN = 10_000
+AUTO_IVFPQ_MIN = 200_000
+
+INDEX_TYPES = ("flat", "fp16", "sq8", "hnsw", "ivfpq", "auto")
+
+
+def choose_index_type(n_vectors: int) -> str:
+    """Choose an index type from corpus size (used when INDEX_TYPE is 'auto')."""
+    if n_vectors >= AUTO_IVFPQ_MIN:
+        return "ivfpq"
+    if n_vectors >= AUTO_HNSW_MIN:
+        return "hnsw"
+    return "flat"
+
+
+def _pq_subquantizers(dim: int) -> int:
+    """Largest sub-quantizer count <= dim/8 that divides dim (8 dims per code byte)."""
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def make_index(embeddings: np.ndarray, index_type: Optional[str] = None):
+    """
+    Build and fill a FAISS index.
+
+    Args:
+        embeddings: float32 array of shape (n, dim)
+        index_type: One of INDEX_TYPES (defaults to RAG_INDEX_TYPE)
+
+    Returns:
+        A trained FAISS index containing all embeddings
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    n, dim = embeddings.shape
+    index_type = (index_type or INDEX_TYPE).lower()
+
+    if index_type == "auto":
+        index_type = choose_index_type(n)
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "fp16":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16)
+    elif index_type == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type == "ivfpq":
+        # Keep ~39 training points per centroid, as FAISS recommends
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+        nbits = 8 if n >= 39 * 256 else max(4, int(math.log2(max(n // 39, 16))))
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), nbits)
+    else:
+        raise ValueError(f"Unknown index type: {index_type} (expected one of {', '.join(INDEX_TYPES)})")
+
+    if not index.is_trained:
+        index.train(embeddings)
+    index.add(embeddings)
+    configure_search(index)
+    return index
+
+
+def index_type_of(index) -> str:
+    """The INDEX_TYPES name an index was built as (to rebuild it the same way)."""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    if isinstance(index, faiss.IndexFlat):
+        return "flat"
+    raise ValueError(f"Unsupported index class: {type(index).__name__}")
+
+
+def configure_search(index):
+    """Apply query-time parameters (efSearch / nprobe) to a loaded index."""
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    ivf = faiss.try_extract_index_ivf(index) if hasattr(faiss, "try_extract_index_ivf") else None
+    if ivf is not None:
+        ivf.nprobe = min(IVF_NPROBE, ivf.nlist)
+    return index
+
+
+def read_index(path: str, mmap: Optional[bool] = None):
+    """
+    Load an index from disk, memory-mapped when supported.
+
+    Memory-mapped, read-only indexes are backed by the page cache, so several
+    worker processes serving the same subject share one copy of the vectors.
+    """
+    if USE_MMAP if mmap is None else mmap:
+        # IO_FLAG_MMAP_IFC (newer FAISS) also maps flat/SQ codes, not just IVF lists
+        flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        try:
+            return configure_search(faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY))
+        except Exception as e:
+            print(f"Warning: mmap load failed for {path}, reading into memory: {e}")
+    return configure_search(faiss.read_index(path))
+
+
+def write_index(index, path: str):
+    """
+    Save an index atomically: running servers map the old file, so it is
+    replaced rather than truncated under them.
+    """
+    tmp_path = path + ".tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def index_nbytes(index) -> int:
+    """Serialized size of an index in bytes."""
+    return int(faiss.serialize_index(index).nbytes)
@@ -0,0 +1,246 @@
+"""
+Lexical (BM25) Index
+Inverted keyword index built alongside each FAISS index.
+
+Hint queries are mostly compiler/runtime error text ("expected ';'",
+"segmentation fault", "EOFError"). Retrieval merges BM25 hits with the
+dense FAISS hits (reciprocal rank fusion), and uses BM25 alone when no
+embedder is available. Skipping dense search on a decisive BM25 result is an
+opt-in fast path (RAG_LEXICAL_FAST_PATH=1).
+
+Stored as {subject}.bm25.npz in the metadata directory (compressed plain
+arrays, no pickle): the vocabulary, CSR postings (term offsets, doc ids, term
+frequencies) and document lengths.
+"""
+
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configuration
+BM25_K1 = 1.2
+BM25_B = 0.75
+# A lexical result is decisive when the top chunk scores at least the minimum,
+# covers this share of the query's (IDF-weighted) vocabulary and beats the
+# runner-up by this margin (1.0 = no margin required).
+# Answering from decisive BM25 hits alone (skipping dense retrieval) is off by
+# default: on bench/error_corpus.json 25 of 105 errors pass these thresholds,
+# but only 8 of their top chunks are on-topic, and no threshold tried
+# separated relevant from irrelevant matches much better.
+LEXICAL_FAST_PATH = os.environ.get("RAG_LEXICAL_FAST_PATH", "0") != "0"
+DECISIVE_COVERAGE = float(os.environ.get("RAG_LEXICAL_COVERAGE", "0.5"))
+DECISIVE_MARGIN = float(os.environ.get("RAG_LEXICAL_MARGIN", "1.2"))
+DECISIVE_MIN_SCORE = float(os.environ.get("RAG_LEXICAL_MIN_SCORE", "3.0"))
+
+FORMAT_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+|[;{}()\[\]]")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# Words that carry no signal in error text or in the query template
+_STOPWORDS = frozenset(
+    "a an the of to in on at for and or is are was be by it this that with as "
+    "from not no error failed tests test".split()
+)
+# Words the compiler/runner wrap around every error ("Compilation Error:
+# main.c: In function 'main'", "Traceback (most recent call last)"). Dropped
+# from queries only: a match on them says nothing about the topic.
+_QUERY_STOPWORDS = frozenset(
+    "compile_error compilation runtime_error runtime exit exited code sandbox "
+    "main traceback most recent call last file line module py java cpp c program".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split error/manual text into index terms.
+
+    Identifiers are lowercased and camel-case parts are added as extra terms,
+    so "EOFError" matches both "eoferror" and "eof". Statement punctuation
+    (";", braces, brackets) is kept because errors like "expected ';'" hinge on it.
+    """
+    tokens = []
+    for tok in _TOKEN_RE.findall(text):
+        lower = tok.lower()
+        if lower in _STOPWORDS:
+            continue
+        tokens.append(lower)
+        if tok[0].isalpha() and not tok.islower():
+            parts = [p.lower() for p in _CAMEL_RE.findall(tok)]
+            if len(parts) > 1:
+                tokens.extend(p for p in parts if p not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a subject's chunks, stored as CSR postings."""
+
+    def __init__(self, terms: Sequence[str], term_offsets: np.ndarray, doc_ids: np.ndarray,
+                 tfs: np.ndarray, doc_lens: np.ndarray):
+        self.vocab: Dict[str, int] = {t: i for i, t in enumerate(terms)}
+        self.term_offsets = term_offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs.astype(np.float32)
+        self.doc_lens = doc_lens.astype(np.float32)
+        self.n_docs = len(doc_lens)
+        self.avgdl = float(self.doc_lens.mean()) if self.n_docs else 0.0
+
+        df = np.diff(term_offsets).astype(np.float32)
+        self.idf = np.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        # Precompute the length-normalisation term of the BM25 denominator
+        if self.n_docs:
+            self._norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lens / max(self.avgdl, 1e-9))
+        else:
+            self._norm = self.doc_lens
+
+    @classmethod
+    def build(cls, chunks: Sequence[str]) -> "BM25Index":
+        """Build an index from chunk texts (doc id = chunk position)."""
+        postings: Dict[str, Dict[int, int]] = {}
+        doc_lens = np.zeros(len(chunks), dtype=np.int32)
+        for doc_id, text in enumerate(chunks):
+            tokens = tokenize(str(text))
+            doc_lens[doc_id] = len(tokens)
+            for tok in tokens:
+                docs = postings.setdefault(tok, {})
+                docs[doc_id] = docs.get(doc_id, 0) + 1
+
+        terms = sorted(postings)
+        term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids, tfs = [], []
+        for i, term in enumerate(terms):
+            docs = postings[term]
+            doc_ids.extend(docs.keys())
+            tfs.extend(docs.values())
+            term_offsets[i + 1] = len(doc_ids)
+
+        return cls(terms, term_offsets, np.array(doc_ids, dtype=np.int32),
+                   np.minimum(np.array(tfs, dtype=np.int64), 65535).astype(np.uint16), doc_lens)
+
+    def save(self, path: str):
+        """Save to an .npz file (atomically: running servers may be reading the old one)."""
+        terms = sorted(self.vocab, key=self.vocab.get)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                version=np.array(FORMAT_VERSION),
+                terms=np.array(terms, dtype=str),
+                term_offsets=self.term_offsets,
+                doc_ids=self.doc_ids,
+                tfs=self.tfs.astype(np.uint16),
+                doc_lens=self.doc_lens.astype(np.int32),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load from an .npz file written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported BM25 index version: {int(data['version'])}")
+            return cls(data["terms"].tolist(), data["term_offsets"], data["doc_ids"],
+                       data["tfs"], data["doc_lens"])
+
+    def _query_terms(self, query: str) -> List[int]:
+        seen = []
+        for tok in tokenize(query):
+            if tok in _QUERY_STOPWORDS:
+                continue
+            term_id = self.vocab.get(tok)
+            if term_id is not None and term_id not in seen:
+                seen.append(term_id)
+        return seen
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Score every chunk sharing a term with the query.
+
+        Returns:
+            Up to k (doc_id, score) pairs, best first
+        """
+        term_ids = self._query_terms(query)
+        if not term_ids or not self.n_docs:
+            return []
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.tfs[start:end]
+            scores[docs] += self.idf[term_id] * tf * (BM25_K1 + 1) / (tf + self._norm[docs])
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(d), float(scores[d])) for d in top]
+
+    def coverage(self, query: str, doc_id: int) -> float:
+        """IDF-weighted share of the query's known terms that appear in a chunk."""
+        term_ids = self._query_terms(query)
+        total = float(sum(self.idf[t] for t in term_ids))
+        if total <= 0:
+            return 0.0
+        matched = 0.0
+        for term_id in term_ids:
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            if doc_id in self.doc_ids[start:end]:
+                matched += float(self.idf[term_id])
+        return matched / total
+
+    def is_decisive(self, query: str, hits: List[Tuple[int, float]]) -> bool:
+        """Whether lexical hits are strong enough to skip dense retrieval."""
+        if not hits or hits[0][1] < DECISIVE_MIN_SCORE:
+            return False
+        if len(hits) > 1 and hits[0][1] < DECISIVE_MARGIN * hits[1][1]:
+            return False
+        return self.coverage(query, hits[0][0]) >= DECISIVE_COVERAGE
+
+
+def index_path(meta_dir: str, subject: str) -> str:
+    """Path of a subject's BM25 index."""
+    return os.path.join(meta_dir, f"{subject}.bm25.npz")
+
+
+def load(meta_dir: str, subject: str) -> Optional[BM25Index]:
+    """Load a subject's BM25 index, or None if it has not been built."""
+    path = index_path(meta_dir, subject)
+    return BM25Index.load(path) if os.path.exists(path) else None
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int, c: int = 60) -> List[int]:
+    """Merge ranked id lists: score(id) = sum of 1 / (c + rank)."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (c + rank + 1)
+    return sorted(scores, key=lambda d: -scores[d])[:k]
+
+
+def main():
+    """Build BM25 indexes from existing chunk stores: python -m rag.lexical_index"""
+    from . import chunk_store
+    from .chunk_store import ChunkStore
+
+    meta_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "metadata"
+    )
+    for name in sorted(os.listdir(meta_dir)):
+        if not name.endswith(".chunks.json"):
+            continue
+        subject = name[:-len(".chunks.json")]
+        if not chunk_store.exists(meta_dir, subject):
+            continue
+        store = ChunkStore(meta_dir, subject)
+        bm25 = BM25Index.build([store[i] for i in range(len(store))])
+        bm25.save(index_path(meta_dir, subject))
+        store.close()
+        print(f"✅ BM25 {subject} | Chunks: {bm25.n_docs} | Terms: {len(bm25.vocab)}")
+
+
+if __name__ == "__main__":
+    main()
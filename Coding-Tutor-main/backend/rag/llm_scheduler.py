@@ -0,0 +1,155 @@
+"""
+LLM Scheduler
+Admission control for Ollama generations on CPU-only lab servers.
+
+- At most LLM_MAX_CONCURRENCY generations run at once; the rest wait in a
+  FIFO queue of at most LLM_MAX_QUEUE requests.
+- Every request carries a deadline. The expected wait is estimated from
+  the queue length and a moving average of recent generation times; when it
+  cannot finish in time, the request is shed immediately (LLMShed) so the
+  caller can answer from a faster tier instead of timing out.
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict
+
+# Configuration
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "2"))
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", "16"))
+HINT_DEADLINE = float(os.environ.get("HINT_DEADLINE", "25"))
+# Generation time assumed before any has been measured (seconds)
+LLM_INITIAL_ESTIMATE = 6.0
+# Weight of the newest sample in the moving average
+EWMA_ALPHA = 0.3
+
+
+class LLMShed(Exception):
+    """The request cannot be served by the LLM before its deadline."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"LLM request shed ({reason})")
+        self.reason = reason
+
+
+class LLMScheduler:
+    """Bounded, deadline-aware queue in front of the LLM."""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE,
+                 initial_estimate: float = LLM_INITIAL_ESTIMATE):
+        """
+        Initialize LLMScheduler.
+
+        Args:
+            max_concurrency: Generations allowed to run at once
+            max_queue: Requests allowed to wait for a slot
+            initial_estimate: Seconds per generation until one has been measured
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.avg_duration = initial_estimate
+        self.running = 0
+        self._waiters = deque()
+
+        self.completed = 0
+        self.shed = {"queue_full": 0, "deadline": 0, "timeout": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def estimate_wait(self) -> float:
+        """Expected seconds until a new request would get a slot."""
+        if self.running < self.max_concurrency and not self._waiters:
+            return 0.0
+        return (len(self._waiters) + 1) / self.max_concurrency * self.avg_duration
+
+    def _release(self):
+        """Hand the slot to the next live waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    def _record(self, duration: float):
+        self.avg_duration += EWMA_ALPHA * (duration - self.avg_duration)
+        self.completed += 1
+
+    @asynccontextmanager
+    async def slot(self, deadline: float):
+        """
+        Hold one generation slot.
+
+        Args:
+            deadline: time.monotonic() by which the answer is needed
+
+        Yields:
+            Seconds left before the deadline once the slot is granted
+
+        Raises:
+            LLMShed: Queue full, or the slot would come too late to finish in time
+        """
+        if self.queue_depth >= self.max_queue:
+            self.shed["queue_full"] += 1
+            raise LLMShed("queue_full")
+        if time.monotonic() + self.estimate_wait() + self.avg_duration > deadline:
+            self.shed["deadline"] += 1
+            raise LLMShed("deadline")
+
+        if self.running < self.max_concurrency and not self._waiters:
+            self.running += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            granted = False
+            try:
+                # Give up on the queue once there is no longer time to generate
+                await asyncio.wait_for(waiter, max(0.0, deadline - time.monotonic() - self.avg_duration))
+                granted = True
+            except asyncio.TimeoutError:
+                self.shed["deadline"] += 1
+                raise LLMShed("deadline")
+            finally:
+                if not granted:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                    elif waiter.done() and not waiter.cancelled():
+                        # Slot was handed over as we gave up: pass it on
+                        self._release()
+
+        started = time.monotonic()
+        try:
+            yield max(0.0, deadline - started)
+        finally:
+            self._record(time.monotonic() - started)
+            self._release()
+
+    async def run(self, fn: Callable[[], Awaitable[Any]], deadline: float) -> Any:
+        """
+        Run fn() in a slot, cut off at the deadline.
+
+        Raises:
+            LLMShed: Not admitted, or fn() did not finish before the deadline
+        """
+        async with self.slot(deadline) as remaining:
+            try:
+                return await asyncio.wait_for(fn(), remaining)
+            except asyncio.TimeoutError:
+                self.shed["timeout"] += 1
+                raise LLMShed("timeout")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics."""
+        return {
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "avg_duration": round(self.avg_duration, 3),
+            "estimated_wait": round(self.estimate_wait(), 3),
+            "completed": self.completed,
+            "shed": dict(self.shed),
+        }
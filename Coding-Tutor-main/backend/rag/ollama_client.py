@@ -0,0 +1,206 @@
+"""
+Ollama HTTP Client
+Async client for the local Ollama HTTP API.
+
+Replaces spawning `ollama --version` plus `ollama run` per hint:
+- one pooled keep-alive connection per event loop
+- streamed generation (tokens are yielded as Ollama produces them)
+- keep_alive so the model stays loaded between hints
+- cached availability check
+- structured connect / read / total timeouts
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+import weakref
+from typing import AsyncIterator, Optional
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    httpx = None
+    HAS_HTTPX = False
+
+# Configuration
+OLLAMA_URL = os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434").rstrip("/")
+if not OLLAMA_URL.startswith("http"):
+    OLLAMA_URL = f"http://{OLLAMA_URL}"
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+CONNECT_TIMEOUT = 2.0
+READ_TIMEOUT = 30.0       # longest silence between streamed tokens
+TOTAL_TIMEOUT = 60.0      # whole generation
+AVAILABILITY_TTL = 30.0   # seconds to trust an availability check
+UNAVAILABLE_TTL = 5.0     # retry sooner after a failed check
+
+# Messages returned in place of a hint (see rag_llm_chat.LLM_FAILURE_PREFIXES)
+MSG_UNAVAILABLE = "LLM service (Ollama) is not available."
+MSG_NOT_INSTALLED = "LLM service (Ollama) is not installed. Please install Ollama to use AI hints."
+MSG_TIMEOUT = "LLM response timeout. Please try again."
+MSG_EMPTY = "LLM response timeout or error."
+
+
+class OllamaError(Exception):
+    """Raised by OllamaClient.stream when generation cannot complete."""
+
+
+class OllamaTimeout(OllamaError):
+    """Generation exceeded a read or total timeout."""
+
+
+class OllamaClient:
+    """Async Ollama client with connection reuse and streamed generation."""
+
+    def __init__(self, model: str, base_url: str = OLLAMA_URL, keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 total_timeout: float = TOTAL_TIMEOUT, read_timeout: float = READ_TIMEOUT):
+        """
+        Initialize OllamaClient.
+
+        Args:
+            model: Ollama model name (e.g. 'llama3.1')
+            base_url: Ollama server URL
+            keep_alive: How long Ollama keeps the model loaded after a request
+            total_timeout: Maximum seconds for one whole generation
+            read_timeout: Maximum seconds between two streamed chunks
+        """
+        self.model = model
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.total_timeout = total_timeout
+        self.read_timeout = read_timeout
+        self._client = None
+        self._client_loop = None
+        # Network streams the current client opened, to close them if its loop is gone
+        self._streams = weakref.WeakSet()
+        self._available: Optional[bool] = None
+        self._checked_at = 0.0
+
+    def _http(self):
+        """Pooled client bound to the running event loop (recreated if the loop changes)."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._close_stale()
+            self._streams = weakref.WeakSet()
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.read_timeout, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=8, keepalive_expiry=300),
+                event_hooks={"response": [self._track]},
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def _track(self, response):
+        stream = response.extensions.get("network_stream")
+        if stream is not None:
+            self._streams.add(stream)
+
+    def _close_stale(self):
+        """Close the client of a previous event loop so its pooled sockets are not leaked."""
+        client, loop, streams = self._client, self._client_loop, self._streams
+        self._client = None
+        if client is None:
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        # A closed or idle loop would never run aclose(): shut the connections
+        # down directly (the descriptors go with the dropped transports)
+        for stream in list(streams):
+            sock = stream.get_extra_info("socket")
+            if sock is not None and sock.fileno() != -1:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    async def is_available(self) -> bool:
+        """Whether the Ollama server answers (cached for AVAILABILITY_TTL)."""
+        if not HAS_HTTPX:
+            return False
+        ttl = AVAILABILITY_TTL if self._available else UNAVAILABLE_TTL
+        if self._available is not None and time.monotonic() - self._checked_at < ttl:
+            return self._available
+        try:
+            response = await self._http().get("/api/version", timeout=CONNECT_TIMEOUT)
+            self._available = response.status_code == 200
+        except Exception:
+            self._available = False
+        self._checked_at = time.monotonic()
+        return self._available
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream generated text chunks.
+
+        Raises:
+            OllamaTimeout: If a read or the total timeout expires
+            OllamaError: If the server is unavailable or returns an error
+        """
+        if not await self.is_available():
+            raise OllamaError(MSG_UNAVAILABLE)
+
+        deadline = time.monotonic() + self.total_timeout
+        payload = {"model": self.model, "prompt": prompt, "stream": True, "keep_alive": self.keep_alive}
+        try:
+            # The wait for the response headers is bounded by the deadline too
+            timeout = httpx.Timeout(min(self.read_timeout, self.total_timeout), connect=CONNECT_TIMEOUT)
+            async with self._http().stream("POST", "/api/generate", json=payload,
+                                           timeout=timeout) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode("utf-8", "replace")
+                    raise OllamaError(f"LLM error: HTTP {response.status_code}: {body[:200]}")
+                # Read to the end of the body (past "done") so the
+                # connection goes back to the pool instead of being closed.
+                # Each read waits at most until the deadline, so a stalled
+                # stream cannot run past total_timeout by up to read_timeout.
+                lines = response.aiter_lines()
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise OllamaTimeout(MSG_TIMEOUT)
+                    try:
+                        line = await asyncio.wait_for(lines.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise OllamaTimeout(MSG_TIMEOUT)
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise OllamaError(f"LLM error: {data['error']}")
+                    if data.get("response"):
+                        yield data["response"]
+        except httpx.TimeoutException:
+            raise OllamaTimeout(MSG_TIMEOUT)
+        except httpx.HTTPError as e:
+            # Connection dropped: re-check availability next time
+            self._available = None
+            raise OllamaError(f"LLM error: {e}")
+
+    async def generate(self, prompt: str) -> str:
+        """Generate a complete response. Failures come back as user-facing messages."""
+        if not HAS_HTTPX:
+            return MSG_NOT_INSTALLED
+        parts = []
+        try:
+            async for part in self.stream(prompt):
+                parts.append(part)
+        except OllamaError as e:
+            return str(e)
+        except Exception as e:
+            return f"LLM error: {str(e)}"
+        output = "".join(parts).strip()
+        return output if output else MSG_EMPTY
+
+    async def aclose(self):
+        """Close pooled connections."""
+        if self._client is not None and self._client_loop is not asyncio.get_running_loop():
+            self._close_stale()
+        elif self._client is not None:
+            await self._client.aclose()
+            self._client = None
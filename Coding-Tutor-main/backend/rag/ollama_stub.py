@@ -0,0 +1,173 @@
+"""
+Ollama Stand-in Server
+Minimal local imitation of the Ollama HTTP API for tests and benchmarks.
+
+Implements GET /api/version, GET /api/tags and POST /api/generate (streamed
+NDJSON or a single JSON object) over HTTP/1.1 keep-alive. Responses are
+deterministic for a given prompt, and per-token latency is configurable so
+benchmarks can model a slow CPU-only model.
+
+Usage (from backend/):
+    python -m rag.ollama_stub --port 11435 --token-delay 0.05
+    OLLAMA_HOST=http://127.0.0.1:11435 python main.py
+"""
+
+import json
+import asyncio
+import hashlib
+import argparse
+from typing import Optional
+
+DEFAULT_RESPONSE = (
+    "Check the line mentioned in the error and compare it with the syntax "
+    "shown in your lab manual. Trace the values step by step before changing the logic."
+)
+
+
+class OllamaStub:
+    """Asyncio HTTP server speaking the subset of the Ollama API the backend uses."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, token_delay: float = 0.0,
+                 first_token_delay: float = 0.0, response: Optional[str] = None):
+        """
+        Initialize OllamaStub.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 = pick a free port)
+            token_delay: Seconds between streamed tokens
+            first_token_delay: Extra seconds before the first token (prompt processing)
+            response: Fixed response text (default: deterministic text per prompt)
+        """
+        self.host = host
+        self.port = port
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.response = response
+        self.server = None
+
+        # Counters for tests
+        self.connections = 0
+        self.requests = 0
+        self.generations = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def reply_for(self, prompt: str) -> str:
+        """Deterministic reply text for a prompt."""
+        if self.response is not None:
+            return self.response
+        tag = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:6]
+        return f"{DEFAULT_RESPONSE} [stub {tag}]"
+
+    async def start(self):
+        """Start listening (updates self.port when it was 0)."""
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = b""
+                if int(headers.get("content-length", "0")):
+                    body = await reader.readexactly(int(headers["content-length"]))
+                self.requests += 1
+
+                if method == "GET" and path == "/api/version":
+                    await self._send_json(writer, {"version": "0.0.0-stub"})
+                elif method == "GET" and path == "/api/tags":
+                    await self._send_json(writer, {"models": [{"name": "stub"}]})
+                elif method == "POST" and path == "/api/generate":
+                    await self._generate(writer, json.loads(body or b"{}"))
+                else:
+                    await self._send_json(writer, {"error": "not found"}, status="404 Not Found")
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send_json(self, writer, data, status: str = "200 OK"):
+        body = json.dumps(data).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def _generate(self, writer, payload: dict):
+        self.generations += 1
+        model = payload.get("model", "stub")
+        words = self.reply_for(payload.get("prompt", "")).split(" ")
+
+        if not payload.get("stream", True):
+            await asyncio.sleep(self.first_token_delay + self.token_delay * len(words))
+            await self._send_json(writer, {"model": model, "response": " ".join(words), "done": True})
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        await asyncio.sleep(self.first_token_delay)
+        for i, word in enumerate(words):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            token = word if i == 0 else f" {word}"
+            await self._write_chunk(writer, {"model": model, "response": token, "done": False})
+        await self._write_chunk(writer, {"model": model, "response": "", "done": True})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _write_chunk(self, writer, data: dict):
+        line = (json.dumps(data) + "\n").encode("utf-8")
+        writer.write(f"{len(line):x}\r\n".encode("latin-1") + line + b"\r\n")
+        await writer.drain()
+
+
+async def _serve(args):
+    stub = await OllamaStub(args.host, args.port, args.token_delay, args.first_token_delay,
+                            args.response).start()
+    print(f"Ollama stub listening on {stub.url}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Ollama HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between tokens")
+    parser.add_argument("--first-token-delay", type=float, default=0.0)
+    parser.add_argument("--response", default=None, help="Fixed response text")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
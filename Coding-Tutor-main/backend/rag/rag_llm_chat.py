@@ -4,66 +4,234 @@ RAG-first, LLM-fallback strategy for generating conceptual hints.
 """
 
 import os
-import subprocess
-from typing import List, Dict, Any, Optional
+import re
+import time
+import asyncio
+from typing import List, Dict, Any, Optional, AsyncIterator
+
+from .embedding_service import EmbeddingBatcher
+from .ollama_client import OllamaClient, OllamaError, MSG_EMPTY, MSG_NOT_INSTALLED, HAS_HTTPX
+from .error_signature import error_signature, normalize_error
+from .singleflight import SingleFlight
+from .llm_scheduler import LLMScheduler, LLMShed, HINT_DEADLINE
+from .rule_engine import engine as rule_engine, language_for_subject
+from .hint_packs import HintPacks
+from .retrieval_cache import RetrievalCache, CACHE_PATH
+from .retrieval_daemon import RetrievalClient, RetrievalDaemonError, DaemonHintCache, DAEMON_SOCKET
+from stats import tracing
+
+# Keyword (BM25) retrieval only needs numpy
+try:
+    import numpy as np
+    from .chunk_store import ChunkStore
+    from . import chunk_store
+    from . import lexical_index
+    HAS_LEXICAL = True
+except ImportError as e:
+    print(f"Warning: lab-manual retrieval not available: {e}")
+    print("Hint generation will use rule-based hints only.")
+    HAS_LEXICAL = False
+    np = None
+    ChunkStore = None
+    chunk_store = None
+    lexical_index = None
 
-# Try to import optional RAG dependencies
+# Try to import optional RAG dependencies (embedding model and FAISS)
 try:
     import faiss
-    import numpy as np
-    from sentence_transformers import SentenceTransformer
-    HAS_RAG_DEPS = True
+    from .embedders import load_embedder, backend_available, EMBED_BACKEND
+    if not (backend_available(EMBED_BACKEND) or backend_available("sentence-transformers")):
+        raise ImportError(f"No module for EMBED_BACKEND '{EMBED_BACKEND}' (sentence-transformers, "
+                          "or onnxruntime + tokenizers)")
+    from .index_factory import read_index
+    HAS_RAG_DEPS = HAS_LEXICAL
 except ImportError as e:
     print(f"Warning: RAG dependencies not available: {e}")
-    print("Hint generation will use rule-based hints only.")
+    if HAS_LEXICAL:
+        print("Lab-manual retrieval will use BM25 keyword search only.")
     HAS_RAG_DEPS = False
     faiss = None
-    np = None
-    SentenceTransformer = None
+    load_embedder = None
+    read_index = None
+
+try:
+    from .hint_cache import HintCache
+except ImportError:
+    HintCache = None
 
 # Configuration
-EMBED_MODEL = "all-MiniLM-L6-v2"
 OLLAMA_MODEL = "llama3.1"
+# "sequential" (each tier waits for the previous) or "parallel" (see hint_pipeline)
+HINT_PIPELINE = os.environ.get("HINT_PIPELINE", "sequential")
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 INDEX_DIR = os.path.join(BASE_DIR, "indexes")
 META_DIR = os.path.join(BASE_DIR, "metadata")
 
+# Shared retrieval daemon (RAG_DAEMON_SOCKET): it owns the embedder, indexes,
+# retrieval cache and hint cache. While it is down this process retrieves
+# with BM25 only; it never loads the model itself
+retrieval_client = RetrievalClient(DAEMON_SOCKET) if DAEMON_SOCKET else None
+
 # Initialize embedder
 embedder = None
-if HAS_RAG_DEPS:
+batcher = None
+_embedder_loaded = False
+
+
+def load_local_embedder() -> bool:
+    """Load the in-process embedder (once). Returns whether one is available."""
+    global embedder, batcher, _embedder_loaded
+    if _embedder_loaded or not HAS_RAG_DEPS:
+        return batcher is not None
+    _embedder_loaded = True
     try:
-        embedder = SentenceTransformer(EMBED_MODEL)
+        embedder = load_embedder(EMBED_BACKEND)
     except Exception as e:
-        print(f"Warning: Could not load embedding model: {e}")
-        embedder = None
+        print(f"Warning: Could not load {EMBED_BACKEND} embedder: {e}")
+        if EMBED_BACKEND != "sentence-transformers" and backend_available("sentence-transformers"):
+            # Same model in fp32: vectors stay compatible with the indexes
+            print("Falling back to the sentence-transformers embedder.")
+            try:
+                embedder = load_embedder("sentence-transformers")
+            except Exception as e:
+                print(f"Warning: Could not load sentence-transformers embedder: {e}")
+                embedder = None
+        else:
+            embedder = None
+    
+    # Batch concurrent query embeddings onto one worker thread
+    batcher = EmbeddingBatcher(embedder) if embedder else None
+    return batcher is not None
+
+
+if retrieval_client is None:
+    load_local_embedder()
+
+
+def _use_daemon() -> bool:
+    return retrieval_client is not None and retrieval_client.available()
+
+
+def encode_query(text: str):
+    """(1, dim) query embedding from the daemon, or the in-process model."""
+    if retrieval_client is not None:
+        if not retrieval_client.available():
+            raise RuntimeError("Retrieval daemon unavailable")
+        return retrieval_client.encode(text)
+    if not load_local_embedder():
+        raise RuntimeError("No embedding model available")
+    return batcher.encode(text)
+
+
+async def encode_query_async(text: str):
+    """Async variant of encode_query."""
+    if retrieval_client is not None:
+        if not retrieval_client.available():
+            raise RuntimeError("Retrieval daemon unavailable")
+        return await retrieval_client.encode_async(text)
+    if not await asyncio.to_thread(load_local_embedder):
+        raise RuntimeError("No embedding model available")
+    return await batcher.encode_async(text)
+
 
 # Cache for loaded indexes
 indexes = {}
 metadata = {}
+lexical = {}
+
+# How often BM25 answered alone (opt-in fast path, or no embedder), how often
+# dense and keyword hits were merged, and how often the daemon could not answer
+retrieval_stats = {"lexical_fast_path": 0, "lexical_only": 0, "hybrid": 0, "daemon_fallback": 0}
+
+# Messages call_llm returns instead of a hint (never cached)
+LLM_FAILURE_PREFIXES = ("LLM service", "LLM response timeout", "LLM error")
+
+
+def index_version(subject: str) -> str:
+    """Version of a subject's on-disk index (changes when it is rebuilt)."""
+    parts = []
+    for path in (os.path.join(INDEX_DIR, f"{subject}.index"),
+                 os.path.join(META_DIR, f"{subject}.chunks.json")):
+        try:
+            parts.append(str(os.stat(path).st_mtime_ns))
+        except OSError:
+            parts.append("-")
+    return ":".join(parts)
+
+
+def indexes_version() -> str:
+    """Version of every subject's index together (for the persisted retrieval cache)."""
+    try:
+        names = sorted(n[:-len(".index")] for n in os.listdir(INDEX_DIR) if n.endswith(".index"))
+    except OSError:
+        names = []
+    return ",".join(f"{name}={index_version(name)}" for name in names)
+
+
+# Cache for RAG retrieval results, keyed by subject + normalized error signature
+_rag_cache = RetrievalCache(path=CACHE_PATH or None, version_fn=indexes_version)
 
-# Cache for RAG retrieval results (per exercise)
-_rag_cache = {}
+
+def make_hint_cache():
+    """The daemon's hint cache when one is configured, else an in-process one."""
+    if HintCache is None:
+        return None
+    # Only exact matches while the daemon is down (no model in this process)
+    can_embed = batcher is not None and retrieval_client is None
+    local = HintCache(
+        encode=encode_query if can_embed else None,
+        encode_async=encode_query_async if can_embed else None,
+        version_fn=index_version,
+    )
+    return DaemonHintCache(retrieval_client, local) if retrieval_client is not None else local
+
+
+# Cache of generated hints, shared by students on the same exercise
+_hint_cache = make_hint_cache()
+
+# Hints precomputed offline per (exercise, error class); see build_hint_packs
+hint_packs = HintPacks()
+
+# Pooled keep-alive client for the local Ollama HTTP API
+llm_client = OllamaClient(OLLAMA_MODEL)
+
+# Identical hint requests in flight share one retrieval + generation
+hint_flights = SingleFlight()
+
+# Bounded LLM queue; requests that cannot finish by their deadline are shed
+llm_scheduler = LLMScheduler()
+
+
+def flight_key(subject: str, error_message: str, failed_tests: str) -> tuple:
+    """Requests with equal keys are answered by the same generation."""
+    return (subject, normalize_error(error_message), failed_tests.strip())
 
 
 def load_subject(subject: str) -> bool:
-    """Load FAISS index and metadata for a subject."""
-    if not HAS_RAG_DEPS:
+    """Load FAISS index (with RAG deps), chunk store and BM25 index for a subject."""
+    if not HAS_LEXICAL:
         return False
     
-    if subject in indexes:
+    if subject in metadata:
         return True
     
     try:
         index_path = os.path.join(INDEX_DIR, f"{subject}.index")
-        meta_path = os.path.join(META_DIR, f"{subject}.npy")
         
-        if not os.path.exists(index_path) or not os.path.exists(meta_path):
+        if not chunk_store.exists(META_DIR, subject):
+            return False
+        if HAS_RAG_DEPS:
+            if not os.path.exists(index_path):
+                return False
+            indexes[subject] = read_index(index_path)
+        elif not os.path.exists(lexical_index.index_path(META_DIR, subject)):
             return False
         
-        indexes[subject] = faiss.read_index(index_path)
-        metadata[subject] = np.load(meta_path, allow_pickle=True)
+        # Both are memory-mapped; chunk text is only decoded for retrieved hits
+        metadata[subject] = ChunkStore(META_DIR, subject)
+        lexical[subject] = lexical_index.load(META_DIR, subject)
         return True
     except Exception as e:
         print(f"Error loading subject {subject}: {e}")
@@ -71,78 +239,136 @@ def load_subject(subject: str) -> bool:
 
 
 def retrieve_notes(subject: str, query: str, k: int = 5) -> List[str]:
-    """Retrieve relevant notes from lab manual using RAG with caching."""
-    if not HAS_RAG_DEPS or not embedder:
-        return []
+    """
+    Retrieve relevant notes from lab manual with caching.
+    Merges BM25 keyword hits with FAISS hits (BM25 alone without an
+    embedder, or on a decisive match with RAG_LEXICAL_FAST_PATH=1). With a
+    retrieval daemon configured, asks it first and falls back to BM25 in-process.
+    """
+    if _use_daemon():
+        try:
+            with tracing.span("retrieval_daemon"):
+                return retrieval_client.retrieve(subject, query, k)
+        except RetrievalDaemonError as e:
+            retrieval_stats["daemon_fallback"] += 1
+            print(f"Warning: retrieval daemon: {e}; retrieving in-process")
     
+    if not HAS_LEXICAL:
+        return []
     if not load_subject(subject):
         return []
     
     # Check cache first
-    cache_key = f"{subject}:{hash(query)}"
-    if cache_key in _rag_cache:
-        return _rag_cache[cache_key]
+    cache_key = _cache_key(subject, query, k)
+    cached = _rag_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
     try:
-        q_vec = embedder.encode([query])
-        D, I = indexes[subject].search(q_vec, k)
-        result = [metadata[subject][i] for i in I[0]]
-        
-        # Cache result (limit cache size to prevent memory issues)
-        if len(_rag_cache) < 100:  # Keep max 100 cached queries
-            _rag_cache[cache_key] = result
+        lexical_hits = _lexical_search(subject, query, k)
+        if _lexical_is_enough(subject, query, lexical_hits):
+            return _cache_chunks(subject, cache_key, [d for d, _ in lexical_hits])
         
-        return result
+        with tracing.span("embed"):
+            q_vec = batcher.encode(query)
+        return _cache_chunks(subject, cache_key, _hybrid_ids(subject, q_vec, lexical_hits, k))
     except Exception as e:
         print(f"Error retrieving notes: {e}")
         return []
 
 
-def call_llm(prompt: str) -> str:
-    """Call offline LLM (Ollama) for hint generation."""
-    try:
-        # Check if ollama is available
-        result = subprocess.run(
-            ["ollama", "--version"],
-            capture_output=True,
-            text=True,
-            timeout=2,
-            encoding='utf-8',
-            errors='replace'
-        )
-        if result.returncode != 0:
-            return "LLM service (Ollama) is not available."
-    except FileNotFoundError:
-        return "LLM service (Ollama) is not installed. Please install Ollama to use AI hints."
-    except Exception:
-        pass
+async def retrieve_notes_async(subject: str, query: str, k: int = 5) -> List[str]:
+    """Async variant of retrieve_notes that never blocks the event loop on encoding."""
+    if _use_daemon():
+        try:
+            with tracing.span("retrieval_daemon"):
+                return await retrieval_client.retrieve_async(subject, query, k)
+        except RetrievalDaemonError as e:
+            retrieval_stats["daemon_fallback"] += 1
+            print(f"Warning: retrieval daemon: {e}; retrieving in-process")
+    
+    if not HAS_LEXICAL:
+        return []
+    if not load_subject(subject):
+        return []
+    
+    cache_key = _cache_key(subject, query, k)
+    cached = _rag_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
     try:
-        process = subprocess.Popen(
-            ["ollama", "run", OLLAMA_MODEL],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding='utf-8',
-            errors='replace'
-        )
-        output, error = process.communicate(prompt, timeout=30)
-        
-        if error:
-            print(f"Ollama error: {error}")
+        lexical_hits = _lexical_search(subject, query, k)
+        if _lexical_is_enough(subject, query, lexical_hits):
+            return _cache_chunks(subject, cache_key, [d for d, _ in lexical_hits])
         
-        return output.strip() if output else "LLM response timeout or error."
-    except subprocess.TimeoutExpired:
-        if 'process' in locals():
-            process.kill()
-        return "LLM response timeout. Please try again."
+        with tracing.span("embed"):
+            q_vec = await batcher.encode_async(query)
+        return _cache_chunks(subject, cache_key, _hybrid_ids(subject, q_vec, lexical_hits, k))
     except Exception as e:
-        return f"LLM error: {str(e)}"
+        print(f"Error retrieving notes: {e}")
+        return []
 
 
-def format_hint_from_notes(chunks: List[str], error_message: str, failed_tests: str) -> str:
-    """Format hint from RAG chunks using LLM."""
+def _cache_key(subject: str, query: str, k: int) -> str:
+    """Cache key that ignores line numbers, identifiers, paths and literals."""
+    return f"{subject}:{k}:{error_signature(query)}"
+
+
+def _lexical_search(subject: str, query: str, k: int):
+    """BM25 hits for a query, or [] if the subject has no lexical index."""
+    bm25 = lexical.get(subject)
+    with tracing.span("lexical_search"):
+        return bm25.search(query, k) if bm25 else []
+
+
+def _lexical_is_enough(subject: str, query: str, lexical_hits) -> bool:
+    """Whether to answer from BM25 alone (no embedder, or a decisive match when enabled)."""
+    if batcher is None:
+        # No model in this process (or the daemon is down): the BM25 ranking,
+        # decisive or not, is all there is. Counted apart from the fast path.
+        retrieval_stats["lexical_only"] += 1
+        return True
+    if not lexical_index.LEXICAL_FAST_PATH or not lexical_hits:
+        return False
+    if lexical[subject].is_decisive(query, lexical_hits):
+        retrieval_stats["lexical_fast_path"] += 1
+        return True
+    return False
+
+
+def _hybrid_ids(subject: str, q_vec, lexical_hits, k: int) -> List[int]:
+    """Dense FAISS search, merged with any lexical hits by reciprocal rank."""
+    retrieval_stats["hybrid"] += 1
+    with tracing.span("vector_search"):
+        D, I = indexes[subject].search(q_vec, k)
+    # FAISS pads with -1 when the index holds fewer than k vectors
+    dense_ids = [int(i) for i in I[0] if i >= 0]
+    if not lexical_hits:
+        return dense_ids
+    return lexical_index.reciprocal_rank_fusion([dense_ids, [d for d, _ in lexical_hits]], k)
+
+
+def _cache_chunks(subject: str, cache_key: str, ids: List[int]) -> List[str]:
+    """Resolve chunk ids to text and cache the result."""
+    result = [metadata[subject][i] for i in ids]
+    _rag_cache.put(cache_key, result)
+    return result
+
+
+async def call_llm(prompt: str) -> str:
+    """Call offline LLM (Ollama) for hint generation."""
+    with tracing.span("ollama"):
+        return await llm_client.generate(prompt)
+
+
+def stream_llm(prompt: str) -> AsyncIterator[str]:
+    """Stream LLM output chunks (raises ollama_client.OllamaError on failure)."""
+    return llm_client.stream(prompt)
+
+
+def notes_prompt(chunks: List[str], error_message: str, failed_tests: str) -> str:
+    """Build the LLM prompt for a hint grounded in lab-manual chunks."""
     notes = "\n\n".join(str(chunk) for chunk in chunks[:3])
     
     prompt = f"""You are a lab assistant helping students learn programming.
@@ -169,11 +395,21 @@ You can explain in Tanglish, Hindi, or English - whatever helps the student unde
 
 Return ONLY the hint, nothing else."""
 
-    return call_llm(prompt)
+    return prompt
 
 
-def llm_hint_fallback(subject: str, error_message: str, failed_tests: str) -> str:
-    """Generate hint using LLM when RAG doesn't have relevant info."""
+def has_relevant_notes(chunks: List[str]) -> bool:
+    """Whether retrieved chunks carry enough text to ground a hint."""
+    return bool(chunks) and any(len(str(chunk)) > 50 for chunk in chunks)
+
+
+async def format_hint_from_notes(chunks: List[str], error_message: str, failed_tests: str) -> str:
+    """Format hint from RAG chunks using LLM."""
+    return await call_llm(notes_prompt(chunks, error_message, failed_tests))
+
+
+def fallback_prompt(subject: str, error_message: str, failed_tests: str) -> str:
+    """Build the LLM prompt used when RAG has nothing relevant."""
     prompt = f"""You are a strict programming lab assistant.
 
 CRITICAL RULES:
@@ -193,90 +429,238 @@ You can explain in Tanglish, Hindi, or English - whatever helps the student unde
 
 Return ONLY the hint, nothing else."""
 
-    return call_llm(prompt)
+    return prompt
 
 
-def generate_rule_based_hint(error_message: str, failed_tests: str) -> Optional[str]:
+async def llm_hint_fallback(subject: str, error_message: str, failed_tests: str) -> str:
+    """Generate hint using LLM when RAG doesn't have relevant info."""
+    return await call_llm(fallback_prompt(subject, error_message, failed_tests))
+
+
+def generate_rule_based_hint(error_message: str, failed_tests: str, language: Optional[str] = None) -> Optional[str]:
     """
-    Generate fast rule-based hints for common errors.
+    Generate fast rule-based hints for common errors (rule packs in rag/rules/).
     Returns hint string if rule matches, None otherwise.
     """
-    error_lower = error_message.lower()
-    tests_lower = failed_tests.lower()
-    
-    # Rule 1: Output format error (prompt text detected)
-    if "output_format_error" in error_lower or "prompt" in error_lower:
-        return "Your program is printing input prompts. In lab practice, print ONLY the final result, not prompts like 'Enter a number:' or 'Input:'. Remove all printf/print statements that ask for input."
-    
-    # Rule 2: Compilation error
-    if "compile" in error_lower or "syntax" in error_lower:
-        if "missing" in error_lower or "expected" in error_lower:
-            return "Syntax error: Missing semicolons, brackets, or parentheses. Error message la exact line number check pannunga. (Check the exact line number in the error message.)"
-        return "Compilation error: Code syntax check pannunga. All statements properly close pannirukka verify pannunga. (Check your code syntax and ensure all statements are properly closed.)"
-    
-    # Rule 3: Runtime error
-    if "runtime" in error_lower or "segmentation" in error_lower or "null pointer" in error_lower:
-        return "Runtime error: Array bounds, null pointer, or division by zero check pannunga. Variables initialize pannirukka verify pannunga. (Check array bounds, null pointer access, or division by zero. Verify all variables are initialized.)"
-    
-    # Rule 4: Output mismatch - numeric
-    if "output mismatch" in error_lower or "expected" in error_lower:
-        if any(char.isdigit() for char in failed_tests):
-            return "Output match aagala. Calculation logic check pannunga. Formula correct-a use pannirukkingala? Decimal places handle pannirukkingala? (Your output doesn't match. Check calculation logic and formula.)"
-        return "Output format mismatch. Spacing, newlines, decimal places exact-a match pannunga. (Ensure output format matches exactly.)"
-    
-    # Rule 5: Logical error
-    if "logical" in error_lower:
-        return "Logical error: Algorithm review pannunga. Loop conditions correct-a? Variables right order-la update pannirukkingala? Step by step trace pannunga. (Review algorithm and loop conditions.)"
-    
-    # Rule 6: Missing output
-    if "no output" in error_lower or "empty" in error_lower:
-        return "Output print aagala. printf/print/cout use pannirukkingala? Code print statement reach aagudha check pannunga. (No output. Check if you're using printf/print/cout and if code reaches print statement.)"
-    
-    return None
+    if rule_engine is None:
+        return None
+    match = rule_engine.match(error_message, failed_tests, language)
+    return match["hint"] if match else None
 
 
-def get_hint(subject: str, error_message: str, failed_tests: str) -> Dict[str, Any]:
+def instant_hint(subject: str, error_message: str, failed_tests: str,
+                 exercise_id: str = "") -> Optional[Dict[str, Any]]:
+    """
+    Hint answered without retrieval or generation.
+
+    A rule written for this exact error wins, then the exercise's
+    precomputed hint pack, then the catch-all rules.
     """
-    Generate hint using rule-based first, then RAG, then LLM fallback.
+    with tracing.span("rules"):
+        match = rule_engine.match(error_message, failed_tests, language_for_subject(subject)) if rule_engine else None
+    rule_hint = {"hint": match["hint"], "source": "Rule-based (Fast)", "rag_used": False} if match else None
+    if rule_hint and not match["generic"]:
+        return rule_hint
+    with tracing.span("hint_pack"):
+        return hint_packs.lookup(subject, exercise_id, error_message, failed_tests) or rule_hint
+
+
+async def get_hint(subject: str, error_message: str, failed_tests: str, exercise_id: str = "",
+                   budget: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Generate hint using rule-based or precomputed hints first, then cached hints, then RAG, then LLM fallback.
     
     Args:
         subject: Subject name (e.g., 'c_lab_manual', 'python_lab_manual')
         error_message: Error description
         failed_tests: Description of failed test cases
+        exercise_id: Exercise the error came from (scopes the hint cache)
+        budget: Seconds the caller can wait (default HINT_DEADLINE); when the
+            LLM queue cannot answer in time, a lab-manual summary or basic
+            hint is returned instead
     
     Returns:
         dict with hint, source, and rag_used flag
     """
-    # Step 1: Try rule-based hints first (FAST, <1s)
-    rule_hint = generate_rule_based_hint(error_message, failed_tests)
-    if rule_hint:
-        return {
-            "hint": rule_hint,
-            "source": "Rule-based (Fast)",
-            "rag_used": False
-        }
+    if HINT_PIPELINE == "parallel":
+        from .hint_pipeline import parallel_hint
+        return await parallel_hint(subject, error_message, failed_tests, exercise_id, budget)
+    
+    deadline = time.monotonic() + (budget or HINT_DEADLINE)
+    
+    # Step 1: Try rule-based and precomputed hints first (FAST, <1s)
+    instant = instant_hint(subject, error_message, failed_tests, exercise_id)
+    if instant:
+        return instant
+    
+    # Step 2: Reuse a hint generated earlier for the same (or a similar) error
+    if _hint_cache:
+        with tracing.span("hint_cache"):
+            cached = await _hint_cache.lookup_async(subject, exercise_id, error_message, failed_tests)
+        if cached:
+            return cached
     
-    # Step 2: Try RAG (lab notes) for conceptual hints
-    query = f"""
+    # Step 3: Join an identical request already being answered, or start one
+    hint_data, _ = await hint_flights.do(
+        ("hint",) + flight_key(subject, error_message, failed_tests),
+        lambda: _generate_hint(subject, error_message, failed_tests, deadline),
+    )
+    hint_data = dict(hint_data)
+    if _hint_cache and _cacheable(hint_data):
+        await _hint_cache.store_async(subject, exercise_id, error_message, failed_tests, hint_data)
+    return hint_data
+
+
+async def stream_hint(subject: str, error_message: str, failed_tests: str,
+                      exercise_id: str = "", budget: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Same lookup order as get_hint, delivered as events while the LLM is generating.
+    The budget bounds the wait for an LLM slot; once tokens flow they are not cut off.
+
+    Yields dicts with an "event" key:
+        hint:   complete hint available immediately (rule-based, precomputed or cached)
+        status: stage update ("retrieving", "generating")
+        token:  next chunk of LLM text ("text")
+        done:   final hint, source and rag_used (always the last event)
+    """
+    instant = instant_hint(subject, error_message, failed_tests, exercise_id)
+    if instant:
+        yield {"event": "hint", **instant}
+        yield {"event": "done", **instant}
+        return
+    
+    if _hint_cache:
+        cached = await _hint_cache.lookup_async(subject, exercise_id, error_message, failed_tests)
+        if cached:
+            yield {"event": "hint", **cached}
+            yield {"event": "done", **cached}
+            return
+    
+    deadline = time.monotonic() + (budget or HINT_DEADLINE)
+    
+    # Identical requests already streaming get the tokens produced so far, then follow live
+    async for event in hint_flights.stream(
+        ("stream",) + flight_key(subject, error_message, failed_tests),
+        lambda: _stream_generation(subject, error_message, failed_tests, deadline),
+    ):
+        if event["event"] == "done" and _hint_cache and _cacheable(event):
+            hint_data = {k: v for k, v in event.items() if k != "event"}
+            await _hint_cache.store_async(subject, exercise_id, error_message, failed_tests, hint_data)
+        # Events are shared between subscribers; hand out copies
+        yield dict(event)
+
+
+async def _stream_generation(subject: str, error_message: str, failed_tests: str,
+                             deadline: float) -> AsyncIterator[Dict[str, Any]]:
+    """Retrieval + streamed LLM generation as status/token/done events."""
+    yield {"event": "status", "stage": "retrieving"}
+    rag_chunks = await retrieve_notes_async(subject, build_query(error_message, failed_tests), k=5)
+    relevant = has_relevant_notes(rag_chunks)
+    if relevant:
+        prompt = notes_prompt(rag_chunks, error_message, failed_tests)
+        hint_data = {"source": "RAG (Lab Manual)", "rag_used": True}
+    else:
+        prompt = fallback_prompt(subject, error_message, failed_tests)
+        hint_data = {"source": "LLM (Ollama)", "rag_used": False}
+    
+    parts = []
+    try:
+        async with llm_scheduler.slot(deadline):
+            yield {"event": "status", "stage": "generating"}
+            if not HAS_HTTPX:
+                raise OllamaError(MSG_NOT_INSTALLED)
+            async for part in stream_llm(prompt):
+                parts.append(part)
+                yield {"event": "token", "text": part}
+        hint_data["hint"] = "".join(parts).strip() or MSG_EMPTY
+    except LLMShed:
+        hint_data = degraded_hint(rag_chunks if relevant else [], error_message, failed_tests)
+        yield {"event": "hint", **hint_data}
+    except OllamaError as e:
+        hint_data["hint"] = str(e)
+    except Exception as e:
+        hint_data["hint"] = f"LLM error: {str(e)}"
+    yield {"event": "done", **hint_data}
+
+
+def build_query(error_message: str, failed_tests: str) -> str:
+    """Retrieval query for an error."""
+    return f"""
 Error:
 {error_message}
 
 Failed Tests:
 {failed_tests}
 """
+
+
+def _cacheable(hint_data: Dict[str, Any]) -> bool:
+    """LLM failures and shed (degraded) answers are not cached."""
+    return not hint_data.get("shed") and not hint_data["hint"].startswith(LLM_FAILURE_PREFIXES)
+
+
+def summarize_notes(chunks: List[str], max_chars: int = 300) -> str:
+    """First sentences of the best-ranked lab-manual chunk."""
+    text = " ".join(str(chunks[0]).split())
+    sentences = re.split(r"(?<=[.!?])\s+", text)
+    summary = ""
+    for sentence in sentences:
+        if summary and len(summary) + len(sentence) > max_chars:
+            break
+        summary = f"{summary} {sentence}".strip()
+    if len(summary) > max_chars:
+        summary = summary[:max_chars].rsplit(" ", 1)[0] + "..."
+    return summary
+
+
+def degraded_hint(chunks: List[str], error_message: str, failed_tests: str) -> Dict[str, Any]:
+    """Hint from the faster tiers when the LLM is too busy to answer in time."""
+    if chunks:
+        return {
+            "hint": f"From your lab manual: {summarize_notes(chunks)}",
+            "source": "RAG (Lab Manual, Summary)",
+            "rag_used": True,
+            "shed": True
+        }
+    return {
+        "hint": generate_rule_based_hint(error_message, failed_tests)
+        or f"Error: {error_message}. Review your code syntax and logic.",
+        "source": "Basic",
+        "rag_used": False,
+        "shed": True
+    }
+
+
+async def _generate_hint(subject: str, error_message: str, failed_tests: str,
+                         deadline: Optional[float] = None) -> Dict[str, Any]:
+    """RAG (lab notes) hint, or plain LLM hint when the notes have nothing relevant."""
+    if deadline is None:
+        deadline = time.monotonic() + HINT_DEADLINE
+    query = build_query(error_message, failed_tests)
     
-    rag_chunks = retrieve_notes(subject, query, k=5)
+    with tracing.span("retrieval"):
+        rag_chunks = await retrieve_notes_async(subject, query, k=5)
     
-    if rag_chunks and any(len(str(chunk)) > 50 for chunk in rag_chunks):
-        hint_text = format_hint_from_notes(rag_chunks, error_message, failed_tests)
+    if has_relevant_notes(rag_chunks):
+        try:
+            with tracing.span("llm"):
+                hint_text = await llm_scheduler.run(
+                    lambda: format_hint_from_notes(rag_chunks, error_message, failed_tests), deadline)
+        except LLMShed:
+            return degraded_hint(rag_chunks, error_message, failed_tests)
         return {
             "hint": hint_text,
             "source": "RAG (Lab Manual)",
             "rag_used": True
         }
     
-    # Step 3: Fallback to LLM (slowest, use only when needed)
-    hint_text = llm_hint_fallback(subject, error_message, failed_tests)
+    # Fallback to LLM (slowest, use only when needed)
+    try:
+        with tracing.span("llm"):
+            hint_text = await llm_scheduler.run(
+                lambda: llm_hint_fallback(subject, error_message, failed_tests), deadline)
+    except LLMShed:
+        return degraded_hint([], error_message, failed_tests)
     return {
         "hint": hint_text,
         "source": "LLM (Ollama)",
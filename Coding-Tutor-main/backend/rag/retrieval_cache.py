@@ -0,0 +1,160 @@
+"""
+Retrieval Cache
+LRU + TTL cache for retrieved lab-manual chunks, keyed on error signatures.
+
+Keys are built from the normalized error (see error_signature), so the same
+classroom mistake hits the cache even when line numbers, variable names or
+temp paths differ. Entries are evicted least-recently-used once the size
+limit is reached and expire after a TTL. The cache can optionally persist
+to a JSON file so it survives backend restarts; the file records the index
+version it was built against and is discarded when the indexes change.
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Configuration
+CACHE_MAX_ENTRIES = int(os.environ.get("RAG_CACHE_SIZE", "1024"))
+CACHE_TTL_SECONDS = float(os.environ.get("RAG_CACHE_TTL", str(24 * 3600)))
+CACHE_PATH = os.environ.get("RAG_CACHE_PATH", "")  # empty = in-memory only
+# Persist after this many writes (and always at exit)
+CACHE_SAVE_EVERY = 25
+
+
+class RetrievalCache:
+    """Thread-safe LRU cache with TTL expiry, hit-rate stats and optional persistence."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS,
+                 path: Optional[str] = None, version_fn: Optional[Callable[[], str]] = None):
+        """
+        Initialize RetrievalCache.
+
+        Args:
+            max_entries: Maximum number of entries before LRU eviction
+            ttl: Seconds an entry stays valid (0 = never expires)
+            path: JSON file to load from and persist to (None/empty = memory only)
+            version_fn: Version of the data the entries were computed from; a
+                persisted file saved under another version is not loaded
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.path = path
+        self.version_fn = version_fn
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if self.path:
+            self._load()
+            atexit.register(self.save)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value (refreshing its LRU position), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at and expires_at < time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any):
+        """Insert or replace an entry, evicting the least recently used if full."""
+        expires_at = time.time() + self.ttl if self.ttl > 0 else 0
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty += 1
+            save_now = self.path and self._dirty >= CACHE_SAVE_EVERY
+        if save_now:
+            self.save()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not (entry[1] and entry[1] < time.time())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self, prefix: str = ""):
+        """Drop all entries, or only those whose key starts with prefix."""
+        with self._lock:
+            if not prefix:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k.startswith(prefix)]:
+                    del self._entries[key]
+            self._dirty += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _version(self) -> str:
+        return self.version_fn() if self.version_fn else ""
+
+    def _load(self):
+        """Load persisted entries, skipping expired ones (or all of them if the version changed)."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load retrieval cache: {e}")
+            return
+        if data.get("index_version", "") != self._version():
+            print("Indexes changed since the retrieval cache was saved; starting empty")
+            return
+        now = time.time()
+        # Stored oldest-first, so re-inserting preserves LRU order
+        for key, value, expires_at in data.get("entries", [])[-self.max_entries:]:
+            if not expires_at or expires_at > now:
+                self._entries[key] = (value, expires_at)
+
+    def save(self):
+        """Write entries to disk atomically (no-op without a path)."""
+        if not self.path:
+            return
+        with self._lock:
+            entries = [[k, v, exp] for k, (v, exp) in self._entries.items()]
+            self._dirty = 0
+        version = self._version()
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "index_version": version, "entries": entries}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Warning: Could not save retrieval cache: {e}")
@@ -0,0 +1,508 @@
+"""
+Retrieval Daemon
+One local process owning the embedder, FAISS indexes and retrieval cache,
+shared by every API worker over a Unix socket.
+
+Without it, each worker process loads its own copy of the model and indexes
+and keeps its own cold caches. With RAG_DAEMON_SOCKET set, retrieve_notes
+and hint-cache lookups and stores become calls to the daemon, so every
+worker shares one semantic hint cache. Workers never load the model: while
+the daemon is unreachable they retrieve with BM25 only and keep an
+exact-match hint cache of their own, and they go back to the daemon once
+it answers again.
+
+Protocol (all integers big-endian), one request/response at a time per
+connection, connections are kept open and reused:
+
+    request:  version u8 | op u8 | k u16 | length u32 | payload
+    response: version u8 | status u8 | count u16 | length u32 | payload
+
+    RETRIEVE  payload = subject_len u16 | subject | query (UTF-8)
+              -> count chunks, each length u32 | UTF-8 text
+    EMBED     payload = text (UTF-8) -> count float32 values (little-endian)
+    STATS     -> JSON
+    PING      -> empty
+    HINT_LOOKUP payload = JSON {subject, exercise_id, error_message, failed_tests}
+              -> JSON hint or null
+    HINT_STORE  payload = JSON lookup fields + hint_data -> empty
+    status 1  -> payload is the UTF-8 error message
+
+Run (from backend/):
+    python -m rag.retrieval_daemon [--socket /tmp/coding-tutor-rag.sock]
+then start the API workers with RAG_DAEMON_SOCKET pointing at the same path.
+"""
+
+import os
+import json
+import time
+import socket
+import struct
+import asyncio
+import weakref
+import tempfile
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Configuration
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "coding-tutor-rag.sock")
+DAEMON_SOCKET = os.environ.get("RAG_DAEMON_SOCKET", "")  # empty = in-process retrieval
+DAEMON_TIMEOUT = float(os.environ.get("RAG_DAEMON_TIMEOUT", "5"))
+# After a failed call, retrieve in-process for this long before trying the daemon again
+DAEMON_RETRY_AFTER = 5.0
+# Idle connections kept per client (and event loop)
+POOL_SIZE = 8
+MAX_FRAME = 16 * 1024 * 1024
+
+PROTOCOL_VERSION = 1
+OP_RETRIEVE, OP_EMBED, OP_STATS, OP_PING, OP_HINT_LOOKUP, OP_HINT_STORE = 1, 2, 3, 4, 5, 6
+STATUS_OK, STATUS_ERROR = 0, 1
+
+_HEADER = struct.Struct("!BBHI")
+_U16 = struct.Struct("!H")
+_U32 = struct.Struct("!I")
+
+
+class RetrievalDaemonError(Exception):
+    """The daemon could not be reached or reported an error."""
+
+
+# --- Encoding ---------------------------------------------------------------
+
+def encode_request(op: int, payload: bytes = b"", k: int = 0) -> bytes:
+    return _HEADER.pack(PROTOCOL_VERSION, op, k, len(payload)) + payload
+
+
+def encode_retrieve(subject: str, query: str, k: int) -> bytes:
+    subject_bytes = subject.encode("utf-8")
+    return encode_request(OP_RETRIEVE, _U16.pack(len(subject_bytes)) + subject_bytes + query.encode("utf-8"), k)
+
+
+def decode_retrieve(payload: bytes):
+    (subject_len,) = _U16.unpack_from(payload)
+    subject = payload[2:2 + subject_len].decode("utf-8")
+    return subject, payload[2 + subject_len:].decode("utf-8")
+
+
+def encode_chunks(chunks: List[str]) -> bytes:
+    parts = []
+    for chunk in chunks:
+        data = str(chunk).encode("utf-8")
+        parts.append(_U32.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def decode_chunks(payload: bytes, count: int) -> List[str]:
+    chunks, offset = [], 0
+    for _ in range(count):
+        (length,) = _U32.unpack_from(payload, offset)
+        offset += 4
+        chunks.append(payload[offset:offset + length].decode("utf-8"))
+        offset += length
+    return chunks
+
+
+def encode_response(payload: bytes = b"", count: int = 0, status: int = STATUS_OK) -> bytes:
+    return _HEADER.pack(PROTOCOL_VERSION, status, count, len(payload)) + payload
+
+
+def _check_header(version: int, length: int):
+    if version != PROTOCOL_VERSION:
+        raise RetrievalDaemonError(f"Protocol version {version} (expected {PROTOCOL_VERSION})")
+    if length > MAX_FRAME:
+        raise RetrievalDaemonError(f"Frame of {length} bytes exceeds {MAX_FRAME}")
+
+
+def _parse_response(status: int, count: int, payload: bytes, op: int):
+    if status != STATUS_OK:
+        raise RetrievalDaemonError(payload.decode("utf-8", "replace"))
+    if op == OP_RETRIEVE:
+        return decode_chunks(payload, count)
+    if op == OP_EMBED:
+        return np.frombuffer(payload, dtype="<f4").reshape(1, -1)
+    if op in (OP_STATS, OP_HINT_LOOKUP):
+        return json.loads(payload.decode("utf-8"))
+    return None
+
+
+# --- Server -----------------------------------------------------------------
+
+class RetrievalDaemon:
+    """Serves retrieval and query embeddings over a Unix socket."""
+
+    def __init__(self, socket_path: str,
+                 retrieve: Callable[[str, str, int], Awaitable[List[str]]],
+                 encode: Optional[Callable[[str], Awaitable[Any]]] = None,
+                 stats: Optional[Callable[[], Dict[str, Any]]] = None,
+                 hints: Optional[Any] = None):
+        """
+        Initialize RetrievalDaemon.
+
+        Args:
+            socket_path: Unix socket to listen on
+            retrieve: (subject, query, k) -> chunks
+            encode: text -> (1, dim) vector; None disables EMBED
+            stats: Extra statistics merged into STATS replies
+            hints: HintCache shared by the workers; None disables HINT_LOOKUP/HINT_STORE
+        """
+        self.socket_path = socket_path
+        self.retrieve = retrieve
+        self.encode = encode
+        self.stats = stats
+        self.hints = hints
+        self.server = None
+        self.connections = 0
+        self.requests = {"retrieve": 0, "embed": 0, "stats": 0, "ping": 0, "hint_lookup": 0,
+                         "hint_store": 0, "error": 0}
+
+    async def start(self) -> "RetrievalDaemon":
+        if os.path.exists(self.socket_path):
+            # A socket file left by a crashed daemon; refuse to steal a live one
+            try:
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                probe.connect(self.socket_path)
+                probe.close()
+                raise RuntimeError(f"A retrieval daemon is already listening on {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.socket_path)
+        self.server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        return self
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"✅ Retrieval daemon listening on {self.socket_path}")
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    return
+                version, op, k, length = _HEADER.unpack(header)
+                try:
+                    _check_header(version, length)
+                except RetrievalDaemonError as e:
+                    writer.write(encode_response(str(e).encode("utf-8"), status=STATUS_ERROR))
+                    await writer.drain()
+                    return
+                payload = await reader.readexactly(length) if length else b""
+                writer.write(await self._dispatch(op, k, payload))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _dispatch(self, op: int, k: int, payload: bytes) -> bytes:
+        try:
+            if op == OP_RETRIEVE:
+                self.requests["retrieve"] += 1
+                subject, query = decode_retrieve(payload)
+                chunks = await self.retrieve(subject, query, k or 5)
+                return encode_response(encode_chunks(chunks), len(chunks))
+            if op == OP_EMBED:
+                self.requests["embed"] += 1
+                if self.encode is None:
+                    raise RuntimeError("No embedder loaded in the retrieval daemon")
+                vec = np.asarray(await self.encode(payload.decode("utf-8")), dtype="<f4").reshape(-1)
+                return encode_response(vec.tobytes(), len(vec))
+            if op == OP_STATS:
+                self.requests["stats"] += 1
+                data = {"connections": self.connections, "requests": dict(self.requests)}
+                if self.stats:
+                    data.update(self.stats())
+                return encode_response(json.dumps(data).encode("utf-8"))
+            if op == OP_PING:
+                self.requests["ping"] += 1
+                return encode_response()
+            if op in (OP_HINT_LOOKUP, OP_HINT_STORE):
+                if self.hints is None:
+                    raise RuntimeError("No hint cache in the retrieval daemon")
+                request = json.loads(payload.decode("utf-8"))
+                if op == OP_HINT_LOOKUP:
+                    self.requests["hint_lookup"] += 1
+                    hit = await self.hints.lookup_async(**request)
+                    return encode_response(json.dumps(hit).encode("utf-8"))
+                self.requests["hint_store"] += 1
+                await self.hints.store_async(**request)
+                return encode_response()
+            raise ValueError(f"Unknown op {op}")
+        except Exception as e:
+            self.requests["error"] += 1
+            return encode_response(f"{type(e).__name__}: {e}".encode("utf-8"), status=STATUS_ERROR)
+
+
+# --- Client -----------------------------------------------------------------
+
+class RetrievalClient:
+    """Thin client; every call raises RetrievalDaemonError when the daemon cannot answer."""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = DAEMON_TIMEOUT):
+        """
+        Initialize RetrievalClient.
+
+        Args:
+            socket_path: Daemon socket
+            timeout: Seconds per call before giving up
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._pools: "weakref.WeakKeyDictionary[Any, list]" = weakref.WeakKeyDictionary()
+        self._down_until = 0.0
+
+        self.calls = 0
+        self.failures = 0
+
+    def available(self) -> bool:
+        """False for a while after a failure (callers retrieve in-process meanwhile)."""
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, e: Exception, down: bool = True) -> RetrievalDaemonError:
+        """Count a failure; down=False for errors the daemon reported (it is still up)."""
+        self.failures += 1
+        if down:
+            self._down_until = time.monotonic() + DAEMON_RETRY_AFTER
+        return e if isinstance(e, RetrievalDaemonError) else RetrievalDaemonError(f"Retrieval daemon unreachable: {e}")
+
+    # Blocking calls (one connection per thread)
+
+    def _recv_exactly(self, sock: socket.socket, n: int) -> bytes:
+        data = bytearray()
+        while len(data) < n:
+            part = sock.recv(n - len(data))
+            if not part:
+                raise ConnectionError("connection closed by daemon")
+            data += part
+        return bytes(data)
+
+    def _call(self, op: int, request: bytes):
+        self.calls += 1
+        sock = getattr(self._local, "sock", None)
+        try:
+            if sock is None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                self._local.sock = sock
+            sock.sendall(request)
+            version, status, count, length = _HEADER.unpack(self._recv_exactly(sock, _HEADER.size))
+            _check_header(version, length)
+            payload = self._recv_exactly(sock, length) if length else b""
+        except (OSError, RetrievalDaemonError) as e:
+            if sock is not None:
+                sock.close()
+            self._local.sock = None
+            raise self._failed(e)
+        try:
+            return _parse_response(status, count, payload, op)
+        except RetrievalDaemonError as e:
+            raise self._failed(e, down=False)
+
+    def retrieve(self, subject: str, query: str, k: int = 5) -> List[str]:
+        return self._call(OP_RETRIEVE, encode_retrieve(subject, query, k))
+
+    def encode(self, text: str) -> np.ndarray:
+        """(1, dim) query embedding computed by the daemon's model."""
+        return self._call(OP_EMBED, encode_request(OP_EMBED, text.encode("utf-8")))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._call(OP_STATS, encode_request(OP_STATS))
+
+    def ping(self) -> bool:
+        try:
+            self._call(OP_PING, encode_request(OP_PING))
+            return True
+        except RetrievalDaemonError:
+            return False
+
+    # Async calls (pooled connections per event loop)
+
+    async def _call_async(self, op: int, request: bytes):
+        self.calls += 1
+        pool = self._pools.setdefault(asyncio.get_running_loop(), [])
+        conn = pool.pop() if pool else None
+        try:
+            async def exchange():
+                nonlocal conn
+                if conn is None:
+                    conn = await asyncio.open_unix_connection(self.socket_path)
+                reader, writer = conn
+                writer.write(request)
+                await writer.drain()
+                header = await reader.readexactly(_HEADER.size)
+                version, status, count, length = _HEADER.unpack(header)
+                _check_header(version, length)
+                return status, count, (await reader.readexactly(length) if length else b"")
+
+            status, count, payload = await asyncio.wait_for(exchange(), self.timeout)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, RetrievalDaemonError) as e:
+            if conn is not None:
+                conn[1].close()
+            raise self._failed(e)
+        if len(pool) < POOL_SIZE:
+            pool.append(conn)
+        else:
+            conn[1].close()
+        try:
+            return _parse_response(status, count, payload, op)
+        except RetrievalDaemonError as e:
+            raise self._failed(e, down=False)
+
+    async def retrieve_async(self, subject: str, query: str, k: int = 5) -> List[str]:
+        return await self._call_async(OP_RETRIEVE, encode_retrieve(subject, query, k))
+
+    async def encode_async(self, text: str) -> np.ndarray:
+        return await self._call_async(OP_EMBED, encode_request(OP_EMBED, text.encode("utf-8")))
+
+    # Shared hint cache
+
+    @staticmethod
+    def _hint_request(op: int, subject: str, exercise_id: str, error_message: str, failed_tests: str,
+                      hint_data: Optional[Dict[str, Any]] = None) -> bytes:
+        request = {"subject": subject, "exercise_id": exercise_id,
+                   "error_message": error_message, "failed_tests": failed_tests}
+        if hint_data is not None:
+            request["hint_data"] = hint_data
+        return encode_request(op, json.dumps(request).encode("utf-8"))
+
+    def hint_lookup(self, subject: str, exercise_id: str, error_message: str,
+                    failed_tests: str = "") -> Optional[Dict[str, Any]]:
+        return self._call(OP_HINT_LOOKUP, self._hint_request(
+            OP_HINT_LOOKUP, subject, exercise_id, error_message, failed_tests))
+
+    def hint_store(self, subject: str, exercise_id: str, error_message: str, failed_tests: str,
+                   hint_data: Dict[str, Any]):
+        self._call(OP_HINT_STORE, self._hint_request(
+            OP_HINT_STORE, subject, exercise_id, error_message, failed_tests, hint_data))
+
+    async def hint_lookup_async(self, subject: str, exercise_id: str, error_message: str,
+                                failed_tests: str = "") -> Optional[Dict[str, Any]]:
+        return await self._call_async(OP_HINT_LOOKUP, self._hint_request(
+            OP_HINT_LOOKUP, subject, exercise_id, error_message, failed_tests))
+
+    async def hint_store_async(self, subject: str, exercise_id: str, error_message: str, failed_tests: str,
+                               hint_data: Dict[str, Any]):
+        await self._call_async(OP_HINT_STORE, self._hint_request(
+            OP_HINT_STORE, subject, exercise_id, error_message, failed_tests, hint_data))
+
+
+class DaemonHintCache:
+    """The daemon's hint cache seen from a worker, with a local one while the daemon is down."""
+
+    def __init__(self, client: RetrievalClient, fallback: Any):
+        """
+        Initialize DaemonHintCache.
+
+        Args:
+            client: Client for the daemon holding the shared cache
+            fallback: HintCache used while the daemon cannot answer
+        """
+        self.client = client
+        self.fallback = fallback
+        self.daemon_fallbacks = 0
+
+    def _unreachable(self, e: RetrievalDaemonError):
+        self.daemon_fallbacks += 1
+        print(f"Warning: retrieval daemon: {e}; using this worker's hint cache")
+
+    def lookup(self, subject: str, exercise_id: str, error_message: str,
+               failed_tests: str = "") -> Optional[Dict[str, Any]]:
+        if self.client.available():
+            try:
+                return self.client.hint_lookup(subject, exercise_id, error_message, failed_tests)
+            except RetrievalDaemonError as e:
+                self._unreachable(e)
+        return self.fallback.lookup(subject, exercise_id, error_message, failed_tests)
+
+    async def lookup_async(self, subject: str, exercise_id: str, error_message: str,
+                           failed_tests: str = "") -> Optional[Dict[str, Any]]:
+        if self.client.available():
+            try:
+                return await self.client.hint_lookup_async(subject, exercise_id, error_message, failed_tests)
+            except RetrievalDaemonError as e:
+                self._unreachable(e)
+        return await self.fallback.lookup_async(subject, exercise_id, error_message, failed_tests)
+
+    def store(self, subject: str, exercise_id: str, error_message: str, failed_tests: str,
+              hint_data: Dict[str, Any]):
+        if self.client.available():
+            try:
+                self.client.hint_store(subject, exercise_id, error_message, failed_tests, hint_data)
+                return
+            except RetrievalDaemonError as e:
+                self._unreachable(e)
+        self.fallback.store(subject, exercise_id, error_message, failed_tests, hint_data)
+
+    async def store_async(self, subject: str, exercise_id: str, error_message: str, failed_tests: str,
+                          hint_data: Dict[str, Any]):
+        if self.client.available():
+            try:
+                await self.client.hint_store_async(subject, exercise_id, error_message, failed_tests, hint_data)
+                return
+            except RetrievalDaemonError as e:
+                self._unreachable(e)
+        await self.fallback.store_async(subject, exercise_id, error_message, failed_tests, hint_data)
+
+    def invalidate(self, subject: str = ""):
+        self.fallback.invalidate(subject)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistics of this worker's fallback cache (the shared one is in the daemon's STATS)."""
+        stats = self.fallback.get_stats()
+        stats["daemon_fallbacks"] = self.daemon_fallbacks
+        return stats
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shared retrieval daemon for backend workers")
+    parser.add_argument("--socket", default=DAEMON_SOCKET or DEFAULT_SOCKET, help="Unix socket path")
+    args = parser.parse_args()
+
+    from . import rag_llm_chat as chat
+
+    # This process is the one doing the retrieval
+    chat.retrieval_client = None
+    chat.load_local_embedder()
+    chat._hint_cache = chat.make_hint_cache()
+    for name in sorted(os.listdir(chat.INDEX_DIR)):
+        if name.endswith(".index"):
+            chat.load_subject(name[:-len(".index")])
+
+    daemon = RetrievalDaemon(
+        args.socket,
+        retrieve=chat.retrieve_notes_async,
+        encode=chat.batcher.encode_async if chat.batcher else None,
+        stats=lambda: {"subjects": sorted(chat.metadata), "cache": chat._rag_cache.get_stats(),
+                       "retrieval": dict(chat.retrieval_stats),
+                       "hint_cache": chat._hint_cache.get_stats() if chat._hint_cache else None},
+        hints=chat._hint_cache,
+    )
+    try:
+        asyncio.run(daemon.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Rule Engine
+Instant hints from data-driven rule packs (rag/rules/*.json).
+
+Each pack lists the languages it applies to ("*" for all) and its rules:
+
+    {
+      "id": "missing-semicolon",
+      "priority": 210,                      # highest matching priority wins
+      "field": "error",                     # error | message | kind | tests
+      "keywords": ["expected ';' before"],  # literal triggers (case-insensitive)
+      "pattern": "...",                     # optional regex, named groups feed the hint
+      "require": [{"field": "tests", "pattern": "\\d"}],
+      "generic": false,                     # true for catch-all rules
+      "hint": "... {name} ..."
+    }
+
+At load time all keywords of a language are compiled into one prefix-trie
+alternation regex per field, so a single scan over the error text finds
+every triggered rule regardless of how many rules exist. Only the
+triggered rules' own patterns are then checked, in priority order.
+
+Usage (from backend/):
+    python -m rag.rule_engine --corpus bench/error_corpus.json
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+RULES_DIR = os.path.join(os.path.dirname(__file__), "rules")
+FIELDS = ("error", "message", "kind", "tests")
+
+# "COMPILE_ERROR: Compilation Error: main.c:3:5: ..." -> kind, message
+_KIND_RE = re.compile(r"^\s*([A-Z][A-Z_]*_ERROR)\s*:\s*(.*)$", re.DOTALL)
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+
+def language_for_subject(subject: str) -> Optional[str]:
+    """Rule-pack language for a hint subject ('c_lab_manual', 'C++', 'Java', ...)."""
+    name = (subject or "").lower()
+    if name.startswith(("c++", "cpp")):
+        return "cpp"
+    if name.startswith("java"):
+        return "java"
+    if name.startswith(("python", "py")):
+        return "python"
+    if name == "c" or name.startswith("c_"):
+        return "c"
+    return None
+
+
+def split_fields(error_message: str, failed_tests: str) -> Dict[str, str]:
+    """Structured fields a rule can match against."""
+    match = _KIND_RE.match(error_message or "")
+    kind, message = (match.group(1), match.group(2)) if match else ("", error_message or "")
+    return {"error": error_message or "", "message": message, "kind": kind, "tests": failed_tests or ""}
+
+
+class Rule:
+    """One compiled rule."""
+
+    __slots__ = ("id", "priority", "order", "field", "keywords", "pattern", "require", "hint", "generic")
+
+    def __init__(self, pack: str, spec: Dict[str, Any], order: int):
+        self.id = f"{pack}.{spec['id']}"
+        self.priority = int(spec.get("priority", 0))
+        self.order = order
+        self.field = spec.get("field", "error")
+        if self.field not in FIELDS:
+            raise ValueError(f"Rule {self.id}: unknown field '{self.field}'")
+        self.keywords = [k.lower() for k in spec.get("keywords", [])]
+        self.pattern = re.compile(spec["pattern"], re.IGNORECASE) if spec.get("pattern") else None
+        self.require = [(r.get("field", "error"), re.compile(r["pattern"], re.IGNORECASE))
+                        for r in spec.get("require", [])]
+        self.hint = spec["hint"]
+        self.generic = bool(spec.get("generic", False))
+
+    def check(self, fields: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """Named groups of the match (empty dict without a pattern), or None if the rule fails."""
+        groups: Dict[str, str] = {}
+        if self.pattern is not None:
+            match = self.pattern.search(fields[self.field])
+            if match is None:
+                return None
+            groups = {k: v for k, v in match.groupdict().items() if v is not None}
+        for field, pattern in self.require:
+            if not pattern.search(fields[field]):
+                return None
+        return groups
+
+    def render(self, groups: Dict[str, str]) -> str:
+        return _PLACEHOLDER_RE.sub(lambda m: groups.get(m.group(1), m.group(0)), self.hint)
+
+
+def _trie_regex(words: List[str]) -> str:
+    """Alternation regex of words with shared prefixes factored out."""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node) -> str:
+        ends = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            body = "(?:" + body + ")?" if len(branches) == 1 else body + "?"
+        return body
+
+    return build(trie)
+
+
+class _Matcher:
+    """All keywords for one field compiled into a single scanning regex."""
+
+    def __init__(self, rules: List[Rule], field: str):
+        self.by_keyword: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            if rule.field == field:
+                for keyword in rule.keywords:
+                    self.by_keyword.setdefault(keyword, []).append(rule)
+        # Zero-width lookahead so overlapping keywords are all found; the
+        # longest keyword at each position is captured and its prefixes
+        # that are keywords are looked up below
+        self.regex = re.compile("(?=(" + _trie_regex(list(self.by_keyword)) + "))") if self.by_keyword else None
+        self.max_len = max((len(k) for k in self.by_keyword), default=0)
+
+    def triggered(self, text: str, into: set):
+        if self.regex is None or not text:
+            return
+        by_keyword = self.by_keyword
+        for hit in set(self.regex.findall(text)):
+            for end in range(1, len(hit) + 1):
+                rules = by_keyword.get(hit[:end])
+                if rules:
+                    into.update(rules)
+
+
+class RuleEngine:
+    """Loads rule packs and matches errors against them."""
+
+    def __init__(self, rules_dir: str = RULES_DIR):
+        """
+        Initialize RuleEngine.
+
+        Args:
+            rules_dir: Directory of *.json rule packs
+        """
+        self.rules_dir = rules_dir
+        self.packs: Dict[str, Dict[str, Any]] = {}
+        self._rules_by_pack: Dict[str, List[Rule]] = {}
+        self._compiled: Dict[Optional[str], Tuple[Dict[str, _Matcher], List[Rule]]] = {}
+        self.load()
+
+    def load(self):
+        """(Re)load and compile every pack in rules_dir."""
+        packs, rules_by_pack = {}, {}
+        order = 0
+        for filename in sorted(os.listdir(self.rules_dir)) if os.path.isdir(self.rules_dir) else []:
+            if not filename.endswith(".json"):
+                continue
+            with open(os.path.join(self.rules_dir, filename), "r", encoding="utf-8") as f:
+                pack = json.load(f)
+            name = pack.get("name", filename[:-5])
+            rules = []
+            for spec in pack.get("rules", []):
+                rules.append(Rule(name, spec, order))
+                order += 1
+            packs[name] = {"version": pack.get("version", 1), "languages": pack.get("languages", ["*"])}
+            rules_by_pack[name] = rules
+        self.packs, self._rules_by_pack = packs, rules_by_pack
+        self._compiled = {}
+        for language in self.languages() + [None]:
+            self._compile(language)
+
+    @property
+    def version(self) -> str:
+        """Changes whenever a pack is added, removed or re-versioned."""
+        text = ",".join(f"{name}:{info['version']}" for name, info in sorted(self.packs.items()))
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def rule_count(self) -> int:
+        return sum(len(rules) for rules in self._rules_by_pack.values())
+
+    def languages(self) -> List[str]:
+        return sorted({lang for info in self.packs.values() for lang in info["languages"] if lang != "*"})
+
+    def _compile(self, language: Optional[str]):
+        """Matchers for one language (None = every pack)."""
+        rules = [
+            rule
+            for name, info in self.packs.items()
+            if language is None or "*" in info["languages"] or language in info["languages"]
+            for rule in self._rules_by_pack[name]
+        ]
+        matchers = {field: _Matcher(rules, field) for field in FIELDS}
+        always = [rule for rule in rules if not rule.keywords]
+        self._compiled[language] = (matchers, always)
+        return self._compiled[language]
+
+    def match(self, error_message: str, failed_tests: str = "",
+              language: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Best rule for an error.
+
+        Args:
+            error_message: Error text (optionally prefixed with COMPILE_ERROR: / RUNTIME_ERROR:)
+            failed_tests: Description of failed test cases
+            language: 'c', 'cpp', 'java', 'python' or None for every pack
+
+        Returns:
+            dict with id, hint, priority and generic flag, or None if no rule matches
+        """
+        compiled = self._compiled.get(language) or self._compiled[None]
+        matchers, always = compiled
+        fields = split_fields(error_message, failed_tests)
+
+        candidates = set(always)
+        for field, matcher in matchers.items():
+            matcher.triggered(fields[field].lower(), candidates)
+
+        for rule in sorted(candidates, key=lambda r: (-r.priority, r.order)):
+            groups = rule.check(fields)
+            if groups is not None:
+                return {"id": rule.id, "hint": rule.render(groups),
+                        "priority": rule.priority, "generic": rule.generic}
+        return None
+
+
+# Compiled once at startup
+try:
+    engine = RuleEngine()
+except (OSError, ValueError, KeyError, re.error) as e:
+    print(f"Warning: could not load hint rule packs: {e}")
+    engine = None
+
+
+def evaluate_corpus(rule_engine: RuleEngine, corpus: List[Dict[str, Any]], repeat: int = 200) -> Dict[str, Any]:
+    """Coverage and matcher speed over an error corpus."""
+    results = [rule_engine.match(c["error_message"], c.get("failed_tests", ""), c.get("language")) for c in corpus]
+    matched = [r for r in results if r]
+    specific = [r for r in matched if not r["generic"]]
+    mismatches = [
+        {"error": c["error_message"][:80], "expected": c["expect"], "got": r["id"] if r else None}
+        for c, r in zip(corpus, results)
+        if "expect" in c and (r["id"] if r else None) != c["expect"]
+    ]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for c in corpus:
+            rule_engine.match(c["error_message"], c.get("failed_tests", ""), c.get("language"))
+    per_match_us = (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6 if corpus else 0.0
+
+    return {
+        "rules": rule_engine.rule_count,
+        "errors": len(corpus),
+        "coverage": len(matched) / len(corpus) if corpus else 0.0,
+        "specific_coverage": len(specific) / len(corpus) if corpus else 0.0,
+        "mean_match_us": round(per_match_us, 2),
+        "mismatches": mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate hint rule packs against an error corpus")
+    parser.add_argument("--rules", default=RULES_DIR, help="Rule pack directory")
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                                         "bench", "error_corpus.json"))
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rule_engine = RuleEngine(args.rules)
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    report = evaluate_corpus(rule_engine, corpus, args.repeat)
+    print(f"Rules: {report['rules']} (packs version {rule_engine.version})")
+    print(f"Errors: {report['errors']}")
+    print(f"Coverage: {report['coverage']:.1%} (specific rules: {report['specific_coverage']:.1%})")
+    print(f"Mean match time: {report['mean_match_us']} µs")
+    for miss in report["mismatches"]:
+        print(f"  expected {miss['expected']}, got {miss['got']}: {miss['error']!r}")
+
+
+if __name__ == "__main__":
+    main()
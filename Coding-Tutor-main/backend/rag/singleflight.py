@@ -0,0 +1,117 @@
+"""
+Single-Flight Request Coalescing
+While a result for a key is being computed, identical requests wait for it
+instead of starting the same work again.
+
+In a lab, many students hit the same compile error within seconds. With
+coalescing, retrieval and LLM generation run once per distinct error and
+every waiting request gets the shared result.
+
+The shared work runs in its own task, so a client that disconnects does
+not cancel it for the others.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _StreamFlight:
+    """Events produced so far by one shared stream, replayed to each subscriber."""
+
+    def __init__(self):
+        self.events: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls (or streams) that share a key."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, Tuple[_StreamFlight, asyncio.Task]] = {}
+
+        self.leaders = 0     # calls that did the work
+        self.coalesced = 0   # calls that attached to work already in flight
+
+    @staticmethod
+    def _same_loop(task: asyncio.Task) -> bool:
+        return task.get_loop() is asyncio.get_running_loop()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run fn() once per key at a time.
+
+        Args:
+            key: Identity of the work (equal keys share one result)
+            fn: Coroutine factory doing the work
+
+        Returns:
+            (result, shared) where shared is True if another call did the work
+        """
+        task = self._calls.get(key)
+        if task is not None and self._same_loop(task):
+            self.coalesced += 1
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda t: self._calls.pop(key) if self._calls.get(key) is t else None)
+        self.leaders += 1
+        return await asyncio.shield(task), False
+
+    async def stream(self, key: Hashable, fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Iterate fn() once per key at a time.
+
+        Late subscribers first receive every event produced so far, then
+        follow the shared stream live.
+        """
+        entry = self._streams.get(key)
+        if entry is not None and self._same_loop(entry[1]):
+            flight = entry[0]
+            self.coalesced += 1
+        else:
+            flight = _StreamFlight()
+            task = asyncio.ensure_future(self._pump(flight, fn))
+            self._streams[key] = (flight, task)
+            task.add_done_callback(
+                lambda t: self._streams.pop(key) if self._streams.get(key, (None, None))[1] is t else None)
+            self.leaders += 1
+
+        position = 0
+        while True:
+            changed = flight.changed
+            while position < len(flight.events):
+                yield flight.events[position]
+                position += 1
+            if flight.finished:
+                if flight.error is not None:
+                    raise flight.error
+                return
+            await changed.wait()
+
+    @staticmethod
+    async def _pump(flight: _StreamFlight, fn: Callable[[], AsyncIterator[Any]]):
+        try:
+            async for event in fn():
+                flight.events.append(event)
+                flight.notify()
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.finished = True
+            flight.notify()
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently being computed."""
+        return len(self._calls) + len(self._streams)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get coalescing statistics."""
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": self.in_flight()}
@@ -0,0 +1,283 @@
+"""
+Production Server (preload, then fork)
+Loads the app once in a master process and forks worker processes from it.
+
+The master imports the FastAPI app (rule engine, hint packs, retrieval
+cache), parses the exercise catalog and loads the RAG indexes and embedding
+model, then forks N workers. The workers share those pages copy-on-write,
+so N workers cost roughly one model load in time and memory, and every
+core serves requests.
+
+- Workers accept on one listening socket created by the master.
+- Worker recycling: a worker exits after --max-requests requests (with
+  jitter so they do not all restart together) and the master forks a fresh
+  one; crashed workers are replaced the same way.
+- SIGHUP: graceful reload. The master re-reads rule packs, hint packs,
+  exercises and indexes, then replaces the workers one at a time; each old
+  worker finishes its in-flight requests before exiting. Code changes need
+  a full restart.
+- SIGTERM / SIGINT: graceful shutdown of every worker, then exit.
+
+Admission state (LLM queue, sandbox scheduler, hint coalescing) lives in
+each worker, so each worker gets 1/N of the global limits (LLM and sandbox
+concurrency, LLM queue, remote sandbox capacity, per-client run rate) and
+the totals stay what a single process allows. Per-client in-flight caps,
+supersede and hint coalescing still only see one worker's requests, which
+is why the default is a single worker.
+
+Usage (from backend/, Linux/macOS):
+    python serve.py --workers 4 --port 8000
+On Windows (no fork) this runs a single uvicorn process.
+"""
+
+import os
+import gc
+import sys
+import atexit
+import time
+import random
+import signal
+import socket
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Configuration
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+MAX_REQUESTS = int(os.environ.get("SERVE_MAX_REQUESTS", "0"))  # 0 = never recycle
+MAX_REQUESTS_JITTER = 0.1
+GRACEFUL_TIMEOUT = int(os.environ.get("SERVE_GRACEFUL_TIMEOUT", "30"))
+# Workers exiting sooner than this after start count as crashes (respawn is delayed)
+MIN_WORKER_LIFETIME = 2.0
+
+
+def preload():
+    """Import and warm everything workers will need, in the master."""
+    import main
+    from api import catalog
+    from rag import rag_llm_chat
+
+    exercises = catalog.preload()
+    subjects = []
+    if rag_llm_chat.retrieval_client is None and os.path.isdir(rag_llm_chat.INDEX_DIR):
+        for name in sorted(os.listdir(rag_llm_chat.INDEX_DIR)):
+            if name.endswith(".index") and rag_llm_chat.load_subject(name[:-len(".index")]):
+                subjects.append(name[:-len(".index")])
+    print(f"✅ Preloaded app, {exercises} exercises, indexes: {', '.join(subjects) or 'none'}")
+    return main.app
+
+
+def share_limits(workers: int):
+    """Give this worker its 1/workers share of the process-wide admission limits."""
+    if workers <= 1:
+        return
+    from api import run_code
+    from rag import rag_llm_chat
+
+    llm = rag_llm_chat.llm_scheduler
+    llm.max_concurrency = max(1, llm.max_concurrency // workers)
+    llm.max_queue = max(1, llm.max_queue // workers)
+    sandbox = run_code.sandbox_scheduler
+    sandbox.max_concurrency = max(1, sandbox.max_concurrency // workers)
+    sandbox.rate /= workers
+    if sandbox.capacity_fn is not None:
+        capacity = sandbox.capacity_fn
+        sandbox.capacity_fn = lambda: max(1, capacity() // workers)
+
+
+def reload_data():
+    """Re-read data files in the master (SIGHUP) so new workers see the changes."""
+    from rag import rag_llm_chat
+
+    if rag_llm_chat.rule_engine is not None:
+        rag_llm_chat.rule_engine.load()
+    rag_llm_chat.hint_packs.load()
+    for store in rag_llm_chat.metadata.values():
+        store.close()
+    rag_llm_chat.indexes.clear()
+    rag_llm_chat.metadata.clear()
+    rag_llm_chat.lexical.clear()
+    rag_llm_chat._rag_cache.clear()
+    return preload()
+
+
+def make_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Master:
+    """Forks, watches and replaces worker processes."""
+
+    def __init__(self, app, sock: socket.socket, workers: int, max_requests: int, log_level: str):
+        self.app = app
+        self.sock = sock
+        self.size = workers
+        self.max_requests = max_requests
+        self.log_level = log_level
+        self.workers = {}  # pid -> start time
+        # Workers reaped while stopping another one; the main loop replaces them
+        self.exited = []
+        self.running = True
+        self.reload_requested = False
+
+    # Worker side
+
+    def _run_worker(self):
+        import uvicorn
+
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        random.seed()
+        share_limits(self.size)
+        limit = None
+        if self.max_requests:
+            limit = self.max_requests + random.randint(0, int(self.max_requests * MAX_REQUESTS_JITTER))
+        config = uvicorn.Config(self.app, log_level=self.log_level, limit_max_requests=limit,
+                                timeout_graceful_shutdown=GRACEFUL_TIMEOUT)
+        server = uvicorn.Server(config)
+        try:
+            server.run(sockets=[self.sock])
+        finally:
+            # os._exit skips atexit, so persist this worker's retrieval cache first
+            from rag import rag_llm_chat
+            rag_llm_chat._rag_cache.save()
+            os._exit(0)
+
+    # Master side
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self.workers[pid] = time.monotonic()
+        return pid
+
+    def reap(self) -> list:
+        """Collect exited workers. Returns [(pid, lifetime)]."""
+        exited = []
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = self.workers.pop(pid, None)
+            if started is not None:
+                exited.append((pid, time.monotonic() - started))
+        return exited
+
+    def stop_worker(self, pid: int, timeout: float = GRACEFUL_TIMEOUT + 5):
+        """SIGTERM (uvicorn finishes in-flight requests), SIGKILL after the timeout."""
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self.workers.pop(pid, None)
+            return
+        deadline = time.monotonic() + timeout
+        while pid in self.workers and time.monotonic() < deadline:
+            # Others exiting meanwhile (recycled, crashed) are handed back to the main loop
+            self.exited.extend(e for e in self.reap() if e[0] != pid)
+            time.sleep(0.05)
+        if pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            self.workers.pop(pid, None)
+
+    def rolling_restart(self):
+        """Replace workers one at a time, starting each replacement before stopping the old one."""
+        for pid in list(self.workers):
+            self.spawn()
+            self.stop_worker(pid)
+
+    def run(self):
+        def on_term(signum, frame):
+            self.running = False
+
+        def on_hup(signum, frame):
+            self.reload_requested = True
+
+        signal.signal(signal.SIGTERM, on_term)
+        signal.signal(signal.SIGINT, on_term)
+        signal.signal(signal.SIGHUP, on_hup)
+
+        # Workers save the retrieval cache themselves on exit; the master's
+        # copy only holds the startup entries and must not overwrite theirs
+        from rag import rag_llm_chat
+        atexit.unregister(rag_llm_chat._rag_cache.save)
+
+        # Objects allocated so far are never freed; keep the collector from
+        # touching (and so un-sharing) their pages in the workers
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+
+        for _ in range(self.size):
+            self.spawn()
+        print(f"✅ Master {os.getpid()} serving with {self.size} workers")
+
+        crash_delay = 0.0
+        while self.running:
+            exited, self.exited = self.exited + self.reap(), []
+            for pid, lifetime in exited:
+                if not self.running:
+                    break
+                if lifetime < MIN_WORKER_LIFETIME:
+                    crash_delay = min(max(crash_delay * 2, 0.5), 30.0)
+                    print(f"Warning: worker {pid} exited after {lifetime:.1f}s; respawning in {crash_delay:.1f}s")
+                    time.sleep(crash_delay)
+                else:
+                    crash_delay = 0.0
+                self.spawn()
+            if self.reload_requested:
+                self.reload_requested = False
+                print("Reloading data and restarting workers...")
+                self.app = reload_data()
+                self.rolling_restart()
+            time.sleep(0.2)
+
+        print("Shutting down workers...")
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self.workers):
+            self.stop_worker(pid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preforking production server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="Worker processes; limits are split between them (default: WEB_CONCURRENCY or 1)")
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS,
+                        help="Recycle a worker after this many requests (0 = never)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    app = preload()
+    if not hasattr(os, "fork"):
+        import uvicorn
+        print("Warning: fork is not available on this platform; running a single process")
+        uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level)
+        return
+
+    Master(app, make_socket(args.host, args.port), max(1, args.workers),
+           args.max_requests, args.log_level).run()
+
+
+if __name__ == "__main__":
+    main()
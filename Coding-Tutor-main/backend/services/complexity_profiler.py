@@ -0,0 +1,335 @@
+"""
+Complexity Profiler
+Estimates how a submission's running time and memory grow with input size.
+
+Exercises about algorithmic efficiency carry an optional "profile" object
+describing a series of generated inputs:
+
+    input     "number": the size itself ("{n}")
+              "prime": the largest prime <= n (worst case for prime checks)
+              "array": n, then n random values, one per line
+              "matrix": n, n, then `matrices` (default 2) n x n matrices
+    sizes     increasing values of n
+    budget    seconds allowed per size (default PROFILE_SIZE_BUDGET)
+    sorted    sort array values (for searches)
+    suffix    extra input line after the generated data (e.g. a search key)
+
+The sandbox times the program at each size (see profile_driver.py) and
+stops at the first size over the budget. Time and memory are fitted to
+t = a + b * f(n) for the usual complexity classes; the simplest class that
+fits about as well as the best one is reported, and compared with the
+exercise's reference solution profiled on the same inputs. Neighbouring
+classes (n and n log n) are hard to tell apart over one decade of sizes,
+so exercises should span as wide a range as the budget allows.
+"""
+
+import os
+import math
+import json
+import random
+import hashlib
+import functools
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Configuration
+PROFILE_SIZE_BUDGET = float(os.environ.get("PROFILE_SIZE_BUDGET", "2"))
+# Growth below these is measurement noise (process start, JVM heap sizing):
+# an absolute floor, or this fraction of the median measurement
+TIME_NOISE_FLOOR = 0.005       # seconds
+TIME_NOISE_FRACTION = 0.4
+MEMORY_NOISE_FLOOR = 1024      # KB
+MEMORY_NOISE_FRACTION = 0.05
+# A growth class must leave at most this fraction of O(1)'s squared error
+SIGNIFICANCE = 0.25
+# A simpler class is preferred while its squared error is within this
+# fraction of the best fit's
+FIT_TOLERANCE = 0.1
+# Exponential growth is only considered for sizes this small
+MAX_EXPONENTIAL_N = 64
+# Generated array and matrix values are in 1..VALUE_MAX
+VALUE_MAX = 1000
+
+INPUT_KINDS = ("number", "prime", "array", "matrix")
+
+# (class, f(n)) from slowest to fastest growing
+MODELS: List[Tuple[str, Callable[[float], float]]] = [
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log(n)),
+    ("O(sqrt n)", lambda n: math.sqrt(n)),
+    ("O(n)", lambda n: n),
+    ("O(n log n)", lambda n: n * math.log(n)),
+    ("O(n^2)", lambda n: n ** 2),
+    ("O(n^3)", lambda n: n ** 3),
+]
+EXPONENTIAL = "O(2^n)"
+# Bases tried for exponential growth (fib-style recursion grows as 1.618^n)
+EXPONENTIAL_BASES = [1.1 + 0.05 * i for i in range(39)]
+CLASSES = [name for name, _ in MODELS] + [EXPONENTIAL]
+
+_reference_profiles: Dict[str, Dict[str, Any]] = {}
+_reference_lock = threading.Lock()
+
+
+# Inputs
+
+def _is_prime(n: int) -> bool:
+    """Deterministic Miller-Rabin for n < 3.3e24."""
+    if n < 2:
+        return False
+    bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+    for p in bases:
+        if n % p == 0:
+            return n == p
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    for a in bases:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _prime_at_most(n: int) -> int:
+    while n > 2 and not _is_prime(n):
+        n -= 1
+    return max(n, 2)
+
+
+_VALUES = range(1, VALUE_MAX + 1)
+
+
+def _lines(values: List[int]) -> str:
+    return "\n".join(map(str, values)) + "\n" if values else ""
+
+
+def generate_inputs(spec: Dict[str, Any], seed: str) -> List[Tuple[int, str]]:
+    """
+    Stdin for each size of a profile spec.
+
+    Args:
+        spec: The exercise's "profile" object
+        seed: Seed for random values, so every run sees the same inputs
+
+    Returns:
+        [(n, stdin_data)] in the spec's order
+    """
+    kind = spec.get("input", "number")
+    if kind not in INPUT_KINDS:
+        raise ValueError(f"Unknown profile input '{kind}'")
+    rng = random.Random(seed)
+    inputs = []
+    for n in spec["sizes"]:
+        n = int(n)
+        if kind == "number":
+            text = f"{n}\n"
+        elif kind == "prime":
+            text = f"{_prime_at_most(n)}\n"
+        elif kind == "array":
+            values = rng.choices(_VALUES, k=n)
+            if spec.get("sorted"):
+                values.sort()
+            text = f"{n}\n" + _lines(values)
+        else:
+            count = n * n * int(spec.get("matrices", 2))
+            text = f"{n}\n{n}\n" + _lines(rng.choices(_VALUES, k=count))
+        if spec.get("suffix") is not None:
+            text += f"{spec['suffix']}\n"
+        inputs.append((n, text))
+    return inputs
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_inputs(spec_json: str, seed: str) -> Tuple[Tuple[int, str], ...]:
+    return tuple(generate_inputs(json.loads(spec_json), seed))
+
+
+def plan(language: str, exercise: Dict[str, Any]) -> Tuple[List[Tuple[int, str]], float]:
+    """Inputs and per-size budget for profiling an exercise (recent exercises' inputs are cached)."""
+    spec = exercise["profile"]
+    inputs = _cached_inputs(json.dumps(spec, sort_keys=True), f"{language}:{exercise['id']}")
+    return list(inputs), float(spec.get("budget", PROFILE_SIZE_BUDGET))
+
+
+# Fitting
+
+def _least_squares(xs: List[float], ys: List[float]) -> Tuple[float, float, float]:
+    """
+    y = a + b*x with b >= 0, minimizing relative error so that small sizes
+    count as much as large ones.
+
+    Returns:
+        (a, b, weighted squared error)
+    """
+    weights = [1.0 / max(y, 1e-9) ** 2 for y in ys]
+    total = sum(weights)
+    mean_x = sum(w * x for w, x in zip(weights, xs)) / total
+    mean_y = sum(w * y for w, y in zip(weights, ys)) / total
+    var_x = sum(w * (x - mean_x) ** 2 for w, x in zip(weights, xs))
+    b = sum(w * (x - mean_x) * (y - mean_y) for w, x, y in zip(weights, xs, ys)) / var_x if var_x else 0.0
+    b = max(b, 0.0)
+    a = mean_y - b * mean_x
+    return a, b, sum(w * (a + b * x - y) ** 2 for w, x, y in zip(weights, xs, ys))
+
+
+def fit(ns: List[int], values: List[float], noise_floor: float,
+        noise_fraction: float = TIME_NOISE_FRACTION) -> Optional[Dict[str, Any]]:
+    """
+    Complexity class of measurements taken at sizes ns.
+
+    Measurements that spread less than the noise (noise_floor, or
+    noise_fraction of their median) are O(1), and so is growth that no
+    class explains significantly better than a constant.
+
+    Returns:
+        {"class", "constant", "coefficient"[, "base"]}, or None with fewer than 3 sizes
+    """
+    if len(ns) < 3:
+        return None
+    constant = {"class": "O(1)", "constant": sum(values) / len(values), "coefficient": 0.0}
+    median = sorted(values)[len(values) // 2]
+    if max(values) - min(values) <= max(noise_floor, noise_fraction * median):
+        return constant
+    fits = []
+    for name, f in MODELS:
+        a, b, error = _least_squares([f(n) for n in ns], values)
+        fits.append((error, {"class": name, "constant": a, "coefficient": b}))
+    if max(ns) <= MAX_EXPONENTIAL_N:
+        best = min((_least_squares([base ** n for n in ns], values) + (base,) for base in EXPONENTIAL_BASES),
+                   key=lambda r: r[2])
+        a, b, error, base = best
+        fits.append((error, {"class": EXPONENTIAL, "constant": a, "coefficient": b, "base": round(base, 2)}))
+    best_error = min(error for error, _ in fits)
+    if best_error > SIGNIFICANCE * fits[0][0]:
+        return constant
+    for error, result in fits:
+        if error <= best_error * (1 + FIT_TOLERANCE) + 1e-12:
+            return constant if result["coefficient"] <= 0 else result
+    return fits[-1][1]
+
+
+def predict(model: Dict[str, Any], n: int) -> float:
+    """Value of a fitted model at size n."""
+    if model["class"] == EXPONENTIAL:
+        x = model["base"] ** n
+    else:
+        x = dict(MODELS)[model["class"]](n)
+    return model["constant"] + model["coefficient"] * x
+
+
+def analyze(sizes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Time and memory complexity of one profile's measurements."""
+    timed = [s for s in sizes if not s.get("over_budget") and s.get("exit_code", 0) == 0]
+    ns = [s["n"] for s in timed]
+    time_fit = fit(ns, [s["seconds"] for s in timed], TIME_NOISE_FLOOR)
+    memory_fit = fit(ns, [s["max_rss_kb"] for s in timed], MEMORY_NOISE_FLOOR, MEMORY_NOISE_FRACTION)
+    return {
+        "time_complexity": time_fit["class"] if time_fit else None,
+        "memory_complexity": memory_fit["class"] if memory_fit else None,
+        "time_fit": time_fit,
+    }
+
+
+# Reports
+
+def reference_profile(runner, language: str, exercise: Dict[str, Any],
+                      container_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Profile of the exercise's reference solution (cached per solution and spec).
+
+    Returns:
+        The runner's profile result, or None without a reference solution
+    """
+    code = exercise.get("reference_solution")
+    if not code:
+        return None
+    key = hashlib.sha1(json.dumps([language, exercise["id"], code, exercise["profile"]],
+                                  sort_keys=True).encode("utf-8")).hexdigest()
+    with _reference_lock:
+        if key in _reference_profiles:
+            return _reference_profiles[key]
+    inputs, budget = plan(language, exercise)
+    result = runner.profile_code(language, code, inputs, budget, container_name=container_name)
+    if result["sizes"]:  # a failed sandbox is retried next time
+        with _reference_lock:
+            _reference_profiles[key] = result
+    return result
+
+
+def report(result: Dict[str, Any], reference: Optional[Dict[str, Any]], exercise: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Profile report: measurements, estimated complexity, the reference's, and
+    the predicted time at the largest size when the series stopped early.
+    """
+    sizes = result.get("sizes", [])
+    budget = float(exercise["profile"].get("budget", PROFILE_SIZE_BUDGET))
+    analysis = analyze(sizes)
+    time_fit = analysis.pop("time_fit")
+    out = dict(budget_seconds=budget, sizes=sizes, stopped=result.get("stopped"),
+               memory_floor_kb=result.get("memory_floor_kb"), **analysis)
+
+    planned = int(exercise["profile"]["sizes"][-1])
+    if sizes and sizes[-1]["n"] < planned or result.get("stopped") == "over_budget":
+        out["predicted"] = {"n": planned, "seconds": round(predict(time_fit, planned), 3) if time_fit else None}
+
+    out["reference"] = None
+    out["verdict"] = None
+    if reference and reference.get("sizes"):
+        ref = analyze(reference["sizes"])
+        ref.pop("time_fit")
+        out["reference"] = dict(sizes=reference["sizes"], stopped=reference.get("stopped"), **ref)
+        if out["time_complexity"] and ref["time_complexity"]:
+            mine = CLASSES.index(out["time_complexity"])
+            theirs = CLASSES.index(ref["time_complexity"])
+            out["verdict"] = "slower" if mine > theirs else "faster" if mine < theirs else "same"
+        # Time relative to the reference at the largest size both finished
+        finished = {s["n"]: s["seconds"] for s in reference["sizes"] if not s.get("over_budget")}
+        common = [s for s in sizes if s["n"] in finished and not s.get("over_budget") and finished[s["n"]] > 0]
+        if common:
+            out["slowdown"] = round(common[-1]["seconds"] / finished[common[-1]["n"]], 2)
+    return out
+
+
+def _format_memory(kb: float) -> str:
+    return f"{kb / 1024:.1f} MB"
+
+
+def summary(profile: Dict[str, Any]) -> str:
+    """Plain-text table and estimate for students."""
+    lines = [f"Performance profile (time limit {profile['budget_seconds']:g} s per size):",
+             f"{'n':>12} {'time':>10} {'memory':>10}"]
+    for size in profile["sizes"]:
+        if size.get("over_budget"):
+            time_text = f"> {size['seconds']:g} s"
+        else:
+            time_text = f"{size['seconds'] * 1000:.1f} ms"
+        memory_text = _format_memory(size["max_rss_kb"])
+        floor = profile.get("memory_floor_kb")
+        if floor and size["max_rss_kb"] <= floor + MEMORY_NOISE_FLOOR:
+            # Below what the sandbox can measure
+            memory_text = "<= " + _format_memory(floor + MEMORY_NOISE_FLOOR)
+        lines.append(f"{size['n']:>12} {time_text:>10} {memory_text:>10}")
+    if profile["stopped"] == "over_budget":
+        lines.append("Stopped: the last size went over the time limit.")
+    predicted = profile.get("predicted")
+    if predicted and predicted["seconds"] is not None:
+        lines.append(f"Predicted time at n={predicted['n']}: {predicted['seconds']:g} s")
+
+    reference = profile.get("reference") or {}
+    estimate = profile["time_complexity"] or "unknown (too few sizes finished)"
+    if reference.get("time_complexity"):
+        estimate += f" (reference solution: {reference['time_complexity']})"
+    lines.append(f"Estimated time complexity: {estimate}")
+    if profile["memory_complexity"]:
+        lines.append(f"Estimated memory growth: {profile['memory_complexity']}")
+    if profile["verdict"] == "slower":
+        lines.append("Your solution grows faster than the reference solution; look for a more efficient algorithm.")
+    return "\n".join(lines)
@@ -0,0 +1,193 @@
+"""
+Output Checker
+Compares a program's stdout with a testcase's expected output while the
+program is still running.
+
+Output is fed in chunks as it arrives. The first difference is reported as
+soon as it is certain, so the sandbox can stop a wrong program instead of
+waiting for it to finish: a line that can no longer match, output that
+continues after the expected end, or an endless line.
+
+Comparison rules come from the exercise's optional "compare" object:
+
+    mode         "lines" (default): trailing whitespace on each line and
+                 blank lines before and after the output are ignored.
+                 "tokens": any difference in whitespace is ignored.
+    ignore_case  compare case-insensitively (default false)
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+MODES = ("lines", "tokens")
+# Whitespace tolerated after the expected output ends (or at the end of a
+# line) before the output counts as too long
+MAX_EXTRA_WHITESPACE = 4096
+# Longest expected/got text quoted in a difference report
+MAX_QUOTE = 200
+
+_TOKEN = re.compile(r"\S+")
+
+
+def _first_diff(a: str, b: str) -> int:
+    """Index of the first differing character (length of the shorter if one is a prefix)."""
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return i
+    return min(len(a), len(b))
+
+
+def _quote(text: str) -> str:
+    return text if len(text) <= MAX_QUOTE else text[:MAX_QUOTE] + "..."
+
+
+class OutputChecker:
+    """Incremental comparison of program output with an expected output."""
+
+    def __init__(self, expected: str, mode: str = "lines", ignore_case: bool = False):
+        """
+        Initialize OutputChecker.
+
+        Args:
+            expected: The testcase's expected output
+            mode: "lines" or "tokens" (see module docstring)
+            ignore_case: Compare case-insensitively
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown compare mode '{mode}'")
+        self.mode = mode
+        self.ignore_case = ignore_case
+        expected = self._normalize(expected.replace("\r\n", "\n"))
+        if mode == "lines":
+            self._expected: List[str] = [line.rstrip() for line in expected.strip().split("\n")] \
+                if expected.strip() else []
+        else:
+            self._expected = expected.split()
+
+        self._partial = ""    # output after the last newline
+        self._line = 0        # complete output lines seen
+        self._index = 0       # next expected line / token
+        self._started = False  # a non-blank line was seen (lines mode)
+        self._extra = 0       # whitespace seen after the expected end
+        self.difference: Optional[Dict[str, Any]] = None
+
+    def _normalize(self, text: str) -> str:
+        return text.lower() if self.ignore_case else text
+
+    def _differ(self, reason: str, line: int, column: int, expected: str, got: str):
+        self.difference = {
+            "reason": reason,
+            "line": line,
+            "column": column,
+            "expected": _quote(expected),
+            "got": _quote(got),
+        }
+
+    def feed(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Compare the next chunk of output.
+
+        Returns:
+            The first difference once one is certain, else None
+        """
+        if self.difference is not None or not text:
+            return self.difference
+        *lines, self._partial = (self._partial + text).split("\n")
+        for line in lines:
+            self._line += 1
+            self._check(line, complete=True)
+            if self.difference is not None:
+                return self.difference
+        if self._partial:
+            self._check(self._partial, complete=False)
+        return self.difference
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """
+        Compare the end of the output (the program exited).
+
+        Returns:
+            The first difference, or None if the output matched
+        """
+        if self.difference is None and self._partial:
+            self._line += 1
+            self._check(self._partial, complete=True)
+            self._partial = ""
+        if self.difference is None and self._index < len(self._expected):
+            self._differ("missing_output", self._line + 1, 1, self._expected[self._index], "")
+        return self.difference
+
+    def _check(self, raw: str, complete: bool):
+        line_no = self._line if complete else self._line + 1
+        text = self._normalize(raw)
+        if self.mode == "lines":
+            self._check_line(text, raw, line_no, complete)
+        else:
+            self._check_tokens(text, raw, line_no, complete)
+
+    def _past_end(self, text: str, raw: str, line_no: int, complete: bool):
+        """Output after the expected end: only a little whitespace is allowed."""
+        content = _TOKEN.search(text)
+        if content:
+            self._differ("extra_output", line_no, content.start() + 1, "", raw.strip())
+            return
+        extra = self._extra + len(text) + 1
+        if extra > MAX_EXTRA_WHITESPACE:
+            self._differ("extra_output", line_no, 1, "", raw)
+        elif complete:
+            self._extra = extra
+
+    def _check_line(self, text: str, raw: str, line_no: int, complete: bool):
+        if self._index >= len(self._expected):
+            self._past_end(text, raw, line_no, complete)
+            return
+        if not self._started and not text.strip():
+            return  # blank lines before the output
+        expected = self._expected[self._index]
+        got = text.rstrip()
+        if complete:
+            self._started = True
+            self._index += 1
+            if got != expected:
+                self._differ("mismatch", line_no, _first_diff(got, expected) + 1, expected, raw.rstrip())
+        elif not expected.startswith(got):
+            self._differ("mismatch", line_no, _first_diff(got, expected) + 1, expected, raw.rstrip())
+        elif len(text) - len(expected) > MAX_EXTRA_WHITESPACE:
+            self._differ("extra_output", line_no, len(expected) + 1, expected, raw.rstrip())
+
+    def _check_tokens(self, text: str, raw: str, line_no: int, complete: bool):
+        index = self._index
+        for match in _TOKEN.finditer(text):
+            token = match.group()
+            got = raw[match.start():match.end()]
+            if index >= len(self._expected):
+                self._differ("extra_output", line_no, match.start() + 1, "", got)
+                return
+            expected = self._expected[index]
+            # The last token of an unfinished line may still grow
+            unfinished = not complete and match.end() == len(text)
+            if token != expected and not (unfinished and expected.startswith(token)):
+                self._differ("mismatch", line_no, match.start() + _first_diff(token, expected) + 1, expected, got)
+                return
+            if not unfinished:
+                index += 1
+        if complete:
+            self._index = index
+        if index >= len(self._expected) and not _TOKEN.search(text):
+            self._past_end(text, raw, line_no, complete)
+
+
+def checker_for(expected: str, compare: Optional[Dict[str, Any]] = None) -> OutputChecker:
+    """OutputChecker with an exercise's "compare" rules."""
+    compare = compare or {}
+    return OutputChecker(expected, compare.get("mode", "lines"), bool(compare.get("ignore_case")))
+
+
+def describe(difference: Dict[str, Any]) -> str:
+    """One-line description of a difference for students."""
+    where = f"line {difference['line']}, column {difference['column']}"
+    if difference["reason"] == "extra_output":
+        return f"{where}: output continues after the expected end (got '{difference['got']}')"
+    if difference["reason"] == "missing_output":
+        return f"{where}: output ended early (expected '{difference['expected']}')"
+    return f"{where}: expected '{difference['expected']}', got '{difference['got']}'"
@@ -0,0 +1,94 @@
+"""
+Profile Driver
+Runs inside the sandbox container (copied next to the program) and times
+the program on a series of inputs.
+
+Each input is run as its own process with the input file on stdin and
+stdout discarded; quick runs are repeated and the fastest is kept, which
+filters out scheduling noise. Wall time and peak resident memory (from
+wait4, so only the program itself is counted, not the compiler) are
+written to stdout as one JSON line per size. The series stops at the first
+size that exceeds the time budget or exits with an error.
+
+A child's peak memory includes what the process used before exec, so the
+driver first reports that floor (measured on `true`) as memory_floor_kb;
+programs using less than it are reported at the floor.
+
+Standard library only: the sandbox image has python3 for every language.
+
+Usage:
+    python3 profile_driver.py BUDGET N1 FILE1 [N2 FILE2 ...] -- COMMAND...
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import subprocess
+
+# Stderr kept from a failing run
+MAX_STDERR = 2000
+# Runs faster than this are repeated, up to REPEATS times
+REPEAT_UNDER = 0.5  # seconds
+REPEATS = 3
+
+
+def run_size(cmd, path, budget):
+    """Run cmd once on the input file; returns the measurement."""
+    with open(path, "rb") as stdin, tempfile.TemporaryFile() as stderr:
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdin=stdin, stdout=subprocess.DEVNULL, stderr=stderr)
+        over_budget = threading.Event()
+
+        def expire():
+            over_budget.set()
+            proc.kill()
+
+        timer = threading.Timer(budget, expire)
+        timer.start()
+        # wait4 (not proc.wait) to get this child's own resource usage
+        _, status, usage = os.wait4(proc.pid, 0)
+        elapsed = time.perf_counter() - started
+        timer.cancel()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+        result = {
+            "seconds": round(min(elapsed, budget) if over_budget.is_set() else elapsed, 6),
+            "max_rss_kb": usage.ru_maxrss,
+            "exit_code": proc.returncode,
+            "over_budget": over_budget.is_set(),
+        }
+        if proc.returncode != 0 and not over_budget.is_set():
+            stderr.seek(0)
+            result["error"] = stderr.read()[-MAX_STDERR:].decode("utf-8", errors="replace")
+        return result
+
+
+def main(argv):
+    split = argv.index("--")
+    budget = float(argv[0])
+    pairs = argv[1:split]
+    cmd = argv[split + 1:]
+    floor = run_size(["true"], os.devnull, budget)["max_rss_kb"]
+    print(json.dumps({"memory_floor_kb": floor}), flush=True)
+    for n, path in zip(pairs[::2], pairs[1::2]):
+        result = run_size(cmd, path, budget)
+        for _ in range(REPEATS - 1):
+            if result["exit_code"] != 0 or result["seconds"] >= REPEAT_UNDER:
+                break
+            again = run_size(cmd, path, budget)
+            if again["exit_code"] != 0:
+                result = again
+                break
+            result["seconds"] = min(result["seconds"], again["seconds"])
+            result["max_rss_kb"] = max(result["max_rss_kb"], again["max_rss_kb"])
+        result = dict(n=int(n), **result)
+        print(json.dumps(result), flush=True)
+        if result["over_budget"] or result["exit_code"] != 0:
+            break
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
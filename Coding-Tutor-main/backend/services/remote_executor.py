@@ -0,0 +1,307 @@
+"""
+Remote Sandbox Executor
+Runs sandbox jobs on sandbox agents (services/sandbox_agent.py) on other hosts.
+
+Enabled by listing the agents in SANDBOX_WORKERS (comma-separated URLs);
+/api/run then uses RemoteSandboxRunner in place of the local
+DockerSandboxRunner. It has the same run_code/kill interface, so the
+fair-share scheduler in front of it is unchanged.
+
+- Placement: least outstanding jobs relative to the agent's capacity; on
+  a tie, an agent that recently ran the same language (warm compiler and
+  image cache) wins.
+- Heartbeats: every agent's /health is polled every HEARTBEAT_INTERVAL
+  seconds. Agents that fail a heartbeat are skipped until one succeeds.
+- Worker loss: a job whose agent cannot be reached is retried on another
+  agent, up to SANDBOX_REMOTE_ATTEMPTS. An agent that answers 503 (full or
+  draining) is skipped for that job without using an attempt. Once the job
+  has been sent it is never re-run: a result that does not arrive within
+  the run timeout is reported as a timeout (and the job killed), and a
+  connection dropped mid-run as a worker error.
+- Draining: drain(url) (or POST /drain on the agent) stops new placements
+  there while running jobs finish.
+"""
+
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    httpx = None
+    HAS_HTTPX = False
+
+from .sandbox_runner import DockerSandboxRunner
+from stats import tracing
+
+# Configuration
+SANDBOX_WORKERS = [u.strip().rstrip("/") for u in os.environ.get("SANDBOX_WORKERS", "").split(",") if u.strip()]
+SANDBOX_AGENT_TOKEN = os.environ.get("SANDBOX_AGENT_TOKEN", "")
+SANDBOX_REMOTE_ATTEMPTS = int(os.environ.get("SANDBOX_REMOTE_ATTEMPTS", "3"))
+HEARTBEAT_INTERVAL = float(os.environ.get("SANDBOX_HEARTBEAT_INTERVAL", "2"))
+CONNECT_TIMEOUT = 2.0
+# Agents enforce the sandbox timeout themselves; allow for queueing and transfer
+RUN_TIMEOUT = DockerSandboxRunner.TIMEOUT + 30
+
+MSG_NO_WORKERS = "No sandbox workers are available. Please try again in a moment."
+MSG_LOST = "The sandbox worker stopped responding during the run. Please try again."
+
+
+class WorkerState:
+    """What the API server knows about one agent."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True  # until a heartbeat says otherwise
+        self.draining = False
+        self.capacity = 1
+        self.cpus = 1
+        self.reported_running = 0
+        self.outstanding = 0  # jobs this process has placed there
+        self.warm = set()
+        self.last_seen = 0.0
+        self.failures = 0
+
+    def load(self) -> float:
+        return max(self.outstanding, self.reported_running) / max(1, self.capacity)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "draining": self.draining,
+            "capacity": self.capacity,
+            "cpus": self.cpus,
+            "running": self.reported_running,
+            "outstanding": self.outstanding,
+            "warm": sorted(self.warm),
+        }
+
+
+class RemoteSandboxRunner:
+    """Places sandbox runs on remote agents (drop-in for DockerSandboxRunner)."""
+
+    def __init__(self, urls: List[str], token: str = SANDBOX_AGENT_TOKEN,
+                 attempts: int = SANDBOX_REMOTE_ATTEMPTS, heartbeat_interval: float = HEARTBEAT_INTERVAL,
+                 run_timeout: float = RUN_TIMEOUT):
+        """
+        Initialize RemoteSandboxRunner.
+
+        Args:
+            urls: Agent base URLs (e.g. http://sandbox-1:9100)
+            token: Shared bearer token expected by the agents
+            attempts: Agents tried per run before giving up
+            heartbeat_interval: Seconds between /health polls
+            run_timeout: Seconds to wait for one run's result
+        """
+        if not HAS_HTTPX:
+            raise RuntimeError("httpx is required for remote sandbox workers")
+        self.workers = [WorkerState(u.rstrip("/")) for u in urls]
+        self.token = token
+        self.attempts = max(1, attempts)
+        self.heartbeat_interval = heartbeat_interval
+        self.run_timeout = run_timeout
+        self._jobs: Dict[str, WorkerState] = {}  # job name -> agent running it
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._client = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+
+        self.retries = 0
+        self.completed = 0
+
+    # Connections and heartbeats
+
+    def _ensure_started(self):
+        """Create the HTTP client and heartbeat thread lazily (and again in a forked child)."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+            self._client = httpx.Client(headers=headers, timeout=httpx.Timeout(
+                self.run_timeout, connect=CONNECT_TIMEOUT))
+            self._pid = pid
+        self.check_workers()
+        self._thread = threading.Thread(target=self._heartbeat, name="sandbox-heartbeat", daemon=True)
+        self._thread.start()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            self.check_workers()
+
+    def check_workers(self):
+        """Poll every agent's /health once."""
+        self._ensure_started()
+        for worker in self.workers:
+            try:
+                response = self._client.get(f"{worker.url}/health", timeout=CONNECT_TIMEOUT)
+                response.raise_for_status()
+                info = response.json()
+            except Exception:
+                with self._lock:
+                    if worker.healthy:
+                        print(f"Warning: sandbox worker {worker.url} is not responding")
+                    worker.healthy = False
+                    worker.failures += 1
+                continue
+            with self._lock:
+                worker.healthy = True
+                worker.draining = bool(info.get("draining"))
+                worker.capacity = max(1, int(info.get("capacity", 1)))
+                worker.cpus = max(1, int(info.get("cpus", 1)))
+                worker.reported_running = int(info.get("running", 0))
+                worker.warm = set(info.get("warm", []))
+                worker.last_seen = time.monotonic()
+
+    def close(self):
+        self._stop.set()
+        if self._client is not None:
+            self._client.close()
+
+    # Placement
+
+    def _pick(self, language: str, tried: set) -> Optional[WorkerState]:
+        """Least loaded usable agent, preferring one warm for the language."""
+        with self._lock:
+            candidates = [w for w in self.workers
+                          if w.healthy and not w.draining and w.url not in tried]
+            if not candidates:
+                return None
+            worker = min(candidates, key=lambda w: (w.load(), language not in w.warm))
+            worker.outstanding += 1
+            return worker
+
+    def capacity(self) -> int:
+        """Total job slots on usable agents."""
+        with self._lock:
+            return max(1, sum(w.capacity for w in self.workers if w.healthy and not w.draining))
+
+    def run_code(self, language, code, stdin_data="", container_name=None, expected_output=None, compare=None):
+        """
+        Run code on a remote agent (same contract as DockerSandboxRunner.run_code).
+
+        Returns:
+            dict with keys: success, output, error (and check, when expected_output is given)
+        """
+        name = container_name or f"coding-tutor-{os.getpid()}-{time.monotonic_ns()}"
+        payload = {"name": name, "language": language, "code": code, "stdin": stdin_data}
+        if expected_output is not None:
+            payload.update(expected_output=expected_output, compare=compare)
+        return self._place(payload)
+
+    def profile_code(self, language, code, inputs, budget, container_name=None):
+        """
+        Profile code on a remote agent (same contract as DockerSandboxRunner.profile_code).
+
+        Returns:
+            dict with keys: success, error, sizes, stopped
+        """
+        name = container_name or f"coding-tutor-{os.getpid()}-{time.monotonic_ns()}"
+        result = self._place({"name": name, "language": language, "code": code,
+                              "profile": {"inputs": [[n, stdin_data] for n, stdin_data in inputs],
+                                          "budget": budget}})
+        result.setdefault("sizes", [])
+        result.setdefault("stopped", None if result.get("success") else "error")
+        return result
+
+    def _place(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a job to the least loaded agent, retrying elsewhere if the agent is lost."""
+        self._ensure_started()
+        name = payload["name"]
+        language = payload["language"]
+        tried = set()
+        failures = 0
+        while failures < self.attempts:
+            worker = self._pick(language, tried)
+            if worker is None:
+                break
+            if tried:
+                self.retries += 1
+            tried.add(worker.url)
+            self._jobs[name] = worker
+            try:
+                with tracing.span("remote_run"):
+                    response = self._client.post(f"{worker.url}/run", json=payload)
+                if response.status_code == 503:
+                    # Draining or full (another API worker filled it): the heartbeat
+                    # will catch up, place elsewhere now; this does not use an attempt
+                    if "draining" in response.text:
+                        with self._lock:
+                            worker.draining = True
+                    continue
+                response.raise_for_status()
+                with self._lock:
+                    worker.warm.add(language)
+                self.completed += 1
+                result = response.json()
+                # Container start / compile / execute as measured on the agent
+                for phase, seconds in (result.pop("phases", None) or {}).items():
+                    tracing.record(phase, seconds)
+                return result
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                # Agent unreachable, so the job never started: try another one
+                failures += 1
+                with self._lock:
+                    worker.healthy = False
+                    worker.failures += 1
+                print(f"Warning: sandbox worker {worker.url} failed ({type(e).__name__}); retrying elsewhere")
+            except httpx.ReadTimeout:
+                # The agent has the job but no result came back in time: stop it, do not re-run it
+                self.kill(name)
+                return {"success": False, "error": f"Execution timed out after {self.run_timeout:.0f} seconds "
+                                                   "waiting for the sandbox worker."}
+            except httpx.TransportError as e:
+                # Connection dropped mid-run; the heartbeat decides whether the agent is still usable
+                print(f"Warning: sandbox worker {worker.url} failed during a run ({type(e).__name__})")
+                return {"success": False, "error": MSG_LOST}
+            except httpx.HTTPStatusError as e:
+                return {"success": False, "error": f"Sandbox worker error: HTTP {e.response.status_code}"}
+            finally:
+                self._jobs.pop(name, None)
+                with self._lock:
+                    worker.outstanding -= 1
+        return {"success": False, "error": MSG_NO_WORKERS}
+
+    def kill(self, container_name):
+        """Stop a run on whichever agent is executing it."""
+        worker = self._jobs.get(container_name)
+        if worker is None:
+            return
+        try:
+            self._client.post(f"{worker.url}/kill", json={"name": container_name}, timeout=CONNECT_TIMEOUT * 5)
+        except Exception as e:
+            print(f"Warning: could not stop {container_name} on {worker.url}: {e}")
+
+    def drain(self, url: str) -> bool:
+        """Stop placing jobs on an agent and tell it to refuse new ones."""
+        self._ensure_started()
+        for worker in self.workers:
+            if worker.url == url.rstrip("/"):
+                with self._lock:
+                    worker.draining = True
+                try:
+                    self._client.post(f"{worker.url}/drain", timeout=CONNECT_TIMEOUT)
+                except Exception as e:
+                    print(f"Warning: could not reach {worker.url} to drain it: {e}")
+                return True
+        return False
+
+    def healthy_workers(self) -> int:
+        with self._lock:
+            return sum(1 for w in self.workers if w.healthy and not w.draining)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get placement statistics."""
+        with self._lock:
+            return {
+                "workers": [w.to_dict() for w in self.workers],
+                "completed": self.completed,
+                "retries": self.retries,
+            }
@@ -0,0 +1,203 @@
+"""
+Sandbox Agent
+Worker process run on each sandbox host; executes jobs sent by the API server.
+
+The API server (services/remote_executor.py) places runs on agents over
+HTTP. Each agent runs them with its local DockerSandboxRunner, at most
+--capacity at once, and reports its load and warm languages at /health
+for heartbeats and placement.
+
+Endpoints:
+    GET  /health  load, capacity, CPUs, warm languages, draining flag
+    POST /run     {name, language, code, stdin[, expected_output, compare]}
+                  or {name, language, code, profile: {inputs, budget}}
+                  -> runner result, plus the
+                  run's phase timings (container start, compile, execute)
+    POST /kill    {name} stops a running job
+    POST /drain   stop accepting jobs; running jobs finish
+
+Requests must carry `Authorization: Bearer $SANDBOX_AGENT_TOKEN` when the
+token is set. The agent listens on 127.0.0.1 by default and refuses to
+listen on any other address without a token. A draining (or full) agent answers /run with 503 and the API
+server places the job elsewhere.
+
+Usage (from backend/ on the sandbox host):
+    SANDBOX_AGENT_TOKEN=... python -m services.sandbox_agent --host 0.0.0.0 --port 9100 --capacity 4
+"""
+
+import os
+import sys
+import hmac
+import time
+import argparse
+import importlib
+import ipaddress
+import threading
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Header
+from pydantic import BaseModel
+
+from stats import tracing
+
+# Configuration
+SANDBOX_AGENT_TOKEN = os.environ.get("SANDBOX_AGENT_TOKEN", "")
+SANDBOX_AGENT_CAPACITY = int(os.environ.get("SANDBOX_AGENT_CAPACITY", str(max(1, (os.cpu_count() or 2) // 2))))
+# A language counts as warm (image layers and compiler cached) this long after a run
+WARM_TTL = 300.0
+
+
+class RunJob(BaseModel):
+    """A run placed on this agent."""
+    name: str
+    language: str
+    code: str
+    stdin: str = ""
+    # Grading runs: stop the program at the first difference from this output
+    expected_output: Optional[str] = None
+    compare: Optional[Dict[str, Any]] = None
+    # Performance profiles: {"inputs": [[n, stdin], ...], "budget": seconds}
+    profile: Optional[Dict[str, Any]] = None
+
+
+class KillJob(BaseModel):
+    """A run to stop."""
+    name: str
+
+
+class Agent:
+    """Runs jobs on the local runner and tracks load."""
+
+    def __init__(self, runner, capacity: int = SANDBOX_AGENT_CAPACITY):
+        self.runner = runner
+        self.capacity = max(1, capacity)
+        self.running: Dict[str, str] = {}  # job name -> language
+        self.warm: Dict[str, float] = {}   # language -> last run
+        self.draining = False
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def health(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "status": "draining" if self.draining else "ok",
+                "running": len(self.running),
+                "capacity": self.capacity,
+                "cpus": os.cpu_count() or 1,
+                "draining": self.draining,
+                "warm": sorted(lang for lang, at in self.warm.items() if now - at < WARM_TTL),
+                "completed": self.completed,
+            }
+
+    def run(self, job: RunJob) -> Dict[str, Any]:
+        with self._lock:
+            if self.draining:
+                raise HTTPException(status_code=503, detail="draining")
+            if len(self.running) >= self.capacity:
+                raise HTTPException(status_code=503, detail="busy")
+            self.running[job.name] = job.language
+        try:
+            check = {}
+            if job.expected_output is not None:
+                check = {"expected_output": job.expected_output, "compare": job.compare}
+            with tracing.collect() as trace:
+                if job.profile is not None:
+                    result = self.runner.profile_code(job.language, job.code,
+                                                      [tuple(i) for i in job.profile["inputs"]],
+                                                      job.profile["budget"], container_name=job.name)
+                else:
+                    result = self.runner.run_code(job.language, job.code, job.stdin, container_name=job.name,
+                                                  **check)
+            # Recorded into the API server's request trace (see RemoteSandboxRunner)
+            return dict(result, phases=trace.breakdown())
+        finally:
+            with self._lock:
+                self.running.pop(job.name, None)
+                self.warm[job.language] = time.monotonic()
+                self.completed += 1
+
+    def kill(self, name: str) -> bool:
+        with self._lock:
+            if name not in self.running:
+                return False
+        self.runner.kill(name)
+        return True
+
+
+def create_app(runner, capacity: int = SANDBOX_AGENT_CAPACITY, token: str = SANDBOX_AGENT_TOKEN) -> FastAPI:
+    """FastAPI app serving one Agent."""
+    agent = Agent(runner, capacity)
+    app = FastAPI(title="Sandbox Agent")
+    app.state.agent = agent
+
+    def check(authorization: Optional[str]):
+        # Constant-time comparison: the token must not leak through response timing
+        if token and not hmac.compare_digest((authorization or "").encode("utf-8"),
+                                             f"Bearer {token}".encode("utf-8")):
+            raise HTTPException(status_code=401, detail="invalid token")
+
+    # Plain (sync) handlers run in the threadpool, one thread per running job
+    @app.get("/health")
+    def health(authorization: Optional[str] = Header(None)):
+        check(authorization)
+        return agent.health()
+
+    @app.post("/run")
+    def run(job: RunJob, authorization: Optional[str] = Header(None)):
+        check(authorization)
+        return agent.run(job)
+
+    @app.post("/kill")
+    def kill(job: KillJob, authorization: Optional[str] = Header(None)):
+        check(authorization)
+        return {"killed": agent.kill(job.name)}
+
+    @app.post("/drain")
+    def drain(authorization: Optional[str] = Header(None)):
+        check(authorization)
+        agent.draining = True
+        return agent.health()
+
+    return app
+
+
+def load_runner(spec: str):
+    """Instantiate a runner from 'module:Class'."""
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sandbox worker agent")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Address to listen on; anything but loopback requires SANDBOX_AGENT_TOKEN")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--capacity", type=int, default=SANDBOX_AGENT_CAPACITY)
+    parser.add_argument("--runner", default="services.sandbox_runner:DockerSandboxRunner",
+                        help="Runner class as module:Class")
+    args = parser.parse_args()
+    if not SANDBOX_AGENT_TOKEN and not is_loopback(args.host):
+        # Anyone who can reach the port could run code on this host
+        parser.error(f"refusing to listen on {args.host} without SANDBOX_AGENT_TOKEN")
+
+    import uvicorn
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app = create_app(load_runner(args.runner), args.capacity)
+    # Let running jobs finish (the sandbox timeout is 120s) on shutdown
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning",
+                timeout_graceful_shutdown=180)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,197 @@ Non-interactive execution model: stdin is closed immediately to prevent hanging.
 """
 
 import subprocess
+import threading
 import tempfile
+import codecs
 import shutil
+import time
+import uuid
+import json
 import os
 
+from stats import tracing
+from .output_checker import checker_for, describe
+
+# Prefix of the timestamp lines the sandbox shell writes to stderr
+PHASE_MARKER = "__coding_tutor_phase__"
+# Times the program on each input of a performance profile (runs in the container)
+PROFILE_DRIVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profile_driver.py")
+
+
+def _phase_mark(name):
+    """Shell command writing '<marker> <name> <epoch ns>' to stderr."""
+    return f"printf '{PHASE_MARKER} {name} %s\\n' \"$(date +%s%N)\" >&2"
+
+
+def _record_phases(stderr, launched_ns, ended_ns):
+    """
+    Turn the sandbox's timestamp lines into trace phases.
+
+    Returns:
+        stderr without the timestamp lines
+    """
+    marks = {}
+    lines = []
+    for line in stderr.splitlines(keepends=True):
+        if line.startswith(PHASE_MARKER):
+            parts = line.split()
+            if len(parts) == 3 and parts[2].isdigit():
+                marks[parts[1]] = int(parts[2])
+            continue
+        lines.append(line)
+    started = marks.get("started")
+    # Container and host share a clock on Linux; a skewed VM clock is ignored
+    if started is None or not launched_ns <= started <= ended_ns:
+        tracing.record("docker_run", (ended_ns - launched_ns) / 1e9)
+    else:
+        compiled = marks.get("compiled")
+        tracing.record("container_start", (started - launched_ns) / 1e9)
+        if compiled is not None and started <= compiled <= ended_ns:
+            tracing.record("compile", (compiled - started) / 1e9)
+            started = compiled
+        tracing.record("execute", (ended_ns - started) / 1e9)
+    return "".join(lines)
+
+
+def _commands(language, code):
+    """
+    How a submission is built and run in the sandbox.
+
+    Returns:
+        (filename, code, compile_cmd or None, exec_cmd), or None for an unsupported language
+    """
+    if language == "python":
+        return "main.py", code, None, "python3 -u /sandbox/main.py"
+    if language == "c":
+        return "main.c", code, "gcc /sandbox/main.c -o /sandbox/a.out", "/sandbox/a.out"
+    if language == "cpp":
+        return "main.cpp", code, "g++ /sandbox/main.cpp -o /sandbox/a.out", "/sandbox/a.out"
+    if language == "java":
+        if 'public class Main' not in code and 'class Main' not in code:
+            if 'public class' not in code:
+                code = f'public class Main {{\n    public static void main(String[] args) {{\n        {code}\n    }}\n}}'
+        return "Main.java", code, "javac /sandbox/Main.java", "java -cp /sandbox Main"
+    return None
+
+
+def _stream_output(cmd, stdin_data, checker, stop, timeout):
+    """
+    Run cmd, feeding its stdout to checker as it arrives.
+
+    Calls stop() and returns as soon as the checker reports a difference,
+    so a wrong program does not keep its sandbox slot.
+
+    Returns:
+        (returncode, stdout, stderr, stopped_early)
+
+    Raises:
+        subprocess.TimeoutExpired: The command ran longer than timeout
+    """
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr_chunks = []
+
+    def write_stdin():
+        try:
+            if stdin_data:
+                proc.stdin.write(stdin_data.encode("utf-8"))
+            proc.stdin.close()
+        except OSError:
+            pass  # the program exited (or was stopped) without reading its input
+
+    def read_stderr():
+        stderr_chunks.append(proc.stderr.read())
+
+    threads = [threading.Thread(target=write_stdin, daemon=True), threading.Thread(target=read_stderr, daemon=True)]
+    for t in threads:
+        t.start()
+    timed_out = threading.Event()
+
+    def halt():
+        stop()
+        try:
+            proc.kill()
+        except OSError:
+            pass
+
+    def expire():
+        timed_out.set()
+        halt()
+
+    timer = threading.Timer(timeout, expire)
+    timer.daemon = True
+    timer.start()
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    stdout = []
+    stopped = False
+    try:
+        while True:
+            chunk = os.read(proc.stdout.fileno(), 65536)
+            text = decoder.decode(chunk, final=not chunk)
+            stdout.append(text)
+            if not chunk:
+                checker.feed(text)
+                break
+            if checker.feed(text) is not None:
+                stopped = True
+                halt()
+                break
+    finally:
+        timer.cancel()
+        proc.stdout.close()
+        proc.wait()
+        for t in threads:
+            t.join(timeout=5)
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    if not stopped:
+        checker.finish()
+    stderr = b"".join(stderr_chunks).decode("utf-8", errors="replace")
+    return proc.returncode, "".join(stdout).replace("\r\n", "\n"), stderr.replace("\r\n", "\n"), stopped
+
+
+def _profile_result(returncode, stdout, stderr):
+    """
+    Turn the profile driver's output into a runner result.
+
+    Returns:
+        dict with keys: success, error, sizes (one measurement per input run),
+        stopped (None, "over_budget" or "error"), memory_floor_kb (see profile_driver)
+    """
+    sizes = []
+    floor = None
+    for line in stdout.splitlines():
+        line = line.strip()
+        if not line.startswith("{"):
+            continue
+        try:
+            measurement = json.loads(line)
+        except ValueError:
+            continue
+        if "n" in measurement:
+            sizes.append(measurement)
+        else:
+            floor = measurement.get("memory_floor_kb")
+    error = ""
+    stopped = None
+    if not sizes:
+        # Nothing ran: the program did not compile (or the driver failed)
+        error = stderr.strip() or f"Program exited with error code {returncode}"
+        if returncode != 0:
+            error = f"Compilation Error: {error}"
+        return {"success": False, "error": error, "sizes": [], "stopped": "error", "memory_floor_kb": floor}
+    last = sizes[-1]
+    if last["over_budget"]:
+        stopped = "over_budget"
+        error = f"Time limit exceeded at n={last['n']} (over {last['seconds']:g} s)"
+    elif last["exit_code"] != 0:
+        stopped = "error"
+        detail = (last.pop("error", "") or "").strip()
+        error = f"Runtime Error at n={last['n']} (Exit code {last['exit_code']})" + (f": {detail}" if detail else "")
+    return {"success": stopped is None, "error": error, "sizes": sizes, "stopped": stopped,
+            "memory_floor_kb": floor}
+
 
 class DockerSandboxRunner:
     """Execute code in isolated Docker containers using Docker CLI."""
@@ -33,7 +220,7 @@ class DockerSandboxRunner:
         except Exception as e:
             raise RuntimeError(f"Docker CLI check failed: {str(e)}")
 
-    def run_code(self, language, code, stdin_data=""):
+    def run_code(self, language, code, stdin_data="", container_name=None, expected_output=None, compare=None):
         """
         Execute code in Docker container using Docker CLI.
         Non-interactive execution model: stdin is preloaded before execution starts.
@@ -49,48 +236,38 @@ class DockerSandboxRunner:
             code: Source code to execute
             stdin_data: Input data to preload into stdin (optional, defaults to empty)
                        If provided, this data is available immediately when program reads
+            container_name: Optional container name, so the run can be stopped with kill()
+            expected_output: Optional expected stdout; the output is checked while the
+                       program runs and the program is stopped at the first difference
+            compare: The exercise's comparison rules for expected_output (see output_checker)
         
         Returns:
-            dict with keys: success, output, error
+            dict with keys: success, output, error (and check, when expected_output is given)
         """
+        prepare_started = time.perf_counter()
+        checker = checker_for(expected_output, compare) if expected_output is not None else None
+        stopped = False
+        if checker is not None and not container_name:
+            container_name = f"coding-tutor-{uuid.uuid4().hex[:12]}"  # so it can be stopped early
         temp_dir = tempfile.mkdtemp(prefix="coding_tutor_")
         try:
-            if language == "python":
-                filename = "main.py"
-                if stdin_data:
-                    run_cmd = f"python3 -u /sandbox/main.py << 'EOF'\n{stdin_data}\nEOF"
-                else:
-                    run_cmd = "python3 -u /sandbox/main.py < /dev/null"
-
-            elif language == "c":
-                filename = "main.c"
-                if stdin_data:
-                    run_cmd = f"gcc /sandbox/main.c -o /sandbox/a.out && /sandbox/a.out << 'EOF'\n{stdin_data}\nEOF"
-                else:
-                    run_cmd = "gcc /sandbox/main.c -o /sandbox/a.out && /sandbox/a.out < /dev/null"
-
-            elif language == "cpp":
-                filename = "main.cpp"
-                if stdin_data:
-                    run_cmd = f"g++ /sandbox/main.cpp -o /sandbox/a.out && /sandbox/a.out << 'EOF'\n{stdin_data}\nEOF"
-                else:
-                    run_cmd = "g++ /sandbox/main.cpp -o /sandbox/a.out && /sandbox/a.out < /dev/null"
-
-            elif language == "java":
-                filename = "Main.java"
-                if 'public class Main' not in code and 'class Main' not in code:
-                    if 'public class' not in code:
-                        code = f'public class Main {{\n    public static void main(String[] args) {{\n        {code}\n    }}\n}}'
-                if stdin_data:
-                    run_cmd = f"javac /sandbox/Main.java && java -cp /sandbox Main << 'EOF'\n{stdin_data}\nEOF"
-                else:
-                    run_cmd = "javac /sandbox/Main.java && java -cp /sandbox Main < /dev/null"
+            command = _commands(language, code)
+            if command is None:
+                return {"success": False, "error": "Unsupported language"}
+            filename, code, compile_cmd, exec_cmd = command
 
+            if stdin_data:
+                run_cmd = f"{exec_cmd} << 'EOF'\n{stdin_data}\nEOF"
             else:
-                return {"success": False, "error": "Unsupported language"}
+                run_cmd = f"{exec_cmd} < /dev/null"
+            if compile_cmd:
+                run_cmd = f"{compile_cmd} && {_phase_mark('compiled')} && {run_cmd}"
+            # Timestamps on stderr split container start, compile and run (see _record_phases)
+            run_cmd = f"{_phase_mark('started')}; {run_cmd}"
 
             with open(os.path.join(temp_dir, filename), "w", encoding="utf-8") as f:
                 f.write(code)
+            tracing.record("sandbox_prepare", time.perf_counter() - prepare_started)
 
             # Docker execution configuration
             # Use -i (interactive) only when stdin_data is provided
@@ -98,6 +275,8 @@ class DockerSandboxRunner:
             docker_base_cmd = ["docker", "run", "--rm"]
             if stdin_data:
                 docker_base_cmd.append("-i")  # Interactive mode for stdin injection
+            if container_name:
+                docker_base_cmd.extend(["--name", container_name])
             docker_base_cmd.extend([
                 "--network", "none",
                 "--memory", "128m",
@@ -109,19 +288,36 @@ class DockerSandboxRunner:
 
             # Execute in non-interactive Docker container
             # stdin_data is injected via subprocess input parameter (not TTY)
-            result = subprocess.run(
-                docker_base_cmd,
-                input=stdin_data if stdin_data else "",  # Preload stdin data before execution
-                capture_output=True,
-                text=True,
-                timeout=self.TIMEOUT,
-                encoding='utf-8',
-                errors='replace'
-            )
+            launched_ns = time.time_ns()
+            if checker is None:
+                result = subprocess.run(
+                    docker_base_cmd,
+                    input=stdin_data if stdin_data else "",  # Preload stdin data before execution
+                    capture_output=True,
+                    text=True,
+                    timeout=self.TIMEOUT,
+                    encoding='utf-8',
+                    errors='replace'
+                )
+            else:
+                # Compare stdout as it is produced; stop the container at the first difference
+                returncode, stdout, stderr, stopped = _stream_output(
+                    docker_base_cmd, stdin_data, checker, lambda: self.kill(container_name), self.TIMEOUT)
+                result = subprocess.CompletedProcess(docker_base_cmd, returncode, stdout, stderr)
+
+            stderr = _record_phases(result.stderr or "", launched_ns, time.time_ns())
+            
+            if stopped:
+                return {
+                    "success": False,
+                    "output": result.stdout.strip(),
+                    "error": f"Wrong Answer: {describe(checker.difference)}",
+                    "check": self._check_report(checker, stopped)
+                }
 
             # Combine stdout and stderr for error messages
             output = result.stdout.strip() if result.stdout else ""
-            error = result.stderr.strip() if result.stderr else ""
+            error = stderr.strip()
             
             # Check for input-related issues in non-interactive environment
             # Programs that wait for input will timeout or get EOF
@@ -154,11 +350,14 @@ class DockerSandboxRunner:
                     else:
                         error = f"Program exited with error code {result.returncode}"
 
-            return {
+            response = {
                 "success": result.returncode == 0,
                 "output": output,
                 "error": error
             }
+            if checker is not None:
+                response["check"] = self._check_report(checker, stopped)
+            return response
 
         except subprocess.TimeoutExpired:
             # Check if program might be waiting for input
@@ -170,4 +369,100 @@ class DockerSandboxRunner:
             return {"success": False, "error": str(e)}
 
         finally:
-            shutil.rmtree(temp_dir, ignore_errors=True)
\ No newline at end of file
+            with tracing.span("sandbox_cleanup"):
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def profile_code(self, language, code, inputs, budget, container_name=None):
+        """
+        Time the program on a series of growing inputs in one container.
+
+        The program is compiled once; each input is then run by the profile
+        driver, which measures wall time and peak memory and stops at the
+        first input over the time budget.
+
+        Args:
+            language: One of 'python', 'c', 'cpp', 'java'
+            code: Source code to profile
+            inputs: [(n, stdin_data)] in increasing n
+            budget: Seconds allowed per input
+            container_name: Optional container name, so the run can be stopped with kill()
+
+        Returns:
+            dict with keys: success, error, sizes, stopped (see _profile_result)
+        """
+        prepare_started = time.perf_counter()
+        temp_dir = tempfile.mkdtemp(prefix="coding_tutor_")
+        try:
+            command = _commands(language, code)
+            if command is None:
+                return {"success": False, "error": "Unsupported language", "sizes": [], "stopped": "error"}
+            filename, code, compile_cmd, exec_cmd = command
+
+            with open(os.path.join(temp_dir, filename), "w", encoding="utf-8") as f:
+                f.write(code)
+            shutil.copy(PROFILE_DRIVER, os.path.join(temp_dir, "profile_driver.py"))
+            args = []
+            for i, (n, stdin_data) in enumerate(inputs, 1):
+                with open(os.path.join(temp_dir, f"input_{i}.txt"), "w", encoding="utf-8") as f:
+                    f.write(stdin_data)
+                args += [str(int(n)), f"/sandbox/input_{i}.txt"]
+            run_cmd = f"python3 /sandbox/profile_driver.py {float(budget)} {' '.join(args)} -- {exec_cmd}"
+            if compile_cmd:
+                run_cmd = f"{compile_cmd} && {_phase_mark('compiled')} && {run_cmd}"
+            run_cmd = f"{_phase_mark('started')}; {run_cmd}"
+            tracing.record("sandbox_prepare", time.perf_counter() - prepare_started)
+
+            docker_cmd = ["docker", "run", "--rm"]
+            if container_name:
+                docker_cmd.extend(["--name", container_name])
+            docker_cmd.extend([
+                "--network", "none",
+                "--memory", "128m",
+                "--cpus", "0.5",
+                "-v", f"{temp_dir}:/sandbox",
+                self.SANDBOX_IMAGE,
+                "sh", "-c", run_cmd
+            ])
+            launched_ns = time.time_ns()
+            result = subprocess.run(
+                docker_cmd,
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+                timeout=self.TIMEOUT,
+                encoding='utf-8',
+                errors='replace'
+            )
+            stderr = _record_phases(result.stderr or "", launched_ns, time.time_ns())
+            return _profile_result(result.returncode, result.stdout or "", stderr)
+
+        except subprocess.TimeoutExpired:
+            return {"success": False, "error": f"Profiling timed out after {self.TIMEOUT} seconds.",
+                    "sizes": [], "stopped": "error"}
+
+        except Exception as e:
+            return {"success": False, "error": str(e), "sizes": [], "stopped": "error"}
+
+        finally:
+            with tracing.span("sandbox_cleanup"):
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    @staticmethod
+    def _check_report(checker, stopped):
+        """Outcome of comparing the output with the expected output."""
+        return {
+            "passed": checker.difference is None,
+            "stopped_early": stopped,
+            "first_difference": checker.difference
+        }
+
+    def kill(self, container_name):
+        """Stop and remove a running container started with container_name."""
+        try:
+            subprocess.run(
+                ["docker", "rm", "-f", container_name],
+                capture_output=True,
+                timeout=10
+            )
+        except Exception as e:
+            print(f"Warning: could not stop container {container_name}: {e}")
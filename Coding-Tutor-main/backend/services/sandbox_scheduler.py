@@ -0,0 +1,301 @@
+"""
+Sandbox Scheduler
+Fair sharing of sandbox executions between clients (students).
+
+- At most SANDBOX_MAX_CONCURRENCY runs execute at once. Waiting runs are
+  queued per client and slots are handed out round-robin across clients, so
+  one client with many submissions cannot starve the others.
+- Each client has a token bucket (SANDBOX_CLIENT_RATE runs per second,
+  bursts of SANDBOX_CLIENT_BURST) and at most SANDBOX_CLIENT_MAX_IN_FLIGHT
+  runs executing at once. Submissions over the rate are rejected with a
+  retry-after instead of queueing.
+- A new submission supersedes the client's earlier ones from the same
+  session (e.g. app window): queued runs are dropped and running ones are
+  killed (SandboxCancelled), since the student only looks at the latest
+  result. Sessions only scope superseding; limits apply per client.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import contextvars
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from stats import tracing
+
+# Configuration
+SANDBOX_MAX_CONCURRENCY = int(os.environ.get("SANDBOX_MAX_CONCURRENCY", str(max(1, (os.cpu_count() or 2) // 2))))
+SANDBOX_CLIENT_RATE = float(os.environ.get("SANDBOX_CLIENT_RATE", "0.5"))
+SANDBOX_CLIENT_BURST = int(os.environ.get("SANDBOX_CLIENT_BURST", "5"))
+SANDBOX_CLIENT_MAX_IN_FLIGHT = int(os.environ.get("SANDBOX_CLIENT_MAX_IN_FLIGHT", "1"))
+# Seconds a run may wait for a slot before it is rejected
+SANDBOX_QUEUE_TIMEOUT = float(os.environ.get("SANDBOX_QUEUE_TIMEOUT", "60"))
+# Idle clients kept before their state is pruned
+MAX_IDLE_CLIENTS = 10000
+
+
+class SandboxRejected(Exception):
+    """The run was not admitted (rate limit or queue timeout)."""
+
+    def __init__(self, reason: str, retry_after: float = 0.0):
+        super().__init__(f"Sandbox run rejected ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class SandboxCancelled(Exception):
+    """The run was superseded by a newer submission from the same client."""
+
+
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> bool:
+        self._refill(time.monotonic())
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        """Seconds until the next token."""
+        if self.rate <= 0:
+            return float("inf")
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+class _Job:
+    __slots__ = ("client", "session", "fn", "kill", "name", "future", "queued_at", "cancelled", "context")
+
+    def __init__(self, client, session, fn, kill, future):
+        self.client = client
+        self.session = session
+        self.fn = fn
+        self.kill = kill
+        self.name = f"coding-tutor-{uuid.uuid4().hex[:12]}"
+        self.future = future
+        self.queued_at = time.monotonic()
+        self.cancelled = False
+        # The submitter's context (request trace), whichever request dispatches the job
+        self.context = contextvars.copy_context()
+
+
+class _Client:
+    __slots__ = ("bucket", "queue", "running")
+
+    def __init__(self, rate, burst):
+        self.bucket = TokenBucket(rate, burst)
+        self.queue = deque()
+        self.running = set()
+
+
+class SandboxScheduler:
+    """Per-client fair queue in front of the sandbox runner."""
+
+    def __init__(self, max_concurrency: int = SANDBOX_MAX_CONCURRENCY, rate: float = SANDBOX_CLIENT_RATE,
+                 burst: int = SANDBOX_CLIENT_BURST, max_in_flight: int = SANDBOX_CLIENT_MAX_IN_FLIGHT,
+                 queue_timeout: float = SANDBOX_QUEUE_TIMEOUT):
+        """
+        Initialize SandboxScheduler.
+
+        Args:
+            max_concurrency: Runs allowed to execute at once (all clients)
+            rate: Runs per second each client may submit, on average
+            burst: Runs a client may submit back to back
+            max_in_flight: Runs one client may have executing at once
+            queue_timeout: Seconds a run may wait for a slot
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max(1, max_in_flight)
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self._clients: Dict[str, _Client] = {}
+        # Clients with queued runs, in round-robin order
+        self._ring = deque()
+        self._tasks = set()
+
+        self.completed = 0
+        self.cancelled = 0
+        self.rejected = {"rate_limited": 0, "queue_timeout": 0}
+        self.wait_observer: Optional[Callable[[float], None]] = None
+        # Overrides max_concurrency when set (e.g. slots on remote sandbox hosts)
+        self.capacity_fn: Optional[Callable[[], int]] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(self._clients[c].queue) for c in self._ring)
+
+    def _client(self, client_id: str) -> _Client:
+        client = self._clients.get(client_id)
+        if client is None:
+            if len(self._clients) >= MAX_IDLE_CLIENTS:
+                self._prune()
+            client = self._clients[client_id] = _Client(self.rate, self.burst)
+        return client
+
+    def _prune(self):
+        for cid in [cid for cid, c in self._clients.items()
+                    if not c.queue and not c.running and c.bucket.full()]:
+            del self._clients[cid]
+
+    def _cancel(self, job: _Job):
+        job.cancelled = True
+        self.cancelled += 1
+        if not job.future.done():
+            job.future.set_exception(SandboxCancelled("Superseded by a newer run"))
+
+    def _supersede(self, client: _Client, session: Optional[str]):
+        """Drop the session's queued runs and kill its running ones."""
+        for job in [j for j in client.queue if j.session == session]:
+            client.queue.remove(job)
+            self._cancel(job)
+        for job in list(client.running):
+            if job.session == session and not job.cancelled:
+                self._cancel(job)
+                if job.kill is not None:
+                    asyncio.get_running_loop().run_in_executor(None, job.kill, job.name)
+
+    def _next_job(self) -> Optional[_Job]:
+        """Next runnable job, taking clients in round-robin order."""
+        for _ in range(len(self._ring)):
+            cid = self._ring[0]
+            self._ring.rotate(-1)
+            client = self._clients[cid]
+            if not client.queue:
+                self._ring.remove(cid)
+                continue
+            if len(client.running) >= self.max_in_flight:
+                continue
+            job = client.queue.popleft()
+            if not client.queue:
+                self._ring.remove(cid)
+            return job
+        return None
+
+    def _capacity(self) -> int:
+        if self.capacity_fn is not None:
+            return max(1, self.capacity_fn())
+        return self.max_concurrency
+
+    def _dispatch(self):
+        while self.running < self._capacity():
+            job = self._next_job()
+            if job is None:
+                return
+            self.running += 1
+            self._clients[job.client].running.add(job)
+            waited = time.monotonic() - job.queued_at
+            job.context.run(tracing.record, "sandbox_queue", waited)
+            if self.wait_observer:
+                self.wait_observer(waited)
+            task = asyncio.ensure_future(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, job: _Job):
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(None, job.context.run, job.fn, job.name)
+            if not job.future.done():
+                job.future.set_result(result)
+        except BaseException as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            client = self._clients.get(job.client)
+            if client is not None:
+                client.running.discard(job)
+            self._dispatch()
+
+    def _withdraw(self, job: _Job):
+        """Remove a job whose caller gave up; kill it if it already started."""
+        client = self._clients.get(job.client)
+        if client is None:
+            return
+        if job in client.queue:
+            client.queue.remove(job)
+            if not client.queue and job.client in self._ring:
+                self._ring.remove(job.client)
+        elif job in client.running and not job.cancelled:
+            job.cancelled = True
+            job.future.cancel()
+            if job.kill is not None:
+                asyncio.get_running_loop().run_in_executor(None, job.kill, job.name)
+
+    async def submit(self, client_id: str, fn: Callable[[str], Any],
+                     kill: Optional[Callable[[str], Any]] = None, session: Optional[str] = None) -> Any:
+        """
+        Run fn(name) in a fair share of the sandbox slots.
+
+        Args:
+            client_id: Who submitted the run (the peer IP; something the
+                client cannot choose, since rate limits and fairness use it)
+            fn: Blocking call executing the run; `name` identifies the run
+                (e.g. the container name)
+            kill: Optional blocking call stopping a running fn by name
+            session: Client-supplied session (e.g. app window); a new run
+                supersedes only the same session's earlier runs
+
+        Returns:
+            Whatever fn returns
+
+        Raises:
+            SandboxRejected: Over the client's rate, or no slot within the queue timeout
+            SandboxCancelled: A newer submission from the same session superseded this one
+        """
+        client = self._client(client_id)
+        if not client.bucket.take():
+            self.rejected["rate_limited"] += 1
+            raise SandboxRejected("rate_limited", client.bucket.retry_after())
+        self._supersede(client, session)
+
+        job = _Job(client_id, session, fn, kill, asyncio.get_running_loop().create_future())
+        client.queue.append(job)
+        if client_id not in self._ring:
+            self._ring.append(client_id)
+        self._dispatch()
+
+        try:
+            if job in client.queue:
+                try:
+                    await asyncio.wait_for(asyncio.shield(job.future), self.queue_timeout)
+                except asyncio.TimeoutError:
+                    if job in client.queue:
+                        self._withdraw(job)
+                        self.rejected["queue_timeout"] += 1
+                        raise SandboxRejected("queue_timeout", self.queue_timeout)
+            return await job.future
+        except asyncio.CancelledError:
+            # Caller went away (e.g. the HTTP client disconnected)
+            self._withdraw(job)
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics."""
+        return {
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "clients_waiting": len(self._ring),
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "rejected": dict(self.rejected),
+        }
@@ -1,5 +1,6 @@
 """Statistics module."""
 from .stats_manager import StatsManager
+from . import metrics, tracing
 
-__all__ = ['StatsManager']
+__all__ = ['StatsManager', 'metrics', 'tracing']
 
@@ -0,0 +1,191 @@
+"""
+Metrics Registry
+In-process counters, gauges and histograms exported in Prometheus text format.
+
+Only aggregate numbers are kept (no code, input or error text), in line
+with StatsManager. Served by GET /metrics.
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds: 5 ms .. 2 min
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, str]) -> LabelKey:
+    return tuple((name, str(labels.get(name, ""))) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _Scalar(_Metric):
+    """Single value per label set, optionally read from a callback at export time."""
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+        self._callbacks: Dict[LabelKey, Callable[[], float]] = {}
+
+    def _add(self, amount: float, labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_function(self, fn: Callable[[], float], **labels):
+        """Read the value from fn() whenever metrics are exported."""
+        with self._lock:
+            self._callbacks[_label_key(self.labelnames, labels)] = fn
+
+    def value(self, **labels) -> float:
+        key = _label_key(self.labelnames, labels)
+        if key in self._callbacks:
+            return float(self._callbacks[key]())
+        return self._values.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = dict(self._values)
+            callbacks = dict(self._callbacks)
+        for key, fn in callbacks.items():
+            try:
+                items[key] = float(fn())
+            except Exception:
+                continue
+        return self.header() + [f"{self.name}{_format_labels(k)} {v:g}" for k, v in items.items()]
+
+
+class Counter(_Scalar):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        self._add(amount, labels)
+
+
+class Gauge(_Scalar):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(self.labelnames, labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1.0, **labels):
+        self._add(-amount, labels)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (cumulative buckets, sum and count)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    def count(self, **labels) -> int:
+        row = self._values.get(_label_key(self.labelnames, labels))
+        return int(sum(row[:-1])) if row else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = self.header()
+        for key, row in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {cumulative:g}")
+            cumulative += row[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {row[-1]:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative:g}")
+        return lines
+
+
+class Registry:
+    """Named collection of metrics; get-or-create so modules can share them."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames,
+                                   buckets=buckets or DEFAULT_BUCKETS)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+render = REGISTRY.render
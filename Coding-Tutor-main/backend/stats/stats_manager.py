@@ -5,9 +5,19 @@ NO code or input storage.
 """
 
 from typing import Dict, Any
+from contextlib import contextmanager
 import json
 import os
 
+from . import tracing
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:  # Windows: single-process server only
+    fcntl = None
+    HAS_FCNTL = False
+
 
 class StatsManager:
     """Manages statistics for lab practice system."""
@@ -42,13 +52,33 @@ class StatsManager:
         }
     
     def _save_stats(self):
-        """Save statistics to file."""
+        """Save statistics to file (atomically, so readers never see a partial file)."""
         try:
-            with open(self.stats_file, 'w') as f:
+            tmp_file = f"{self.stats_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
                 json.dump(self.stats, f, indent=2)
+            os.replace(tmp_file, self.stats_file)
         except Exception as e:
             print(f"Warning: Could not save stats: {e}")
     
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock shared by every process writing this stats file."""
+        if not HAS_FCNTL:
+            yield
+            return
+        try:
+            lock = open(f"{self.stats_file}.lock", 'a')
+        except OSError:
+            yield
+            return
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+    
     def record_attempt(self, language: str, success: bool, error: bool = False, hint_used: bool = False):
         """
         Record an execution attempt.
@@ -59,6 +89,13 @@ class StatsManager:
             error: Whether there was an error
             hint_used: Whether hint was requested
         """
+        with tracing.span("stats_write"), self._locked():
+            # Other server workers may have recorded attempts since our last write
+            self.stats = self._load_stats()
+            self._record(language, success, error, hint_used)
+            self._save_stats()
+    
+    def _record(self, language: str, success: bool, error: bool, hint_used: bool):
         self.stats["total_attempts"] += 1
         
         if language in self.stats["language_counts"]:
@@ -74,8 +111,6 @@ class StatsManager:
         
         if hint_used:
             self.stats["total_hints_used"] += 1
-        
-        self._save_stats()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get current statistics."""
@@ -0,0 +1,172 @@
+"""
+Request Tracing
+Per-request phase timings (spans), exported through the metrics registry.
+
+The middleware in main.py starts a trace for every HTTP request and keeps
+it in a context variable, so code anywhere below an endpoint (api/,
+services/, rag/, stats/) can time a phase with
+
+    with tracing.span("compile"):
+        ...
+
+without passing anything around. Tasks and asyncio.to_thread workers
+inherit the trace. Outside a request, spans cost one context lookup and
+record nothing.
+
+When the request finishes its spans are observed in
+request_phase_seconds{route, phase, language}, the whole request in
+http_request_duration_seconds{route, status} and, for annotated requests,
+exercise_request_seconds{route, language, exercise}. Requests slower than
+SLOW_REQUEST_SECONDS are logged with their per-phase breakdown.
+"""
+
+import os
+import json
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from . import metrics
+
+# Configuration
+SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_SECONDS", "0"))  # 0 = no slow-request log
+# Append one anonymized JSON line per request (route, labels, status, timing;
+# never code, input, error text or client identity) for bench.load_harness --replay
+REQUEST_LOG = os.environ.get("REQUEST_LOG", "")
+
+logger = logging.getLogger(__name__)
+
+request_duration = metrics.histogram(
+    "http_request_duration_seconds",
+    "Seconds to answer an HTTP request",
+    ["route", "status"],
+)
+exercise_duration = metrics.histogram(
+    "exercise_request_seconds",
+    "Seconds to answer a request about an exercise",
+    ["route", "language", "exercise"],
+)
+phase_duration = metrics.histogram(
+    "request_phase_seconds",
+    "Seconds spent in each phase of a request",
+    ["route", "phase", "language"],
+)
+
+
+class Trace:
+    """Spans and labels of one request."""
+
+    __slots__ = ("started", "spans", "attrs")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []  # (phase, seconds)
+        self.attrs: Dict[str, str] = {}
+
+    def breakdown(self) -> Dict[str, float]:
+        """Seconds per phase (repeated phases are summed)."""
+        totals: Dict[str, float] = {}
+        for phase, seconds in self.spans:
+            totals[phase] = totals.get(phase, 0.0) + seconds
+        return totals
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+def start() -> Tuple[Trace, contextvars.Token]:
+    """Begin a trace for the current request."""
+    trace = Trace()
+    return trace, _current.set(trace)
+
+
+@contextmanager
+def collect():
+    """Gather spans into a fresh trace that is not exported (e.g. to send them elsewhere)."""
+    trace, token = start()
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def record(phase: str, seconds: float):
+    """Add a phase measured elsewhere to the current trace."""
+    trace = _current.get()
+    if trace is not None:
+        trace.spans.append((phase, max(0.0, seconds)))
+
+
+@contextmanager
+def span(phase: str):
+    """Time the enclosed block as one phase of the current request."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.spans.append((phase, time.perf_counter() - started))
+
+
+def mark(phase: str):
+    """Record the time since the request started as a phase (e.g. request parsing)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.spans.append((phase, time.perf_counter() - trace.started))
+
+
+def annotate(**attrs: str):
+    """Attach labels (language, exercise) to the current request."""
+    trace = _current.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+def detach(token: contextvars.Token):
+    """Remove a trace from the current context without ending it (see finish)."""
+    _current.reset(token)
+
+
+def finish(trace: Trace, token: Optional[contextvars.Token], route: str, status: int):
+    """
+    End a trace: export its timings and log it if slow.
+
+    token is None when the trace was already detached from the context
+    (a streamed response finishing after its handler returned).
+    """
+    total = time.perf_counter() - trace.started
+    if token is not None:
+        _current.reset(token)
+    language = trace.attrs.get("language", "")
+    request_duration.observe(total, route=route, status=str(status))
+    if "exercise" in trace.attrs:
+        exercise_duration.observe(total, route=route, language=language, exercise=trace.attrs["exercise"])
+    breakdown = trace.breakdown()
+    for phase, seconds in breakdown.items():
+        phase_duration.observe(seconds, route=route, phase=phase, language=language)
+    if SLOW_REQUEST_SECONDS and total >= SLOW_REQUEST_SECONDS:
+        phases = ", ".join(f"{p}={s * 1000:.0f}ms" for p, s in sorted(breakdown.items(), key=lambda x: -x[1]))
+        labels = " ".join(f"{k}={v}" for k, v in sorted(trace.attrs.items()))
+        logger.warning(f"Slow request {route} {status} {total * 1000:.0f}ms {labels} [{phases}]")
+    if REQUEST_LOG:
+        _log_request(route, status, total, trace.attrs)
+
+
+def _log_request(route: str, status: int, seconds: float, attrs: Dict[str, str]):
+    entry = {"ts": round(time.time(), 3), "route": route, "status": status, "ms": round(seconds * 1000, 1)}
+    entry.update({k: attrs[k] for k in ("language", "exercise") if k in attrs})
+    try:
+        # Single short appends; lines from several workers do not interleave
+        with open(REQUEST_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        logger.warning(f"Could not write request log: {e}")
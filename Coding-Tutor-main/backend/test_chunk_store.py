@@ -0,0 +1,101 @@
+"""
+Tests for the memory-mapped chunk store.
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag import chunk_store
+from rag.chunk_store import ChunkStore
+
+
+def test_round_trip():
+    """Chunks, pages and sources survive a write/open cycle."""
+    print("TEST 1: round trip...")
+    with tempfile.TemporaryDirectory() as d:
+        chunks = ["printf prints output", "scanf – reads input ✓", ""]
+        chunk_store.write(d, "c_lab", chunks, pages=[1, 2, 2], sources=["text", "ocr", "text"])
+        store = ChunkStore(d, "c_lab")
+        assert len(store) == 3
+        assert [store[i] for i in range(3)] == chunks
+        assert store.get(1) == {"text": chunks[1], "page": 2, "source": "ocr"}
+        store.close()
+    print("✅ PASS")
+
+
+def test_optional_fields_and_bounds():
+    """Fields are optional and out-of-range access raises IndexError."""
+    print("TEST 2: optional fields...")
+    with tempfile.TemporaryDirectory() as d:
+        chunk_store.write(d, "py", ["only text"])
+        store = ChunkStore(d, "py")
+        assert store.get(0) == {"text": "only text"}
+        try:
+            store[1]
+            assert False, "Expected IndexError"
+        except IndexError:
+            pass
+        store.close()
+    print("✅ PASS")
+
+
+def test_empty_store():
+    """A subject with no chunks can still be opened."""
+    print("TEST 3: empty store...")
+    with tempfile.TemporaryDirectory() as d:
+        chunk_store.write(d, "empty", [])
+        assert chunk_store.exists(d, "empty")
+        assert len(ChunkStore(d, "empty")) == 0
+    print("✅ PASS")
+
+
+def test_rewrite_under_reader():
+    """A rewrite replaces the files, so an open store keeps reading the old chunks."""
+    print("TEST 4: rewrite while open...")
+    with tempfile.TemporaryDirectory() as d:
+        chunk_store.write(d, "c_lab", ["old first chunk", "old second chunk"], pages=[1, 2])
+        old = ChunkStore(d, "c_lab")
+        chunk_store.write(d, "c_lab", ["new"])
+        assert [old[i] for i in range(len(old))] == ["old first chunk", "old second chunk"]
+        new = ChunkStore(d, "c_lab")
+        assert len(new) == 1 and new.get(0) == {"text": "new"}
+        assert not [f for f in os.listdir(d) if f.endswith(".tmp")]
+        old.close()
+        new.close()
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_round_trip,
+        test_optional_fields_and_bounds,
+        test_empty_store,
+        test_rewrite_under_reader,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,177 @@
+"""
+Tests for the performance mode: input generation, complexity fitting and the profile driver.
+"""
+
+import sys
+import os
+import json
+import tempfile
+import subprocess
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+from api import run_code
+from services import complexity_profiler
+from services.sandbox_runner import PROFILE_DRIVER, _profile_result
+from stats import StatsManager
+
+QUADRATIC = "n = int(input())\ntotal = 0\nfor i in range(n):\n    for j in range(n):\n        total += 1\nprint(total)\n"
+CONSTANT = "n = int(input())\nprint(n * n)\n"
+
+
+class LocalRunner:
+    """Profiles Python submissions with the profile driver as a local process."""
+
+    def profile_code(self, language, code, inputs, budget, container_name=None):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "main.py"), "w", encoding="utf-8") as f:
+                f.write(code)
+            args = []
+            for i, (n, stdin_data) in enumerate(inputs, 1):
+                path = os.path.join(tmp, f"input_{i}.txt")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(stdin_data)
+                args += [str(n), path]
+            result = subprocess.run([sys.executable, PROFILE_DRIVER, str(budget)] + args +
+                                    ["--", sys.executable, os.path.join(tmp, "main.py")],
+                                    capture_output=True, text=True, timeout=60)
+        return _profile_result(result.returncode, result.stdout, result.stderr)
+
+    def kill(self, container_name):
+        pass
+
+
+class FixedRunner:
+    """Returns canned timings: quadratic submissions over budget at the last size, constant ones flat."""
+
+    def profile_code(self, language, code, inputs, budget, container_name=None):
+        sizes = []
+        for n, _ in inputs:
+            seconds = 0.03 + 0.01 * (n % 3) / 2 if code == CONSTANT else 0.03 + 1e-7 * n * n
+            over = seconds > budget
+            sizes.append({"n": n, "seconds": budget if over else seconds, "max_rss_kb": 14000,
+                          "exit_code": -9 if over else 0, "over_budget": over})
+            if over:
+                break
+        return _profile_result(0, "\n".join(json.dumps(s) for s in sizes), "")
+
+    def kill(self, container_name):
+        pass
+
+
+def test_inputs_and_fitting():
+    """Generated inputs are deterministic; growth curves map to their classes."""
+    print("TEST 1: inputs and fitting...")
+    spec = {"input": "array", "sizes": [3, 5], "sorted": True, "suffix": "1001"}
+    inputs = complexity_profiler.generate_inputs(spec, "c:ex11")
+    assert inputs == complexity_profiler.generate_inputs(spec, "c:ex11")
+    lines = inputs[1][1].split()
+    assert inputs[1][0] == 5 and lines[0] == "5" and lines[-1] == "1001" and len(lines) == 7
+    assert [int(v) for v in lines[1:6]] == sorted(int(v) for v in lines[1:6])
+    assert complexity_profiler.generate_inputs({"input": "prime", "sizes": [100]}, "") == [(100, "97\n")]
+    matrix = complexity_profiler.generate_inputs({"input": "matrix", "sizes": [3]}, "")[0][1].split()
+    assert matrix[:2] == ["3", "3"] and len(matrix) == 2 + 2 * 9
+
+    ns = [1000, 2000, 4000, 8000, 16000]
+    cases = {
+        "O(n)": [0.05 + 1e-5 * n for n in ns],
+        "O(n^2)": [0.05 + 1e-9 * n * n for n in ns],
+        "O(sqrt n)": [0.01 + 1e-3 * n ** 0.5 for n in ns],
+        "O(1)": [0.05 + 0.001 * (i % 2) for i in range(len(ns))],  # within the noise floor
+    }
+    for expected, times in cases.items():
+        assert complexity_profiler.fit(ns, times, complexity_profiler.TIME_NOISE_FLOOR)["class"] == expected
+    # Start-up jitter is not growth
+    assert complexity_profiler.fit([200, 400, 800, 1600, 12800], [.030, .031, .029, .030, .040],
+                                   complexity_profiler.TIME_NOISE_FLOOR)["class"] == "O(1)"
+    assert complexity_profiler.fit(ns, [0.3, 0.31, 0.29, 0.305, 0.31],
+                                   complexity_profiler.TIME_NOISE_FLOOR)["class"] == "O(1)"
+    fib = list(range(20, 37, 4))
+    model = complexity_profiler.fit(fib, [0.5 + 1e-8 * 1.618 ** n for n in fib], 0.005)
+    assert model["class"] == "O(2^n)" and abs(model["base"] - 1.6) < 0.1
+    assert complexity_profiler.fit(ns[:2], [0.1, 0.2], 0.005) is None
+    print("✅ PASS")
+
+
+def test_driver():
+    """The driver measures each size and stops at the first one over the budget."""
+    print("TEST 2: profile driver...")
+    runner = LocalRunner()
+    inputs = [(n, f"{n}\n") for n in (100, 200, 400, 100000)]
+    result = runner.profile_code("python", QUADRATIC, inputs, 0.5)
+    assert result["stopped"] == "over_budget" and not result["success"]
+    assert [s["n"] for s in result["sizes"]] == [100, 200, 400, 100000]
+    assert result["sizes"][-1]["over_budget"] and result["sizes"][-1]["seconds"] == 0.5
+    assert all(s["max_rss_kb"] > 0 for s in result["sizes"]) and result["memory_floor_kb"] > 0
+    assert "n=100000" in result["error"]
+
+    result = runner.profile_code("python", "n = int(input())\nassert n < 200\n", inputs, 5)
+    assert result["stopped"] == "error" and len(result["sizes"]) == 2
+    assert result["error"].startswith("Runtime Error at n=200") and "AssertionError" in result["error"]
+    print("✅ PASS")
+
+
+def test_profile_endpoint():
+    """/api/run with profile compares the submission's growth with the reference solution."""
+    print("TEST 3: profile endpoint...")
+    exercise = {"id": "ex2", "reference_solution": CONSTANT,
+                "profile": {"input": "number", "sizes": [200, 400, 800, 1600, 12800], "budget": 1}}
+    original = (run_code.remote_runner, run_code.stats_manager, run_code._load_exercise)
+    with tempfile.TemporaryDirectory() as tmp:
+        run_code.remote_runner = FixedRunner()
+        run_code.stats_manager = StatsManager(os.path.join(tmp, "stats.json"))
+        run_code._load_exercise = lambda language, exercise_id: exercise if exercise_id == "ex2" else None
+        try:
+            client = TestClient(main.app)
+            result = client.post("/api/run", json={
+                "code": QUADRATIC, "language": "python", "exercise_id": "ex2", "profile": True}).json()
+            profile = result["profile"]
+            assert not result["success"] and result["error_type"] == "TIME_LIMIT_EXCEEDED", result
+            assert profile["stopped"] == "over_budget" and len(profile["sizes"]) == 5
+            assert profile["predicted"]["n"] == 12800 and profile["predicted"]["seconds"] > 1
+            assert profile["time_complexity"] == "O(n^2)" and profile["reference"]["time_complexity"] == "O(1)"
+            assert profile["verdict"] == "slower", profile
+            assert "Estimated time complexity" in result["output"] and "grows faster" in result["output"]
+            assert CONSTANT not in str(result)
+
+            response = client.post("/api/run", json={
+                "code": "", "language": "python", "exercise_id": "ex3", "profile": True})
+            assert response.status_code == 404
+        finally:
+            run_code.remote_runner, run_code.stats_manager, run_code._load_exercise = original
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_inputs_and_fitting,
+        test_driver,
+        test_profile_endpoint,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,101 @@
+"""
+Tests for near-duplicate chunk elimination (MinHash/LSH) and boilerplate stripping.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag.dedup import dedup_chunks, strip_boilerplate
+
+PASSAGE = ("A for loop repeats a block of statements while its condition is true. The loop "
+           "variable is initialised once, tested before every iteration and updated at the end "
+           "of each iteration. Forgetting the update makes the loop run forever, and using <= "
+           "instead of < makes it run one time too many.")
+OTHER = ("Arrays store several values of the same type in consecutive memory. The first "
+         "element has index zero, so an array of n elements ends at index n - 1. Reading past "
+         "the end is undefined behaviour and often crashes the program with a segmentation fault.")
+
+
+def test_near_duplicates_collapsed():
+    """OCR-style copies collapse onto the first chunk; distinct chunks all stay."""
+    print("TEST 1: near-duplicates...")
+    ocr_copy = PASSAGE.replace("iteration.", "iteratlon.").replace("The loop", "The  loop")
+    chunks = [PASSAGE, OTHER, ocr_copy, PASSAGE + " See page 12.", "Record Notes: page 4", "Record Notes: page 5"]
+    kept, report = dedup_chunks(chunks, sources=["text", "text", "ocr", "text", "text", "text"])
+    assert kept == [0, 1, 4], kept
+    assert report["removed"] == 3 and report["clusters"] == 2, report
+    assert report["removed_by_source"] == {"ocr": 1, "text": 2}, report
+
+    kept, report = dedup_chunks([PASSAGE, OTHER])
+    assert kept == [0, 1] and report["removed"] == 0
+    assert dedup_chunks([])[0] == []
+    print("✅ PASS")
+
+
+def test_strip_boilerplate():
+    """Lines repeated on most pages (digits ignored) are removed; content stays."""
+    print("TEST 2: boilerplate...")
+    pages = [f"JAVA PROGRAMMING LAB 2020-2021\nBody of page {n}: topic {chr(65 + n)}\n{n} | P a g e" for n in range(6)]
+    stripped = strip_boilerplate(pages)
+    assert all("JAVA PROGRAMMING LAB" not in p and "P a g e" not in p for p in stripped), stripped
+    assert stripped[2] == "Body of page 2: topic C"
+    # Too few pages to tell boilerplate from content
+    assert strip_boilerplate(pages[:2]) == pages[:2]
+    print("✅ PASS")
+
+
+def test_apply_keeps_index_type():
+    """Rewriting a deduplicated subject rebuilds its index as the same type."""
+    print("TEST 3: rebuilt index type...")
+    import tempfile
+    import numpy as np
+    from rag import chunk_store, index_factory
+    from rag.dedup import dedup_subject
+
+    ocr_copy = PASSAGE.replace("iteration.", "iteratlon.")
+    chunks = [PASSAGE, OTHER, ocr_copy]
+    vectors = np.random.default_rng(0).random((3, 16), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as d:
+        for index_type in ("hnsw", "sq8", "flat"):
+            chunk_store.write(d, "c_lab", chunks)
+            index_factory.write_index(index_factory.make_index(vectors, index_type),
+                                      os.path.join(d, "c_lab.index"))
+            report = dedup_subject(d, d, "c_lab", apply=True)
+            assert report["removed"] == 1, report
+            rebuilt = index_factory.read_index(os.path.join(d, "c_lab.index"), mmap=False)
+            assert rebuilt.ntotal == 2 and index_factory.index_type_of(rebuilt) == index_type
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_near_duplicates_collapsed,
+        test_strip_boilerplate,
+        test_apply_keeps_index_type,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
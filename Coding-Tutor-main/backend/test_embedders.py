@@ -0,0 +1,130 @@
+"""
+Tests for the embedding backends: backend selection, ONNX pooling/batching and load failures.
+"""
+
+import sys
+import os
+import numpy as np
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag.embedders import OnnxEmbedder, load_embedder, backend_available
+
+
+class _Encoding:
+    def __init__(self, ids, mask):
+        self.ids = ids
+        self.attention_mask = mask
+
+
+class _FakeTokenizer:
+    """One token per word, padded to the longest text of the batch."""
+
+    def encode_batch(self, texts):
+        lengths = [len(t.split()) for t in texts]
+        width = max(lengths)
+        return [_Encoding([i + 1] * n + [0] * (width - n), [1] * n + [0] * (width - n))
+                for i, n in enumerate(lengths)]
+
+
+class _FakeSession:
+    """Hidden state of every real token is (word count, 1); padding is garbage."""
+
+    def run(self, outputs, feeds):
+        mask = feeds["attention_mask"]
+        hidden = np.full(mask.shape + (2,), 1000.0, dtype=np.float32)
+        counts = mask.sum(axis=1)
+        for row, n in enumerate(counts):
+            hidden[row, :n] = [n, 1]
+        return [hidden]
+
+
+def make_onnx_embedder():
+    embedder = OnnxEmbedder.__new__(OnnxEmbedder)
+    embedder.tokenizer = _FakeTokenizer()
+    embedder.session = _FakeSession()
+    embedder.input_names = {"input_ids", "attention_mask", "token_type_ids"}
+    embedder.dim = 2
+    return embedder
+
+
+def test_onnx_pooling_and_order():
+    """Mean pooling ignores padding, vectors are unit length and come back in input order."""
+    print("TEST 1: ONNX pooling...")
+    embedder = make_onnx_embedder()
+    texts = ["one two three four", "one", "one two"]
+    vectors = embedder.encode(texts, batch_size=2)
+    assert vectors.shape == (3, 2) and vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    for text, vec in zip(texts, vectors):
+        n = len(text.split())
+        expected = np.array([n, 1.0]) / np.hypot(n, 1.0)
+        assert np.allclose(vec, expected, atol=1e-6), (text, vec)
+    print("✅ PASS")
+
+
+def test_backend_selection():
+    """Unknown backends are rejected; availability is checked without importing."""
+    print("TEST 2: backend selection...")
+    try:
+        load_embedder("word2vec")
+        assert False, "unknown backend should raise"
+    except ValueError as e:
+        assert "EMBED_BACKEND" in str(e)
+    assert backend_available("nope") is False
+    assert isinstance(backend_available("onnx"), bool)
+    print("✅ PASS")
+
+
+def test_failed_fallback():
+    """When both the configured backend and sentence-transformers fail, retrieval runs without an embedder."""
+    print("TEST 3: embedder fallback fails...")
+    from rag import rag_llm_chat as chat
+
+    def broken(backend):
+        raise OSError(f"{backend} model files missing")
+
+    names = ("HAS_RAG_DEPS", "EMBED_BACKEND", "load_embedder", "backend_available",
+             "embedder", "batcher", "_embedder_loaded")
+    original = {name: getattr(chat, name, None) for name in names}
+    try:
+        chat.HAS_RAG_DEPS, chat.EMBED_BACKEND, chat._embedder_loaded = True, "onnx", False
+        chat.load_embedder, chat.backend_available = broken, lambda backend: True
+        assert chat.load_local_embedder() is False
+        assert chat.embedder is None and chat.batcher is None
+    finally:
+        for name, value in original.items():
+            setattr(chat, name, value)
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_onnx_pooling_and_order,
+        test_backend_selection,
+        test_failed_fallback,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,151 @@
+"""
+Tests for the micro-batched EmbeddingBatcher.
+Uses a fake embedder, so no model download is needed.
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+
+from rag.embedding_service import EmbeddingBatcher
+
+
+class FakeEmbedder:
+    """Embeds a text as [len(text), index-in-batch] and records batch sizes."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(len(texts))
+        time.sleep(self.delay)
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype="float32")
+
+
+def test_single_query_shape():
+    """A single query comes back as a (1, dim) array."""
+    print("TEST 1: single query shape...")
+    batcher = EmbeddingBatcher(FakeEmbedder(), window_ms=1)
+    vec = batcher.encode("hello", timeout=5)
+    assert vec.shape == (1, 2), f"Unexpected shape {vec.shape}"
+    assert vec[0][0] == 5
+    print("✅ PASS")
+
+
+def test_concurrent_queries_are_batched():
+    """Concurrent callers share forward passes and each gets its own vector."""
+    print("TEST 2: concurrent queries batched...")
+    fake = FakeEmbedder(delay=0.02)
+    batcher = EmbeddingBatcher(fake, window_ms=20, max_batch_size=64)
+    results = {}
+
+    def worker(n):
+        results[n] = batcher.encode("x" * n, timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(1, 33)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 32
+    for n, vec in results.items():
+        assert vec[0][0] == n, f"Caller {n} got the wrong vector: {vec}"
+    assert len(fake.calls) < 32, f"Expected batching, got {fake.calls}"
+    assert sum(fake.calls) == 32
+    print("✅ PASS")
+
+
+def test_max_batch_size():
+    """No batch exceeds max_batch_size."""
+    print("TEST 3: max batch size...")
+    fake = FakeEmbedder(delay=0.0)
+    batcher = EmbeddingBatcher(fake, window_ms=50, max_batch_size=4)
+    futures = [batcher.submit(str(i)) for i in range(10)]
+    for f in futures:
+        f.result(timeout=5)
+    assert max(fake.calls) <= 4, f"Batch too large: {fake.calls}"
+    print("✅ PASS")
+
+
+def test_encode_async_does_not_block_loop():
+    """encode_async leaves the event loop free while the batch runs."""
+    print("TEST 4: async encode...")
+    batcher = EmbeddingBatcher(FakeEmbedder(delay=0.1), window_ms=1)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        vecs = await asyncio.gather(*(batcher.encode_async("abc") for _ in range(8)))
+        task.cancel()
+        return vecs, ticks
+
+    vecs, ticks = asyncio.run(main())
+    assert all(v[0][0] == 3 for v in vecs)
+    assert ticks >= 3, f"Event loop was blocked (ticks={ticks})"
+    print("✅ PASS")
+
+
+def test_encoder_error_propagates():
+    """An encoder failure is delivered to every waiting caller."""
+    print("TEST 5: error propagation...")
+
+    class Broken:
+        def encode(self, texts):
+            raise ValueError("boom")
+
+    batcher = EmbeddingBatcher(Broken(), window_ms=1)
+    try:
+        batcher.encode("x", timeout=5)
+        assert False, "Expected ValueError"
+    except ValueError:
+        pass
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_single_query_shape,
+        test_concurrent_queries_are_batched,
+        test_max_batch_size,
+        test_encode_async_does_not_block_loop,
+        test_encoder_error_propagates,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
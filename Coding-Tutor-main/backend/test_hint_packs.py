@@ -0,0 +1,180 @@
+"""
+Tests for precomputed hint packs: error classes, pack build/lookup, staleness and tier order.
+"""
+
+import sys
+import os
+import json
+import shutil
+import asyncio
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag import rag_llm_chat
+from rag.hint_packs import HintPacks, classify_error, EXERCISES_DIR
+from rag.build_hint_packs import build_pack, write_pack
+
+
+async def fake_llm(prompt: str) -> str:
+    return f"Precomputed hint ({len(prompt)} chars of prompt)"
+
+
+def make_packs(tmp: str, version: str = "v1") -> HintPacks:
+    """Build a C pack (two error classes) with the fake LLM and load it."""
+    exercises_dir = os.path.join(tmp, "exercises")
+    os.makedirs(exercises_dir, exist_ok=True)
+    shutil.copy(os.path.join(EXERCISES_DIR, "c.json"), exercises_dir)
+
+    pack = asyncio.run(build_pack("c", exercises_dir, llm=fake_llm, classes=["off_by_one", "eof_input"]))
+    pack["index_version"] = "v1"
+    write_pack(pack, os.path.join(tmp, "packs"))
+    return HintPacks(os.path.join(tmp, "packs"), exercises_dir, version_fn=lambda subject: version)
+
+
+def test_classify_error():
+    """Errors map to the classes the packs are built for."""
+    print("TEST 1: error classes...")
+    cases = [
+        ("COMPILE_ERROR: Compilation Error: main.c:3:5: error: expected ';'", "", "compile_error"),
+        ("COMPILE_ERROR: Traceback...\n  SyntaxError: invalid syntax", "", "compile_error"),
+        ("COMPILE_ERROR: Traceback...\nZeroDivisionError: division by zero", "", "runtime_error"),
+        ("Runtime Error (Exit code 1): Exception in thread \"main\"", "", "runtime_error"),
+        ("Input Error: Program expects input but none was provided", "", "eof_input"),
+        ("EOFError: EOF when reading a line", "", "eof_input"),
+        ("Execution timed out after 5 seconds", "", "timeout"),
+        ("OUTPUT_FORMAT_ERROR: prompts printed", "", "output_format"),
+        ("Output mismatch", "Test 1: expected 10, got 11", "off_by_one"),
+        ("Output mismatch", "Test 1: expected 10, got 20", "wrong_output"),
+        # Failed tests are checked for the specific classes before falling back to wrong_output
+        ("", "Test 2: Execution timed out after 5 seconds", "timeout"),
+        ("", "Test 3: Runtime Error: Segmentation fault", "runtime_error"),
+        ("", "Test 1: EOFError: EOF when reading a line", "eof_input"),
+        ("", "Test 1: OUTPUT_FORMAT_ERROR: prompts printed", "output_format"),
+        ("", "Test 1: wrong answer", "wrong_output"),
+        # Word-bounded matches; compile errors are classified first
+        ("COMPILE_ERROR: Compilation Error: main.c:5:9: error: invalid application of 'sizeof' "
+         "to incomplete type", "", "compile_error"),
+        ("Runtime Error (Exit code 1): Traceback...\nNameError: name 'prompt' is not defined", "",
+         "runtime_error"),
+        ("Something odd", "", None),
+    ]
+    for error, tests, expected in cases:
+        got = classify_error(error, tests)
+        assert got == expected, f"{error!r}: expected {expected}, got {got}"
+    print("✅ PASS")
+
+
+def test_build_and_lookup():
+    """Every exercise gets a hint per class, found again by a dictionary lookup."""
+    print("TEST 2: build + lookup...")
+    with tempfile.TemporaryDirectory() as tmp:
+        packs = make_packs(tmp)
+        with open(os.path.join(EXERCISES_DIR, "c.json"), "r", encoding="utf-8") as f:
+            exercise_count = len(json.load(f))
+        assert len(packs) == exercise_count * 2, len(packs)
+
+        hint = packs.lookup("c_lab_manual", "ex1", "Output mismatch", "Test 1: expected 10, got 9")
+        assert hint["hint"].startswith("Precomputed hint")
+        assert hint["source"].endswith("(Precomputed)")
+        # Other subject with the same exercise id, class not in the pack, unknown exercise
+        assert packs.lookup("Java", "ex1", "Output mismatch", "Test 1: expected 10, got 9") is None
+        assert packs.lookup("c_lab_manual", "ex1", "Execution timed out", "") is None
+        assert packs.lookup("c_lab_manual", "ex999", "EOFError", "") is None
+        assert packs.get_stats()["hits"] == 1 and packs.get_stats()["misses"] == 3
+    print("✅ PASS")
+
+
+def test_stale_hints_skipped():
+    """A rebuilt index drops the whole pack; an edited exercise drops its hints."""
+    print("TEST 3: staleness...")
+    with tempfile.TemporaryDirectory() as tmp:
+        assert len(make_packs(tmp, version="v2")) == 0
+
+        packs = make_packs(tmp)
+        before = len(packs)
+        path = os.path.join(tmp, "exercises", "c.json")
+        with open(path, "r", encoding="utf-8") as f:
+            exercises = json.load(f)
+        exercises[0]["testcases"][0]["expected_output"] = "changed"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(exercises, f)
+        packs.load()
+        assert len(packs) == before - 2
+        assert packs.lookup("c_lab_manual", exercises[0]["id"], "EOFError", "") is None
+
+        # Fields hints do not depend on (reference solution, profile) keep them
+        exercises[1]["reference_solution"] = "/* rewritten */"
+        exercises[1]["profile"] = {"input": "number", "sizes": [10]}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(exercises, f)
+        packs.load()
+        assert len(packs) == before - 2
+    print("✅ PASS")
+
+
+def test_tier_order():
+    """Specific rules beat the pack; the pack beats catch-all rules and online generation."""
+    print("TEST 4: tier order...")
+    original = rag_llm_chat.hint_packs, rag_llm_chat.retrieve_notes_async
+
+    async def no_notes(subject, query, k=5):
+        return []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Without lab-manual notes the pack holds LLM hints, whatever indexes are on disk
+        rag_llm_chat.retrieve_notes_async = no_notes
+        rag_llm_chat.hint_packs = make_packs(tmp)
+        try:
+            # Catch-all numeric mismatch rule loses to the exercise's precomputed hint
+            hint = asyncio.run(rag_llm_chat.get_hint(
+                "c_lab_manual", "Output mismatch", "Test 1: expected 10, got 11", "ex1"))
+            assert hint["source"] == "LLM (Ollama) (Precomputed)", hint
+
+            # A rule written for this exact error still wins
+            hint = asyncio.run(rag_llm_chat.get_hint(
+                "c_lab_manual", "Input Error: Program expects input but none was provided", "", "ex1"))
+            assert hint["source"] == "Rule-based (Fast)", hint
+
+            async def collect():
+                return [e async for e in rag_llm_chat.stream_hint(
+                    "c_lab_manual", "Output mismatch", "Test 1: expected 10, got 11", "ex1")]
+            events = asyncio.run(collect())
+            assert [e["event"] for e in events] == ["hint", "done"]
+            assert events[0]["source"].endswith("(Precomputed)")
+        finally:
+            rag_llm_chat.hint_packs, rag_llm_chat.retrieve_notes_async = original
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_classify_error,
+        test_build_and_lookup,
+        test_stale_hints_skipped,
+        test_tier_order,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,118 @@
+"""
+Tests for the parallel hint pipeline (latency budget + stage timings).
+"""
+
+import sys
+import os
+import time
+import asyncio
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag import rag_llm_chat
+from rag.hint_pipeline import parallel_hint
+from rag.ollama_client import OllamaClient
+from rag.ollama_stub import OllamaStub
+
+NOTES = ("A for loop repeats while its condition is true. The loop variable must be "
+         "updated in every iteration, otherwise the loop never ends. Print inside the loop "
+         "to trace each value.")
+
+
+def with_stub(coro_fn, **stub_args):
+    """Run coro_fn() with the LLM client pointed at a fresh stub and slow fake retrieval."""
+    async def main():
+        stub = await OllamaStub(**stub_args).start()
+        original_client = rag_llm_chat.llm_client
+        original_retrieve = rag_llm_chat.retrieve_notes_async
+        rag_llm_chat.llm_client = OllamaClient("stub", base_url=stub.url)
+
+        async def slow_retrieve(subject, query, k=5):
+            await asyncio.sleep(0.2)
+            return [NOTES]
+
+        rag_llm_chat.retrieve_notes_async = slow_retrieve
+        try:
+            return await coro_fn(), stub
+        finally:
+            await rag_llm_chat.llm_client.aclose()
+            rag_llm_chat.llm_client = original_client
+            rag_llm_chat.retrieve_notes_async = original_retrieve
+            await stub.stop()
+    return asyncio.run(main())
+
+
+def test_rule_hint_has_timings():
+    """Rule matches return at once with timings attached."""
+    print("TEST 1: rule tier...")
+    hint = asyncio.run(parallel_hint("c_lab_manual", "segmentation fault", ""))
+    assert hint["source"] == "Rule-based (Fast)"
+    assert "rules" in hint["timings"] and "retrieval" not in hint["timings"]
+    print("✅ PASS")
+
+
+def test_llm_hint_then_cached():
+    """Retrieval feeds the LLM; the repeat request is a cache hit with no LLM stage."""
+    print("TEST 2: retrieval -> LLM -> cache...")
+
+    async def run():
+        first = await parallel_hint("c_lab_manual", "loop runs forever on input 5", "", "pipe-1", budget=8)
+        second = await parallel_hint("c_lab_manual", "loop runs forever on input 7", "", "pipe-1", budget=8)
+        return first, second
+
+    (first, second), stub = with_stub(run, response="Update the loop variable.")
+    assert first["hint"] == "Update the loop variable." and first["rag_used"], first
+    assert first["timings"]["retrieval"] >= 150 and "llm" in first["timings"]
+    if rag_llm_chat._hint_cache:
+        assert second["source"].endswith("(Cached)"), second
+        assert "llm" not in second["timings"]
+        assert stub.generations == 1
+    print("✅ PASS")
+
+
+def test_budget_bounds_latency():
+    """A slow LLM is cut off at the budget and the lab-manual summary is returned."""
+    print("TEST 3: latency budget...")
+
+    async def run():
+        started = time.monotonic()
+        hint = await parallel_hint("c_lab_manual", "wrong total after loop", "", "pipe-2", budget=0.6)
+        return hint, time.monotonic() - started
+
+    (hint, elapsed), _ = with_stub(run, response="late", first_token_delay=3.0)
+    assert hint["source"] == "RAG (Lab Manual, Summary)", hint
+    assert hint["hint"].startswith("From your lab manual: A for loop repeats")
+    assert elapsed < 1.2, f"Budget 0.6s but took {elapsed:.2f}s"
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_rule_hint_has_timings,
+        test_llm_hint_then_cached,
+        test_budget_bounds_latency,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,154 @@
+"""
+Tests for streamed hint delivery and the metrics registry.
+"""
+
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag import rag_llm_chat
+from rag.ollama_client import OllamaClient
+from rag.ollama_stub import OllamaStub
+from stats.metrics import Registry
+
+
+def collect(subject, error_message, failed_tests="", exercise_id=""):
+    async def main():
+        return [e async for e in rag_llm_chat.stream_hint(subject, error_message, failed_tests, exercise_id)]
+    return asyncio.run(main())
+
+
+def test_rule_hint_is_immediate():
+    """A rule-based hint arrives as a single hint event followed by done."""
+    print("TEST 1: rule-based hint...")
+    events = collect("c_lab_manual", "compile error: expected ';'")
+    assert [e["event"] for e in events] == ["hint", "done"], events
+    assert events[1]["source"] == "Rule-based (Fast)"
+    assert events[0]["hint"] == events[1]["hint"]
+    print("✅ PASS")
+
+
+def test_llm_tokens_stream_then_cached():
+    """LLM text streams as tokens; the same error afterwards is served from cache."""
+    print("TEST 2: streamed LLM hint...")
+
+    async def main():
+        stub = await OllamaStub(response="Think about the loop bound.", token_delay=0.01).start()
+        original = rag_llm_chat.llm_client
+        rag_llm_chat.llm_client = OllamaClient("stub", base_url=stub.url)
+        try:
+            args = ("c_lab_manual", "Test 2 printed 9 instead of 10", "", "stream-test")
+            first = [e async for e in rag_llm_chat.stream_hint(*args)]
+            second = [e async for e in rag_llm_chat.stream_hint(*args)]
+        finally:
+            await rag_llm_chat.llm_client.aclose()
+            rag_llm_chat.llm_client = original
+            await stub.stop()
+        return first, second
+
+    first, second = asyncio.run(main())
+    tokens = [e["text"] for e in first if e["event"] == "token"]
+    assert len(tokens) == 5, tokens
+    done = first[-1]
+    assert done["event"] == "done" and done["hint"] == "Think about the loop bound."
+    assert "rag_used" in done and "source" in done
+    if rag_llm_chat._hint_cache:
+        assert [e["event"] for e in second] == ["hint", "done"], second
+        assert second[-1]["source"].endswith("(Cached)")
+    print("✅ PASS")
+
+
+def test_identical_requests_coalesce():
+    """A burst of identical errors (different line numbers) runs one generation."""
+    print("TEST 3: single-flight coalescing...")
+
+    async def main():
+        stub = await OllamaStub(response="Check the array size.", token_delay=0.01).start()
+        original = rag_llm_chat.llm_client
+        rag_llm_chat.llm_client = OllamaClient("stub", base_url=stub.url)
+        flights = rag_llm_chat.hint_flights
+        before = flights.coalesced
+        try:
+            async def student(i):
+                error = f"main.c:{i}:5: array index {i} is past the end of the array"
+                return [e async for e in rag_llm_chat.stream_hint("c_lab_manual", error, "", f"burst-{i}")]
+
+            async def plain(i):
+                error = f"main.c:{i}:9: unused variable 'x{i}'"
+                return await rag_llm_chat.get_hint("c_lab_manual", error, "", f"plain-{i}")
+
+            streams = await asyncio.gather(*(student(i) for i in range(20)))
+            plains = await asyncio.gather(*(plain(i) for i in range(10)))
+        finally:
+            await rag_llm_chat.llm_client.aclose()
+            rag_llm_chat.llm_client = original
+            await stub.stop()
+        return stub, streams, plains, flights.coalesced - before
+
+    stub, streams, plains, coalesced = asyncio.run(main())
+    assert stub.generations == 2, f"Expected one generation per distinct error, got {stub.generations}"
+    assert coalesced == 28, coalesced
+    for events in streams:
+        assert "".join(e["text"] for e in events if e["event"] == "token") == "Check the array size."
+        assert events[-1]["hint"] == "Check the array size."
+    assert all(p["hint"] == stub.reply_for("") for p in plains)
+    print("✅ PASS")
+
+
+def test_metrics_render():
+    """Counters, gauges and histograms render in Prometheus text format."""
+    print("TEST 4: metrics registry...")
+    registry = Registry()
+    requests = registry.counter("hints_total", "Hints served", ["source"])
+    requests.inc(source="rule")
+    requests.inc(2, source="rule")
+    registry.gauge("queue_depth", "Queued requests").set_function(lambda: 4)
+    ttft = registry.histogram("ttft_seconds", "TTFT", buckets=[0.1, 1.0])
+    ttft.observe(0.05)
+    ttft.observe(0.5)
+    ttft.observe(5.0)
+
+    text = registry.render()
+    assert 'hints_total{source="rule"} 3' in text, text
+    assert "queue_depth 4" in text
+    assert 'ttft_seconds_bucket{le="0.1"} 1' in text
+    assert 'ttft_seconds_bucket{le="1"} 2' in text
+    assert 'ttft_seconds_bucket{le="+Inf"} 3' in text
+    assert "ttft_seconds_count 3" in text
+    assert registry.counter("hints_total", "Hints served", ["source"]) is requests
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_rule_hint_is_immediate,
+        test_llm_tokens_stream_then_cached,
+        test_identical_requests_coalesce,
+        test_metrics_render,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,97 @@
+"""
+Tests for the BM25 lexical index and rank fusion.
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag.lexical_index import BM25Index, tokenize, reciprocal_rank_fusion
+
+CHUNKS = [
+    "Every statement in C ends with a semicolon ; missing it gives expected ';' errors.",
+    "A for loop repeats a block of statements a fixed number of times.",
+    "input() raises EOFError when there is no more input to read.",
+    "Arrays are indexed from zero; reading past the end causes a segmentation fault.",
+]
+
+
+def test_tokenize():
+    """Camel-case identifiers are split and punctuation is kept."""
+    print("TEST 1: tokenize...")
+    tokens = tokenize("EOFError: expected ';'")
+    assert "eoferror" in tokens and "eof" in tokens, tokens
+    assert ";" in tokens, tokens
+    assert "error" not in tokens, tokens
+    print("✅ PASS")
+
+
+def test_search_ranks_keyword_match_first():
+    """The chunk sharing the error keywords ranks first and is decisive."""
+    print("TEST 2: search...")
+    bm25 = BM25Index.build(CHUNKS)
+    query = "Error:\nEOFError: EOF when reading a line\n"
+    hits = bm25.search(query, k=3)
+    assert hits[0][0] == 2, hits
+    assert bm25.is_decisive(query, hits)
+    assert bm25.search("zzz unknown words", k=3) == []
+    # Runner boilerplate alone never matches a chunk
+    wrapped = BM25Index.build(CHUNKS + ["The main program exits with code 0."])
+    assert wrapped.search("Runtime Error:\nProgram exited with code 1 in main", k=3) == []
+    print("✅ PASS")
+
+
+def test_save_load_round_trip():
+    """A saved index gives identical results after loading."""
+    print("TEST 3: save/load...")
+    bm25 = BM25Index.build(CHUNKS)
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "c.bm25.npz")
+        bm25.save(path)
+        loaded = BM25Index.load(path)
+    query = "segmentation fault reading array"
+    assert loaded.search(query, 4) == bm25.search(query, 4)
+    print("✅ PASS")
+
+
+def test_reciprocal_rank_fusion():
+    """Ids ranked well in both lists win; k limits the result."""
+    print("TEST 4: rank fusion...")
+    merged = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=2)
+    assert merged == [1, 3], merged
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_tokenize,
+        test_search_ranks_keyword_match_first,
+        test_save_load_round_trip,
+        test_reciprocal_rank_fusion,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,142 @@
+"""
+Tests for the deadline-aware LLM scheduler and hint degradation.
+"""
+
+import sys
+import os
+import time
+import asyncio
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag import rag_llm_chat
+from rag.llm_scheduler import LLMScheduler, LLMShed
+from rag.ollama_client import OllamaClient
+from rag.ollama_stub import OllamaStub
+
+
+def test_concurrency_limit():
+    """No more than max_concurrency jobs run at once; queued jobs all finish."""
+    print("TEST 1: concurrency limit...")
+    scheduler = LLMScheduler(max_concurrency=2, max_queue=10, initial_estimate=0.01)
+    peak = {"now": 0, "max": 0}
+
+    async def job():
+        peak["now"] += 1
+        peak["max"] = max(peak["max"], peak["now"])
+        await asyncio.sleep(0.02)
+        peak["now"] -= 1
+        return "ok"
+
+    async def main():
+        deadline = time.monotonic() + 5
+        return await asyncio.gather(*(scheduler.run(job, deadline) for _ in range(6)))
+
+    results = asyncio.run(main())
+    assert results == ["ok"] * 6
+    assert peak["max"] == 2, peak
+    assert scheduler.running == 0 and scheduler.queue_depth == 0
+    assert scheduler.completed == 6
+    print("✅ PASS")
+
+
+def test_shed_when_queue_full_or_too_slow():
+    """Requests are shed when the queue is full or the estimated wait misses the deadline."""
+    print("TEST 2: load shedding...")
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=1, initial_estimate=0.5)
+
+    async def job():
+        await asyncio.sleep(0.3)
+        return "ok"
+
+    async def attempt(deadline_in):
+        try:
+            return await scheduler.run(job, time.monotonic() + deadline_in)
+        except LLMShed as e:
+            return e.reason
+
+    async def main():
+        running = asyncio.ensure_future(attempt(5))
+        await asyncio.sleep(0.01)
+        queued = asyncio.ensure_future(attempt(5))
+        await asyncio.sleep(0.01)
+        full = await attempt(5)                 # queue already holds one request
+        return await running, await queued, full
+
+    async def too_slow():
+        return await attempt(0.1)               # estimate 0.5 s > 0.1 s deadline
+
+    assert asyncio.run(main()) == ("ok", "ok", "queue_full")
+    assert asyncio.run(too_slow()) == "deadline"
+    assert scheduler.shed["queue_full"] == 1 and scheduler.shed["deadline"] == 1
+    print("✅ PASS")
+
+
+def test_busy_llm_degrades_hint():
+    """When the LLM cannot answer within the budget, a basic hint comes back at once."""
+    print("TEST 3: degraded hint...")
+
+    async def no_notes(subject, query, k=5):
+        return []
+
+    async def main():
+        stub = await OllamaStub(response="slow answer", first_token_delay=2.0).start()
+        original_client, original_scheduler = rag_llm_chat.llm_client, rag_llm_chat.llm_scheduler
+        original_retrieve = rag_llm_chat.retrieve_notes_async
+        rag_llm_chat.llm_client = OllamaClient("stub", base_url=stub.url)
+        rag_llm_chat.llm_scheduler = LLMScheduler(max_concurrency=1, initial_estimate=0.1)
+        # No lab-manual notes, so the degraded hint is the basic one
+        rag_llm_chat.retrieve_notes_async = no_notes
+        try:
+            started = time.monotonic()
+            hint = await rag_llm_chat.get_hint("c_lab_manual", "Test 3 printed 41 not 42", "",
+                                               "shed-test", budget=0.5)
+            elapsed = time.monotonic() - started
+            events = [e async for e in rag_llm_chat.stream_hint(
+                "c_lab_manual", "Test 3 printed 41 not 42", "", "shed-test", budget=0.05)]
+        finally:
+            await rag_llm_chat.llm_client.aclose()
+            rag_llm_chat.llm_client, rag_llm_chat.llm_scheduler = original_client, original_scheduler
+            rag_llm_chat.retrieve_notes_async = original_retrieve
+            await stub.stop()
+        return hint, elapsed, events
+
+    hint, elapsed, events = asyncio.run(main())
+    assert hint["shed"] and hint["source"] == "Basic", hint
+    assert elapsed < 1.5, f"Degraded hint took {elapsed:.2f}s"
+    # Shed hints are not cached, so the stream tried again and was shed too
+    assert [e["event"] for e in events][-2:] == ["hint", "done"], events
+    assert events[-1]["shed"]
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_concurrency_limit,
+        test_shed_when_queue_full_or_too_slow,
+        test_busy_llm_degrades_hint,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,145 @@
+"""
+Tests for state shared by preforked workers: the exercise catalog, stats file and limits.
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+import multiprocessing
+sys.path.insert(0, os.path.dirname(__file__))
+
+from api import catalog
+from stats import StatsManager
+
+
+def test_catalog_cache():
+    """Exercises are parsed once and re-read only when their file changes."""
+    print("TEST 1: exercise catalog...")
+    original = catalog.EXERCISES_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog.EXERCISES_DIR = tmp
+        path = os.path.join(tmp, "demo.json")
+        try:
+            with open(path, "w") as f:
+                json.dump([{"id": "ex1", "title": "One"}], f)
+            assert catalog.preload() == 1
+            first = catalog.list_exercises("demo")
+            assert catalog.list_exercises("demo") is first
+            assert catalog.get_exercise("demo", "ex1")["title"] == "One"
+            assert catalog.get_exercise("demo", "ex9") is None
+            assert catalog.list_exercises("missing") is None
+
+            with open(path, "w") as f:
+                json.dump([{"id": "ex1", "title": "Uno"}, {"id": "ex2"}], f)
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+            assert len(catalog.list_exercises("demo")) == 2
+            assert catalog.get_exercise("demo", "ex1")["title"] == "Uno"
+        finally:
+            catalog.EXERCISES_DIR = original
+            catalog._catalog.pop("demo", None)
+    print("✅ PASS")
+
+
+def _record_many(stats_file, n):
+    manager = StatsManager(stats_file)
+    for i in range(n):
+        manager.record_attempt("python", success=i % 2 == 0, error=i % 2 == 1)
+
+
+def test_stats_across_processes():
+    """Concurrent workers writing one stats file lose no updates."""
+    print("TEST 2: stats from several processes...")
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_file = os.path.join(tmp, "stats.json")
+        ctx = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+        procs = [ctx.Process(target=_record_many, args=(stats_file, 25)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        stats = StatsManager(stats_file).get_stats()
+        assert stats["total_attempts"] == 100, stats
+        assert stats["language_counts"]["python"] == 100
+        assert stats["success_count"] + stats["failure_count"] == 100
+    print("✅ PASS")
+
+
+def test_share_limits():
+    """Each forked worker takes 1/N of the process-wide admission limits."""
+    print("TEST 3: limits split between workers...")
+    import serve
+    from api import run_code
+    from rag import rag_llm_chat
+
+    llm = rag_llm_chat.llm_scheduler
+    sandbox = run_code.sandbox_scheduler
+    original = (llm.max_concurrency, llm.max_queue, sandbox.max_concurrency, sandbox.rate, sandbox.capacity_fn)
+    try:
+        llm.max_concurrency, llm.max_queue = 8, 30
+        sandbox.max_concurrency, sandbox.rate, sandbox.capacity_fn = 2, 1.0, lambda: 12
+        serve.share_limits(1)
+        assert llm.max_concurrency == 8 and sandbox._capacity() == 12
+        serve.share_limits(4)
+        assert (llm.max_concurrency, llm.max_queue) == (2, 7)
+        assert sandbox.max_concurrency == 1 and sandbox.rate == 0.25
+        assert sandbox._capacity() == 3
+    finally:
+        llm.max_concurrency, llm.max_queue, sandbox.max_concurrency, sandbox.rate, sandbox.capacity_fn = original
+    print("✅ PASS")
+
+
+def test_stop_worker_keeps_other_exits():
+    """Workers that exit while another is being stopped are still replaced."""
+    print("TEST 4: exits during a rolling restart...")
+    import serve
+
+    master = serve.Master(None, None, 2, 0, "info")
+    quick = os.fork()
+    if quick == 0:
+        os._exit(0)
+    slow = os.fork()
+    if slow == 0:
+        time.sleep(30)
+        os._exit(0)
+    master.workers = {quick: time.monotonic(), slow: time.monotonic()}
+    time.sleep(0.2)
+    master.stop_worker(slow, timeout=5)
+    assert master.workers == {}
+    assert [pid for pid, _ in master.exited] == [quick], master.exited
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_catalog_cache,
+        test_stats_across_processes,
+        test_share_limits,
+        test_stop_worker_keeps_other_exits,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
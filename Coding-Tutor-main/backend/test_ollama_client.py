@@ -0,0 +1,225 @@
+"""
+Tests for the Ollama HTTP client against the local stand-in server.
+"""
+
+import sys
+import os
+import gc
+import socket
+import asyncio
+import threading
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag.ollama_client import OllamaClient, OllamaTimeout, MSG_UNAVAILABLE, MSG_TIMEOUT
+from rag.ollama_stub import OllamaStub
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_generate_reuses_connection():
+    """Several generations share one keep-alive connection and one availability check."""
+    print("TEST 1: generate + connection reuse...")
+
+    async def main():
+        stub = await OllamaStub(response="Check your semicolons.").start()
+        client = OllamaClient("stub", base_url=stub.url)
+        results = [await client.generate(f"prompt {i}") for i in range(3)]
+        await client.aclose()
+        await stub.stop()
+        return stub, results
+
+    stub, results = run(main())
+    assert results == ["Check your semicolons."] * 3, results
+    assert stub.connections == 1, f"Expected 1 connection, got {stub.connections}"
+    assert stub.generations == 3
+    assert stub.requests == 4, f"Availability should be checked once, got {stub.requests} requests"
+    print("✅ PASS")
+
+
+def test_stream_yields_tokens_incrementally():
+    """Tokens arrive one by one and join to the full response."""
+    print("TEST 2: streaming...")
+
+    async def main():
+        stub = await OllamaStub(response="one two three four", token_delay=0.01).start()
+        client = OllamaClient("stub", base_url=stub.url)
+        tokens = [t async for t in client.stream("hi")]
+        await client.aclose()
+        await stub.stop()
+        return tokens
+
+    tokens = run(main())
+    assert tokens == ["one", " two", " three", " four"], tokens
+    print("✅ PASS")
+
+
+def test_unavailable_server():
+    """A closed port gives the 'not available' message instead of raising."""
+    print("TEST 3: unavailable server...")
+
+    async def main():
+        stub = await OllamaStub().start()
+        url = stub.url
+        await stub.stop()
+        client = OllamaClient("stub", base_url=url)
+        result = await client.generate("hi")
+        await client.aclose()
+        return result
+
+    assert run(main()) == MSG_UNAVAILABLE
+    print("✅ PASS")
+
+
+def test_read_timeout():
+    """A stalled stream hits the read timeout."""
+    print("TEST 4: read timeout...")
+
+    async def main():
+        stub = await OllamaStub(response="slow", first_token_delay=1.0).start()
+        client = OllamaClient("stub", base_url=stub.url, read_timeout=0.2)
+        result = await client.generate("hi")
+        try:
+            async for _ in client.stream("hi"):
+                pass
+            raised = False
+        except OllamaTimeout:
+            raised = True
+        await client.aclose()
+        await stub.stop()
+        return result, raised
+
+    result, raised = run(main())
+    assert result == MSG_TIMEOUT, result
+    assert raised
+    print("✅ PASS")
+
+
+def test_total_timeout():
+    """A stream that keeps going past the total timeout stops at the deadline."""
+    print("TEST 5: total timeout...")
+
+    async def main():
+        stub = await OllamaStub(response="a b c d e f g h", token_delay=0.1).start()
+        client = OllamaClient("stub", base_url=stub.url, total_timeout=0.35, read_timeout=5)
+        started = asyncio.get_running_loop().time()
+        result = await client.generate("hi")
+        elapsed = asyncio.get_running_loop().time() - started
+
+        silent = await OllamaStub(response="slow", first_token_delay=2.0).start()
+        quiet = OllamaClient("stub", base_url=silent.url, total_timeout=0.3, read_timeout=5)
+        started = asyncio.get_running_loop().time()
+        silent_result = await quiet.generate("hi")
+        silent_elapsed = asyncio.get_running_loop().time() - started
+        for c in (client, quiet):
+            await c.aclose()
+        for s in (stub, silent):
+            await s.stop()
+        return result, elapsed, silent_result, silent_elapsed
+
+    result, elapsed, silent_result, silent_elapsed = run(main())
+    assert result == MSG_TIMEOUT and elapsed < 0.6, (result, elapsed)
+    assert silent_result == MSG_TIMEOUT and silent_elapsed < 0.6, (silent_result, silent_elapsed)
+    print("✅ PASS")
+
+
+def test_new_event_loop_closes_old_client():
+    """Moving to a new event loop closes the pooled sockets of the old one."""
+    print("TEST 6: event loop change...")
+    stub_loop = asyncio.new_event_loop()
+    stub = stub_loop.run_until_complete(OllamaStub(response="ok").start())
+    thread = threading.Thread(target=stub_loop.run_forever, daemon=True)
+    thread.start()
+    client = OllamaClient("stub", base_url=stub.url)
+
+    async def generate():
+        return await client.generate("hi"), [s.get_extra_info("socket") for s in client._streams]
+
+    try:
+        first, (sock,) = run(generate())
+        assert first == "ok" and sock.fileno() != -1
+        second, _ = run(generate())                 # asyncio.run closed the first loop
+        gc.collect()
+        assert second == "ok", second
+        assert sock.fileno() == -1, "old pooled socket left open"
+        run(client.aclose())
+    finally:
+        asyncio.run_coroutine_threadsafe(stub.stop(), stub_loop).result(5)
+        stub_loop.call_soon_threadsafe(stub_loop.stop)
+        thread.join(5)
+        stub_loop.close()
+    print("✅ PASS")
+
+
+def test_idle_event_loop_closes_old_client():
+    """A client left on an idle (open, not running) loop has its sockets shut down."""
+    print("TEST 7: idle event loop change...")
+    stub_loop = asyncio.new_event_loop()
+    stub = stub_loop.run_until_complete(OllamaStub(response="ok").start())
+    thread = threading.Thread(target=stub_loop.run_forever, daemon=True)
+    thread.start()
+    client = OllamaClient("stub", base_url=stub.url)
+    idle_loop = asyncio.new_event_loop()
+
+    async def generate():
+        return await client.generate("hi"), [s.get_extra_info("socket") for s in client._streams]
+
+    try:
+        first, (sock,) = idle_loop.run_until_complete(generate())
+        assert first == "ok"
+        second, _ = run(generate())                 # idle_loop stays open but never runs again
+        assert second == "ok", second
+        probe = socket.socket(fileno=os.dup(sock.fileno()))
+        try:
+            # A shut-down socket reads EOF at once; a live idle one would block
+            assert probe.recv(1, socket.MSG_DONTWAIT) == b"", "old pooled socket left open"
+        except BlockingIOError:
+            raise AssertionError("old pooled socket left open")
+        finally:
+            probe.close()
+        run(client.aclose())
+    finally:
+        idle_loop.close()
+        asyncio.run_coroutine_threadsafe(stub.stop(), stub_loop).result(5)
+        stub_loop.call_soon_threadsafe(stub_loop.stop)
+        thread.join(5)
+        stub_loop.close()
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_generate_reuses_connection,
+        test_stream_yields_tokens_incrementally,
+        test_unavailable_server,
+        test_read_timeout,
+        test_total_timeout,
+        test_new_event_loop_closes_old_client,
+        test_idle_event_loop_closes_old_client,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,137 @@
+"""
+Tests for grading against expected output: the streaming checker and early termination.
+"""
+
+import sys
+import os
+import time
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+from api import run_code
+from services.output_checker import OutputChecker, checker_for
+from services.sandbox_runner import DockerSandboxRunner, _stream_output
+from stats import StatsManager
+
+ENDLESS = "import itertools\nfor i in itertools.count():\n    print(i)\n"
+
+
+class LocalRunner:
+    """Runs Python submissions as local processes, with the sandbox's checking contract."""
+
+    def run_code(self, language, code, stdin_data="", container_name=None, expected_output=None, compare=None):
+        checker = checker_for(expected_output, compare)
+        returncode, stdout, stderr, stopped = _stream_output(
+            [sys.executable, "-u", "-c", code], stdin_data, checker, lambda: None, 10)
+        return {"success": returncode == 0 and not stopped, "output": stdout.strip(), "error": stderr.strip(),
+                "check": DockerSandboxRunner._check_report(checker, stopped)}
+
+    def kill(self, container_name):
+        pass
+
+
+def test_checker():
+    """Chunks are compared as they arrive under the exercise's rules; differences are located."""
+    print("TEST 1: output checker...")
+    checker = OutputChecker("Even: 2 4\nOdd: 1 3")
+    assert checker.feed("\nEven: 2 4   \nOd") is None
+    assert checker.feed("d: 1 3\n\n") is None and checker.finish() is None
+
+    # A partial line that can no longer match is reported before its newline
+    checker = OutputChecker("Sum: 15")
+    assert checker.feed("Sum: 1") is None
+    assert checker.feed("6") == {"reason": "mismatch", "line": 1, "column": 7,
+                                 "expected": "Sum: 15", "got": "Sum: 16"}
+
+    assert OutputChecker("x").feed("x\ny")["reason"] == "extra_output"
+    checker = OutputChecker("a\nb")
+    checker.feed("a\n")
+    assert checker.finish()["reason"] == "missing_output" and checker.difference["line"] == 2
+
+    tokens = checker_for("1 2 3", {"mode": "tokens"})
+    assert tokens.feed("1\n2  ") is None and tokens.feed("3") is None and tokens.finish() is None
+    assert checker_for("PRIME", {"ignore_case": True}).feed("prime\n") is None
+    print("✅ PASS")
+
+
+def test_early_termination():
+    """A program printing endlessly is stopped at the first difference."""
+    print("TEST 2: early termination...")
+    stops = []
+    started = time.monotonic()
+    returncode, stdout, _, stopped = _stream_output(
+        [sys.executable, "-u", "-c", ENDLESS], "", OutputChecker("0\n1\n2"), lambda: stops.append(1), 30)
+    assert stopped and stops and time.monotonic() - started < 5
+    assert stdout.startswith("0\n1\n2\n3")
+    print("✅ PASS")
+
+
+def test_run_tests():
+    """/api/run with run_tests grades every testcase and explains a wrong answer."""
+    print("TEST 3: grading endpoint...")
+    original = (run_code.remote_runner, run_code.stats_manager)
+    with tempfile.TemporaryDirectory() as tmp:
+        run_code.remote_runner = LocalRunner()
+        run_code.stats_manager = StatsManager(os.path.join(tmp, "stats.json"))
+        try:
+            client = TestClient(main.app)
+            exercise = run_code.catalog.get_exercise("python", "ex3")
+
+            def grade(code, client_id):
+                return client.post("/api/run", headers={"X-Client-Id": client_id}, json={
+                    "code": code, "language": "python", "exercise_id": "ex3", "run_tests": True,
+                }).json()
+
+            result = grade(exercise["reference_solution"], "a")
+            assert result["success"] and result["tests_passed"] == result["tests_total"] == 2, result
+
+            result = grade(ENDLESS, "b")
+            assert not result["success"] and result["error_type"] == "WRONG_ANSWER"
+            assert result["tests"] == [{"testcase": 1, "input": "hello world", "passed": False,
+                                        "stopped_early": True, "first_difference": {
+                                            "reason": "mismatch", "line": 1, "column": 1,
+                                            "expected": "True", "got": "0"}}]
+            assert "testcase 1: line 1, column 1" in result["error"]
+
+            response = client.post("/api/run", json={
+                "code": "", "language": "python", "exercise_id": "nope", "run_tests": True})
+            assert response.status_code == 404
+        finally:
+            run_code.remote_runner, run_code.stats_manager = original
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_checker,
+        test_early_termination,
+        test_run_tests,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,213 @@
+"""
+Tests for remote sandbox execution, with local agent processes standing in for hosts.
+"""
+
+import sys
+import os
+import time
+import socket
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.remote_executor import RemoteSandboxRunner, MSG_NO_WORKERS
+from stats import tracing
+
+
+class FakeRunner:
+    """Stands in for DockerSandboxRunner inside the agent processes."""
+
+    def run_code(self, language, code, stdin_data="", container_name=None):
+        time.sleep(float(stdin_data or 0))
+        tracing.record("execute", 0.25)
+        return {"success": True, "output": f"{os.getpid()}:{language}:{code}", "error": ""}
+
+    def kill(self, container_name):
+        pass
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_agents(n: int, capacity: int = 2):
+    """Start n agent processes; returns [(url, process)] once all are up."""
+    agents = []
+    for _ in range(n):
+        port = free_port()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "services.sandbox_agent", "--host", "127.0.0.1", "--port", str(port),
+             "--capacity", str(capacity), "--runner", "test_remote_executor:FakeRunner"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        agents.append((f"http://127.0.0.1:{port}", proc))
+    deadline = time.monotonic() + 20
+    for url, _ in agents:
+        port = int(url.rsplit(":", 1)[1])
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                assert time.monotonic() < deadline, "agent did not start"
+                time.sleep(0.1)
+    return agents
+
+
+def stop_agents(agents):
+    for _, proc in agents:
+        proc.kill()
+        proc.wait()
+
+
+def pid_of(result) -> str:
+    return result["output"].split(":")[0]
+
+
+def test_placement():
+    """Concurrent runs spread over agents; a warm agent wins ties; phases come back with results."""
+    print("TEST 1: placement...")
+    agents = start_agents(2)
+    runner = RemoteSandboxRunner([url for url, _ in agents], heartbeat_interval=0.2)
+    try:
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda i: runner.run_code("c", str(i), "0.3"), range(4)))
+        assert all(r["success"] for r in results)
+        assert len({pid_of(r) for r in results}) == 2, results
+
+        # Idle agents: the one that last ran Java is preferred for Java
+        java_pid = pid_of(runner.run_code("java", "x", ""))
+        for _ in range(3):
+            assert pid_of(runner.run_code("java", "y", "")) == java_pid
+
+        # Phases timed on the agent land in the caller's trace
+        with tracing.collect() as trace:
+            result = runner.run_code("c", "z", "")
+        assert "phases" not in result
+        assert trace.breakdown()["execute"] == 0.25 and "remote_run" in trace.breakdown()
+    finally:
+        runner.close()
+        stop_agents(agents)
+    print("✅ PASS")
+
+
+def test_worker_loss_and_drain():
+    """Runs are retried when an agent dies; drained agents get no new jobs."""
+    print("TEST 2: worker loss and draining...")
+    agents = start_agents(3, capacity=1)
+    urls = [url for url, _ in agents]
+    runner = RemoteSandboxRunner(urls, heartbeat_interval=30)
+    try:
+        assert runner.run_code("python", "warmup", "")["success"]
+
+        # Kill one agent before the heartbeat notices: runs still succeed
+        agents[0][1].kill()
+        agents[0][1].wait()
+        results = [runner.run_code("python", str(i), "") for i in range(4)]
+        assert all(r["success"] for r in results), results
+        assert runner.retries >= 1
+        states = {w.url: w for w in runner.workers}
+        assert not states[urls[0]].healthy
+
+        # Drain the second agent: everything goes to the third
+        assert runner.drain(urls[1])
+        third = {pid_of(runner.run_code("python", str(i), "")) for i in range(3)}
+        assert third == {str(agents[2][1].pid)}, third
+
+        # Nothing left once the last agent is drained too
+        runner.drain(urls[2])
+        result = runner.run_code("python", "z", "")
+        assert not result["success"] and result["error"] == MSG_NO_WORKERS
+        runner.check_workers()
+        assert runner.healthy_workers() == 0
+    finally:
+        runner.close()
+        stop_agents(agents)
+    print("✅ PASS")
+
+
+def test_shared_agents():
+    """Two API workers filling the same agent: the second run moves to the free agent."""
+    print("TEST 3: agents shared by several API workers...")
+    agents = start_agents(2, capacity=1)
+    urls = [url for url, _ in agents]
+    runners = [RemoteSandboxRunner(urls, attempts=1, heartbeat_interval=30) for _ in range(2)]
+    try:
+        for runner in runners:
+            runner.check_workers()
+        with ThreadPoolExecutor(2) as pool:
+            results = list(pool.map(lambda r: r.run_code("c", "x", "0.5"), runners))
+        assert all(r["success"] for r in results), results
+        assert len({pid_of(r) for r in results}) == 2, results
+    finally:
+        for runner in runners:
+            runner.close()
+        stop_agents(agents)
+    print("✅ PASS")
+
+
+def test_slow_result_not_rerun():
+    """A run whose result is late times out once and is not placed again; open agents need a token."""
+    print("TEST 4: slow results and agent binding...")
+    agents = start_agents(2, capacity=1)
+    runner = RemoteSandboxRunner([url for url, _ in agents], heartbeat_interval=30, run_timeout=0.5)
+    try:
+        result = runner.run_code("c", "slow", "2")
+        assert not result["success"] and "timed out" in result["error"], result
+        assert runner.retries == 0 and all(w.healthy for w in runner.workers)
+        runner.check_workers()
+        assert sum(w.reported_running for w in runner.workers) == 1
+    finally:
+        runner.close()
+        stop_agents(agents)
+
+    env = {k: v for k, v in os.environ.items() if k != "SANDBOX_AGENT_TOKEN"}
+    proc = subprocess.run([sys.executable, "-m", "services.sandbox_agent", "--host", "0.0.0.0",
+                           "--port", str(free_port())], cwd=os.path.dirname(os.path.abspath(__file__)),
+                          env=env, capture_output=True, text=True, timeout=30)
+    assert proc.returncode == 2 and "SANDBOX_AGENT_TOKEN" in proc.stderr, proc.stderr
+
+    from fastapi.testclient import TestClient
+    from services.sandbox_agent import create_app
+    client = TestClient(create_app(FakeRunner(), capacity=1, token="s3cret"))
+    assert client.get("/health").status_code == 401
+    assert client.get("/health", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/health", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_placement,
+        test_worker_loss_and_drain,
+        test_shared_agents,
+        test_slow_result_not_rerun,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
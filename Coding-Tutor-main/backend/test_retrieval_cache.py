@@ -0,0 +1,178 @@
+"""
+Tests for error signatures, the LRU/TTL retrieval cache and the hint cache.
+"""
+
+import sys
+import os
+import time
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag.error_signature import normalize_error, error_signature
+from rag.retrieval_cache import RetrievalCache
+from rag.hint_cache import HintCache
+
+
+def test_signature_ignores_volatile_details():
+    """Line numbers, paths and literals do not change the signature; unknown names do."""
+    print("TEST 1: error signatures...")
+    a = ("/tmp/coding_tutor_ab12/main.c: In function ‘main’:\n"
+         "/tmp/coding_tutor_ab12/main.c:5:5: error: expected ‘;’ before ‘return’\n"
+         "    5 |     return 0;\n      |     ^~~~~~")
+    b = ("/tmp/coding_tutor_zz99/main.c: In function ‘main’:\n"
+         "/tmp/coding_tutor_zz99/main.c:12:9: error: expected ‘;’ before ‘printf’\n"
+         "   12 |         printf(\"%d\", total)\n      |         ^")
+    assert error_signature(a) == error_signature(b), (normalize_error(a), normalize_error(b))
+    assert "';'" in normalize_error(a)
+
+    py_a = ("Traceback (most recent call last):\n  File \"/sandbox/main.py\", line 3, in <module>\n"
+            "    n = int(input())\nNameError: name 'foo' is not defined")
+    py_b = ("Traceback (most recent call last):\n  File \"/sandbox/main.py\", line 9, in <module>\n"
+            "    print(total)\nNameError: name 'total' is not defined")
+    py_c = ("Traceback (most recent call last):\n  File \"/tmp/other/main.py\", line 7, in <module>\n"
+            "    n = int(input())\nNameError: name 'foo' is not defined")
+    assert error_signature(py_a) == error_signature(py_c)
+    assert error_signature(py_a) != error_signature("EOFError: EOF when reading a line")
+
+    # The missing name is the diagnosis: cout needs <iostream>, vector needs <vector>
+    cout = "main.cpp:4:5: error: 'cout' was not declared in this scope"
+    vector = "main.cpp:9:2: error: 'vector' was not declared in this scope"
+    assert error_signature(cout) != error_signature(vector)
+    assert error_signature(cout) == error_signature("main.cpp:17:3: error: 'cout' was not declared in this scope")
+    assert error_signature(py_a) != error_signature(py_b)
+    java_a = "Main.java:5: error: cannot find symbol\n  symbol:   variable total\n  location: class Main"
+    java_b = "Main.java:8: error: cannot find symbol\n  symbol:   variable count\n  location: class Main"
+    assert error_signature(java_a) != error_signature(java_b)
+    assert "'length'" in normalize_error("AttributeError: 'list' object has no attribute 'length'")
+    print("✅ PASS")
+
+
+def test_lru_eviction_and_hit_rate():
+    """The least recently used entry is evicted and hits are counted."""
+    print("TEST 2: LRU eviction...")
+    cache = RetrievalCache(max_entries=2, ttl=0)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    assert cache.get("a") == [1]   # a is now most recent
+    cache.put("c", [3])            # evicts b
+    assert cache.get("b") is None
+    assert cache.get("c") == [3]
+    stats = cache.get_stats()
+    assert stats["evictions"] == 1 and stats["hits"] == 2 and stats["misses"] == 1, stats
+    print("✅ PASS")
+
+
+def test_ttl_expiry():
+    """Entries expire after the TTL."""
+    print("TEST 3: TTL expiry...")
+    cache = RetrievalCache(max_entries=10, ttl=0.05)
+    cache.put("a", ["chunk"])
+    assert cache.get("a") == ["chunk"]
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.get_stats()["expirations"] == 1
+    print("✅ PASS")
+
+
+def test_persistence():
+    """A saved cache is reloaded by a new instance, unless the indexes changed since."""
+    print("TEST 4: persistence...")
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "cache.json")
+        version = ["c_lab=1:1"]
+        cache = RetrievalCache(max_entries=10, ttl=60, path=path, version_fn=lambda: version[0])
+        cache.put("c_lab:5:abc", ["note one", "note two"])
+        cache.save()
+        reloaded = RetrievalCache(max_entries=10, ttl=60, path=path, version_fn=lambda: version[0])
+        assert reloaded.get("c_lab:5:abc") == ["note one", "note two"]
+
+        version[0] = "c_lab=2:2"  # index rebuilt
+        rebuilt = RetrievalCache(max_entries=10, ttl=60, path=path, version_fn=lambda: version[0])
+        assert len(rebuilt) == 0 and rebuilt.get("c_lab:5:abc") is None
+    print("✅ PASS")
+
+
+def fake_encode(text):
+    """Bag-of-letters embedding: similar texts get similar vectors."""
+    vec = [0.0] * 26
+    for ch in text.lower():
+        if "a" <= ch <= "z":
+            vec[ord(ch) - ord("a")] += 1
+    return [vec]
+
+
+def test_hint_cache_exact_and_semantic():
+    """Same signature hits exactly; a near-identical error hits semantically."""
+    print("TEST 5: hint cache...")
+    cache = HintCache(encode=fake_encode, similarity=0.95)
+    hint = {"hint": "Check your loop bounds.", "source": "LLM (Ollama)", "rag_used": False}
+    cache.store("c_lab", "ex1", "main.c:4:2: error: expected ';' before 'return'", "", hint)
+
+    hit = cache.lookup("c_lab", "ex1", "main.c:9:7: error: expected ';' before 'printf'", "")
+    assert hit and hit["hint"] == hint["hint"], hit
+    assert hit["source"] == "LLM (Ollama) (Cached)", hit
+
+    near = cache.lookup("c_lab", "ex1", "main.c:9:7: error: expected ';' before 'printf' here", "")
+    assert near and near["hint"] == hint["hint"], near
+    assert cache.get_stats()["semantic_hits"] == 1
+
+    assert cache.lookup("c_lab", "ex2", "main.c:9:7: error: expected ';' before 'printf'", "") is None
+    assert cache.lookup("c_lab", "ex1", "Segmentation fault", "") is None
+
+    # An evicted nearest neighbour falls through to the next live one and leaves the bucket
+    small = HintCache(encode=fake_encode, similarity=0.5, max_entries=2)
+    small.store("c_lab", "ex1", "expected ';' before 'return'", "", hint)
+    small.store("c_lab", "ex1", "expected ';' before 'printf' here", "", {**hint, "hint": "Second."})
+    small.store("c_lab", "ex2", "EOFError", "", hint)    # evicts the first entry
+    near = small.lookup("c_lab", "ex1", "expected ';' before 'return' now", "")
+    assert near and near["hint"] == "Second.", near
+    assert len(small._buckets[("c_lab", "ex1")][0]) == 1
+    print("✅ PASS")
+
+
+def test_hint_cache_invalidated_on_index_rebuild():
+    """A new index version drops that subject's cached hints."""
+    print("TEST 6: hint cache invalidation...")
+    versions = {"c_lab": "v1"}
+    cache = HintCache(version_fn=lambda subject: versions.get(subject, "-"))
+    cache.store("c_lab", "ex1", "EOFError", "", {"hint": "Provide input.", "source": "RAG", "rag_used": True})
+    assert cache.lookup("c_lab", "ex1", "EOFError", "") is not None
+    versions["c_lab"] = "v2"
+    assert cache.lookup("c_lab", "ex1", "EOFError", "") is None
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_signature_ignores_volatile_details,
+        test_lru_eviction_and_hit_rate,
+        test_ttl_expiry,
+        test_persistence,
+        test_hint_cache_exact_and_semantic,
+        test_hint_cache_invalidated_on_index_rebuild,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,164 @@
+"""
+Tests for the retrieval daemon: binary protocol, sync/async clients and in-process fallback.
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import numpy as np
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag import rag_llm_chat
+from rag.retrieval_daemon import RetrievalDaemon, RetrievalClient, RetrievalDaemonError, DaemonHintCache
+from rag.hint_cache import HintCache
+
+CHUNKS = ["A for loop repeats while its condition holds.", "Zeiger → pointers: *p gives the value ✓", ""]
+
+
+async def fake_retrieve(subject, query, k):
+    if subject == "broken":
+        raise KeyError(subject)
+    return [f"{subject}|{query}|{k}"] + CHUNKS
+
+
+async def fake_encode(text):
+    return np.arange(4, dtype="float32").reshape(1, -1) * len(text)
+
+
+def with_daemon(body, hints=None):
+    """Run body(client, socket_path) against a daemon with fake retrieval."""
+    async def main():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rag.sock")
+            daemon = await RetrievalDaemon(path, fake_retrieve, fake_encode, hints=hints).start()
+            try:
+                return await body(RetrievalClient(path, timeout=2), daemon)
+            finally:
+                await daemon.stop()
+    return asyncio.run(main())
+
+
+def test_round_trip():
+    """Chunks (incl. non-ASCII and empty), vectors and stats survive the protocol."""
+    print("TEST 1: round trip...")
+
+    async def body(client, daemon):
+        chunks = await client.retrieve_async("c_lab_manual", "expected ';' — ✗", 3)
+        assert chunks == ["c_lab_manual|expected ';' — ✗|3"] + CHUNKS, chunks
+        vec = await client.encode_async("abc")
+        assert vec.shape == (1, 4) and vec[0, 3] == 9.0
+
+        # Blocking client (used from worker threads)
+        chunks = await asyncio.to_thread(client.retrieve, "Java", "NullPointerException", 5)
+        assert chunks[0] == "Java|NullPointerException|5"
+        stats = await asyncio.to_thread(client.get_stats)
+        assert stats["requests"]["retrieve"] == 2 and stats["requests"]["embed"] == 1
+
+        # Concurrent requests share pooled connections
+        results = await asyncio.gather(*[client.retrieve_async("C++", f"q{i}", 5) for i in range(20)])
+        assert [r[0] for r in results] == [f"C++|q{i}|5" for i in range(20)]
+        assert daemon.requests["retrieve"] == 22
+
+    with_daemon(body)
+    print("✅ PASS")
+
+
+def test_daemon_errors():
+    """Errors raised by retrieval come back as RetrievalDaemonError; the daemon stays usable."""
+    print("TEST 2: daemon errors...")
+
+    async def body(client, daemon):
+        try:
+            await client.retrieve_async("broken", "q", 5)
+            assert False, "should raise"
+        except RetrievalDaemonError as e:
+            assert "KeyError" in str(e)
+        assert client.available()
+        assert (await client.retrieve_async("ok", "q", 5))[0] == "ok|q|5"
+
+    with_daemon(body)
+    print("✅ PASS")
+
+
+def test_fallback_when_daemon_down():
+    """retrieve_notes falls back in-process when the daemon is unreachable, then backs off."""
+    print("TEST 3: fallback...")
+    original = rag_llm_chat.retrieval_client
+    before_batcher = rag_llm_chat.batcher
+    with tempfile.TemporaryDirectory() as tmp:
+        rag_llm_chat.retrieval_client = RetrievalClient(os.path.join(tmp, "missing.sock"), timeout=1)
+        try:
+            before = rag_llm_chat.retrieval_stats["daemon_fallback"]
+            assert isinstance(rag_llm_chat.retrieve_notes("c_lab_manual", "segmentation fault"), list)
+            assert rag_llm_chat.retrieval_stats["daemon_fallback"] == before + 1
+            assert not rag_llm_chat.retrieval_client.available()
+            # Backing off: no further attempts while the daemon is marked down
+            asyncio.run(rag_llm_chat.retrieve_notes_async("c_lab_manual", "segmentation fault"))
+            assert rag_llm_chat.retrieval_client.calls == 1
+            # The worker answers with BM25 only; it never loads a model of its own
+            assert rag_llm_chat.batcher is before_batcher
+        finally:
+            rag_llm_chat.retrieval_client = original
+    print("✅ PASS")
+
+
+def test_shared_hint_cache():
+    """Workers share the daemon's hint cache; while it is down each uses its own exact cache."""
+    print("TEST 4: shared hint cache...")
+    hint = {"hint": "Check the loop bound.", "source": "LLM", "rag_used": True}
+
+    async def body(client, daemon):
+        first = DaemonHintCache(client, HintCache())
+        second = DaemonHintCache(RetrievalClient(client.socket_path, timeout=2), HintCache())
+        await first.store_async("c_lab_manual", "ex1", "index 5 out of range", "", hint)
+        hit = await second.lookup_async("c_lab_manual", "ex1", "index 7 out of range")
+        assert hit and hit["hint"] == hint["hint"] and hit["source"] == "LLM (Cached)", hit
+        assert await asyncio.to_thread(second.lookup, "c_lab_manual", "ex2", "index 7 out of range") is None
+        assert daemon.requests["hint_store"] == 1 and daemon.requests["hint_lookup"] == 2
+        assert len(second.fallback._exact) == 0
+
+        # Daemon unreachable: lookups miss instead of failing, and stores stay in the worker
+        down = DaemonHintCache(RetrievalClient(client.socket_path + ".gone", timeout=1), HintCache())
+        assert await down.lookup_async("c_lab_manual", "ex1", "index 7 out of range") is None
+        assert not down.client.available() and down.daemon_fallbacks == 1
+        await down.store_async("c_lab_manual", "ex1", "index 7 out of range", "", hint)
+        assert (await down.lookup_async("c_lab_manual", "ex1", "index 9 out of range"))["hint"] == hint["hint"]
+        assert down.client.calls == 1 and down.get_stats()["size"] == 1
+
+    with_daemon(body, hints=HintCache())
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_round_trip,
+        test_daemon_errors,
+        test_fallback_when_daemon_down,
+        test_shared_hint_cache,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
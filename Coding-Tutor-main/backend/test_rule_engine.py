@@ -0,0 +1,128 @@
+"""
+Tests for the rule-pack hint engine: original rules, templates, corpus coverage and speed.
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rag.rule_engine import RuleEngine, evaluate_corpus, language_for_subject
+
+CORPUS = os.path.join(os.path.dirname(__file__), "bench", "error_corpus.json")
+
+engine = RuleEngine()
+
+
+def test_original_rules_preserved():
+    """The six original rules still answer the errors they used to."""
+    print("TEST 1: original rules...")
+    cases = [
+        ("OUTPUT_FORMAT_ERROR: prompts printed", "", "common.output-format"),
+        ("Did not compile: missing bracket", "", "common.syntax-missing"),
+        ("compile failed", "", "common.compile"),
+        ("Runtime crash", "", "common.runtime"),
+        ("Output mismatch", "Test 1: got 5", "common.output-mismatch-numeric"),
+        ("Output mismatch", "spacing differs", "common.output-mismatch"),
+        ("Logical error in loop", "", "common.logical"),
+        ("No output produced", "", "common.no-output"),
+        ("Wrong answer", "", None),
+    ]
+    for error, tests, expected in cases:
+        match = engine.match(error, tests)
+        got = match["id"] if match else None
+        assert got == expected, f"{error!r}: expected {expected}, got {got}"
+    assert engine.match("compile failed", "")["hint"].startswith("Compilation error: Code syntax check pannunga.")
+    print("✅ PASS")
+
+
+def test_templates_and_priority():
+    """Specific rules beat generic ones and fill templates from named groups."""
+    print("TEST 2: templates + priority...")
+    match = engine.match("COMPILE_ERROR: Traceback...\nNameError: name 'totl' is not defined", "", "python")
+    assert match["id"] == "python.name-not-defined" and "'totl'" in match["hint"], match
+    assert not match["generic"]
+
+    # Language selection: a C pack rule does not fire for Python
+    c_error = "COMPILE_ERROR: main.c:5:5: error: expected ';' before 'return'"
+    assert engine.match(c_error, "", "c")["id"] == "gcc.missing-semicolon"
+    assert engine.match(c_error, "", "python")["id"] == "common.syntax-missing"
+    assert language_for_subject("c_lab_manual") == "c"
+    assert language_for_subject("C++") == "cpp"
+    assert language_for_subject("Java") == "java"
+    assert language_for_subject("python_lab_manual") == "python"
+    print("✅ PASS")
+
+
+def test_custom_pack_and_overlapping_keywords():
+    """Packs load from any directory; overlapping keywords all trigger."""
+    print("TEST 3: custom pack...")
+    with tempfile.TemporaryDirectory() as tmp:
+        pack = {"name": "t", "version": 2, "languages": ["*"], "rules": [
+            {"id": "short", "priority": 1, "keywords": ["abc"], "hint": "short"},
+            {"id": "long", "priority": 5, "keywords": ["abcdef"], "pattern": "abcdef (?P<n>\\d+)",
+             "hint": "long {n} {missing}"},
+            {"id": "inner", "priority": 3, "keywords": ["cde"], "field": "tests", "hint": "inner"},
+        ]}
+        with open(os.path.join(tmp, "t.json"), "w") as f:
+            json.dump(pack, f)
+        custom = RuleEngine(tmp)
+        assert custom.match("xx ABCDEF 42", "")["hint"] == "long 42 {missing}"
+        assert custom.match("xx abcdef", "")["id"] == "t.short"          # long's pattern fails
+        assert custom.match("xx abcdef", "cde")["id"] == "t.inner"
+        version = custom.version
+        pack["version"] = 3
+        with open(os.path.join(tmp, "t.json"), "w") as f:
+            json.dump(pack, f)
+        custom.load()
+        assert custom.version != version
+    print("✅ PASS")
+
+
+def test_corpus_coverage_and_speed():
+    """Real gcc/javac/Python errors: expected rules, coverage and matcher speed."""
+    print("TEST 4: corpus...")
+    with open(CORPUS, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    report = evaluate_corpus(engine, corpus, repeat=20)
+    print(f"  {report['rules']} rules, coverage {report['coverage']:.1%}, "
+          f"specific {report['specific_coverage']:.1%}, {report['mean_match_us']} µs/match")
+    assert not report["mismatches"], report["mismatches"]
+    assert report["specific_coverage"] >= 0.9
+    assert report["mean_match_us"] < 500, "Matcher should take microseconds, not milliseconds"
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_original_rules_preserved,
+        test_templates_and_priority,
+        test_custom_pack_and_overlapping_keywords,
+        test_corpus_coverage_and_speed,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,204 @@
+"""
+Tests for the sandbox scheduler: round-robin fairness, token buckets and superseded runs.
+"""
+
+import sys
+import os
+import time
+import asyncio
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.sandbox_scheduler import SandboxScheduler, SandboxRejected, SandboxCancelled
+
+
+def sleeper(seconds, log=None, tag=None):
+    """Blocking fake run; records its start order."""
+    def fn(name):
+        if log is not None:
+            log.append(tag)
+        time.sleep(seconds)
+        return {"success": True, "output": tag}
+    return fn
+
+
+def test_round_robin_under_abuse():
+    """A client flooding the queue does not delay another client's run."""
+    print("TEST 1: fairness...")
+
+    async def main():
+        scheduler = SandboxScheduler(max_concurrency=1, rate=100, burst=100, max_in_flight=1)
+        log = []
+        # Even a script rotating client ids only gets one turn per id
+        abusers = [asyncio.ensure_future(scheduler.submit(f"bot{i}", sleeper(0.05, log, f"bot{i}")))
+                   for i in range(4)]
+        await asyncio.sleep(0.01)
+        student = asyncio.ensure_future(scheduler.submit("student", sleeper(0.01, log, "student")))
+        await asyncio.gather(*abusers, student)
+        # The student waits for at most one run per client ahead of it
+        assert log.index("student") <= 5, log
+        assert scheduler.running == 0 and scheduler.queue_depth == 0
+
+        # One client submitting many runs only ever holds one slot
+        scheduler = SandboxScheduler(max_concurrency=2, rate=100, burst=100, max_in_flight=1)
+        log = []
+        first = asyncio.ensure_future(scheduler.submit("spam", sleeper(0.1, log, "spam")))
+        await asyncio.sleep(0.01)
+        started = time.monotonic()
+        result = await scheduler.submit("student", sleeper(0.01, log, "student"))
+        assert result["output"] == "student"
+        assert time.monotonic() - started < 0.08
+        await first
+
+    asyncio.run(main())
+    print("✅ PASS")
+
+
+def test_rate_limit():
+    """Submissions beyond the bucket are rejected with a retry-after."""
+    print("TEST 2: rate limit...")
+
+    async def main():
+        scheduler = SandboxScheduler(max_concurrency=4, rate=1, burst=2)
+        await scheduler.submit("a", sleeper(0))
+        await scheduler.submit("a", sleeper(0))
+        try:
+            await scheduler.submit("a", sleeper(0))
+            assert False, "should be rate limited"
+        except SandboxRejected as e:
+            assert e.reason == "rate_limited" and 0 < e.retry_after <= 1.0
+        # Other clients have their own bucket
+        assert (await scheduler.submit("b", sleeper(0, tag="b")))["output"] == "b"
+        assert scheduler.rejected["rate_limited"] == 1
+
+    asyncio.run(main())
+    print("✅ PASS")
+
+
+def test_newer_run_supersedes():
+    """A new submission cancels the client's queued and running runs and kills them."""
+    print("TEST 3: supersede...")
+
+    async def main():
+        scheduler = SandboxScheduler(max_concurrency=1, rate=100, burst=100)
+        killed = []
+        runs = []
+
+        def run(name):
+            runs.append(name)
+            deadline = time.monotonic() + 2
+            while name not in killed and time.monotonic() < deadline:
+                time.sleep(0.005)
+            return {"killed": name in killed}
+
+        blocker = asyncio.ensure_future(scheduler.submit("other", sleeper(0.05)))
+        running = asyncio.ensure_future(scheduler.submit("a", run, kill=killed.append))
+        await asyncio.sleep(0.1)  # "a" is now running
+        # Resubmitted twice in a row: the first resubmission is still queued
+        # behind the run being killed when the second one arrives
+        queued = asyncio.ensure_future(scheduler.submit("a", run, kill=killed.append))
+        started = time.monotonic()
+        latest = asyncio.ensure_future(scheduler.submit("a", sleeper(0, tag="latest")))
+
+        for fut in (running, queued):
+            try:
+                await fut
+                assert False, "should be cancelled"
+            except SandboxCancelled:
+                pass
+        assert (await latest)["output"] == "latest"
+        assert time.monotonic() - started < 1.0
+        assert killed == runs[:1] and len(runs) == 1
+        assert scheduler.cancelled == 2
+        await blocker
+
+        # Another session of the same client keeps its run
+        first = asyncio.ensure_future(scheduler.submit("b", sleeper(0.05, tag="window-1"), session="1"))
+        second = asyncio.ensure_future(scheduler.submit("b", sleeper(0, tag="window-2"), session="2"))
+        assert (await first)["output"] == "window-1" and (await second)["output"] == "window-2"
+
+        # A caller that goes away withdraws its queued run
+        blocker = asyncio.ensure_future(scheduler.submit("x", sleeper(0.05)))
+        waiting = asyncio.ensure_future(scheduler.submit("y", sleeper(0)))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        await blocker
+        assert scheduler.queue_depth == 0 and scheduler.running == 0
+
+    asyncio.run(main())
+    print("✅ PASS")
+
+
+def test_rotating_session_ids():
+    """Limits follow the caller's IP, not the X-Client-Id or token it chooses."""
+    print("TEST 4: rotating client ids...")
+    import tempfile
+    from fastapi.testclient import TestClient
+    import main
+    from api import run_code
+    from stats import StatsManager
+
+    class Runner:
+        def run_code(self, language, code, stdin_data="", container_name=None, **kwargs):
+            return {"success": True, "output": "ok", "error": ""}
+
+        def kill(self, name):
+            pass
+
+    original = (run_code.remote_runner, run_code.stats_manager, run_code.sandbox_scheduler)
+    with tempfile.TemporaryDirectory() as tmp:
+        run_code.remote_runner = Runner()
+        run_code.stats_manager = StatsManager(os.path.join(tmp, "stats.json"))
+        run_code.sandbox_scheduler = SandboxScheduler(rate=0.01, burst=2)
+        try:
+            client = TestClient(main.app)
+
+            def run(headers):
+                return client.post("/api/run", headers=headers, json={
+                    "code": "print(1)", "language": "python", "exercise_id": "ex1"}).status_code
+
+            statuses = [run({"X-Client-Id": f"script-{i}"}) for i in range(4)]
+            assert statuses == [200, 200, 429, 429], statuses
+            # Nor does an unverified bearer token reset the allowance
+            assert run({"Authorization": "Bearer other", "X-Client-Id": "script-9"}) == 429
+            assert run({"Authorization": "Bearer another", "X-Client-Id": "script-10"}) == 429
+            # A student on another machine is a different client
+            from starlette.requests import Request
+            scope = {"type": "http", "headers": [], "client": ("10.0.0.7", 50000)}
+            assert run_code._client_id(Request(scope)) == "ip:10.0.0.7"
+        finally:
+            run_code.remote_runner, run_code.stats_manager, run_code.sandbox_scheduler = original
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_round_robin_under_abuse,
+        test_rate_limit,
+        test_newer_run_supersedes,
+        test_rotating_session_ids,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
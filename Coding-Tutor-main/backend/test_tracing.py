@@ -0,0 +1,154 @@
+"""
+Tests for request tracing: spans, per-phase metrics and slow-request logging.
+"""
+
+import sys
+import os
+import time
+import asyncio
+import logging
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+
+import main
+from api import get_hint, run_code
+from stats import StatsManager, tracing
+
+
+def test_spans():
+    """Spans land in the current trace, also from threads; nothing is recorded outside a request."""
+    print("TEST 1: spans...")
+    with tracing.span("outside"):
+        pass
+
+    async def handler():
+        trace, token = tracing.start()
+        tracing.annotate(language="c", exercise="ex1")
+        with tracing.span("compile"):
+            time.sleep(0.01)
+        await asyncio.to_thread(tracing.record, "execute", 0.5)
+        with tracing.span("compile"):
+            pass
+        tracing.finish(trace, token, "/test", 200)
+        return trace
+
+    trace = asyncio.run(handler())
+    breakdown = trace.breakdown()
+    assert set(breakdown) == {"compile", "execute"}
+    assert breakdown["compile"] >= 0.01 and breakdown["execute"] == 0.5
+    assert tracing.current() is None
+    assert tracing.phase_duration.count(route="/test", phase="execute", language="c") == 1
+    assert tracing.exercise_duration.count(route="/test", language="c", exercise="ex1") == 1
+    print("✅ PASS")
+
+
+def test_request_metrics_and_slow_log():
+    """Requests export per-route, per-phase histograms; slow ones are logged with a breakdown."""
+    print("TEST 2: request metrics...")
+    original_stats = (get_hint.stats_manager, run_code.stats_manager)
+    original_slow = tracing.SLOW_REQUEST_SECONDS
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    tracing.logger.addHandler(handler)
+    with tempfile.TemporaryDirectory() as tmp:
+        get_hint.stats_manager = run_code.stats_manager = StatsManager(os.path.join(tmp, "stats.json"))
+        tracing.SLOW_REQUEST_SECONDS = 1e-9
+        try:
+            client = TestClient(main.app)
+            response = client.post("/api/hint", json={
+                "language": "c", "exercise_id": "ex1",
+                "error_message": "error: expected ';' before 'return'",
+            })
+            assert response.status_code == 200
+            client.post("/api/hint", json={"language": "klingon", "exercise_id": "x", "error_message": "e"})
+            client.get("/api/exercises/c")
+
+            text = client.get("/metrics").text
+            assert 'http_request_duration_seconds_count{route="/api/hint",status="200"} 2' in text
+            assert 'request_phase_seconds_count{route="/api/hint",phase="rules",language="c"} 1' in text
+            assert 'request_phase_seconds_count{route="/api/hint",phase="stats_write",language="c"} 1' in text
+            assert 'exercise_request_seconds_count{route="/api/hint",language="c",exercise="ex1"} 1' in text
+            # Unknown languages and exercises do not create new label values
+            assert 'exercise_request_seconds_count{route="/api/hint",language="other",exercise="other"} 1' in text
+            assert 'route="/api/exercises/{language}"' in text
+            assert 'cache_entries{cache="retrieval"}' in text
+
+            slow = [r.getMessage() for r in records if "/api/hint" in r.getMessage()]
+            assert slow and "rules=" in slow[0] and "exercise=ex1" in slow[0], slow
+        finally:
+            get_hint.stats_manager, run_code.stats_manager = original_stats
+            tracing.SLOW_REQUEST_SECONDS = original_slow
+            tracing.logger.removeHandler(handler)
+    print("✅ PASS")
+
+
+def test_streamed_hint():
+    """A streamed hint's trace ends with the body, so phases recorded while streaming are exported."""
+    print("TEST 3: streamed request trace...")
+    original = (get_hint.stats_manager, get_hint.stream_hint, tracing.SLOW_REQUEST_SECONDS)
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    tracing.logger.addHandler(handler)
+
+    async def slow_stream(**kwargs):
+        with tracing.span("ollama"):
+            await asyncio.sleep(0.2)
+        yield {"event": "done", "hint": "Check the loop bound.", "source": "LLM", "rag_used": False}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        get_hint.stats_manager = StatsManager(os.path.join(tmp, "stats.json"))
+        get_hint.stream_hint = slow_stream
+        tracing.SLOW_REQUEST_SECONDS = 0.15
+        try:
+            client = TestClient(main.app)
+            route = "/api/hint/stream"
+            before = tracing.request_duration.count(route=route, status="200")
+            phases = tracing.phase_duration.count(route=route, phase="ollama", language="c")
+            response = client.post(route, json={"language": "c", "exercise_id": "ex1", "error_message": "wrong"})
+            assert response.status_code == 200 and "Check the loop bound." in response.text
+            assert tracing.request_duration.count(route=route, status="200") == before + 1
+            assert tracing.phase_duration.count(route=route, phase="ollama", language="c") == phases + 1
+            # Slow only because of the streamed part
+            slow = [r.getMessage() for r in records if route in r.getMessage()]
+            assert len(slow) == 1 and "ollama=" in slow[0], slow
+        finally:
+            get_hint.stats_manager, get_hint.stream_hint, tracing.SLOW_REQUEST_SECONDS = original
+            tracing.logger.removeHandler(handler)
+    print("✅ PASS")
+
+
+def run_all_tests():
+    """Run all tests and report results."""
+    tests = [
+        test_spans,
+        test_request_metrics_and_slow_log,
+        test_streamed_hint,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ FAIL: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("=" * 60)
+    print(f"RESULTS: {passed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
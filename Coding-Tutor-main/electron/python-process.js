@@ -31,6 +31,9 @@ function spawnPythonServer() {
   const backendPath = path.join(__dirname, '..', 'backend');
   const mainPy = path.join(backendPath, 'main.py');
   
+  // A single uvicorn process: admission limits (LLM queue, sandbox
+  // fairness, hint coalescing) are per process, so the desktop app does not
+  // fork workers (see serve.py for server deployments)
   const args = [
     '-m', 'uvicorn',
     'main:app',
@@ -7,7 +7,7 @@ import ResizableTerminal from './components/Output/ResizableTerminal';
 import Dashboard from './components/Dashboard/Dashboard';
 import HintButton from './components/Controls/HintButton';
 import InputArea from './components/Controls/InputArea';
-import { runCode, getHint } from './services/api';
+import { runCode, streamHint } from './services/api';
 
 function App() {
   const [code, setCode] = useState('');
@@ -81,6 +81,10 @@ function App() {
     
     try {
       const result = await runCode(code, language, exerciseId, userInput);
+      if (result.cancelled) {
+        // Superseded by a newer run, whose result will be shown instead
+        return;
+      }
       setLastEvaluation(result);
       
       let outputText = '';
@@ -142,8 +146,9 @@ function App() {
         ? `${lastEvaluation.error_type}: ${lastEvaluation.error || 'Execution failed'}`
         : `Error: ${lastEvaluation.error || 'Execution failed'}`;
       
-      const result = await getHint(language, exerciseId, errorMessage, '');
-      setHintContent(result.hint);
+      // Show the hint as it is generated instead of after the whole answer
+      setHintContent('');
+      await streamHint(language, exerciseId, errorMessage, '', setHintContent);
       setStats(prev => ({
         ...prev,
         hintsRequested: prev.hintsRequested + 1,
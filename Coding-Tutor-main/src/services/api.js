@@ -63,6 +63,23 @@ async function fetchWithRetry(url, options = {}, retries = MAX_RETRIES, delay =
   }
 }
 
+/**
+ * Per-window client id, sent with runs so the backend can share sandbox
+ * slots fairly between students and cancel a student's superseded runs
+ */
+function getClientId() {
+  try {
+    let id = sessionStorage.getItem('clientId');
+    if (!id) {
+      id = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+      sessionStorage.setItem('clientId', id);
+    }
+    return id;
+  } catch (error) {
+    return '';
+  }
+}
+
 // Sandboxed Practice System API
 export const runCode = async (code, language, exerciseId, userInput = '') => {
   try {
@@ -70,6 +87,7 @@ export const runCode = async (code, language, exerciseId, userInput = '') => {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        'X-Client-Id': getClientId(),
       },
       body: JSON.stringify({
         code,
@@ -161,6 +179,86 @@ export const getHint = async (language, exerciseId, errorMessage, failedTests) =
   }
 };
 
+/**
+ * Stream a hint from /hint/stream (Server-Sent Events over a POST body).
+ * onUpdate(text) is called with the hint text so far; resolves with the
+ * final { hint, source, rag_used, ttft_ms }. Falls back to getHint when
+ * streaming is unavailable.
+ */
+export const streamHint = async (language, exerciseId, errorMessage, failedTests, onUpdate = () => {}) => {
+  let response;
+  try {
+    response = await fetch(`${API_BASE_URL}/hint/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'text/event-stream',
+      },
+      body: JSON.stringify({
+        language,
+        exercise_id: exerciseId,
+        error_message: errorMessage,
+        failed_tests: failedTests,
+      }),
+    });
+  } catch (error) {
+    console.warn('Hint stream unavailable, using /hint:', error);
+    response = null;
+  }
+
+  if (!response || !response.ok || !response.body) {
+    const data = await getHint(language, exerciseId, errorMessage, failedTests);
+    onUpdate(data.hint);
+    return data;
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text = '';
+  let final = null;
+
+  while (!final) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // SSE events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      raw.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      if (!data) continue;
+      const payload = JSON.parse(data);
+
+      if (event === 'token') {
+        text += payload.text;
+        onUpdate(text);
+      } else if (event === 'hint') {
+        text = payload.hint;
+        onUpdate(text);
+      } else if (event === 'done') {
+        final = payload;
+        onUpdate(payload.hint);
+        break;
+      }
+    }
+  }
+
+  if (!final) {
+    final = { hint: text || 'Review your code and check for errors.', source: 'Basic', rag_used: false };
+    onUpdate(final.hint);
+  }
+  return final;
+};
+
 export const monitorCode = async (code, language) => {
   try {
     const response = await fetch(`${API_BASE_URL}/ai-tutor/monitor`, {